@@ -1,8 +1,19 @@
 """
 Analytics API routes
 """
-from fastapi import APIRouter
-from app.services.analytics_service import AnalyticsService
+import asyncio
+from datetime import date, datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.services.analytics_cache import analytics_cache
+from app.services.analytics_service import MAX_REPORT_PAGE_SIZE, REPORT_PAGE_SIZE, AnalyticsService
+from app.services.daily_rollup_service import start_date
+from app.services.export_service import FORMATS, ExportService
+from app.services.proxy_detection_service import ProxyDetectionService
+from app.services.student_stats_service import StudentStatsService
+from app.services.utilization_service import UtilizationService
+from app.utils.cursor import decode_cursor
 
 router = APIRouter()
 
@@ -18,20 +29,50 @@ async def get_faculty_summary(faculty_id: str, days: int = 30):
     - Faculty attendance rate
     - Average students per session
     """
-    return await AnalyticsService.get_faculty_summary(faculty_id, days)
+    return await analytics_cache.get(
+        'faculty_summary', {'faculty_id': faculty_id, 'days': days}, [('faculty', faculty_id)],
+        lambda: AnalyticsService.get_faculty_summary(faculty_id, days)
+    )
 
 
 @router.get("/session/{session_id}/report")
-async def get_session_report(session_id: str):
+async def get_session_report(
+    session_id: str,
+    limit: int = Query(REPORT_PAGE_SIZE, ge=1, le=MAX_REPORT_PAGE_SIZE),
+    cursor: Optional[str] = None
+):
     """
     Get detailed session report
     
+    Students come one page at a time in scan order; pass the response's
+    next_cursor as cursor for the next page (None on the last page).
+    
     Returns:
     - Session details
     - Attendance statistics
-    - List of students with verification data
+    - One page of students with verification data
     """
-    return await AnalyticsService.get_session_report(session_id)
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return await analytics_cache.get(
+        'session_report', {'session_id': session_id, 'limit': limit, 'cursor': cursor}, [('session', session_id)],
+        lambda: AnalyticsService.get_session_report(session_id, limit, cursor)
+    )
+
+
+@router.get("/session/{session_id}/proxy-findings")
+async def get_proxy_findings(session_id: str):
+    """
+    Get proxy-attendance findings of a session for review
+
+    Returns:
+    - Shared devices, WiFi bursts, identical GPS fixes and impossible timings
+    - Students and attendance records involved, with evidence
+    """
+    return await ProxyDetectionService.get_findings(session_id)
 
 
 @router.get("/subject/{subject_id}/attendance")
@@ -44,7 +85,11 @@ async def get_subject_attendance(subject_id: str, section_id: str = None, days:
     - Session-wise breakdown
     - Trends over time
     """
-    return await AnalyticsService.get_subject_attendance(subject_id, section_id, days)
+    return await analytics_cache.get(
+        'subject_attendance', {'subject_id': subject_id, 'section_id': section_id, 'days': days},
+        [('subject', subject_id)],
+        lambda: AnalyticsService.get_subject_attendance(subject_id, section_id, days)
+    )
 
 
 @router.get("/section/{section_id}/trends")
@@ -57,4 +102,180 @@ async def get_section_trends(section_id: str, days: int = 30):
     - Daily trends
     - Overall statistics
     """
-    return await AnalyticsService.get_section_trends(section_id, days)
+    return await analytics_cache.get(
+        'section_trends', {'section_id': section_id, 'days': days}, [('section', section_id)],
+        lambda: AnalyticsService.get_section_trends(section_id, days)
+    )
+
+
+@router.get("/section/{section_id}/rollup")
+async def get_section_rollup(
+    section_id: str,
+    days: int = 90,
+    period: Literal['day', 'week', 'month'] = 'week',
+    subject_id: str = None
+):
+    """
+    Get section attendance merged into day, week or month buckets
+
+    Returns:
+    - Sessions held, present, suspicious and expected per bucket
+    - Attendance percentage per bucket
+    """
+    return await analytics_cache.get(
+        'section_rollup',
+        {'section_id': section_id, 'days': days, 'period': period, 'subject_id': subject_id},
+        [('section', section_id)],
+        lambda: AnalyticsService.get_section_rollup(section_id, days, period, subject_id)
+    )
+
+
+@router.get("/student/{student_id}/subjects")
+async def get_student_subject_attendance(student_id: str, subject_id: str = None, threshold: float = None):
+    """
+    Get a student's attendance percentage per subject
+
+    Served from per-student counters: one document read with subject_id,
+    one small query without.
+
+    Returns:
+    - Attended, suspicious and held sessions per subject
+    - Attendance percentage and exam eligibility (default 75%)
+    """
+    return await StudentStatsService.get_student_attendance(student_id, subject_id, threshold)
+
+
+@router.get("/section/{section_id}/eligibility")
+async def get_section_eligibility(section_id: str, subject_id: str, threshold: float = None):
+    """
+    Get exam eligibility of every student of a section in one subject
+
+    Returns:
+    - Students with attended/held sessions and percentage, lowest first
+    - Eligible and ineligible totals
+    """
+    return await analytics_cache.get(
+        'section_eligibility', {'section_id': section_id, 'subject_id': subject_id, 'threshold': threshold},
+        [('section', section_id)],
+        lambda: StudentStatsService.get_section_eligibility(section_id, subject_id, threshold)
+    )
+
+
+@router.get("/utilization/room/{classroom_id}")
+async def get_room_utilization(classroom_id: str, days: int = Query(30, ge=1, le=366)):
+    """
+    Get a classroom's daily utilization
+
+    Returns:
+    - Scheduled slots vs sessions held, minutes in use
+    - Occupancy against capacity and peak headcount
+    - Idle days in the period
+    """
+    # Utilization is written by a separate daily job that publishes no
+    # invalidations: responses carry no tags and are keyed by the local day
+    # they were computed for, so a new day never serves the previous one
+    return await analytics_cache.get(
+        'room_utilization', {'classroom_id': classroom_id, 'days': days, 'as_of': start_date(0)}, [],
+        lambda: UtilizationService.get_room_utilization(classroom_id, days)
+    )
+
+
+@router.get("/utilization/block/{block_id}")
+async def get_block_utilization(block_id: str, day: Optional[date] = Query(None, alias="date")):
+    """
+    Get a block's utilization for one day (default yesterday)
+
+    Returns:
+    - Block and per-floor slot, time and occupancy utilization
+    - Idle rooms and a summary per room
+    """
+    # Resolve "yesterday" before keying, so the key never outlives the day
+    day = day.isoformat() if day else start_date(1)
+    return await analytics_cache.get(
+        'block_utilization', {'block_id': block_id, 'date': day}, [],
+        lambda: UtilizationService.get_block_utilization(block_id, day)
+    )
+
+
+@router.get("/utilization/campus/{campus_id}")
+async def get_campus_utilization(campus_id: str, day: Optional[date] = Query(None, alias="date")):
+    """
+    Get a campus's utilization for one day (default yesterday)
+
+    Returns:
+    - Campus totals and idle room count
+    - Per-block utilization, least used first
+    """
+    day = day.isoformat() if day else start_date(1)
+    return await analytics_cache.get(
+        'campus_utilization', {'campus_id': campus_id, 'date': day}, [],
+        lambda: UtilizationService.get_campus_utilization(campus_id, day)
+    )
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Get analytics response cache statistics for this worker
+
+    Returns:
+    - Cached response count
+    - Hits, stale hits, misses, invalidations and hit ratio per endpoint
+    """
+    return analytics_cache.get_stats()
+
+
+ExportFormat = Literal['csv', 'ndjson']
+
+
+def _export_response(scope: str, scope_id: str, fmt: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> StreamingResponse:
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    return StreamingResponse(
+        ExportService.stream(scope, scope_id, fmt, start, end),
+        media_type=FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="attendance_{scope}_{scope_id}.{fmt}"'}
+    )
+
+
+@router.get("/export/session/{session_id}")
+async def export_session(session_id: str, fmt: ExportFormat = Query('csv', alias='format')):
+    """
+    Stream a session's attendance records as CSV or NDJSON
+
+    Rows are read page by page, so memory stays flat for any session size
+    """
+    if not await asyncio.to_thread(ExportService.session_exists, session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return _export_response('session', session_id, fmt)
+
+
+@router.get("/export/section/{section_id}")
+async def export_section(
+    section_id: str,
+    start: datetime,
+    end: Optional[datetime] = None,
+    fmt: ExportFormat = Query('csv', alias='format')
+):
+    """
+    Stream a section's attendance records between start and end (exclusive)
+
+    Naive timestamps are taken as UTC
+    """
+    return _export_response('section', section_id, fmt, start, end)
+
+
+@router.get("/export/student/{student_id}")
+async def export_student(
+    student_id: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    fmt: ExportFormat = Query('csv', alias='format')
+):
+    """
+    Stream a student's attendance records, optionally between start and end (exclusive)
+
+    Naive timestamps are taken as UTC
+    """
+    return _export_response('student', student_id, fmt, start, end)
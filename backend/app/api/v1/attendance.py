@@ -29,6 +29,7 @@ class ScanQRRequest(BaseModel):
     student_id: str
     qr_token: Optional[str] = None
     location_data: Optional[LocationData] = None
+    device_id: Optional[str] = None  # Stable app install ID, for proxy detection
 
 
 @router.post("/scan-qr")
@@ -40,6 +41,7 @@ async def scan_qr(request: ScanQRRequest):
     - session_id: From QR code
     - student_id: Their ID
     - location_data: GPS, WiFi, Bluetooth for verification
+    - device_id: Optional app install ID (proxy detection)
     
     Returns attendance record with verification status
     """
@@ -49,40 +51,22 @@ async def scan_qr(request: ScanQRRequest):
         request.session_id,
         request.student_id,
         request.qr_token,
-        location_dict
+        location_dict,
+        request.device_id
     )
 
 
 @router.get("/student/{student_id}/history")
-async def get_student_attendance_history(student_id: str, limit: int = 50):
+async def get_student_attendance_history(student_id: str, limit: int = 50, cursor: Optional[str] = None):
     """
-    Get student's attendance history
-    
+    Get student's attendance history, newest first
+
+    Pass the response's next_cursor as cursor to get the following page;
+    it is None on the last page.
+
     Returns list of attendance records
     """
-    from app.services.attendance_service import AttendanceService
-    db = AttendanceService._get_db()
-    
-    attendance_records = db.collection('student_attendance') \
-        .where('student_id', '==', student_id) \
-        .order_by('timestamp', direction='DESCENDING') \
-        .limit(limit) \
-        .stream()
-    
-    records = []
-    for doc in attendance_records:
-        data = doc.to_dict()
-        records.append({
-            'attendance_id': doc.id,
-            'session_id': data.get('session_id'),
-            'subject_id': data.get('subject_id'),
-            'status': data.get('status'),
-            'timestamp': data.get('timestamp'),
-            'verification': data.get('verification_data', {})
-        })
-    
-    return {
-        'student_id': student_id,
-        'total_records': len(records),
-        'records': records
-    }
+    try:
+        return await AttendanceService.get_student_history(student_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
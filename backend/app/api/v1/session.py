@@ -1,9 +1,14 @@
 """
 Session API routes
 """
-from fastapi import APIRouter, HTTPException
+import json
+from typing import Dict, Optional, Tuple
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel
+from app.core.config import settings
+from app.services.session_cache import session_cache
 from app.services.session_service_firestore import SessionService
+from app.services.websocket_manager import manager
 
 router = APIRouter()
 
@@ -55,6 +60,102 @@ async def get_session(session_id: str):
     return await SessionService.get_session_details(session_id)
 
 
+# session_id -> (token, etag, 200 response, 304 response) for the token
+# last served. Responses hold no per-request state, so each poll reuses one.
+_token_responses: Dict[str, Tuple[str, str, Response, Response]] = {}
+
+
+def _token_entry(session_id: str, token_data: Dict) -> Tuple[str, str, Response, Response]:
+    """Prepared responses for a session's current token, rebuilt on rotation"""
+    entry = _token_responses.get(session_id)
+    if entry is not None and entry[0] == token_data['token']:
+        return entry
+
+    etag = f'"{token_data["sequence"]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    body = json.dumps({
+        "session_id": session_id,
+        "token": token_data['token'],
+        "sequence": token_data['sequence'],
+        "timestamp": token_data['timestamp'],
+        "expiry": token_data['expiry']
+    }, separators=(',', ':')).encode('utf-8')
+
+    entry = _token_responses[session_id] = (
+        token_data['token'],
+        etag,
+        Response(content=body, media_type="application/json", headers=headers),
+        Response(status_code=304, headers=headers)
+    )
+    return entry
+
+
+async def _forget_token_responses(session_id: str, message: Dict):
+    if message.get('status') == 'ended':
+        _token_responses.pop(session_id, None)
+
+
+manager.add_delivery_hook('session_status', _forget_token_responses, consume=False)
+
+
+def _parse_wait(value: Optional[str]) -> float:
+    if value is None:
+        return 0.0
+    try:
+        wait = float(value)
+    except ValueError:
+        raise HTTPException(status_code=422, detail="wait must be a number of seconds")
+    if wait < 0:
+        raise HTTPException(status_code=422, detail="wait must not be negative")
+    return wait
+
+
+@router.get("/{session_id}/token")
+async def get_session_token(request: Request):
+    """
+    Current QR token for a session, from in-memory rotation state
+    
+    For kiosks and low-end devices that can't hold a Firestore listener or
+    a WebSocket. The rotation sequence is a strong ETag: send it back as
+    If-None-Match to get 304 until the token rotates, and add ?wait=N to
+    hold the request until the next rotation (up to
+    TOKEN_LONG_POLL_MAX_SECONDS) instead of polling.
+    
+    The session id, wait and If-None-Match are read off the request
+    directly: declared parameters cost more than the rest of the handler.
+    """
+    session_id = request.path_params['session_id']
+    token_data = session_cache.get_token(session_id)
+    
+    if token_data is None:
+        # Cold worker (no rotation seen yet): check the session, then read
+        # the stored token once; every later poll is a dictionary lookup
+        session_data = await session_cache.get_session(session_id)
+        if session_data is None:
+            raise HTTPException(status_code=404, detail="Session not found")
+        if session_data.get('status') != 'active':
+            raise HTTPException(status_code=410, detail="Session not active")
+        token_data = await session_cache.load_token(session_id)
+        if token_data is None:
+            raise HTTPException(status_code=404, detail="No token issued yet")
+    
+    _, etag, ok, not_modified = _token_entry(session_id, token_data)
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None and if_none_match.strip() == etag:
+        wait = _parse_wait(request.query_params.get('wait'))
+        if wait > 0:
+            newer = await session_cache.wait_for_token(
+                session_id,
+                after_token=token_data['token'],
+                timeout=min(wait, settings.TOKEN_LONG_POLL_MAX_SECONDS)
+            )
+            if newer is not None:
+                return _token_entry(session_id, newer)[2]
+        return not_modified
+    
+    return ok
+
+
 @router.post("/{session_id}/end")
 async def end_session(session_id: str):
     """End an active session"""
@@ -3,20 +3,23 @@ WebSocket routes for real-time updates - Firestore version
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.services.websocket_manager import manager
+from app.services.attendance_debouncer import attendance_debouncer
 from app.services.attendance_service import AttendanceService
-import firebase_admin
-from firebase_admin import firestore
-from app.core import firebase
-import asyncio
+from app.services.session_broadcaster import broadcaster
+from app.services.roster_stream import roster_streams
+from app.services.session_cache import session_cache
+from app.services import ws_codec, ws_topics
 import json
 
 router = APIRouter()
 
-def _get_db():
-    """Get Firestore client"""
-    if not firebase_admin._apps:
-        firebase.initialize_firebase()
-    return firestore.client()
+
+def _negotiate_encoding(websocket: WebSocket):
+    """(encoding, subprotocol) from the handshake's subprotocols or ?encoding="""
+    return ws_codec.negotiate_handshake(
+        websocket.scope.get('subprotocols') or (),
+        websocket.query_params.get('encoding')
+    )
 
 
 @router.websocket("/session/{session_id}")
@@ -27,9 +30,33 @@ async def websocket_session_endpoint(websocket: WebSocket, session_id: str):
     Clients: SmartBoard portal, Faculty mobile app
     
     Messages sent to client:
+    - qr_update: New QR token (one stream per session, see session_broadcaster)
     - attendance_update: Real-time attendance count
     - session_status: Session state changes
     - student_joined: When a student marks attendance
+    - roster_snapshot / roster_delta: Live present list (opt in with ?roster=1)
+    
+    Messages are JSON text frames by default. Offer a subprotocol to get
+    binary frames instead (see ws_codec): intelliattend.msgpack, or
+    intelliattend.msgpack-short for MessagePack with short keys (the
+    "connected" message carries the [long, short] key pairs). ?encoding=
+    still selects one for clients that can't set subprotocols.
+    permessage-deflate is negotiated by the server when the client offers it.
+    
+    Topics: pass ?role=smartboard|faculty|student to receive only what that
+    client needs (see ws_topics): a SmartBoard gets qr_update, counts and
+    status; a faculty phone gets counts with student names and status, but
+    no QR stream. ?topics=qr,count,students,status overrides the role's
+    defaults. Clients without a role receive everything, as before.
+    
+    Heartbeats: the server sends {"type": "ping"} to connections it hasn't
+    heard from for WS_HEARTBEAT_INTERVAL_SECONDS; reply {"type": "pong"}.
+    Connections silent for WS_HEARTBEAT_TIMEOUT_SECONDS are closed (1001).
+    
+    Roster clients get one roster_snapshot, then a roster_delta per student
+    change with an increasing seq. To resume after a reconnect, pass the
+    last applied delta as ?roster=1&roster_epoch=<epoch>&roster_since=<seq>;
+    only missed deltas are sent, or a fresh snapshot if they can't be.
     
     Usage:
     const ws = new WebSocket('ws://localhost:8000/api/v1/websocket/session/SESSION_ID');
@@ -40,169 +67,234 @@ async def websocket_session_endpoint(websocket: WebSocket, session_id: str):
         }
     };
     """
-    db = _get_db()
+    # Verify session exists (cached view: a reconnect storm costs at most
+    # one Firestore read per session, off the event loop)
+    session_data = await session_cache.get_session(session_id)
     
-    # Verify session exists
-    session_ref = db.collection('sessions').document(session_id)
-    session_doc = session_ref.get()
-    
-    if not session_doc.exists:
+    if session_data is None:
         await websocket.close(code=1008, reason="Session not found")
         return
     
-    session_data = session_doc.to_dict()
-    
     if session_data.get('status') != 'active':
         await websocket.close(code=1008, reason="Session not active")
         return
     
-    # Connect client
-    await manager.connect(websocket, session_id)
-    
-    # Send initial state
-    attendance_count = await get_attendance_count(session_id)
-    await manager.send_personal_message({
-        "type": "connected",
-        "session_id": session_id,
-        "total_present": attendance_count,
-        "message": "Connected to session"
-    }, websocket)
-    
-    # Start QR Broadcast Loop
-    qr_task = asyncio.create_task(qr_broadcast_loop(session_id))
+    # Connect client (JSON unless a binary subprotocol was offered)
+    encoding, subprotocol = _negotiate_encoding(websocket)
+    role = ws_topics.resolve_role(websocket.query_params.get('role'))
+    topics = ws_topics.resolve_topics(role, websocket.query_params.get('topics'))
+    wants_qr = ws_topics.TOPIC_QR in topics
+    wants_roster = websocket.query_params.get('roster') in ('1', 'true')
+    qr_subscribed = roster_subscribed = False
 
+    # Everything from connect on is inside the try, so a client that goes
+    # away mid-handshake still releases its connection and subscriptions
     try:
+        await manager.connect(websocket, session_id, encoding, role=role, topics=topics, subprotocol=subprotocol)
+        
+        # Send initial state (in-memory count, kept current by attendance_update)
+        attendance_count = await session_cache.get_attendance_count(session_id)
+        connected = {
+            "type": "connected",
+            "session_id": session_id,
+            "total_present": attendance_count,
+            "role": role,
+            "topics": sorted(topics),
+            "encoding": encoding,
+            "message": "Connected to session"
+        }
+        if encoding == ws_codec.ENCODING_MSGPACK_SHORT:
+            connected["keys"] = ws_codec.short_key_pairs()
+        await manager.send_personal_message(connected, websocket)
+        
+        # Join the session's QR broadcaster (started on first subscriber);
+        # clients off the qr topic don't keep it running
+        if wants_qr:
+            broadcaster.subscribe(session_id)
+            qr_subscribed = True
+        
+        if wants_roster:
+            since = websocket.query_params.get('roster_since')
+            roster_subscribed = True
+            await roster_streams.subscribe(
+                websocket,
+                session_id,
+                epoch=websocket.query_params.get('roster_epoch'),
+                since=int(since) if since and since.isdigit() else None
+            )
+        
         # Keep connection alive and listen for messages
         while True:
             data = await websocket.receive_text()
+            manager.touch(websocket)
             
             try:
                 message = json.loads(data)
                 
-                # Handle ping/pong
+                # Handle ping/pong (a pong answers a server heartbeat; touch() already counted it)
                 if message.get('type') == 'ping':
-                    await websocket.send_json({"type": "pong"})
+                    await manager.send_personal_message({"type": "pong"}, websocket)
+                
+                elif message.get('type') == 'pong':
+                    pass
                 
                 # Handle refresh request
                 elif message.get('type') == 'refresh':
-                    count = await get_attendance_count(session_id)
-                    await websocket.send_json({
+                    count = await session_cache.refresh_attendance_count(session_id)
+                    await manager.send_personal_message({
                         "type": "attendance_update",
                         "total_present": count
-                    })
+                    }, websocket)
                 
             except json.JSONDecodeError:
-                await websocket.send_json({
+                await manager.send_personal_message({
                     "type": "error",
                     "message": "Invalid JSON"
-                })
+                }, websocket)
     
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        qr_task.cancel()
+        pass
     
     except Exception as e:
         print(f"WebSocket error: {e}")
+    
+    finally:
         manager.disconnect(websocket)
-        qr_task.cancel()
+        if qr_subscribed:
+            broadcaster.unsubscribe(session_id)
+        if roster_subscribed:
+            roster_streams.unsubscribe(websocket, session_id)
 
 
-async def qr_broadcast_loop(session_id: str):
+@router.websocket("/session/{session_id}/token")
+async def websocket_student_token_endpoint(websocket: WebSocket, session_id: str):
     """
-    Background task to generate and broadcast QR tokens every 5 seconds
+    Read-only QR token channel for student devices
+    
+    An alternative to a Firestore listener on ActiveSessions/{id}, which
+    costs every student a document read per rotation. Sends the current
+    token on connect, then a qr_update per rotation and session_status
+    changes. Everything is served from this worker's in-memory rotation
+    state: one encode per rotation for all of a session's students.
+    
+    Messages sent to client:
+    - qr_update: {qr_token, sequence_number, timestamp, expiry}
+    - session_status: Session state changes (ended: stop scanning)
+    
+    The only messages accepted are ping (answered with pong) and pong
+    (answering the server heartbeat); anything else is ignored.
     """
-    print(f"🔄 Starting QR Loop for {session_id} (Task Started)")
+    session_data = await session_cache.get_session(session_id)
+    
+    if session_data is None:
+        await websocket.close(code=1008, reason="Session not found")
+        return
+    
+    if session_data.get('status') != 'active':
+        await websocket.close(code=1008, reason="Session not active")
+        return
+    
+    encoding, subprotocol = _negotiate_encoding(websocket)
+    subscribed = False
+    
     try:
-        from app.services.qr_service import QRService
-        from app.core.config import settings
-        from app.core.constants import QR_TOKEN_PREFIX
-        import base64
-        import json
-        from datetime import datetime
-
-        db = _get_db()
+        await manager.connect(
+            websocket, session_id, encoding,
+            role="student",
+            topics=(ws_topics.TOPIC_QR, ws_topics.TOPIC_STATUS),
+            subprotocol=subprotocol
+        )
         
-        sequence = 0
+        token_data = await session_cache.load_token(session_id)
+        if token_data is not None:
+            await manager.send_personal_message({
+                "type": "qr_update",
+                "qr_token": token_data['token'],
+                "sequence_number": token_data['sequence'],
+                "timestamp": token_data['timestamp'],
+                "expiry": token_data['expiry']
+            }, websocket)
+        
+        broadcaster.subscribe(session_id)
+        subscribed = True
         
         while True:
-            # Get latest session data
-            session_ref = db.collection('sessions').document(session_id)
-            session_doc = session_ref.get()
-            
-            if not session_doc.exists:
-                print(f"❌ Session {session_id} not found in loop")
-                break
-                
-            session_data = session_doc.to_dict()
-            if session_data.get('status') != 'active':
-                print(f"⏹️ Session {session_id} not active ({session_data.get('status')})")
-                break
-            
-            # Use 'class_code' as subject or fallback
-            subject_id = session_data.get('class_code', 'UNKNOWN')
-            room_id = session_data.get('room_id', 'UNKNOWN-ROOM')
-            
-            sequence += 1
-            timestamp = int(datetime.utcnow().timestamp())
-            
-            # ... payload construction ...
-            
-            payload_data = {
-                "sid": session_id,
-                "cid": session_data.get('class_id', 'UNKNOWN-CLASS'),
-                "rid": room_id,
-                "sub": subject_id,
-                "seq": sequence,
-                "ts": timestamp
-            }
-            
-            # Serialize and encode payload
-            json_str = json.dumps(payload_data, separators=(',', ':'))
-            payload_b64 = base64.urlsafe_b64encode(json_str.encode('utf-8')).decode('utf-8').rstrip('=')
-            
-            # Generate HMAC signature
-            signature = QRService._generate_signature(payload_b64)
-            
-            # Construct final token
-            qr_token = f"{QR_TOKEN_PREFIX}_{payload_b64}_{signature}"
-            
-            print(f"📤 Broadcasting QR: {qr_token[:20]}...")
-            
-            # Broadcast to session clients
-            await manager.broadcast_to_session(session_id, {
-                "type": "qr_update",
-                "qr_token": qr_token,
-                "sequence_number": sequence,
-                "timestamp": timestamp
-            })
-            
-            await asyncio.sleep(5) # 5 Second Rotation
+            data = await websocket.receive_text()
+            manager.touch(websocket)
             
-    except asyncio.CancelledError:
-        print(f"QR Loop cancelled for session {session_id}")
+            try:
+                message = json.loads(data)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(message, dict) and message.get('type') == 'ping':
+                await manager.send_personal_message({"type": "pong"}, websocket)
+    
+    except WebSocketDisconnect:
+        pass
+    
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        print(f"Error in QR loop for {session_id}: {e}")
+        print(f"WebSocket error: {e}")
+    
+    finally:
+        manager.disconnect(websocket)
+        if subscribed:
+            broadcaster.unsubscribe(session_id)
 
 
-async def get_attendance_count(session_id: str) -> int:
-    """Get current attendance count for a session"""
-    db = _get_db()
+@router.get("/session/{session_id}/stats")
+async def get_session_fanout_stats(session_id: str):
+    """
+    Broadcast fan-out stats for a session on this worker
     
-    attendance_records = db.collection('student_attendance') \
-        .where('session_id', '==', session_id) \
-        .where('status', '==', 'present') \
-        .stream()
+    Returns latency of recent broadcasts (ms), send timeouts,
+    slow-consumer evictions and attendance_update debouncing (messages
+    saved during scan bursts)
+    """
+    stats = manager.get_fanout_stats(session_id)
+    stats["attendance_debounce"] = attendance_debouncer.get_stats(session_id)
+    return stats
+
+
+@router.get("/connections/stats")
+async def get_connection_stats(session_id: str = None):
+    """
+    WebSocket connections on this worker
     
-    return sum(1 for _ in attendance_records)
+    Totals by role, bytes sent, heartbeats sent and reaped connections;
+    pass ?session_id= to list that session's connections as well
+    """
+    return manager.get_connection_stats(session_id)
+
 
+async def get_attendance_count(session_id: str) -> int:
+    """Get current attendance count for a session"""
+    return await session_cache.get_attendance_count(session_id)
 
-async def notify_attendance_marked(session_id: str, student_name: str = None):
+
+async def notify_attendance_marked(
+    session_id: str,
+    student_name: str = None,
+    student_id: str = None,
+    attendance_status: str = None,
+    marked_at: str = None
+):
     """
     Notify all connected clients that a student marked attendance
     
-    Called from attendance_service.py after successful attendance marking
+    Called from attendance_service.py after successful attendance marking.
+    The count goes out through the debouncer: immediately after a quiet
+    period, merged into one trailing message during a scan burst.
     """
-    count = await get_attendance_count(session_id)
-    await manager.send_attendance_update(session_id, count, student_name)
+    if attendance_status == 'present':
+        count = await session_cache.record_present(session_id)
+    else:
+        count = await session_cache.get_attendance_count(session_id)
+    await attendance_debouncer.update(session_id, count, student_name, student_id)
+    
+    if student_id:
+        await roster_streams.publish(session_id, {
+            "student_id": student_id,
+            "name": student_name,
+            "status": attendance_status,
+            "marked_at": marked_at
+        })
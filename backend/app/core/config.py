@@ -32,9 +32,43 @@ class Settings(BaseSettings):
     SESSION_DURATION_MINUTES: int = 2
     QR_REFRESH_INTERVAL_SECONDS: int = 5
     QR_TOKEN_EXPIRY_SECONDS: int = 7
+    QR_TOKEN_VERSION: int = 1  # 1 = JSON/base64 (QR_...), 2 = compact binary (Q2...)
+    STUDENT_TOKEN_CHANNEL: str = "listener"  # "websocket" tells student apps to use /websocket/session/{id}/token instead of a Firestore listener
+    TOKEN_LONG_POLL_MAX_SECONDS: int = 30  # Cap for GET /sessions/{id}/token?wait=
+    SESSION_CACHE_TTL_SECONDS: int = 30  # In-memory session document cache
+    
+    # WebSocket fan-out
+    WS_SEND_TIMEOUT_SECONDS: float = 1.0  # Per-send budget during a broadcast
+    WS_SLOW_CONSUMER_MAX_STRIKES: int = 3  # Send-timeout periods one stuck send may last before eviction
+    WS_OUTBOUND_QUEUE_SIZE: int = 32  # Per-connection queued messages (latest-wins types take one slot each)
+    WS_HEARTBEAT_INTERVAL_SECONDS: int = 15  # Ping connections quiet this long; 0 disables heartbeats
+    WS_HEARTBEAT_TIMEOUT_SECONDS: int = 45  # Reap connections silent this long
+    WS_ATTENDANCE_DEBOUNCE_MS: int = 250  # Merge attendance_update broadcasts within this window; 0 sends each
+    WS_ROSTER_BUFFER_SIZE: int = 256  # Roster deltas kept per session for resume-from-sequence
+    WS_ROSTER_IDLE_TTL_SECONDS: int = 300  # Keep a roster this long after its last subscriber leaves
+    WS_PER_MESSAGE_DEFLATE: bool = True  # Let uvicorn negotiate permessage-deflate with clients that offer it
+    WS_BACKPLANE: str = "inprocess"  # "inprocess" (single worker) or "unix" (multi-worker, local broker)
+    WS_BACKPLANE_SOCKET: str = "/tmp/intelliattend-backplane.sock"
     OTP_EXPIRY_MINUTES: int = 5
     OTP_LENGTH: int = 6
     
+    # Analytics
+    ANALYTICS_TIMEZONE: str = "Asia/Kolkata"  # Day boundaries for daily rollups
+    ANALYTICS_CACHE_DIR: str = "data/analytics_cache"  # Local Parquet copy for semester reports (needs pyarrow)
+    ANALYTICS_RESPONSE_TTL_SECONDS: int = 60  # Analytics responses are fresh this long...
+    ANALYTICS_RESPONSE_STALE_SECONDS: int = 600  # ...then served stale while refreshing
+    ANALYTICS_RESPONSE_CACHE_SIZE: int = 2000  # Cached analytics responses per worker
+    ATTENDANCE_ELIGIBILITY_PERCENT: float = 75.0  # Minimum attendance for exam eligibility
+    UTILIZATION_TEACHING_MINUTES: int = 420  # Bookable minutes per classroom per day
+    
+    # Proxy Detection (batch detectors run on end_session and nightly)
+    PROXY_DETECTION_ON_END_SESSION: bool = True
+    PROXY_GPS_RADIUS_METERS: float = 0.1  # Fixes this close from different students are "identical"
+    PROXY_GPS_MAX_ACCURACY_METERS: float = 25.0  # Coarser (network) fixes are ignored
+    PROXY_BURST_SECONDS: float = 0.5  # Max gap between scans in a WiFi burst
+    PROXY_BURST_MIN_SCANS: int = 3
+    PROXY_MIN_DEVICE_GAP_SECONDS: float = 20.0  # One phone can't switch accounts and rescan faster
+    
     # Verification Thresholds
     CONFIDENCE_THRESHOLD: float = 0.6
     BLE_RSSI_THRESHOLD: int = -70
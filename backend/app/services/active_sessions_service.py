@@ -6,10 +6,15 @@ import firebase_admin
 from firebase_admin import firestore
 from app.core import firebase as firebase_init
 from app.utils.token_generator import TokenGenerator
+from app.utils.token_engine import get_token_engine
+from app.core.config import settings
 from datetime import datetime, timezone
 from typing import Dict, Optional
 import asyncio
 
+# Firestore rejects batches of more than 500 writes
+BATCH_LIMIT = 500
+
 
 class ActiveSessionsService:
     """
@@ -97,7 +102,10 @@ class ActiveSessionsService:
             'roomId': room_id,
             'subjectId': subject_id,
             'createdAt': firestore.SERVER_TIMESTAMP,
-            'lastRotation': firestore.SERVER_TIMESTAMP
+            'lastRotation': firestore.SERVER_TIMESTAMP,
+            # "websocket": apps read this document once, then follow
+            # /api/v1/websocket/session/{id}/token instead of listening here
+            'tokenChannel': settings.STUDENT_TOKEN_CHANNEL
         }
         
         active_session_ref = db.collection(ActiveSessionsService.COLLECTION_NAME).document(session_id)
@@ -162,9 +170,92 @@ class ActiveSessionsService:
         active_session_ref.update(update_data)
         
         print(f"🔄 Token rotated for {session_id} - Seq: {next_sequence}")
-        
+
         return new_token_data
-    
+
+    @staticmethod
+    async def rotate_tokens(session_ids: list) -> Dict[str, Dict]:
+        """
+        Rotate tokens for many sessions in one pass
+
+        Same semantics as rotate_token, but reads all ActiveSessions documents
+        in a single get_all round trip, mints every token with one
+        generate_many call and commits the updates in batches of BATCH_LIMIT.
+        A batch that fails is logged and its sessions keep their current
+        token until the next pass; the other batches still commit. The
+        Firestore work runs in a worker thread, off the event loop.
+
+        Args:
+            session_ids: Sessions to rotate
+
+        Returns:
+            Dict of session_id -> new token data for sessions that rotated
+        """
+        if not session_ids:
+            return {}
+        return await asyncio.to_thread(ActiveSessionsService._rotate_tokens_blocking, list(session_ids))
+
+    @staticmethod
+    def _rotate_tokens_blocking(session_ids: list) -> Dict[str, Dict]:
+        db = ActiveSessionsService._get_db()
+        collection = db.collection(ActiveSessionsService.COLLECTION_NAME)
+
+        snapshots = db.get_all([collection.document(session_id) for session_id in session_ids])
+
+        active = []
+        for doc in snapshots:
+            if not doc.exists:
+                print(f"⚠️ ActiveSession not found: {doc.id}")
+                continue
+            data = doc.to_dict()
+            if data.get('status') != 'active':
+                print(f"⚠️ ActiveSession not active: {doc.id}")
+                continue
+            active.append((doc, data))
+
+        if not active:
+            return {}
+
+        tokens = get_token_engine().generate_many([
+            {
+                'session_id': doc.id,
+                'class_id': data.get('classId', 'UNKNOWN'),
+                'room_id': data.get('roomId', 'UNKNOWN'),
+                'subject_id': data.get('subjectId', 'UNKNOWN'),
+                'sequence': data.get('sequence', 0) + 1
+            }
+            for doc, data in active
+        ])
+
+        rotated = {}
+        updates = list(zip(active, tokens))
+        for start in range(0, len(updates), BATCH_LIMIT):
+            chunk = updates[start:start + BATCH_LIMIT]
+            batch = db.batch()
+            for (doc, data), token_data in chunk:
+                batch.update(doc.reference, {
+                    'previousToken': data.get('currentToken'),
+                    'previousTimestamp': data.get('currentTimestamp'),
+                    'previousExpiry': data.get('currentExpiry'),
+                    'currentToken': token_data['token'],
+                    'currentTimestamp': token_data['timestamp'],
+                    'currentExpiry': token_data['expiry'],
+                    'sequence': token_data['sequence'],
+                    'serverTime': firestore.SERVER_TIMESTAMP,
+                    'lastRotation': firestore.SERVER_TIMESTAMP
+                })
+            try:
+                batch.commit()
+            except Exception as e:
+                print(f"❌ Token rotation failed for {len(chunk)} session(s): {e}")
+                continue
+            for (doc, data), token_data in chunk:
+                rotated[doc.id] = token_data
+
+        print(f"🔄 Tokens rotated for {len(rotated)} session(s)")
+
+        return rotated
+
     @staticmethod
     async def get_active_session(session_id: str) -> Optional[Dict]:
         """
@@ -186,6 +277,39 @@ class ActiveSessionsService:
         
         return active_session_doc.to_dict()
     
+    @staticmethod
+    async def get_current_token(session_id: str) -> Optional[Dict]:
+        """
+        Get the stored current token for an active session, if still valid
+
+        Read in a worker thread, off the event loop.
+
+        Returns:
+            Token data (token, timestamp, expiry, sequence) or None if the
+            session has no active document or its token has expired
+        """
+        return await asyncio.to_thread(ActiveSessionsService._current_token_blocking, session_id)
+
+    @staticmethod
+    def _current_token_blocking(session_id: str) -> Optional[Dict]:
+        db = ActiveSessionsService._get_db()
+        doc = db.collection(ActiveSessionsService.COLLECTION_NAME).document(session_id).get()
+        if not doc.exists:
+            return None
+
+        data = doc.to_dict()
+        if data.get('status') != 'active' or not data.get('currentToken'):
+            return None
+        if (data.get('currentExpiry') or 0) <= datetime.now(timezone.utc).timestamp():
+            return None
+
+        return {
+            'token': data['currentToken'],
+            'timestamp': data.get('currentTimestamp'),
+            'expiry': data.get('currentExpiry'),
+            'sequence': data.get('sequence', 0)
+        }
+
     @staticmethod
     async def end_active_session(session_id: str) -> bool:
         """
@@ -273,10 +397,9 @@ class ActiveSessionsService:
         if not is_valid:
             return False, error_msg
         
-        # Check session ID matches
-        token_session_id = payload.get('sid')
-        if token_session_id != session_id:
-            return False, f"Token session mismatch: expected {session_id}, got {token_session_id}"
+        # Check session ID matches (v2 tokens may only carry a handle)
+        if not get_token_engine().matches_session(payload, session_id):
+            return False, f"Token session mismatch: expected {session_id}, got {payload.get('sid')}"
         
         # Get ActiveSession data
         active_session_data = await ActiveSessionsService.get_active_session(session_id)
@@ -0,0 +1,232 @@
+"""
+Analytics Cache - Per-worker response cache for analytics endpoints
+
+Dashboards poll the same summaries with the same parameters; each response
+is cached under (endpoint, parameters) and tagged with the faculty,
+section, subject and session it depends on.
+
+- Fresh for ANALYTICS_RESPONSE_TTL_SECONDS, then served stale for up to
+  ANALYTICS_RESPONSE_STALE_SECONDS more while one background task
+  recomputes it (stale-while-revalidate), so polls never wait on Firestore
+  for a response that has been computed before.
+- attendance_update and analytics_invalidate messages delivered through
+  the backplane mark every entry tagged with the session, its section,
+  subject and faculty as stale on every worker. The next poll still gets
+  an instant answer and triggers the refresh.
+- Concurrent misses for one key share a single computation.
+
+Hits, stale hits and misses are counted per endpoint (get_stats()).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.websocket_manager import manager
+
+INVALIDATE_EVENT = "analytics_invalidate"
+
+Key = Tuple[str, Tuple]
+Tag = Tuple[str, str]
+
+
+def session_tags(session_id: str, session_data: Optional[Dict]) -> Set[Tag]:
+    """Tags of every cached response a change to this session can affect"""
+    tags = {('session', session_id)}
+    for kind in ('faculty', 'section', 'subject'):
+        value = (session_data or {}).get(f"{kind}_id")
+        if value:
+            tags.add((kind, value))
+    return tags
+
+
+class _Entry:
+    __slots__ = ('value', 'fetched_at', 'tags', 'stale')
+
+    def __init__(self, value, fetched_at: float, tags: Set[Tag], stale: bool = False):
+        self.value = value
+        self.fetched_at = fetched_at
+        self.tags = tags
+        self.stale = stale
+
+
+class AnalyticsCache:
+    """
+    Per-worker cache of analytics responses
+
+    - (endpoint, params) -> response, at most max_entries (least recently
+      used are evicted)
+    - tag -> keys, for targeted invalidation
+    - per-endpoint hit/stale/miss counters
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, stale_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.ANALYTICS_RESPONSE_TTL_SECONDS
+        self.stale_seconds = stale_seconds if stale_seconds is not None \
+            else settings.ANALYTICS_RESPONSE_STALE_SECONDS
+        self.max_entries = max_entries or settings.ANALYTICS_RESPONSE_CACHE_SIZE
+        self._entries: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._tags: Dict[Tag, Set[Key]] = {}
+        # key -> in-flight computation shared by concurrent callers
+        self._inflight: Dict[Key, asyncio.Future] = {}
+        # keys invalidated while their computation was in flight
+        self._dirty: Set[Key] = set()
+        # invalidations waiting on a session read
+        self._background: Set[asyncio.Task] = set()
+        # endpoint -> counters
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _endpoint_stats(self, endpoint: str) -> Dict[str, int]:
+        return self._stats.setdefault(endpoint, {'hits': 0, 'stale_hits': 0, 'misses': 0, 'invalidations': 0})
+
+    def _untag(self, key: Key, tags: Iterable[Tag]):
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, endpoint: str, params: Dict, tags: Iterable[Tag],
+                  compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Get a response from the cache, computing it on a miss
+
+        Args:
+            endpoint: Endpoint name, the first part of the cache key
+            params: Request parameters, the rest of the key
+            tags: (kind, id) pairs whose changes invalidate the response
+            compute: Coroutine factory producing the response
+
+        Returns:
+            Cached or freshly computed response
+        """
+        key = (endpoint, tuple(sorted(params.items())))
+        stats = self._endpoint_stats(endpoint)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry.fetched_at
+            if not entry.stale and age < self.ttl_seconds:
+                stats['hits'] += 1
+                self._entries.move_to_end(key)
+                return entry.value
+            if age < self.ttl_seconds + self.stale_seconds:
+                stats['stale_hits'] += 1
+                self._entries.move_to_end(key)
+                self._refresh(key, set(tags), compute)
+                return entry.value
+
+        stats['misses'] += 1
+        return await asyncio.shield(self._refresh(key, set(tags), compute))
+
+    def _refresh(self, key: Key, tags: Set[Tag], compute: Callable[[], Awaitable[Dict]]) -> asyncio.Future:
+        """Start computing key unless a computation is already running"""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return pending
+
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        self._dirty.discard(key)
+        started = time.monotonic()
+
+        async def run():
+            try:
+                value = await compute()
+            finally:
+                self._inflight.pop(key, None)
+            # Error responses aren't cached; the next request tries again
+            if not (isinstance(value, dict) and 'error' in value):
+                self._store(key, _Entry(value, started, tags, stale=key in self._dirty))
+            elif key not in self._entries:
+                self._untag(key, tags)
+            self._dirty.discard(key)
+            return value
+
+        pending = asyncio.ensure_future(run())
+        # Background refreshes nobody awaits must not log unretrieved errors
+        pending.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._inflight[key] = pending
+        return pending
+
+    def _store(self, key: Key, entry: _Entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._untag(old_key, old_entry.tags)
+
+    def invalidate(self, tags: Iterable[Tag]) -> int:
+        """
+        Mark every response carrying one of these tags as stale
+
+        Returns:
+            Number of cached responses marked
+        """
+        marked = 0
+        for tag in tags:
+            for key in self._tags.get(tag, ()):
+                if key in self._inflight:
+                    self._dirty.add(key)
+                entry = self._entries.get(key)
+                if entry is not None and not entry.stale:
+                    entry.stale = True
+                    marked += 1
+                    self._endpoint_stats(key[0])['invalidations'] += 1
+        return marked
+
+    async def invalidate_session(self, session_id: str):
+        """Invalidate responses depending on a session (looked up in the session cache)"""
+        from app.services.session_cache import session_cache
+        try:
+            session_data = await session_cache.get_session(session_id)
+        except Exception as e:
+            print(f"⚠️ Analytics cache could not resolve session {session_id}: {e}")
+            session_data = None
+        self.invalidate(session_tags(session_id, session_data))
+
+    def _invalidate_soon(self, session_id: str):
+        """Invalidate now if the session is cached, else after reading it in the background"""
+        from app.services.session_cache import session_cache
+        session_data = session_cache.peek_session(session_id)
+        if session_data is not None:
+            self.invalidate(session_tags(session_id, session_data))
+            return
+        # Hooks run inline with the broadcast; don't hold it for a Firestore read
+        task = asyncio.ensure_future(self.invalidate_session(session_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def publish_invalidation(self, session_id: str):
+        """Invalidate a session's responses on every worker"""
+        await manager.broadcast_to_session(session_id, {"type": INVALIDATE_EVENT, "session_id": session_id})
+
+    async def on_session_change(self, session_id: str, message: Dict):
+        """Backplane delivery hook: attendance_update / analytics_invalidate"""
+        self._invalidate_soon(session_id)
+
+    def get_stats(self) -> Dict:
+        """Per-endpoint hit, stale hit and miss counts with hit ratios"""
+        endpoints = {}
+        for endpoint, stats in self._stats.items():
+            requests = stats['hits'] + stats['stale_hits'] + stats['misses']
+            endpoints[endpoint] = {
+                **stats,
+                'hit_ratio': round((stats['hits'] + stats['stale_hits']) / requests, 4) if requests else 0.0
+            }
+        return {'entries': len(self._entries), 'endpoints': endpoints}
+
+    def clear(self):
+        """Drop every cached response and counter"""
+        self._entries.clear()
+        self._tags.clear()
+        self._dirty.clear()
+        self._stats.clear()
+
+
+# Global analytics cache instance
+analytics_cache = AnalyticsCache()
+manager.add_delivery_hook('attendance_update', analytics_cache.on_session_change, consume=False)
+manager.add_delivery_hook(INVALIDATE_EVENT, analytics_cache.on_session_change)
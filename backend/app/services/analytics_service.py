@@ -1,70 +1,239 @@
 """
 Analytics Service - Generate attendance reports and statistics
+
+Totals come from per-session rollups (see session_rollup_service), read in
+batches; sessions without a rollup yet fall back to server-side count
+aggregations. Section and subject trends read daily rollups (see
+daily_rollup_service), so their cost grows with days, not sessions.
+Section documents are fetched once per request. Every response carries
+query_stats: Firestore round trips and billed document reads (one per
+document returned, at least one per query, one per 1000 index entries for
+a count).
 """
+import asyncio
+import math
 import firebase_admin
 from firebase_admin import firestore
 from app.core import firebase
-from datetime import datetime, timedelta
-from typing import Dict, List
+from app.services.daily_rollup_service import (
+    DailyRollupService, day_start, merge_range, session_entries, start_date
+)
+from app.services.attendance_service import VERIFICATION_FIELDS
+from app.services.session_rollup_service import SessionRollupService, build_rollup, pass_rates
+from app.utils.cursor import decode_cursor, page
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
 from collections import defaultdict
 
+# Firestore caps the values of an 'in' filter
+IN_QUERY_LIMIT = 30
+
+# Documents per batched get
+GET_ALL_CHUNK = 300
+
+SESSION_FIELDS = ['subject_id', 'section_id', 'created_at']
+
+# Students per session report page; only the listed fields are fetched
+REPORT_PAGE_SIZE = 100
+MAX_REPORT_PAGE_SIZE = 500
+REPORT_FIELDS = ['student_id', 'status', 'timestamp'] + \
+    [f"verification_data.{field}" for field in VERIFICATION_FIELDS]
+
+
+class AnalyticsReads:
+    """
+    Firestore access for one analytics request
+
+    Runs each read in a worker thread, counts round trips and documents
+    read, and memoizes section documents so a report never reads the same
+    section twice.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.round_trips = 0
+        self.documents_read = 0
+        self._sections: Dict[str, Optional[Dict]] = {}
+
+    async def get(self, ref) -> Optional[Dict]:
+        """Read one document, None if it doesn't exist"""
+        doc = await asyncio.to_thread(ref.get)
+        self.round_trips += 1
+        self.documents_read += 1
+        return doc.to_dict() if doc.exists else None
+
+    async def stream(self, query) -> list:
+        """Run a query and return its snapshots"""
+        docs = await asyncio.to_thread(lambda: list(query.stream()))
+        self.round_trips += 1
+        self.documents_read += max(1, len(docs))
+        return docs
+
+    async def count(self, query) -> int:
+        """Count a query's matches with a server-side aggregation"""
+        result = await asyncio.to_thread(lambda: query.count(alias='total').get())
+        total = int(result[0][0].value)
+        self.round_trips += 1
+        self.documents_read += max(1, math.ceil(total / 1000))
+        return total
+
+    async def count_each(self, queries: Iterable) -> List[int]:
+        """Run several count aggregations concurrently"""
+        return list(await asyncio.gather(*(self.count(query) for query in queries)))
+
+    async def sections(self, section_ids: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Section documents by ID, read in one batch and memoized
+
+        Returns:
+            Dict of section_id -> section data (None if it doesn't exist)
+        """
+        section_ids = {section_id for section_id in section_ids if section_id}
+        missing = [section_id for section_id in section_ids if section_id not in self._sections]
+        if missing:
+            collection = self.db.collection('sections')
+            snapshots = await asyncio.to_thread(
+                lambda: list(self.db.get_all([collection.document(section_id) for section_id in missing]))
+            )
+            self.round_trips += 1
+            self.documents_read += len(missing)
+            for doc in snapshots:
+                self._sections[doc.id] = doc.to_dict() if doc.exists else None
+        return {section_id: self._sections.get(section_id) for section_id in section_ids}
+
+    async def rollups(self, session_ids: List[str]) -> Dict[str, Dict]:
+        """Session rollups by ID, one batched read per GET_ALL_CHUNK sessions"""
+        chunks = list(_chunks(session_ids, GET_ALL_CHUNK))
+        results = await asyncio.gather(*(
+            asyncio.to_thread(SessionRollupService.get_many_blocking, self.db, chunk) for chunk in chunks
+        ))
+        self.round_trips += len(chunks)
+        self.documents_read += len(session_ids)
+        rollups = {}
+        for result in results:
+            rollups.update(result)
+        return rollups
+
+    async def expected_students(self, section_id: Optional[str]) -> int:
+        """total_students of a section, 0 if unknown"""
+        if not section_id:
+            return 0
+        section = (await self.sections([section_id])).get(section_id)
+        return section.get('total_students', 0) if section else 0
+
+    def stats(self) -> Dict:
+        return {'round_trips': self.round_trips, 'documents_read': self.documents_read}
+
+
+def _chunks(items: List[str], size: int = IN_QUERY_LIMIT):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _utc(value) -> datetime:
+    """Timestamps as aware UTC for comparisons (naive values are taken as UTC, like Firestore does)"""
+    if not isinstance(value, datetime):
+        return datetime.min.replace(tzinfo=timezone.utc)
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _in_window(value, cutoff_date: datetime) -> bool:
+    return isinstance(value, datetime) and _utc(value) >= cutoff_date
+
+
+def _present_query(db, session_ids):
+    """Present records of one session ID or a chunk of them"""
+    query = db.collection('student_attendance')
+    if isinstance(session_ids, str):
+        query = query.where('session_id', '==', session_ids)
+    else:
+        query = query.where('session_id', 'in', session_ids)
+    return query.where('status', '==', 'present')
+
+
 class AnalyticsService:
     """Handle analytics and reporting"""
-    
+
     @staticmethod
     def _get_db():
         """Get Firestore client"""
         if not firebase_admin._apps:
             firebase.initialize_firebase()
         return firestore.client()
-    
+
+    @staticmethod
+    async def _session_totals(reads: AnalyticsReads, session_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Rollup per session; sessions without one (no scans yet, or not
+        backfilled) get an unfinalized stand-in counted by aggregation
+        """
+        rollups = await reads.rollups(session_ids)
+        missing = [session_id for session_id in session_ids if session_id not in rollups]
+        if missing:
+            counts = await reads.count_each(_present_query(reads.db, session_id) for session_id in missing)
+            for session_id, present in zip(missing, counts):
+                rollups[session_id] = {'present': present, 'suspicious': 0, 'finalized': False}
+        return rollups
+
+    @staticmethod
+    async def _expected(reads: AnalyticsReads, rollups: Dict[str, Dict], sessions: List[tuple]) -> Dict[str, int]:
+        """Expected students per session: frozen in finalized rollups, else the section's size"""
+        open_sections = [
+            session_data.get('section_id') for session_id, session_data in sessions
+            if not rollups[session_id].get('finalized')
+        ]
+        sections = await reads.sections(open_sections)
+        expected = {}
+        for session_id, session_data in sessions:
+            rollup = rollups[session_id]
+            if rollup.get('finalized'):
+                expected[session_id] = rollup.get('expected', 0)
+            else:
+                section = sections.get(session_data.get('section_id'))
+                expected[session_id] = section.get('total_students', 0) if section else 0
+        return expected
+
     @staticmethod
     async def get_faculty_summary(faculty_id: str, days: int = 30):
         """
         Get faculty teaching summary
-        
+
         Args:
             faculty_id: Faculty ID
             days: Number of days to look back
-        
+
         Returns:
             Summary statistics
         """
         db = AnalyticsService._get_db()
-        
+        reads = AnalyticsReads(db)
+
         # Get all sessions by this faculty
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        sessions = db.collection('sessions') \
-            .where('faculty_id', '==', faculty_id) \
-            .where('created_at', '>=', cutoff_date) \
-            .stream()
-        
-        total_sessions = 0
-        total_students_present = 0
-        subjects = set()
-        
-        for session_doc in sessions:
-            total_sessions += 1
-            session_data = session_doc.to_dict()
-            subjects.add(session_data.get('subject_id'))
-            
-            # Count attendance for this session
-            attendance_count = db.collection('student_attendance') \
-                .where('session_id', '==', session_doc.id) \
-                .where('status', '==', 'present') \
-                .stream()
-            
-            total_students_present += sum(1 for _ in attendance_count)
-        
-        # Get faculty attendance
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+
+        sessions = await reads.stream(
+            db.collection('sessions')
+            .where('faculty_id', '==', faculty_id)
+            .where('created_at', '>=', cutoff_date)
+            .select(['subject_id'])
+        )
+        session_ids = [session_doc.id for session_doc in sessions]
+        subjects = {session_doc.get('subject_id') for session_doc in sessions}
+        total_sessions = len(session_ids)
+
         faculty_attendance = db.collection('faculty_attendance') \
             .where('faculty_id', '==', faculty_id) \
-            .where('timestamp', '>=', cutoff_date) \
-            .stream()
-        
-        faculty_present_count = sum(1 for _ in faculty_attendance)
-        
+            .where('timestamp', '>=', cutoff_date)
+
+        rollups, faculty_present_count = await asyncio.gather(
+            reads.rollups(session_ids),
+            reads.count(faculty_attendance)
+        )
+        # Sessions without a rollup: one aggregation per IN_QUERY_LIMIT of them
+        missing = [session_id for session_id in session_ids if session_id not in rollups]
+        missing_present = await reads.count_each(_present_query(db, chunk) for chunk in _chunks(missing))
+        total_students_present = sum(rollup.get('present', 0) for rollup in rollups.values()) + sum(missing_present)
+
         return {
             'faculty_id': faculty_id,
             'period_days': days,
@@ -72,65 +241,73 @@ class AnalyticsService:
             'total_students_taught': total_students_present,
             'unique_subjects': len(subjects),
             'faculty_attendance_rate': round((faculty_present_count / total_sessions * 100) if total_sessions > 0 else 0, 2),
-            'avg_students_per_session': round(total_students_present / total_sessions, 2) if total_sessions > 0 else 0
+            'avg_students_per_session': round(total_students_present / total_sessions, 2) if total_sessions > 0 else 0,
+            'query_stats': reads.stats()
         }
-    
+
     @staticmethod
-    async def get_session_report(session_id: str):
+    async def get_session_report(session_id: str, limit: int = REPORT_PAGE_SIZE, cursor: Optional[str] = None):
         """
         Get detailed report for a specific session
-        
+
+        Students are listed in scan order, one page at a time; statistics
+        always cover the whole session.
+
         Args:
             session_id: Session ID
-        
+            limit: Students per page (at most MAX_REPORT_PAGE_SIZE)
+            cursor: next_cursor of the previous page
+
         Returns:
-            Session report with attendance details
+            Session report with one page of attendance details and next_cursor
+
+        Raises:
+            ValueError: If the cursor is invalid
         """
+        start = decode_cursor(cursor) if cursor else None
+        limit = max(1, min(limit, MAX_REPORT_PAGE_SIZE))
+
         db = AnalyticsService._get_db()
-        
-        # Get session
-        session_ref = db.collection('sessions').document(session_id)
-        session_doc = session_ref.get()
-        
-        if not session_doc.exists:
+        reads = AnalyticsReads(db)
+        attendance = db.collection('student_attendance').where('session_id', '==', session_id)
+        page_query = attendance.select(REPORT_FIELDS).order_by('timestamp').order_by('__name__')
+        if start is not None:
+            page_query = page_query.start_after(start)
+
+        session_data, rollups, attendance_docs = await asyncio.gather(
+            reads.get(db.collection('sessions').document(session_id)),
+            reads.rollups([session_id]),
+            reads.stream(page_query.limit(limit + 1))
+        )
+        if session_data is None:
             return {'error': 'Session not found'}
-        
-        session_data = session_doc.to_dict()
-        
-        # Get all attendance records
-        attendance_records = db.collection('student_attendance') \
-            .where('session_id', '==', session_id) \
-            .stream()
-        
-        present_count = 0
-        suspicious_count = 0
+
+        attendance_docs, next_cursor = page(attendance_docs, limit)
         students = []
-        
-        for att_doc in attendance_records:
+        for att_doc in attendance_docs:
             att_data = att_doc.to_dict()
-            
-            if att_data.get('status') == 'present':
-                present_count += 1
-            elif att_data.get('status') == 'suspicious':
-                suspicious_count += 1
-            
             students.append({
                 'student_id': att_data.get('student_id'),
                 'status': att_data.get('status'),
                 'timestamp': att_data.get('timestamp'),
                 'verification': att_data.get('verification_data', {})
             })
-        
-        # Get expected student count from section
-        expected_count = 0
-        if session_data.get('section_id'):
-            section_ref = db.collection('sections').document(session_data['section_id'])
-            section_doc = section_ref.get()
-            if section_doc.exists:
-                expected_count = section_doc.to_dict().get('total_students', 0)
-        
+
+        # A finalized rollup is authoritative and an open session's rollup
+        # is kept current by every scan; only sessions from before rollups
+        # existed are summarized from their records
+        rollup = rollups.get(session_id)
+        if rollup is None:
+            records = await reads.stream(attendance.select(['status', 'verification_data', 'timestamp']))
+            rollup = build_rollup(session_id, session_data, (doc.to_dict() for doc in records), 0)
+            rollup['finalized'] = False
+        if not rollup.get('finalized'):
+            rollup = {**rollup, 'expected': await reads.expected_students(session_data.get('section_id'))}
+
+        present_count = rollup.get('present', 0)
+        expected_count = rollup.get('expected', 0)
         attendance_percentage = round((present_count / expected_count * 100) if expected_count > 0 else 0, 2)
-        
+
         return {
             'session_id': session_id,
             'subject_id': session_data.get('subject_id'),
@@ -143,157 +320,257 @@ class AnalyticsService:
                 'expected_students': expected_count,
                 'present': present_count,
                 'absent': expected_count - present_count,
-                'suspicious': suspicious_count,
-                'attendance_percentage': attendance_percentage
+                'suspicious': rollup.get('suspicious', 0),
+                'attendance_percentage': attendance_percentage,
+                'verification_pass_rates': pass_rates(rollup),
+                'first_scan_at': rollup.get('first_scan_at'),
+                'last_scan_at': rollup.get('last_scan_at'),
+                'finalized': rollup.get('finalized', False)
             },
-            'students': students
+            'students': students,
+            'next_cursor': next_cursor,
+            'query_stats': reads.stats()
         }
-    
+
+    @staticmethod
+    async def _window_entries(reads: AnalyticsReads, daily_query, open_query, window_query,
+                              cutoff_date: datetime, subject_id: Optional[str] = None) -> List[Dict]:
+        """
+        One entry per session in the window: ended sessions from daily
+        rollups, plus sessions without a daily entry (still active, ended
+        before daily rollups were backfilled, or expired without
+        end_session) counted from their session rollups
+
+        A count of the window's sessions runs alongside the daily read; the
+        window's sessions are only listed when the count shows some have no
+        daily entry.
+
+        Returns:
+            Dicts with session_id, subject_id, present, expected, created_at
+        """
+        daily_docs, open_docs, window_total = await asyncio.gather(
+            reads.stream(daily_query), reads.stream(open_query), reads.count(window_query)
+        )
+        entries = [
+            entry for doc in daily_docs for entry in session_entries(doc.to_dict(), subject_id)
+            if _in_window(entry.get('created_at'), cutoff_date)
+        ]
+        seen = {entry['session_id'] for entry in entries}
+        open_sessions = [
+            (doc.id, doc.to_dict()) for doc in open_docs
+            if doc.id not in seen and _in_window(doc.get('created_at'), cutoff_date)
+        ]
+        if len(seen) + len(open_sessions) < window_total:
+            found = seen | {session_id for session_id, _ in open_sessions}
+            window_docs = await reads.stream(window_query.select(SESSION_FIELDS))
+            missing = [(doc.id, doc.to_dict()) for doc in window_docs if doc.id not in found]
+            if missing:
+                print(f"⚠️ {len(missing)} ended session(s) without a daily rollup, counted from session "
+                      f"rollups; run scripts/backfill_session_rollups.py")
+                open_sessions += missing
+        if open_sessions:
+            rollups = await AnalyticsService._session_totals(reads, [session_id for session_id, _ in open_sessions])
+            expected = await AnalyticsService._expected(reads, rollups, open_sessions)
+            for session_id, session_data in open_sessions:
+                entries.append({
+                    'session_id': session_id,
+                    'subject_id': session_data.get('subject_id'),
+                    'present': rollups[session_id].get('present', 0),
+                    'expected': expected[session_id],
+                    'created_at': session_data.get('created_at'),
+                })
+        entries.sort(key=lambda entry: _utc(entry.get('created_at')), reverse=True)
+        return entries
+
     @staticmethod
     async def get_subject_attendance(subject_id: str, section_id: str = None, days: int = 30):
         """
         Get attendance trends for a subject
-        
+
+        Reads one daily rollup per day (per section without a section
+        filter) instead of every session in the window.
+
         Args:
             subject_id: Subject ID
             section_id: Optional section filter
             days: Number of days to look back
-        
+
         Returns:
             Attendance trends
         """
         db = AnalyticsService._get_db()
-        
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Get all sessions for this subject
-        query = db.collection('sessions') \
+        reads = AnalyticsReads(db)
+
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+
+        daily_query = DailyRollupService.query(db, start_date(days), section_id=section_id, subject_id=subject_id)
+        open_query = db.collection('sessions') \
             .where('subject_id', '==', subject_id) \
-            .where('created_at', '>=', cutoff_date)
-        
+            .where('status', '==', 'active')
+        if section_id:
+            open_query = open_query.where('section_id', '==', section_id)
+
+        window_query = db.collection('sessions').where('subject_id', '==', subject_id)
         if section_id:
-            query = query.where('section_id', '==', section_id)
-        
-        sessions = query.stream()
-        
+            window_query = window_query.where('section_id', '==', section_id)
+        entries = await AnalyticsService._window_entries(
+            reads, daily_query, open_query.select(SESSION_FIELDS),
+            window_query.where('created_at', '>=', cutoff_date), cutoff_date, subject_id
+        )
+
         session_stats = []
         total_present = 0
         total_expected = 0
-        
-        for session_doc in sessions:
-            session_data = session_doc.to_dict()
-            
-            # Count attendance
-            present = db.collection('student_attendance') \
-                .where('session_id', '==', session_doc.id) \
-                .where('status', '==', 'present') \
-                .stream()
-            
-            present_count = sum(1 for _ in present)
-            
-            # Get expected count
-            expected = 0
-            if session_data.get('section_id'):
-                section_ref = db.collection('sections').document(session_data['section_id'])
-                section_doc = section_ref.get()
-                if section_doc.exists:
-                    expected = section_doc.to_dict().get('total_students', 0)
-            
+
+        for entry in entries:
+            present_count = entry.get('present', 0)
+            expected = entry.get('expected', 0)
+
             total_present += present_count
             total_expected += expected
-            
+
             session_stats.append({
-                'session_id': session_doc.id,
-                'date': session_data.get('created_at'),
+                'session_id': entry['session_id'],
+                'date': entry.get('created_at'),
                 'present': present_count,
                 'expected': expected,
                 'percentage': round((present_count / expected * 100) if expected > 0 else 0, 2)
             })
-        
+
         overall_percentage = round((total_present / total_expected * 100) if total_expected > 0 else 0, 2)
-        
+
         return {
             'subject_id': subject_id,
             'section_id': section_id,
             'period_days': days,
             'total_sessions': len(session_stats),
             'overall_attendance': overall_percentage,
-            'sessions': session_stats
+            'sessions': session_stats,
+            'query_stats': reads.stats()
         }
-    
+
     @staticmethod
     async def get_section_trends(section_id: str, days: int = 30):
         """
         Get attendance trends for a section
-        
+
+        Reads at most one daily rollup per day in the window.
+
         Args:
             section_id: Section ID
             days: Number of days to look back
-        
+
         Returns:
             Section attendance trends
         """
         db = AnalyticsService._get_db()
-        
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        # Get section details
-        section_ref = db.collection('sections').document(section_id)
-        section_doc = section_ref.get()
-        
-        if not section_doc.exists:
+        reads = AnalyticsReads(db)
+
+        cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+
+        open_query = db.collection('sessions') \
+            .where('section_id', '==', section_id) \
+            .where('status', '==', 'active') \
+            .select(SESSION_FIELDS)
+        sections, entries = await asyncio.gather(
+            reads.sections([section_id]),
+            AnalyticsService._window_entries(
+                reads, DailyRollupService.query(db, start_date(days), section_id=section_id), open_query,
+                db.collection('sessions').where('section_id', '==', section_id).where('created_at', '>=', cutoff_date),
+                cutoff_date
+            )
+        )
+
+        section_data = sections.get(section_id)
+        if section_data is None:
             return {'error': 'Section not found'}
-        
-        section_data = section_doc.to_dict()
+
         total_students = section_data.get('total_students', 0)
-        
-        # Get all sessions for this section
-        sessions = db.collection('sessions') \
-            .where('section_id', '==', section_id) \
-            .where('created_at', '>=', cutoff_date) \
-            .stream()
-        
+
         subject_wise = defaultdict(lambda: {'sessions': 0, 'total_present': 0})
         daily_attendance = []
-        
-        for session_doc in sessions:
-            session_data = session_doc.to_dict()
-            subject_id = session_data.get('subject_id')
-            
-            # Count attendance
-            present = db.collection('student_attendance') \
-                .where('session_id', '==', session_doc.id) \
-                .where('status', '==', 'present') \
-                .stream()
-            
-            present_count = sum(1 for _ in present)
-            
+
+        for entry in entries:
+            subject_id = entry.get('subject_id')
+            present_count = entry.get('present', 0)
+
             subject_wise[subject_id]['sessions'] += 1
             subject_wise[subject_id]['total_present'] += present_count
-            
+
             daily_attendance.append({
-                'date': session_data.get('created_at'),
+                'date': entry.get('created_at'),
                 'subject_id': subject_id,
                 'present': present_count,
                 'percentage': round((present_count / total_students * 100) if total_students > 0 else 0, 2)
             })
-        
+
         # Calculate subject-wise percentages
         subject_stats = []
         for subject_id, stats in subject_wise.items():
             expected_total = stats['sessions'] * total_students
             percentage = round((stats['total_present'] / expected_total * 100) if expected_total > 0 else 0, 2)
-            
+
             subject_stats.append({
                 'subject_id': subject_id,
                 'sessions': stats['sessions'],
                 'average_attendance': percentage
             })
-        
+
         return {
             'section_id': section_id,
             'total_students': total_students,
             'period_days': days,
             'subject_wise': subject_stats,
-            'daily_trends': sorted(daily_attendance, key=lambda x: x['date'], reverse=True)
+            'daily_trends': daily_attendance,
+            'query_stats': reads.stats()
+        }
+
+    @staticmethod
+    async def get_section_rollup(section_id: str, days: int = 90, period: str = 'week', subject_id: str = None):
+        """
+        Get a section's attendance in day, week or month buckets
+
+        Built from daily rollups only, so sessions still in progress are not
+        included until they end. Ended sessions in the window without a
+        daily rollup (never backfilled, or expired without end_session) are
+        counted and reported as sessions_without_daily_rollup rather than
+        silently left out.
+
+        Args:
+            section_id: Section ID
+            days: Number of days to look back
+            period: 'day', 'week' or 'month'
+            subject_id: Optional subject filter
+
+        Returns:
+            Buckets with sessions, present, suspicious, expected and percentage
+        """
+        db = AnalyticsService._get_db()
+        reads = AnalyticsReads(db)
+
+        since = start_date(days)
+        window_query = db.collection('sessions') \
+            .where('section_id', '==', section_id) \
+            .where('created_at', '>=', day_start(since))
+        if subject_id:
+            window_query = window_query.where('subject_id', '==', subject_id)
+        docs, window_total, active = await asyncio.gather(
+            reads.stream(DailyRollupService.query(db, since, section_id=section_id)),
+            reads.count(window_query),
+            reads.count(window_query.where('status', '==', 'active'))
+        )
+        buckets = merge_range((doc.to_dict() for doc in docs), period, subject_id)
+        missing = max(window_total - active - sum(bucket['sessions'] for bucket in buckets), 0)
+        if missing:
+            print(f"⚠️ Section {section_id}: {missing} ended session(s) without a daily rollup; "
+                  f"run scripts/backfill_session_rollups.py")
+
+        return {
+            'section_id': section_id,
+            'subject_id': subject_id,
+            'period': period,
+            'period_days': days,
+            'buckets': buckets,
+            'sessions_without_daily_rollup': missing,
+            'query_stats': reads.stats()
         }
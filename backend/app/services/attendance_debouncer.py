@@ -0,0 +1,152 @@
+"""
+Attendance Debouncer - one attendance_update per session per window
+A scan burst (sixty students in two seconds) used to send sixty
+attendance_update messages to every subscriber. Now the first scan after a
+quiet period goes out immediately; scans inside the following
+WS_ATTENDANCE_DEBOUNCE_MS window are merged into a single trailing message
+carrying the final count and every student added since the last one.
+
+The trailing message is always sent, so the last state reaches clients
+even if no further scan arrives. A session that ends has its pending
+update flushed first.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.services.websocket_manager import manager
+
+
+class _SessionDebounce:
+    """Pending update and counters for one session"""
+
+    __slots__ = ("last_sent", "count", "students", "pending", "flush_task", "received", "sent")
+
+    def __init__(self):
+        self.last_sent = float('-inf')
+        self.count = 0
+        self.students: List[Dict] = []
+        self.pending = False
+        self.flush_task: Optional[asyncio.Task] = None
+        self.received = 0
+        self.sent = 0
+
+
+class AttendanceDebouncer:
+    """Per-worker, per-session debouncing of attendance_update broadcasts"""
+
+    def __init__(self, window_ms: Optional[float] = None):
+        self.window_ms = window_ms if window_ms is not None else settings.WS_ATTENDANCE_DEBOUNCE_MS
+        self._sessions: Dict[str, _SessionDebounce] = {}
+        # Totals across sessions, kept after sessions end
+        self.received = 0
+        self.sent = 0
+        manager.add_delivery_hook('session_status', self._on_session_status, consume=False)
+
+    async def update(
+        self,
+        session_id: str,
+        count: int,
+        student_name: Optional[str] = None,
+        student_id: Optional[str] = None
+    ):
+        """
+        Report a new present count, sending now or at the end of the window
+
+        Args:
+            session_id: Session the attendance belongs to
+            count: Present count after this change
+            student_name: Student just marked, if any
+            student_id: Their ID, if any
+        """
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _SessionDebounce()
+
+        state.received += 1
+        self.received += 1
+        state.count = count
+        state.pending = True
+        if student_name or student_id:
+            state.students.append({"student_id": student_id, "name": student_name})
+
+        if state.flush_task is not None:
+            return  # merged into the scheduled trailing message
+
+        wait = state.last_sent + self.window_ms / 1000 - time.monotonic()
+        if wait <= 0:
+            await self._flush(session_id, state)
+        else:
+            state.flush_task = asyncio.create_task(self._flush_after(session_id, state, wait))
+
+    async def _flush_after(self, session_id: str, state: _SessionDebounce, delay: float):
+        await asyncio.sleep(delay)
+        state.flush_task = None
+        if self._sessions.get(session_id) is state:
+            await self._flush(session_id, state)
+
+    async def _flush(self, session_id: str, state: _SessionDebounce):
+        """Send the session's pending update, if any"""
+        if not state.pending:
+            return
+        students, state.students = state.students, []
+        state.pending = False
+        state.last_sent = time.monotonic()
+        state.sent += 1
+        self.sent += 1
+
+        try:
+            await manager.send_attendance_update(
+                session_id,
+                state.count,
+                students[-1]["name"] if students else None,
+                students_added=students
+            )
+        except Exception as e:
+            print(f"⚠️ Attendance update broadcast failed for {session_id}: {e}")
+
+    async def _on_session_status(self, session_id: str, message: Dict):
+        """Flush and forget a session once it ends"""
+        if message.get('status') != 'ended':
+            return
+        state = self._sessions.pop(session_id, None)
+        if state is None:
+            return
+        if state.flush_task is not None:
+            state.flush_task.cancel()
+            state.flush_task = None
+        await self._flush(session_id, state)
+
+    async def flush_all(self):
+        """Send every pending update now (shutdown)"""
+        for session_id, state in list(self._sessions.items()):
+            if state.flush_task is not None:
+                state.flush_task.cancel()
+                state.flush_task = None
+            await self._flush(session_id, state)
+
+    def get_stats(self, session_id: Optional[str] = None) -> Dict:
+        """
+        Updates received vs attendance_update messages sent
+
+        messages_saved is how many broadcasts debouncing avoided.
+        """
+        stats = {
+            "window_ms": self.window_ms,
+            "updates": self.received,
+            "messages": self.sent,
+            "messages_saved": self.received - self.sent
+        }
+        state = self._sessions.get(session_id) if session_id else None
+        if state is not None:
+            stats["session"] = {
+                "updates": state.received,
+                "messages": state.sent,
+                "messages_saved": state.received - state.sent,
+                "pending": state.pending
+            }
+        return stats
+
+
+# Global attendance debouncer instance
+attendance_debouncer = AttendanceDebouncer()
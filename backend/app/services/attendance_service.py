@@ -5,10 +5,23 @@ from fastapi import HTTPException, status
 import firebase_admin
 from firebase_admin import firestore
 from app.core import firebase
+from app.services.session_rollup_service import SessionRollupService
+from app.services.student_stats_service import StudentStatsService
+from app.utils.cursor import decode_cursor, page
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
+import asyncio
 import math
 
+# Verification flags shown with each record; location_provided (raw GPS,
+# WiFi and beacon readings) is never fetched for listings
+VERIFICATION_FIELDS = ['gps_verified', 'wifi_verified', 'bluetooth_verified', 'distance_meters']
+
+HISTORY_FIELDS = ['session_id', 'subject_id', 'status', 'timestamp'] + \
+    [f"verification_data.{field}" for field in VERIFICATION_FIELDS]
+
+MAX_PAGE_SIZE = 500
+
 class AttendanceService:
     """Handle student attendance operations"""
     
@@ -44,7 +57,8 @@ class AttendanceService:
         session_id: str,
         student_id: str,
         qr_token: str = None,
-        location_data: Dict = None
+        location_data: Dict = None,
+        device_id: str = None
     ):
         """
         Mark student attendance via QR scan
@@ -54,6 +68,7 @@ class AttendanceService:
             student_id: Student ID
             qr_token: Encrypted QR token (optional for now)
             location_data: GPS, WiFi, Bluetooth data
+            device_id: App install ID, stored for proxy detection
         
         Returns:
             Attendance record
@@ -93,6 +108,7 @@ class AttendanceService:
             )
         
         # Verify student enrollment (if section_id available)
+        student_data = None
         if session_data.get('section_id'):
             student_ref = db.collection('students').document(student_id)
             student_doc = student_ref.get()
@@ -185,9 +201,18 @@ class AttendanceService:
             },
             'timestamp': firestore.SERVER_TIMESTAMP
         }
+        if device_id:
+            attendance_data['device_id'] = device_id
         
+        # Record and session rollup are written together
         attendance_ref = db.collection('student_attendance').document()
-        attendance_ref.set(attendance_data)
+        batch = db.batch()
+        batch.set(attendance_ref, attendance_data)
+        SessionRollupService.add_scan(
+            batch, db, session_id, session_data, attendance_status, attendance_data['verification_data']
+        )
+        StudentStatsService.add_scan(batch, db, student_id, session_id, session_data, attendance_status)
+        batch.commit()
         
         # Notify WebSocket clients of new attendance
         try:
@@ -195,12 +220,16 @@ class AttendanceService:
             import asyncio
             
             # Get student name if available
-            student_name = None
-            if student_doc.exists:
-                student_name = student_data.get('name')
+            student_name = student_data.get('name') if student_data else None
             
             # Send WebSocket notification (non-blocking)
-            asyncio.create_task(notify_attendance_marked(session_id, student_name))
+            asyncio.create_task(notify_attendance_marked(
+                session_id,
+                student_name,
+                student_id=student_id,
+                attendance_status=attendance_status,
+                marked_at=datetime.utcnow().isoformat()
+            ))
         except Exception as e:
             # Don't fail attendance if WebSocket fails
             print(f"WebSocket notification failed: {e}")
@@ -213,3 +242,59 @@ class AttendanceService:
             'message': 'Attendance marked successfully' if attendance_status == 'present' 
                       else 'Attendance marked but location verification failed'
         }
+
+    @staticmethod
+    def _history_blocking(student_id: str, limit: int, cursor: Optional[str]):
+        db = AttendanceService._get_db()
+        query = db.collection('student_attendance') \
+            .where('student_id', '==', student_id) \
+            .select(HISTORY_FIELDS) \
+            .order_by('timestamp', direction='DESCENDING') \
+            .order_by('__name__', direction='DESCENDING')
+        if cursor:
+            query = query.start_after(decode_cursor(cursor))
+        return page(list(query.limit(limit + 1).stream()), limit)
+
+    @staticmethod
+    async def get_student_history(student_id: str, limit: int = 50, cursor: Optional[str] = None) -> Dict:
+        """
+        Get one page of a student's attendance, newest first
+
+        Args:
+            student_id: Student ID
+            limit: Records per page (at most MAX_PAGE_SIZE)
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Records on this page and the cursor for the next one (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is invalid
+        """
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"limit must be between 1 and {MAX_PAGE_SIZE}"
+            )
+        docs, next_cursor = await asyncio.to_thread(
+            AttendanceService._history_blocking, student_id, limit, cursor
+        )
+
+        records = []
+        for doc in docs:
+            data = doc.to_dict()
+            records.append({
+                'attendance_id': doc.id,
+                'session_id': data.get('session_id'),
+                'subject_id': data.get('subject_id'),
+                'status': data.get('status'),
+                'timestamp': data.get('timestamp'),
+                'verification': data.get('verification_data', {})
+            })
+
+        return {
+            'student_id': student_id,
+            'total_records': len(records),
+            'records': records,
+            'next_cursor': next_cursor
+        }
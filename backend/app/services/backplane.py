@@ -0,0 +1,309 @@
+"""
+Broadcast Backplane - deliver session broadcasts across workers
+A scan handled by one uvicorn worker must reach SmartBoards connected to any
+worker. ConnectionManager publishes session broadcasts to the backplane, and
+every worker's backplane delivers them to its local sockets.
+
+Implementations:
+- inprocess: single worker, delivers directly (default)
+- unix: local multi-process broker over a Unix domain socket; no external
+  services, so it also runs inside tests
+
+The backplane also elects one leader worker (is_leader()) for work that
+must run once per deployment, such as QR token rotation.
+
+Run a standalone broker with:
+    python -m app.services.backplane /tmp/intelliattend-backplane.sock
+"""
+import asyncio
+import fcntl
+import json
+import os
+import struct
+import sys
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Optional, Set
+
+DeliverCallback = Callable[[str, dict], Awaitable[None]]
+
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 1 << 20
+# Unsent bytes allowed to pile up for one peer before it is cut off
+MAX_PEER_BUFFER_BYTES = 8 << 20
+
+
+def _pack(session_id: str, message: dict) -> bytes:
+    body = json.dumps({"s": session_id, "m": message}, separators=(',', ':')).encode('utf-8')
+    return _LENGTH.pack(len(body)) + body
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    header = await reader.readexactly(_LENGTH.size)
+    (length,) = _LENGTH.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ValueError(f"Backplane frame too large: {length} bytes")
+    return await reader.readexactly(length)
+
+
+class Backplane(ABC):
+    """
+    Interface for session broadcast backplanes
+
+    start() receives the callback that delivers a message to this worker's
+    local sockets; publish() must eventually invoke it on every worker,
+    including the publishing one.
+    """
+
+    @abstractmethod
+    async def start(self, deliver: DeliverCallback):
+        """Begin delivering messages to this worker"""
+
+    @abstractmethod
+    async def publish(self, session_id: str, message: dict):
+        """Send a session message to every worker"""
+
+    async def stop(self):
+        pass
+
+    def is_leader(self) -> bool:
+        """Whether this worker runs once-per-deployment jobs"""
+        return True
+
+
+class InProcessBackplane(Backplane):
+    """Single-worker backplane: publish delivers straight to local sockets"""
+
+    def __init__(self):
+        self._deliver: Optional[DeliverCallback] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+
+    async def publish(self, session_id: str, message: dict):
+        await self._deliver(session_id, message)
+
+
+class UnixSocketBroker:
+    """
+    Relay hub for UnixSocketBackplane workers
+
+    Every frame received from one worker is forwarded to all other workers.
+    Frames are opaque to the broker; it never decodes them. A worker that
+    stops reading is disconnected once MAX_PEER_BUFFER_BYTES are waiting
+    for it, so it can't grow the broker's memory; it reconnects and its
+    clients resync (e.g. roster snapshots).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._writers: Set[asyncio.StreamWriter] = set()
+        self._lock_fd: Optional[int] = None
+
+    async def start(self):
+        """
+        Bind the broker socket (raises OSError if another broker owns it)
+
+        Ownership is an flock on <path>.lock, which the OS releases if the
+        hosting process dies, so a stale socket file never blocks a new broker
+        and two workers starting together can't both bind.
+        """
+        lock_fd = os.open(self.path + ".lock", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(lock_fd)
+            raise OSError(f"Backplane broker already running at {self.path}")
+
+        self._lock_fd = lock_fd
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._server = await asyncio.start_unix_server(self._handle_worker, path=self.path)
+        print(f"🔀 Backplane broker listening on {self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            for writer in list(self._writers):
+                writer.close()
+            self._writers.clear()
+            await self._server.wait_closed()
+            self._server = None
+        if self._lock_fd is not None:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        try:
+            while True:
+                body = await _read_frame(reader)
+                frame = _LENGTH.pack(len(body)) + body
+                for other in list(self._writers):
+                    if other is writer:
+                        continue
+                    if other.transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+                        print("⚠️ Backplane worker not reading, disconnecting it")
+                        self._writers.discard(other)
+                        other.transport.abort()
+                        continue
+                    other.write(frame)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+class UnixSocketBackplane(Backplane):
+    """
+    Multi-process backplane over a local Unix-socket broker
+
+    Local sockets are served directly; the broker relays the frame to every
+    other worker. The first worker to start hosts the broker if none is
+    running. If the broker goes away, broadcasts keep reaching local sockets
+    while the worker reconnects in the background.
+
+    Leadership is an flock on <path>.leader, held by at most one worker and
+    released by the OS if it dies; is_leader() retries it so another worker
+    takes over. It is independent of who hosts the broker, so it also works
+    with a standalone broker.
+    """
+
+    RECONNECT_DELAY_SECONDS = 1.0
+
+    def __init__(self, path: str, host_broker: bool = True):
+        self.path = path
+        self.host_broker = host_broker
+        self._deliver: Optional[DeliverCallback] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._broker: Optional[UnixSocketBroker] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._leader_fd: Optional[int] = None
+
+    async def start(self, deliver: DeliverCallback):
+        self._deliver = deliver
+        self._closing = False
+
+        await self._try_host_broker()
+        self._reader_task = asyncio.create_task(self._run())
+
+    async def _try_host_broker(self):
+        """Host the broker unless another process already does"""
+        if not self.host_broker or self._broker is not None:
+            return
+        broker = UnixSocketBroker(self.path)
+        try:
+            await broker.start()
+            self._broker = broker
+        except OSError:
+            pass  # another worker hosts it
+
+    def is_leader(self) -> bool:
+        if self._leader_fd is not None:
+            return True
+        fd = os.open(self.path + ".leader", os.O_CREAT | os.O_RDWR, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        print(f"👑 This worker (pid {os.getpid()}) is the backplane leader")
+        return True
+
+    async def stop(self):
+        self._closing = True
+        if self._leader_fd is not None:
+            os.close(self._leader_fd)
+            self._leader_fd = None
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+        if self._broker:
+            await self._broker.stop()
+            self._broker = None
+
+    async def publish(self, session_id: str, message: dict):
+        writer = self._writer
+        if writer is not None:
+            try:
+                if writer.transport.get_write_buffer_size() > MAX_PEER_BUFFER_BYTES:
+                    # Broker stuck: drop the link rather than buffer without
+                    # bound; _run reconnects
+                    print("⚠️ Backplane broker not reading, reconnecting")
+                    self._writer = None
+                    writer.transport.abort()
+                else:
+                    writer.write(_pack(session_id, message))
+            except Exception as e:
+                print(f"⚠️ Backplane publish failed: {e}")
+        await self._deliver(session_id, message)
+
+    async def wait_connected(self, timeout: float = 5.0):
+        """Wait until the broker connection is up (used by tests and benchmarks)"""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while self._writer is None:
+            if asyncio.get_running_loop().time() > deadline:
+                raise TimeoutError(f"Backplane broker not reachable at {self.path}")
+            await asyncio.sleep(0.01)
+
+    async def _run(self):
+        """Hold the broker connection and deliver relayed frames locally"""
+        while not self._closing:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # The hosting worker may have exited; take over if nobody has
+                await self._try_host_broker()
+                await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+                continue
+
+            self._writer = writer
+            try:
+                while True:
+                    envelope = json.loads(await _read_frame(reader))
+                    try:
+                        await self._deliver(envelope["s"], envelope["m"])
+                    except Exception as e:
+                        print(f"⚠️ Backplane delivery failed: {e}")
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                print("⚠️ Backplane broker connection lost, reconnecting")
+            finally:
+                self._writer = None
+                writer.close()
+
+            await asyncio.sleep(self.RECONNECT_DELAY_SECONDS)
+
+
+def create_backplane(kind: str, socket_path: Optional[str] = None) -> Backplane:
+    """Build the backplane named by settings.WS_BACKPLANE"""
+    if kind == "inprocess":
+        return InProcessBackplane()
+    if kind == "unix":
+        return UnixSocketBackplane(socket_path)
+    raise ValueError(f"Unknown WebSocket backplane: {kind}")
+
+
+async def _run_broker(path: str):
+    broker = UnixSocketBroker(path)
+    await broker.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(_run_broker(sys.argv[1] if len(sys.argv) > 1 else "/tmp/intelliattend-backplane.sock"))
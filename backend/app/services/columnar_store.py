@@ -0,0 +1,428 @@
+"""
+Columnar analytics store - local Parquet copy of the attendance collections
+
+For semester-scale, ad-hoc reports that would otherwise stream every
+student_attendance and sessions document through Python dicts. The store
+keeps a Parquet dataset per collection under ANALYTICS_CACHE_DIR:
+
+    student_attendance/month=YYYY-MM/section_id=.../part-*.parquet
+    sessions/month=YYYY-MM/section_id=.../part-*.parquet
+    faculty_attendance/month=YYYY-MM/part-*.parquet
+    sections.parquet                     (small, replaced on every sync)
+    _watermarks.json                     (last (timestamp, doc id) synced)
+
+sync() pages through each collection in (timestamp, id) order from its
+watermark, so a run only reads documents added since the last one. A page's
+file name comes from its first document, so a sync interrupted between
+writing a page and saving the watermark rewrites the same file instead of
+duplicating rows. Dates are UTC. Partitions are monthly: daily ones would
+leave a semester as thousands of few-hundred-row files, where opening
+files costs more than reading them. compact() merges the small files that
+incremental syncs add to a partition.
+
+Queries prune partitions by month/section and then aggregate with Arrow
+group-bys and joins; results have the same shape as AnalyticsService's.
+
+pyarrow is optional: without it ColumnarStore raises on construction.
+"""
+import json
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # optional: columnar cache unavailable
+    pa = None
+
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+
+if pa is not None:
+    _TIMESTAMP = pa.timestamp('us', tz='UTC')
+
+    # collection -> (watermark field, partition keys, schema without partition keys)
+    TABLES = {
+        'student_attendance': ('timestamp', ('month', 'section_id'), pa.schema([
+            ('id', pa.string()),
+            ('session_id', pa.string()),
+            ('student_id', pa.string()),
+            ('subject_id', pa.string()),
+            ('status', pa.string()),
+            ('gps_verified', pa.bool_()),
+            ('wifi_verified', pa.bool_()),
+            ('bluetooth_verified', pa.bool_()),
+            ('timestamp', _TIMESTAMP),
+        ])),
+        'sessions': ('created_at', ('month', 'section_id'), pa.schema([
+            ('id', pa.string()),
+            ('faculty_id', pa.string()),
+            ('subject_id', pa.string()),
+            ('classroom_id', pa.string()),
+            ('created_at', _TIMESTAMP),
+        ])),
+        'faculty_attendance': ('timestamp', ('month',), pa.schema([
+            ('id', pa.string()),
+            ('faculty_id', pa.string()),
+            ('timestamp', _TIMESTAMP),
+        ])),
+    }
+else:
+    TABLES = {}
+
+
+def _utc(value) -> Optional[datetime]:
+    if not isinstance(value, datetime):
+        return None
+    return value.astimezone(timezone.utc) if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _row(collection: str, doc_id: str, data: Dict) -> Dict:
+    """Flatten a Firestore document into a store row, partition keys included"""
+    if collection == 'student_attendance':
+        verification = data.get('verification_data') or {}
+        row = {
+            'id': doc_id,
+            'session_id': data.get('session_id'),
+            'student_id': data.get('student_id'),
+            'subject_id': data.get('subject_id'),
+            'section_id': data.get('section_id'),
+            'status': data.get('status'),
+            'gps_verified': bool(verification.get('gps_verified')),
+            'wifi_verified': bool(verification.get('wifi_verified')),
+            'bluetooth_verified': bool(verification.get('bluetooth_verified')),
+            'timestamp': _utc(data.get('timestamp')),
+        }
+    elif collection == 'sessions':
+        row = {
+            'id': doc_id,
+            'faculty_id': data.get('faculty_id'),
+            'subject_id': data.get('subject_id'),
+            'section_id': data.get('section_id'),
+            'classroom_id': data.get('classroom_id'),
+            'created_at': _utc(data.get('created_at')),
+        }
+    else:
+        row = {'id': doc_id, 'faculty_id': data.get('faculty_id'), 'timestamp': _utc(data.get('timestamp'))}
+
+    watermark_field = TABLES[collection][0]
+    row['month'] = row[watermark_field].strftime('%Y-%m') if row[watermark_field] else 'unknown'
+    if 'section_id' in row:
+        row['section_id'] = row['section_id'] or 'none'
+    return row
+
+
+def _pct(numerator, denominator) -> float:
+    return round(numerator / denominator * 100, 2) if denominator else 0
+
+
+class ColumnarStore:
+    """Local Parquet copy of the attendance collections with vectorized queries"""
+
+    SECTIONS_FILE = 'sections.parquet'
+    WATERMARKS_FILE = '_watermarks.json'
+
+    def __init__(self, root: Optional[str] = None):
+        if pa is None:
+            raise RuntimeError("pyarrow is required for the columnar analytics store")
+        self.root = root or settings.ANALYTICS_CACHE_DIR
+        os.makedirs(self.root, exist_ok=True)
+        # collection -> discovered dataset, dropped whenever files change
+        self._datasets = {}
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    # ---- Storage ----
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    def watermarks(self) -> Dict[str, List]:
+        """collection -> [ISO timestamp, doc id] of the last synced document"""
+        try:
+            with open(self._path(self.WATERMARKS_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _save_watermark(self, collection: str, timestamp: datetime, doc_id: str):
+        marks = self.watermarks()
+        marks[collection] = [timestamp.isoformat(), doc_id]
+        tmp = self._path(self.WATERMARKS_FILE + '.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(marks, f)
+        os.replace(tmp, self._path(self.WATERMARKS_FILE))
+
+    def write_rows(self, collection: str, rows: List[Dict]):
+        """Append rows (as produced by sync) to a collection's dataset"""
+        if not rows:
+            return
+        watermark_field, partitions, schema = TABLES[collection]
+        full_schema = schema
+        for key in partitions:
+            full_schema = full_schema.append(pa.field(key, pa.string()))
+        table = pa.Table.from_pylist(rows, schema=full_schema)
+        first = rows[0]
+        token = re.sub(r'[^A-Za-z0-9]', '', f"{first[watermark_field].timestamp():.6f}{first['id']}")
+        self.write_table(collection, table, token)
+
+    def write_table(self, collection: str, table, token: str):
+        """Write an Arrow table (partition columns included) as one part per partition"""
+        self._datasets.pop(collection, None)
+        ds.write_dataset(
+            table,
+            self._path(collection),
+            format='parquet',
+            partitioning=self._partitioning(collection),
+            basename_template=f"part-{token}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+        )
+
+    def _partitioning(self, collection: str):
+        return ds.partitioning(pa.schema([(key, pa.string()) for key in TABLES[collection][1]]), flavor='hive')
+
+    def _dataset(self, collection: str):
+        dataset = self._datasets.get(collection)
+        if dataset is None and os.path.isdir(self._path(collection)):
+            dataset = self._datasets[collection] = ds.dataset(
+                self._path(collection), format='parquet', partitioning=self._partitioning(collection)
+            )
+        return dataset
+
+    def scan(self, collection: str, columns: Optional[List[str]] = None, filter=None):
+        """Read a collection's rows matching a dataset filter expression"""
+        dataset = self._dataset(collection)
+        if dataset is None:
+            schema = TABLES[collection][2]
+            for key in TABLES[collection][1]:
+                schema = schema.append(pa.field(key, pa.string()))
+            empty = schema.empty_table()
+            return empty.select(columns) if columns else empty
+        return dataset.to_table(columns=columns, filter=filter)
+
+    def compact(self, collection: Optional[str] = None, min_files: int = 4) -> int:
+        """
+        Merge each partition's part files into one
+
+        Args:
+            collection: Collection to compact (default: all)
+            min_files: Leave partitions with fewer files alone
+
+        Returns:
+            Number of partitions rewritten
+        """
+        rewritten = 0
+        for name in [collection] if collection else list(TABLES):
+            for directory, _, files in os.walk(self._path(name)):
+                parts = sorted(f for f in files if f.startswith('part-') and f.endswith('.parquet'))
+                if len(parts) < min_files:
+                    continue
+                table = pa.concat_tables([pq.read_table(os.path.join(directory, f), partitioning=None) for f in parts])
+                tmp = os.path.join(directory, 'compact.tmp')
+                pq.write_table(table.sort_by(TABLES[name][0]), tmp)
+                for f in parts:
+                    os.remove(os.path.join(directory, f))
+                os.replace(tmp, os.path.join(directory, 'part-compacted-0.parquet'))
+                rewritten += 1
+            self._datasets.pop(name, None)
+        return rewritten
+
+    def sections(self):
+        path = self._path(self.SECTIONS_FILE)
+        if not os.path.exists(path):
+            return pa.table({'section_id': pa.array([], pa.string()), 'total_students': pa.array([], pa.int64())})
+        return pq.read_table(path)
+
+    # ---- Sync ----
+
+    def sync(self, db=None, page_size: int = 5000) -> Dict[str, int]:
+        """
+        Copy documents added since the last sync into the store
+
+        Args:
+            db: Firestore client (defaults to the app's)
+            page_size: Documents per Firestore page and Parquet write
+
+        Returns:
+            Dict of collection -> rows added
+        """
+        db = db or self._get_db()
+        added = {}
+        for collection, (watermark_field, _, _) in TABLES.items():
+            added[collection] = 0
+            mark = self.watermarks().get(collection)
+            cursor = [datetime.fromisoformat(mark[0]), mark[1]] if mark else None
+            while True:
+                query = db.collection(collection) \
+                    .order_by(watermark_field) \
+                    .order_by('__name__') \
+                    .limit(page_size)
+                if cursor is not None:
+                    query = query.start_after(cursor)
+                page = [(doc.id, doc.to_dict()) for doc in query.stream()]
+                rows = [_row(collection, doc_id, data) for doc_id, data in page if data.get(watermark_field)]
+                self.write_rows(collection, rows)
+                if page:
+                    last_id, last = page[-1]
+                    cursor = [last[watermark_field], last_id]
+                    self._save_watermark(collection, _utc(last[watermark_field]), last_id)
+                added[collection] += len(rows)
+                if len(page) < page_size:
+                    break
+
+        sections = [
+            {'section_id': doc.id, 'total_students': int((doc.to_dict() or {}).get('total_students', 0) or 0)}
+            for doc in db.collection('sections').stream()
+        ]
+        pq.write_table(
+            pa.Table.from_pylist(sections, schema=pa.schema([('section_id', pa.string()), ('total_students', pa.int64())])),
+            self._path(self.SECTIONS_FILE)
+        )
+        print(f"📦 Columnar sync: {added}")
+        return added
+
+    # ---- Queries ----
+
+    @staticmethod
+    def _window(days: int):
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        return cutoff, ds.field('month') >= cutoff.strftime('%Y-%m')
+
+    @staticmethod
+    def _present_in(sessions):
+        """Present attendance of these sessions, pruned to their section partitions"""
+        # Records written without a section_id land in the 'none' partition
+        section_ids = pc.unique(pa.concat_arrays([
+            sessions['section_id'].combine_chunks(), pa.array(['none'])
+        ]))
+        return (ds.field('status') == 'present') & ds.field('section_id').isin(section_ids) \
+            & ds.field('session_id').isin(sessions['id'])
+
+    def _sessions_with_present(self, session_filter, attendance_filter):
+        """Sessions matching session_filter with their present count, newest first"""
+        sessions = self.scan('sessions', ['id', 'subject_id', 'section_id', 'created_at'], session_filter)
+        present = self.scan('student_attendance', ['session_id'], attendance_filter & self._present_in(sessions))
+        counts = present.group_by('session_id').aggregate([('session_id', 'count')]) \
+            .rename_columns(['session_id', 'present'])
+        joined = sessions.join(counts, keys='id', right_keys='session_id', join_type='left outer')
+        return joined.set_column(
+            joined.schema.get_field_index('present'), 'present', pc.fill_null(joined['present'], 0)
+        ).sort_by([('created_at', 'descending')])
+
+    def section_trends(self, section_id: str, days: int = 30) -> Dict:
+        """Columnar counterpart of AnalyticsService.get_section_trends"""
+        sections = self.sections()
+        match = sections.filter(pc.equal(sections['section_id'], section_id))
+        if match.num_rows == 0:
+            return {'error': 'Section not found'}
+        total_students = match['total_students'][0].as_py()
+
+        cutoff, in_window = self._window(days)
+        in_section = ds.field('section_id') == section_id
+        sessions = self._sessions_with_present(
+            in_window & in_section & (ds.field('created_at') >= cutoff),
+            in_window & in_section & (ds.field('timestamp') >= cutoff),
+        )
+
+        by_subject = sessions.group_by('subject_id').aggregate([('id', 'count'), ('present', 'sum')])
+        subject_stats = [
+            {
+                'subject_id': row['subject_id'],
+                'sessions': row['id_count'],
+                'average_attendance': _pct(row['present_sum'], row['id_count'] * total_students)
+            }
+            for row in by_subject.to_pylist()
+        ]
+        daily_trends = [
+            {
+                'date': row['created_at'],
+                'subject_id': row['subject_id'],
+                'present': row['present'],
+                'percentage': _pct(row['present'], total_students)
+            }
+            for row in sessions.select(['created_at', 'subject_id', 'present']).to_pylist()
+        ]
+        return {
+            'section_id': section_id,
+            'total_students': total_students,
+            'period_days': days,
+            'subject_wise': subject_stats,
+            'daily_trends': daily_trends
+        }
+
+    def subject_attendance(self, subject_id: str, section_id: Optional[str] = None, days: int = 30) -> Dict:
+        """Columnar counterpart of AnalyticsService.get_subject_attendance"""
+        cutoff, in_window = self._window(days)
+        session_filter = in_window & (ds.field('subject_id') == subject_id) & (ds.field('created_at') >= cutoff)
+        attendance_filter = in_window & (ds.field('timestamp') >= cutoff)
+        if section_id:
+            session_filter = session_filter & (ds.field('section_id') == section_id)
+            attendance_filter = attendance_filter & (ds.field('section_id') == section_id)
+
+        sessions = self._sessions_with_present(session_filter, attendance_filter) \
+            .join(self.sections(), keys='section_id', join_type='left outer') \
+            .sort_by([('created_at', 'descending')])
+        expected = pc.fill_null(sessions['total_students'], 0)
+        total_present = pc.sum(sessions['present']).as_py() or 0
+        total_expected = pc.sum(expected).as_py() or 0
+
+        session_stats = [
+            {
+                'session_id': session_id,
+                'date': created_at,
+                'present': present,
+                'expected': expected_count,
+                'percentage': _pct(present, expected_count)
+            }
+            for session_id, created_at, present, expected_count in zip(
+                sessions['id'].to_pylist(), sessions['created_at'].to_pylist(),
+                sessions['present'].to_pylist(), expected.to_pylist()
+            )
+        ]
+        return {
+            'subject_id': subject_id,
+            'section_id': section_id,
+            'period_days': days,
+            'total_sessions': len(session_stats),
+            'overall_attendance': _pct(total_present, total_expected),
+            'sessions': session_stats
+        }
+
+    def faculty_summary(self, faculty_id: str, days: int = 30) -> Dict:
+        """Columnar counterpart of AnalyticsService.get_faculty_summary"""
+        cutoff, in_window = self._window(days)
+        sessions = self.scan(
+            'sessions', ['id', 'subject_id', 'section_id'],
+            in_window & (ds.field('faculty_id') == faculty_id) & (ds.field('created_at') >= cutoff)
+        )
+        present = self.scan(
+            'student_attendance', ['session_id'],
+            in_window & (ds.field('timestamp') >= cutoff) & self._present_in(sessions)
+        )
+        faculty_present = self.scan(
+            'faculty_attendance', ['id'],
+            in_window & (ds.field('faculty_id') == faculty_id) & (ds.field('timestamp') >= cutoff)
+        ).num_rows
+
+        total_sessions = sessions.num_rows
+        total_present = present.num_rows
+        return {
+            'faculty_id': faculty_id,
+            'period_days': days,
+            'total_sessions': total_sessions,
+            'total_students_taught': total_present,
+            'unique_subjects': pc.count_distinct(sessions['subject_id']).as_py() if total_sessions else 0,
+            'faculty_attendance_rate': _pct(faculty_present, total_sessions),
+            'avg_students_per_session': round(total_present / total_sessions, 2) if total_sessions else 0
+        }
@@ -0,0 +1,166 @@
+"""
+Daily Rollup Service - Per-section, per-day attendance buckets
+
+One document per section per local day in daily_rollups/{section_id}_{date},
+holding each ended session's totals grouped by subject:
+
+    {
+        'section_id': ..., 'date': 'YYYY-MM-DD', 'subject_ids': [...],
+        'subjects': {subject_id: {session_id: {present, suspicious, expected, created_at}}}
+    }
+
+Sessions are written when their session rollup is finalized (end_session
+or the rollup backfill). Keying entries by session ID makes the write
+idempotent, so re-finalizing a session never double-counts. A trend query
+reads at most one document per day; merge_range folds days into weeks or
+months.
+"""
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+from firebase_admin import firestore
+
+from app.core.config import settings
+
+PERIODS = ('day', 'week', 'month')
+
+TOTAL_FIELDS = ('sessions', 'present', 'suspicious', 'expected')
+
+
+def local_date(value) -> Optional[str]:
+    """ISO date of a timestamp in ANALYTICS_TIMEZONE (naive values are taken as local)"""
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(ZoneInfo(settings.ANALYTICS_TIMEZONE))
+    return value.date().isoformat()
+
+
+def start_date(days: int, now: Optional[datetime] = None) -> str:
+    """First local date inside a days-long window ending now"""
+    now = now or datetime.now(timezone.utc)
+    return local_date(now - timedelta(days=days))
+
+
+def day_start(day: str) -> datetime:
+    """Start of a local ISO date in ANALYTICS_TIMEZONE"""
+    return datetime.combine(date.fromisoformat(day), time.min, tzinfo=ZoneInfo(settings.ANALYTICS_TIMEZONE))
+
+
+def session_entries(doc: Dict, subject_id: Optional[str] = None) -> List[Dict]:
+    """
+    Flatten a daily document into one entry per session
+
+    Returns:
+        Dicts with session_id, subject_id, present, suspicious, expected, created_at
+    """
+    entries = []
+    for subject, sessions in (doc.get('subjects') or {}).items():
+        if subject_id is not None and subject != subject_id:
+            continue
+        for session_id, totals in sessions.items():
+            entries.append({'session_id': session_id, 'subject_id': subject, **totals})
+    return entries
+
+
+def _period_start(day: str, period: str) -> str:
+    value = date.fromisoformat(day)
+    if period == 'week':
+        value -= timedelta(days=value.weekday())
+    elif period == 'month':
+        value = value.replace(day=1)
+    return value.isoformat()
+
+
+def merge_range(docs: Iterable[Dict], period: str = 'day', subject_id: Optional[str] = None) -> List[Dict]:
+    """
+    Combine daily documents into day, week (Monday-based) or month buckets
+
+    Args:
+        docs: daily_rollups documents
+        period: 'day', 'week' or 'month'
+        subject_id: Only count this subject's sessions
+
+    Returns:
+        Buckets sorted by start date, each with sessions, present, suspicious,
+        expected and attendance percentage
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {PERIODS}")
+
+    buckets: Dict[str, Dict] = {}
+    for doc in docs:
+        entries = session_entries(doc, subject_id)
+        if not entries:
+            continue
+        key = _period_start(doc['date'], period)
+        bucket = buckets.setdefault(key, {'period_start': key, **{field: 0 for field in TOTAL_FIELDS}})
+        bucket['sessions'] += len(entries)
+        for entry in entries:
+            for field in ('present', 'suspicious', 'expected'):
+                bucket[field] += entry.get(field, 0)
+
+    for bucket in buckets.values():
+        expected = bucket['expected']
+        bucket['percentage'] = round(bucket['present'] / expected * 100, 2) if expected else 0
+    return [buckets[key] for key in sorted(buckets)]
+
+
+class DailyRollupService:
+    """Maintain and query daily section rollups"""
+
+    COLLECTION_NAME = 'daily_rollups'
+
+    @staticmethod
+    def add_session(batch, db, rollup: Dict):
+        """
+        Put a finalized session rollup into its section's day, as part of a batch
+
+        Sessions without a section or creation time have no bucket and are skipped.
+
+        Args:
+            batch: Batch that also writes the session rollup
+            db: Firestore client
+            rollup: Finalized session rollup
+        """
+        section_id = rollup.get('section_id')
+        day = local_date(rollup.get('created_at'))
+        if not section_id or not day:
+            return
+        subject_id = rollup.get('subject_id') or 'unknown'
+        ref = db.collection(DailyRollupService.COLLECTION_NAME).document(f"{section_id}_{day}")
+        batch.set(ref, {
+            'section_id': section_id,
+            'date': day,
+            'subject_ids': firestore.ArrayUnion([subject_id]),
+            'subjects': {
+                subject_id: {
+                    rollup['session_id']: {
+                        'present': rollup.get('present', 0),
+                        'suspicious': rollup.get('suspicious', 0),
+                        'expected': rollup.get('expected', 0),
+                        'created_at': rollup.get('created_at'),
+                    }
+                }
+            },
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+
+    @staticmethod
+    def query(db, since: str, section_id: Optional[str] = None, subject_id: Optional[str] = None):
+        """
+        Daily documents from a date on, for a section and/or a subject
+
+        Args:
+            db: Firestore client
+            since: First ISO date to include
+            section_id: Section filter
+            subject_id: Subject filter (only used without a section)
+        """
+        query = db.collection(DailyRollupService.COLLECTION_NAME)
+        if section_id:
+            query = query.where('section_id', '==', section_id)
+        elif subject_id:
+            query = query.where('subject_ids', 'array_contains', subject_id)
+        return query.where('date', '>=', since)
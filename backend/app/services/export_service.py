@@ -0,0 +1,158 @@
+"""
+Export Service - Streaming CSV/NDJSON attendance exports
+
+Exports page through student_attendance ordered by (timestamp, document ID)
+and encode each page as soon as it arrives, so memory stays at one page no
+matter how many rows match. The first page is small to get bytes to the
+client quickly; later pages are larger to cut round trips. The generators
+are synchronous and Starlette runs them in its thread pool, so the blocking
+Firestore reads never stall the event loop.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+COLUMNS = [
+    'attendance_id', 'session_id', 'student_id', 'subject_id', 'section_id', 'classroom_id',
+    'status', 'timestamp', 'gps_verified', 'wifi_verified', 'bluetooth_verified', 'distance_meters'
+]
+
+# Only these fields are fetched; location_provided can be large and is not exported
+SELECT_FIELDS = [
+    'session_id', 'student_id', 'subject_id', 'section_id', 'classroom_id', 'status', 'timestamp',
+    'verification_data.gps_verified', 'verification_data.wifi_verified',
+    'verification_data.bluetooth_verified', 'verification_data.distance_meters'
+]
+
+FIRST_PAGE_SIZE = 100
+PAGE_SIZE = 1000
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def to_row(doc_id: str, data: Dict) -> Dict:
+    """Flatten an attendance document into the export columns"""
+    verification = data.get('verification_data') or {}
+    timestamp = data.get('timestamp')
+    return {
+        'attendance_id': doc_id,
+        'session_id': data.get('session_id'),
+        'student_id': data.get('student_id'),
+        'subject_id': data.get('subject_id'),
+        'section_id': data.get('section_id'),
+        'classroom_id': data.get('classroom_id'),
+        'status': data.get('status'),
+        'timestamp': timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp,
+        'gps_verified': verification.get('gps_verified'),
+        'wifi_verified': verification.get('wifi_verified'),
+        'bluetooth_verified': verification.get('bluetooth_verified'),
+        'distance_meters': verification.get('distance_meters'),
+    }
+
+
+def encode_csv(pages: Iterator[List[Dict]]) -> Iterator[str]:
+    """Header first, then one chunk of CSV lines per page"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, lineterminator='\n')
+    writer.writeheader()
+    yield buffer.getvalue()
+    for page in pages:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(page)
+        yield buffer.getvalue()
+
+
+def encode_ndjson(pages: Iterator[List[Dict]]) -> Iterator[str]:
+    """One chunk of JSON lines per page"""
+    for page in pages:
+        yield ''.join(json.dumps(row, default=str) + '\n' for row in page)
+
+
+class ExportService:
+    """Service for streaming attendance exports"""
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    @staticmethod
+    def _pages(query, first_page_size: int = FIRST_PAGE_SIZE,
+               page_size: int = PAGE_SIZE) -> Iterator[List[Dict]]:
+        """
+        Page a query by (timestamp, document ID)
+
+        Args:
+            query: Attendance query with only equality/range filters applied
+            first_page_size: Rows in the first page
+            page_size: Rows in every later page
+
+        Returns:
+            Iterator of lists of export rows
+        """
+        query = query.select(SELECT_FIELDS).order_by('timestamp').order_by('__name__')
+        cursor = None
+        limit = first_page_size
+        while True:
+            page = query.start_after(cursor) if cursor else query
+            docs = list(page.limit(limit).stream())
+            if not docs:
+                return
+            yield [to_row(doc.id, doc.to_dict()) for doc in docs]
+            if len(docs) < limit:
+                return
+            cursor = [docs[-1].to_dict().get('timestamp'), docs[-1].id]
+            limit = page_size
+
+    @staticmethod
+    def _query(field: str, value: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        query = ExportService._get_db().collection('student_attendance').where(field, '==', value)
+        if start is not None:
+            query = query.where('timestamp', '>=', _utc(start))
+        if end is not None:
+            query = query.where('timestamp', '<', _utc(end))
+        return query
+
+    @staticmethod
+    def stream(scope: str, scope_id: str, fmt: str = 'csv', start: Optional[datetime] = None,
+               end: Optional[datetime] = None, page_size: int = PAGE_SIZE) -> Iterator[str]:
+        """
+        Stream attendance rows of a session, a section or a student
+
+        Args:
+            scope: 'session', 'section' or 'student'
+            scope_id: ID of the session, section or student
+            fmt: 'csv' or 'ndjson'
+            start: Inclusive lower timestamp bound
+            end: Exclusive upper timestamp bound
+            page_size: Rows per Firestore read after the first page
+
+        Returns:
+            Iterator of encoded text chunks
+        """
+        query = ExportService._query(f"{scope}_id", scope_id, start, end)
+        pages = ExportService._pages(query, min(FIRST_PAGE_SIZE, page_size), page_size)
+        return encode_csv(pages) if fmt == 'csv' else encode_ndjson(pages)
+
+    @staticmethod
+    def session_exists(session_id: str) -> bool:
+        """Whether the session document exists"""
+        return ExportService._get_db().collection('sessions').document(session_id).get().exists
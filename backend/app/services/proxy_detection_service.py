@@ -0,0 +1,399 @@
+"""
+Proxy Detection Service - Batch detection of proxy attendance patterns
+
+A scan's 'suspicious' status only checks one student's location. This job
+loads a whole session's scans into numpy arrays (one projected query) and
+looks for patterns across students:
+
+- shared_device: one device_id marking several students
+- wifi_burst: PROXY_BURST_MIN_SCANS or more scans through one BSSID with
+  consecutive gaps under PROXY_BURST_SECONDS
+- identical_gps: fixes from different students within
+  PROXY_GPS_RADIUS_METERS, found with a spatial grid (sort + binary
+  search over cell keys, O(n log n)); coarse fixes worse than
+  PROXY_GPS_MAX_ACCURACY_METERS are ignored
+- impossible_timing: one device scanning again within
+  PROXY_MIN_DEVICE_GAP_SECONDS (too fast to switch accounts), or scans
+  stamped outside the session
+
+Findings go to proxy_findings for faculty review, one document per
+detector and group of attendance records; re-running a session leaves
+existing findings (and their review status) alone. end_session runs it in
+the background; scripts/detect_proxy_attendance.py runs it nightly.
+"""
+import asyncio
+import hashlib
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+
+SCAN_FIELDS = [
+    'student_id', 'device_id', 'timestamp',
+    'verification_data.location_provided.wifi_bssid',
+    'verification_data.location_provided.gps.latitude',
+    'verification_data.location_provided.gps.longitude',
+    'verification_data.location_provided.gps.accuracy',
+]
+
+SEVERITY = {
+    'shared_device': 'high',
+    'impossible_timing': 'high',
+    'identical_gps': 'medium',
+    'wifi_burst': 'low',
+}
+
+EARTH_RADIUS_METERS = 6371000
+BATCH_LIMIT = 500
+
+# Detections started by end_session, kept referenced until they finish
+_background_jobs = set()
+
+
+def _epoch(value) -> float:
+    return value.timestamp() if isinstance(value, datetime) else math.nan
+
+
+class SessionScans:
+    """One session's scans as parallel arrays (one element per attendance record)"""
+
+    def __init__(self, docs: List):
+        n = len(docs)
+        self.attendance_ids = np.empty(n, dtype=object)
+        self.student_ids = np.empty(n, dtype=object)
+        self.devices = np.empty(n, dtype=object)
+        self.bssids = np.empty(n, dtype=object)
+        self.timestamps = np.full(n, math.nan)
+        self.latitudes = np.full(n, math.nan)
+        self.longitudes = np.full(n, math.nan)
+        self.accuracies = np.full(n, math.nan)
+        for k, doc in enumerate(docs):
+            data = doc.to_dict()
+            location = (data.get('verification_data') or {}).get('location_provided') or {}
+            gps = location.get('gps') or {}
+            self.attendance_ids[k] = doc.id
+            self.student_ids[k] = data.get('student_id') or ''
+            self.devices[k] = data.get('device_id') or ''
+            self.bssids[k] = (location.get('wifi_bssid') or '').lower()
+            self.timestamps[k] = _epoch(data.get('timestamp'))
+            for array, value in ((self.latitudes, gps.get('latitude')), (self.longitudes, gps.get('longitude')),
+                                 (self.accuracies, gps.get('accuracy'))):
+                if isinstance(value, (int, float)):
+                    array[k] = value
+
+    def __len__(self):
+        return len(self.attendance_ids)
+
+
+def _runs(order: np.ndarray, new_run: np.ndarray, min_size: int) -> List[np.ndarray]:
+    """Split sorted indices where new_run is True, keeping runs of min_size or more"""
+    if len(order) == 0:
+        return []
+    starts = np.flatnonzero(new_run)
+    return [run for run in np.split(order, starts[1:]) if len(run) >= min_size]
+
+
+def shared_devices(scans: SessionScans) -> List[Dict]:
+    """Groups of scans sent from one device_id"""
+    valid = np.flatnonzero(scans.devices != '')
+    order = valid[np.argsort(scans.devices[valid], kind='stable')]
+    keys = scans.devices[order]
+    new_run = np.r_[True, keys[1:] != keys[:-1]] if len(order) else np.empty(0, bool)
+    return [
+        {'members': run, 'evidence': {'device_id': scans.devices[run[0]]}}
+        for run in _runs(order, new_run, 2)
+    ]
+
+
+def wifi_bursts(scans: SessionScans, window: float, min_scans: int) -> List[Dict]:
+    """Runs of scans through one BSSID with every gap under window seconds"""
+    valid = np.flatnonzero((scans.bssids != '') & ~np.isnan(scans.timestamps))
+    order = valid[np.lexsort((scans.timestamps[valid], scans.bssids[valid].astype(str)))]
+    bssids, times = scans.bssids[order], scans.timestamps[order]
+    new_run = np.r_[True, (bssids[1:] != bssids[:-1]) | (np.diff(times) > window)] \
+        if len(order) else np.empty(0, bool)
+    return [
+        {'members': run, 'evidence': {
+            'wifi_bssid': scans.bssids[run[0]],
+            'span_seconds': round(float(scans.timestamps[run].max() - scans.timestamps[run].min()), 3),
+        }}
+        for run in _runs(order, new_run, min_scans)
+    ]
+
+
+def _components(n: int, pairs_i: np.ndarray, pairs_j: np.ndarray) -> List[np.ndarray]:
+    """Connected components (size >= 2) of the graph given by index pairs"""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, j in zip(pairs_i.tolist(), pairs_j.tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parent[max(root_i, root_j)] = min(root_i, root_j)
+    nodes = np.unique(np.r_[pairs_i, pairs_j])
+    roots = np.array([find(node) for node in nodes.tolist()], dtype=np.int64)
+    order = np.argsort(roots, kind='stable')
+    return _runs(nodes[order], np.r_[True, np.diff(roots[order]) != 0] if len(nodes) else np.empty(0, bool), 2)
+
+
+def identical_gps(scans: SessionScans, radius: float, max_accuracy: float) -> List[Dict]:
+    """Clusters of fixes within radius metres of each other, via a radius-sized grid"""
+    valid = ~np.isnan(scans.latitudes) & ~np.isnan(scans.longitudes) & \
+        ~(scans.accuracies > max_accuracy)
+    points = np.flatnonzero(valid)
+    if len(points) < 2:
+        return []
+
+    # Local metres on an equirectangular projection (fine at classroom scale)
+    lat = np.radians(scans.latitudes[points])
+    lng = np.radians(scans.longitudes[points])
+    y = lat * EARTH_RADIUS_METERS
+    x = lng * EARTH_RADIUS_METERS * math.cos(float(lat.mean()))
+    cell_x = np.floor(x / radius).astype(np.int64)
+    cell_y = np.floor(y / radius).astype(np.int64)
+    cell_x -= cell_x.min() - 1
+    cell_y -= cell_y.min() - 1
+    stride = int(cell_y.max()) + 2
+    keys = cell_x * stride + cell_y
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+
+    pairs_i, pairs_j = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            neighbour = keys + dx * stride + dy
+            lo = np.searchsorted(sorted_keys, neighbour, 'left')
+            hi = np.searchsorted(sorted_keys, neighbour, 'right')
+            counts = hi - lo
+            if not counts.any():
+                continue
+            i = np.repeat(np.arange(len(points)), counts)
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(lo, counts) + offsets]
+            keep = (i < j) & (np.hypot(x[i] - x[j], y[i] - y[j]) <= radius)
+            pairs_i.append(i[keep])
+            pairs_j.append(j[keep])
+    pairs_i, pairs_j = np.concatenate(pairs_i), np.concatenate(pairs_j)
+    if len(pairs_i) == 0:
+        return []
+
+    findings = []
+    for component in _components(len(points), pairs_i, pairs_j):
+        members = points[component]
+        spread = max(np.ptp(x[component]), np.ptp(y[component]))
+        findings.append({'members': members, 'evidence': {
+            'latitude': float(scans.latitudes[members[0]]),
+            'longitude': float(scans.longitudes[members[0]]),
+            'spread_meters': round(float(spread), 3),
+        }})
+    return findings
+
+
+def impossible_timings(scans: SessionScans, min_device_gap: float, session_start: Optional[float],
+                       session_end: Optional[float]) -> List[Dict]:
+    """Device rescans faster than an account switch, and scans outside the session"""
+    findings = []
+    valid = np.flatnonzero((scans.devices != '') & ~np.isnan(scans.timestamps))
+    order = valid[np.lexsort((scans.timestamps[valid], scans.devices[valid].astype(str)))]
+    if len(order) > 1:
+        same_device = scans.devices[order][1:] == scans.devices[order][:-1]
+        gaps = np.diff(scans.timestamps[order])
+        too_fast = np.flatnonzero(same_device & (gaps < min_device_gap))
+        for k in too_fast.tolist():
+            findings.append({'members': order[k:k + 2], 'evidence': {
+                'reason': 'device_rescan', 'device_id': scans.devices[order[k]],
+                'gap_seconds': round(float(gaps[k]), 3),
+            }})
+
+    outside = np.zeros(len(scans), bool)
+    if session_start is not None:
+        outside |= scans.timestamps < session_start
+    if session_end is not None:
+        outside |= scans.timestamps > session_end
+    if outside.any():
+        findings.append({'members': np.flatnonzero(outside), 'evidence': {'reason': 'outside_session'}})
+    return findings
+
+
+def detect(scans: SessionScans, session_data: Dict) -> List[Dict]:
+    """
+    Run every detector over a session's scans
+
+    Returns:
+        Findings: detector, attendance_ids, student_ids and evidence
+    """
+    if len(scans) == 0:
+        return []
+    start, end = _epoch(session_data.get('created_at')), _epoch(session_data.get('end_time'))
+    results = {
+        'shared_device': shared_devices(scans),
+        'wifi_burst': wifi_bursts(scans, settings.PROXY_BURST_SECONDS, settings.PROXY_BURST_MIN_SCANS),
+        'identical_gps': identical_gps(scans, settings.PROXY_GPS_RADIUS_METERS,
+                                       settings.PROXY_GPS_MAX_ACCURACY_METERS),
+        'impossible_timing': impossible_timings(
+            scans, settings.PROXY_MIN_DEVICE_GAP_SECONDS,
+            None if math.isnan(start) else start, None if math.isnan(end) else end
+        ),
+    }
+    findings = []
+    for detector, groups in results.items():
+        for group in groups:
+            members = np.sort(group['members'])
+            findings.append({
+                'detector': detector,
+                'severity': SEVERITY[detector],
+                'attendance_ids': scans.attendance_ids[members].tolist(),
+                'student_ids': sorted(set(scans.student_ids[members].tolist())),
+                'evidence': group['evidence'],
+            })
+    return findings
+
+
+def finding_id(session_id: str, finding: Dict) -> str:
+    """Stable ID, so re-running a session doesn't duplicate a finding"""
+    digest = hashlib.sha1(','.join(finding['attendance_ids']).encode()).hexdigest()[:12]
+    return f"{session_id}_{finding['detector']}_{digest}"
+
+
+class ProxyDetectionService:
+    """Run proxy detectors over sessions and store findings for review"""
+
+    COLLECTION_NAME = 'proxy_findings'
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    @staticmethod
+    def analyze_blocking(session_id: str, session_data: Optional[Dict] = None, db=None) -> List[Dict]:
+        """
+        Detect proxy patterns in one session and store new findings
+
+        Args:
+            session_id: Session ID
+            session_data: sessions/{id} document (read if not given)
+            db: Firestore client
+
+        Returns:
+            Every finding for the session, new or already stored
+        """
+        db = db or ProxyDetectionService._get_db()
+        if session_data is None:
+            session_doc = db.collection('sessions').document(session_id).get()
+            if not session_doc.exists:
+                return []
+            session_data = session_doc.to_dict()
+
+        docs = list(db.collection('student_attendance')
+                    .where('session_id', '==', session_id)
+                    .select(SCAN_FIELDS)
+                    .stream())
+        findings = detect(SessionScans(docs), session_data)
+        if not findings:
+            return []
+
+        collection = db.collection(ProxyDetectionService.COLLECTION_NAME)
+        existing = {doc.id for doc in collection.where('session_id', '==', session_id).select([]).stream()}
+        batch, pending, written = db.batch(), 0, 0
+        for finding in findings:
+            doc_id = finding_id(session_id, finding)
+            if doc_id in existing:
+                continue
+            batch.set(collection.document(doc_id), {
+                'session_id': session_id,
+                'section_id': session_data.get('section_id'),
+                'subject_id': session_data.get('subject_id'),
+                'faculty_id': session_data.get('faculty_id'),
+                **finding,
+                'review_status': 'pending',
+                'detected_at': firestore.SERVER_TIMESTAMP,
+            })
+            pending += 1
+            written += 1
+            if pending == BATCH_LIMIT:
+                batch.commit()
+                batch, pending = db.batch(), 0
+        if pending:
+            batch.commit()
+        if written:
+            print(f"🕵️ Session {session_id}: {written} new proxy finding(s) for review")
+        return findings
+
+    @staticmethod
+    async def analyze_session(session_id: str) -> List[Dict]:
+        """Detect proxy patterns in one session without blocking the event loop"""
+        return await asyncio.to_thread(ProxyDetectionService.analyze_blocking, session_id)
+
+    @staticmethod
+    def schedule(session_id: str):
+        """Analyze a session in the background (end_session doesn't wait for it)"""
+        async def run():
+            try:
+                await ProxyDetectionService.analyze_session(session_id)
+            except Exception as e:
+                print(f"⚠️ Proxy detection failed for session {session_id}: {e}")
+
+        task = asyncio.create_task(run())
+        _background_jobs.add(task)
+        task.add_done_callback(_background_jobs.discard)
+
+    @staticmethod
+    def _findings_blocking(session_id: str) -> List[Dict]:
+        db = ProxyDetectionService._get_db()
+        docs = db.collection(ProxyDetectionService.COLLECTION_NAME).where('session_id', '==', session_id).stream()
+        return [{'finding_id': doc.id, **doc.to_dict()} for doc in docs]
+
+    @staticmethod
+    async def get_findings(session_id: str) -> Dict:
+        """
+        Get stored proxy findings of a session
+
+        Returns:
+            Findings, high severity first
+        """
+        findings = await asyncio.to_thread(ProxyDetectionService._findings_blocking, session_id)
+        rank = {'high': 0, 'medium': 1, 'low': 2}
+        findings.sort(key=lambda finding: (rank.get(finding.get('severity'), 3), finding['finding_id']))
+        return {'session_id': session_id, 'total_findings': len(findings), 'findings': findings}
+
+    @staticmethod
+    def run_recent(hours: int = 24, page_size: int = 200) -> Dict:
+        """
+        Analyze every ended session created in the last hours (the nightly job)
+
+        Returns:
+            Counts of sessions analyzed and findings
+        """
+        db = ProxyDetectionService._get_db()
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        stats = {'sessions': 0, 'findings': 0}
+        query = db.collection('sessions').where('created_at', '>=', since) \
+            .order_by('created_at').order_by('__name__')
+        last = None
+        while True:
+            page = query.start_after(last) if last is not None else query
+            sessions = list(page.limit(page_size).stream())
+            if not sessions:
+                break
+            last = sessions[-1]
+            for session_doc in sessions:
+                session_data = session_doc.to_dict()
+                if session_data.get('status') == 'active':
+                    continue
+                stats['sessions'] += 1
+                stats['findings'] += len(ProxyDetectionService.analyze_blocking(session_doc.id, session_data, db))
+        return stats
@@ -0,0 +1,272 @@
+"""
+Roster Stream - live present list for a session over the WebSocket
+Roster subscribers (faculty LiveMonitorScreen) get one roster_snapshot and
+then a roster_delta per student change, each with a monotonically
+increasing seq. A reconnecting client passes its last seq and only receives
+the deltas it missed, replayed from a bounded per-session buffer.
+
+Deltas travel between workers over the broadcast backplane; each worker
+numbers them in its own stream, identified by an epoch. Resuming against a
+different epoch (another worker, or a restart) or from a seq that has
+fallen out of the buffer gets a fresh snapshot instead.
+"""
+import asyncio
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Optional, Set
+import firebase_admin
+from fastapi import WebSocket
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+from app.services.websocket_manager import manager
+
+ROSTER_EVENT = "roster_event"
+
+
+def _serialize_time(value) -> Optional[str]:
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class SessionRoster:
+    """Roster, delta buffer and subscribers for one session on this worker"""
+
+    def __init__(self, session_id: str, students: Dict[str, Dict], buffer_size: int):
+        self.session_id = session_id
+        self.epoch = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.students = students
+        self.buffer: Deque[Dict] = deque(maxlen=buffer_size)
+        self.subscribers: Set[WebSocket] = set()
+        # monotonic time the last subscriber left, None while followed
+        self.idle_since: Optional[float] = None
+
+    def apply(self, student: Dict) -> Dict:
+        """Record a student change and return its delta event"""
+        self.seq += 1
+        self.students[student['student_id']] = student
+        delta = {
+            "type": "roster_delta",
+            "session_id": self.session_id,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "op": "upsert",
+            "student": student
+        }
+        self.buffer.append(delta)
+        return delta
+
+    def snapshot(self) -> Dict:
+        return {
+            "type": "roster_snapshot",
+            "session_id": self.session_id,
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "students": list(self.students.values())
+        }
+
+    def missed_since(self, epoch: Optional[str], since: Optional[int]):
+        """
+        Deltas after since, or None if they can't be replayed
+
+        Returns:
+            List of delta events, or None when a snapshot is needed
+        """
+        if since is None or epoch != self.epoch or since > self.seq:
+            return None
+        if since == self.seq:
+            return []
+        if not self.buffer or self.buffer[0]['seq'] > since + 1:
+            return None
+        return [delta for delta in self.buffer if delta['seq'] > since]
+
+
+class RosterStreams:
+    """
+    Per-worker registry of session rosters
+
+    A session's roster is loaded from Firestore when its first roster
+    subscriber connects on this worker; the read runs in a worker thread and
+    is shared by everyone subscribing while it is in flight. It is kept for
+    WS_ROSTER_IDLE_TTL_SECONDS after the last subscriber leaves, so briefly
+    disconnected clients can resume from the buffer, and dropped after that
+    (or as soon as a session_status 'ended' reaches this worker).
+    """
+
+    def __init__(self, buffer_size: Optional[int] = None, idle_ttl_seconds: Optional[float] = None):
+        self.buffer_size = buffer_size or settings.WS_ROSTER_BUFFER_SIZE
+        self.idle_ttl_seconds = idle_ttl_seconds if idle_ttl_seconds is not None else settings.WS_ROSTER_IDLE_TTL_SECONDS
+        self._rosters: Dict[str, SessionRoster] = {}
+        # session_id -> in-flight roster load shared by concurrent subscribers
+        self._loading: Dict[str, asyncio.Future] = {}
+        # session_id -> student changes delivered while its roster loads
+        self._arrived_while_loading: Dict[str, List[Dict]] = {}
+        manager.add_delivery_hook(ROSTER_EVENT, self._on_event)
+        manager.add_delivery_hook('session_status', self._on_session_status, consume=False)
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    def _read_students(self, session_id: str) -> Dict[str, Dict]:
+        """Read the session's roster from its attendance records"""
+        db = self._get_db()
+        records = db.collection('student_attendance') \
+            .where('session_id', '==', session_id) \
+            .stream()
+
+        students = {}
+        for doc in records:
+            data = doc.to_dict()
+            student_id = data.get('student_id')
+            if student_id:
+                students[student_id] = {
+                    "student_id": student_id,
+                    "name": None,
+                    "status": data.get('status'),
+                    "marked_at": _serialize_time(data.get('timestamp'))
+                }
+
+        # One batched read for names instead of one get per student
+        if students:
+            refs = [db.collection('students').document(student_id) for student_id in students]
+            for doc in db.get_all(refs):
+                if doc.exists:
+                    students[doc.id]["name"] = doc.to_dict().get('name')
+        return students
+
+    async def _build(self, session_id: str) -> SessionRoster:
+        try:
+            students = await asyncio.to_thread(self._read_students, session_id)
+        finally:
+            arrived = self._arrived_while_loading.pop(session_id, None)
+        roster = SessionRoster(session_id, students, self.buffer_size)
+        if arrived is None:
+            return roster  # the session ended while loading; don't keep it
+        # Changes that reached this worker during the read may postdate it
+        for student in arrived:
+            roster.apply(student)
+        self._rosters[session_id] = roster
+        return roster
+
+    async def _load(self, session_id: str) -> SessionRoster:
+        """
+        Get the session's roster, loading it once for all concurrent subscribers
+
+        The Firestore reads run in a worker thread so a first subscriber
+        doesn't stall every socket on this worker.
+        """
+        roster = self._rosters.get(session_id)
+        if roster is not None:
+            return roster
+
+        pending = self._loading.get(session_id)
+        if pending is None:
+            self._arrived_while_loading[session_id] = []
+            pending = asyncio.ensure_future(self._build(session_id))
+            self._loading[session_id] = pending
+
+            def forget(done: asyncio.Future):
+                if self._loading.get(session_id) is done:
+                    del self._loading[session_id]
+
+            pending.add_done_callback(forget)
+        # Shielded: one subscriber giving up doesn't cancel the load for the rest
+        return await asyncio.shield(pending)
+
+    async def subscribe(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        epoch: Optional[str] = None,
+        since: Optional[int] = None
+    ):
+        """
+        Add a roster subscriber, sending either the missed deltas or a snapshot
+
+        Args:
+            websocket: Connected client
+            session_id: Session to follow
+            epoch: Epoch from the client's last snapshot/delta, if resuming
+            since: Last seq the client applied, if resuming
+        """
+        roster = await self._load(session_id)
+        roster.subscribers.add(websocket)
+        roster.idle_since = None
+
+        missed = roster.missed_since(epoch, since)
+        if missed is None:
+            await manager.send_personal_message(roster.snapshot(), websocket)
+            return
+        for delta in missed:
+            await manager.send_personal_message(delta, websocket)
+
+    def unsubscribe(self, websocket: WebSocket, session_id: str):
+        """Drop a subscriber, scheduling the roster's expiry when none are left"""
+        roster = self._rosters.get(session_id)
+        if roster is None:
+            return
+        roster.subscribers.discard(websocket)
+        if not roster.subscribers and roster.idle_since is None:
+            roster.idle_since = time.monotonic()
+            asyncio.get_running_loop().call_later(
+                self.idle_ttl_seconds, self._expire, session_id, roster
+            )
+
+    def _expire(self, session_id: str, roster: SessionRoster):
+        """Drop a roster nobody has followed for the idle TTL"""
+        if self._rosters.get(session_id) is not roster or roster.subscribers or roster.idle_since is None:
+            return
+        if time.monotonic() - roster.idle_since < self.idle_ttl_seconds:
+            # Re-followed and left again since; that unsubscribe scheduled a later expiry
+            return
+        del self._rosters[session_id]
+
+    def discard(self, session_id: str):
+        """Forget a session's roster"""
+        self._rosters.pop(session_id, None)
+        self._arrived_while_loading.pop(session_id, None)
+
+    async def _on_session_status(self, session_id: str, message: Dict):
+        if message.get('status') == 'ended':
+            self.discard(session_id)
+
+    def get(self, session_id: str) -> Optional[SessionRoster]:
+        return self._rosters.get(session_id)
+
+    async def publish(self, session_id: str, student: Dict):
+        """
+        Announce a student change to roster subscribers on every worker
+
+        Args:
+            session_id: Session the attendance belongs to
+            student: {student_id, name, status, marked_at}
+        """
+        await manager.broadcast_to_session(session_id, {
+            "type": ROSTER_EVENT,
+            "student": student
+        })
+
+    async def _on_event(self, session_id: str, message: Dict):
+        """Backplane delivery: number the change and fan it out locally"""
+        roster = self._rosters.get(session_id)
+        if roster is None:
+            arrived = self._arrived_while_loading.get(session_id)
+            if arrived is not None:
+                arrived.append(message['student'])
+            return  # nobody follows this roster here; a later subscriber loads a snapshot
+
+        delta = roster.apply(message['student'])
+        manager.send_to_connections(session_id, roster.subscribers, delta)
+
+
+# Global roster streams instance
+roster_streams = RosterStreams()
@@ -0,0 +1,134 @@
+"""
+Session Broadcaster - one QR token stream per session
+Started when the first WebSocket subscribes to a session and cancelled when
+the last one leaves. It is the only producer of qr_update messages.
+"""
+import asyncio
+from typing import Dict, Optional
+from app.core.config import settings
+from app.services.active_sessions_service import ActiveSessionsService
+from app.services.session_cache import session_cache
+from app.services.websocket_manager import manager
+
+
+class SessionBroadcaster:
+    """
+    Per-session qr_update broadcaster
+
+    Tokens come from the rotation scheduler via the session cache. A new
+    broadcaster starts from the token stored in ActiveSessions. If no
+    rotation arrives within one refresh interval (scheduler stopped or
+    late), it rotates the session itself through
+    ActiveSessionsService.rotate_tokens, so the displayed token is always
+    the stored currentToken that scans are validated against.
+    """
+
+    # Extra wait past one refresh interval before rotating ourselves
+    FALLBACK_GRACE_SECONDS = 1.0
+
+    def __init__(self):
+        # session_id -> broadcaster task
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # session_id -> number of subscribed connections
+        self._subscribers: Dict[str, int] = {}
+
+    def subscribe(self, session_id: str):
+        """Register a subscriber, starting the session's broadcaster if it is the first"""
+        self._subscribers[session_id] = self._subscribers.get(session_id, 0) + 1
+
+        task = self._tasks.get(session_id)
+        if task is None or task.done():
+            self._tasks[session_id] = asyncio.create_task(self._run(session_id))
+            print(f"🔄 QR broadcaster started for {session_id}")
+
+    def unsubscribe(self, session_id: str):
+        """Drop a subscriber, cancelling the broadcaster when none are left"""
+        remaining = self._subscribers.get(session_id, 0) - 1
+        if remaining > 0:
+            self._subscribers[session_id] = remaining
+            return
+
+        self._subscribers.pop(session_id, None)
+        task = self._tasks.pop(session_id, None)
+        if task:
+            task.cancel()
+            print(f"⏹️ QR broadcaster stopped for {session_id}")
+
+    def is_running(self, session_id: str) -> bool:
+        task = self._tasks.get(session_id)
+        return task is not None and not task.done()
+
+    async def _run(self, session_id: str):
+        """Broadcast each new token for the session until it ends or is cancelled"""
+        interval = settings.QR_REFRESH_INTERVAL_SECONDS
+        # Deduplicate on the token string: a late scheduler rotation and a
+        # fallback rotation can carry the same sequence number
+        last_token: Optional[str] = None
+
+        try:
+            while True:
+                session_data = await session_cache.get_session(session_id)
+                if not session_data or session_data.get('status') != 'active':
+                    print(f"⏹️ Session {session_id} no longer active, broadcaster exiting")
+                    break
+
+                if last_token is None and session_cache.get_token(session_id) is None:
+                    # Nothing rotated yet on this worker: show the stored token
+                    # now so the first subscriber doesn't stare at a blank QR
+                    token_data = await ActiveSessionsService.get_current_token(session_id)
+                else:
+                    token_data = await session_cache.wait_for_token(
+                        session_id,
+                        after_token=last_token,
+                        timeout=interval + self.FALLBACK_GRACE_SECONDS
+                    )
+
+                if token_data is None:
+                    # Woken without a token: the session may have just ended
+                    session_data = await session_cache.get_session(session_id)
+                    if not session_data or session_data.get('status') != 'active':
+                        print(f"⏹️ Session {session_id} no longer active, broadcaster exiting")
+                        break
+                    token_data = await self._rotate_fallback(session_id)
+
+                if token_data is None:
+                    # No ActiveSessions document to rotate; nothing valid to show
+                    await asyncio.sleep(interval)
+                    continue
+
+                if token_data['token'] == last_token:
+                    continue
+                last_token = token_data['token']
+
+                # Local only: every worker runs its own broadcaster for its
+                # own subscribers, so relaying would duplicate the stream
+                await manager.broadcast_local(session_id, {
+                    "type": "qr_update",
+                    "qr_token": token_data['token'],
+                    "sequence_number": token_data['sequence'],
+                    "timestamp": token_data['timestamp'],
+                    "expiry": token_data['expiry']
+                })
+
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"Error in QR broadcaster for {session_id}: {e}")
+        finally:
+            if self._tasks.get(session_id) is asyncio.current_task():
+                del self._tasks[session_id]
+
+    @staticmethod
+    async def _rotate_fallback(session_id: str) -> Optional[Dict]:
+        """Rotate and persist the session's token when the scheduler hasn't"""
+        rotated = await ActiveSessionsService.rotate_tokens([session_id])
+        token_data = rotated.get(session_id)
+        if token_data is not None:
+            await session_cache.publish_token(session_id, token_data)
+        return token_data
+
+
+# Global broadcaster instance
+broadcaster = SessionBroadcaster()
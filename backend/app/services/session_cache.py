@@ -0,0 +1,287 @@
+"""
+Session Cache - In-memory view of active session state
+Holds session documents (with TTL) and the current rotation token per session,
+so hot paths like the QR broadcaster don't re-read Firestore every tick.
+
+session_status messages delivered through the backplane update every
+worker's cache, so ending a session stops its QR stream everywhere at once
+rather than after SESSION_CACHE_TTL_SECONDS. Rotated tokens are published
+the same way, so workers that don't run the rotation scheduler still
+learn about every new token.
+
+WebSocket admission is served from here too: the session document and the
+present count come from memory, and concurrent misses for one session
+(a reconnect storm) share a single Firestore read.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, Optional, Tuple
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+from app.services.active_sessions_service import ActiveSessionsService
+from app.services.websocket_manager import manager
+from app.utils.token_engine import get_token_engine
+
+TOKEN_EVENT = "qr_token"
+
+
+class SessionCache:
+    """
+    Per-worker cache of session state
+
+    - sessions/{id} documents, refreshed from Firestore after
+      SESSION_CACHE_TTL_SECONDS or when explicitly invalidated
+    - the latest rotation token per session, pushed by the rotation
+      scheduler; waiters are woken on every new token
+    - the present count per session, counted once and then kept current
+      from attendance_update messages on every worker; each announced
+      total is a fresh count taken after the scan committed
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else settings.SESSION_CACHE_TTL_SECONDS
+        # session_id -> (fetched_at, session_data or None if missing)
+        self._sessions: Dict[str, Tuple[float, Optional[Dict]]] = {}
+        # session_id -> latest token data
+        self._tokens: Dict[str, Dict] = {}
+        # session_id -> event set on the next token, replaced after each rotation
+        self._token_events: Dict[str, asyncio.Event] = {}
+        # session_id -> students marked present
+        self._attendance_counts: Dict[str, int] = {}
+        # (kind, session_id) -> in-flight Firestore read shared by concurrent callers
+        self._inflight: Dict[Tuple[str, str], asyncio.Future] = {}
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    # ------------------------------------------------------------------
+    # Session documents
+    # ------------------------------------------------------------------
+
+    async def get_session(self, session_id: str) -> Optional[Dict]:
+        """
+        Get session document data, reading Firestore only on a cache miss
+
+        The read runs in a worker thread so a miss doesn't stall the event
+        loop (and every socket on it) for a Firestore round trip.
+
+        Returns:
+            Session data, or None if the session does not exist
+        """
+        cached = self._sessions.get(session_id)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+
+        session_data = await self._single_flight('session', session_id, self._fetch_session)
+        self._sessions[session_id] = (time.monotonic(), session_data)
+        return session_data
+
+    def peek_session(self, session_id: str) -> Optional[Dict]:
+        """Cached session data regardless of age, without reading Firestore"""
+        cached = self._sessions.get(session_id)
+        return cached[1] if cached else None
+
+    async def _single_flight(self, kind: str, session_id: str, fetch: Callable[[str], object]):
+        """Run fetch(session_id) in a worker thread, once for all concurrent callers"""
+        key = (kind, session_id)
+        pending = self._inflight.get(key)
+        if pending is None:
+            pending = asyncio.ensure_future(asyncio.to_thread(fetch, session_id))
+            self._inflight[key] = pending
+
+            def forget(done: asyncio.Future):
+                if self._inflight.get(key) is done:
+                    del self._inflight[key]
+
+            pending.add_done_callback(forget)
+        # Shielded: one caller giving up doesn't cancel the read for the rest
+        return await asyncio.shield(pending)
+
+    def _fetch_session(self, session_id: str) -> Optional[Dict]:
+        session_doc = self._get_db().collection('sessions').document(session_id).get()
+        return session_doc.to_dict() if session_doc.exists else None
+
+    # ------------------------------------------------------------------
+    # Attendance counts
+    # ------------------------------------------------------------------
+
+    async def get_attendance_count(self, session_id: str) -> int:
+        """
+        Get the number of students marked present
+
+        Counted in Firestore (one aggregation query) the first time a session
+        is seen on this worker; afterwards served from memory.
+        """
+        count = self._attendance_counts.get(session_id)
+        if count is not None:
+            return count
+
+        count = await self._single_flight('count', session_id, self._count_present)
+        # An attendance_update may have landed while counting; keep the larger
+        count = max(count, self._attendance_counts.get(session_id, 0))
+        self._attendance_counts[session_id] = count
+        return count
+
+    async def refresh_attendance_count(self, session_id: str) -> int:
+        """Re-count in Firestore, replacing the in-memory value"""
+        self._attendance_counts.pop(session_id, None)
+        return await self.get_attendance_count(session_id)
+
+    async def record_present(self, session_id: str) -> int:
+        """
+        Re-count after a present scan was committed and return the new total
+
+        Called once the attendance batch has committed, so the count already
+        includes the scan. Counting instead of adding one to the cached value
+        means a cold worker doesn't count the scan twice, and scans committed
+        concurrently on different workers never announce the same total. The
+        read is not shared with other callers: one that started before this
+        scan committed would miss it.
+        """
+        count = await asyncio.to_thread(self._count_present, session_id)
+        # Every total is a fresh count and counts only grow; keep the larger
+        count = max(count, self._attendance_counts.get(session_id, 0))
+        self._attendance_counts[session_id] = count
+        return count
+
+    def _count_present(self, session_id: str) -> int:
+        query = self._get_db().collection('student_attendance') \
+            .where('session_id', '==', session_id) \
+            .where('status', '==', 'present')
+        return int(query.count(alias='total').get()[0][0].value)
+
+    async def on_attendance_update(self, session_id: str, message: Dict):
+        """Backplane delivery hook: adopt the total another worker announced"""
+        total = message.get('total_present')
+        if isinstance(total, int):
+            self._attendance_counts[session_id] = max(total, self._attendance_counts.get(session_id, 0))
+
+    def set_status(self, session_id: str, status: str):
+        """Update the cached status without a Firestore round trip (e.g. on end_session)"""
+        cached = self._sessions.get(session_id)
+        if cached and cached[1] is not None:
+            cached[1]['status'] = status
+
+    async def on_session_status(self, session_id: str, message: Dict):
+        """Backplane delivery hook: apply a session_status change on this worker"""
+        status = message.get('status')
+        if not status:
+            return
+        self.set_status(session_id, status)
+        if status == 'ended':
+            self._attendance_counts.pop(session_id, None)
+            self._tokens.pop(session_id, None)
+            event = self._token_events.pop(session_id, None)
+            if event:
+                event.set()  # wake the broadcaster so it sees the session ended
+            get_token_engine().forget_session(session_id)
+
+    def invalidate(self, session_id: str):
+        """Drop cached state for a session"""
+        self._sessions.pop(session_id, None)
+        self._tokens.pop(session_id, None)
+        self._attendance_counts.pop(session_id, None)
+        event = self._token_events.pop(session_id, None)
+        if event:
+            event.set()
+
+    # ------------------------------------------------------------------
+    # Rotation tokens
+    # ------------------------------------------------------------------
+
+    def set_token(self, session_id: str, token_data: Dict):
+        """Record a newly rotated token and wake anyone waiting for it"""
+        self._tokens[session_id] = token_data
+        event = self._token_events.pop(session_id, None)
+        if event:
+            event.set()
+
+    async def publish_token(self, session_id: str, token_data: Dict):
+        """Record a newly rotated token on every worker"""
+        await manager.broadcast_to_session(session_id, {
+            "type": TOKEN_EVENT,
+            "token": {
+                "token": token_data['token'],
+                "timestamp": token_data['timestamp'],
+                "expiry": token_data['expiry'],
+                "sequence": token_data['sequence']
+            }
+        })
+
+    async def on_token_event(self, session_id: str, message: Dict):
+        """Backplane delivery hook for publish_token"""
+        self.set_token(session_id, message['token'])
+
+    def get_token(self, session_id: str) -> Optional[Dict]:
+        """Get the latest token for a session, if one has been rotated on this worker"""
+        return self._tokens.get(session_id)
+
+    async def load_token(self, session_id: str) -> Optional[Dict]:
+        """
+        Get the latest token, reading the stored one on a cold worker
+
+        A worker that hasn't seen a rotation for the session yet reads
+        ActiveSessions once (shared by concurrent callers) and caches it;
+        every later call is a dictionary lookup.
+
+        Returns:
+            Token data, or None if the session has no valid stored token
+        """
+        token = self._tokens.get(session_id)
+        if token is not None:
+            return token
+
+        token = await self._single_flight('token', session_id, self._fetch_token)
+        if token is not None and session_id not in self._tokens:
+            self.set_token(session_id, token)
+        return self._tokens.get(session_id, token)
+
+    def _fetch_token(self, session_id: str) -> Optional[Dict]:
+        return ActiveSessionsService._current_token_blocking(session_id)
+
+    async def wait_for_token(
+        self,
+        session_id: str,
+        after_token: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> Optional[Dict]:
+        """
+        Wait for a token other than after_token
+
+        Compares token strings rather than sequence numbers, so a rotation
+        is never mistaken for one already shown. Returns immediately if the
+        cached token already differs.
+
+        Returns:
+            Token data, or None on timeout
+        """
+        token = self._tokens.get(session_id)
+        if token and token['token'] != after_token:
+            return token
+
+        event = self._token_events.get(session_id)
+        if event is None:
+            event = self._token_events[session_id] = asyncio.Event()
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+        token = self._tokens.get(session_id)
+        if token and token['token'] != after_token:
+            return token
+        return None
+
+
+# Global session cache instance
+session_cache = SessionCache()
+manager.add_delivery_hook('session_status', session_cache.on_session_status, consume=False)
+manager.add_delivery_hook(TOKEN_EVENT, session_cache.on_token_event)
+manager.add_delivery_hook('attendance_update', session_cache.on_attendance_update, consume=False)
@@ -0,0 +1,240 @@
+"""
+Session Rollup Service - Per-session attendance totals
+
+One document per session in session_rollups/{session_id}, so analytics
+never recounts student_attendance for sessions whose totals can't change:
+
+- present / suspicious: scan counts by status
+- verification: how many scans passed each factor (pass rate = n / scans)
+- first_scan_at / last_scan_at: epoch seconds
+- expected: section size, frozen when the session ends
+- finalized: True once end_session has reconciled it with the raw records
+
+mark_attendance adds each scan in the same batch as the attendance record;
+end_session recounts the session's records once, finalizes the rollup,
+adds it to the section's daily rollup (see daily_rollup_service) and
+records the outcome for every student of the section (see
+student_stats_service).
+"""
+import asyncio
+import time
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.services.daily_rollup_service import DailyRollupService
+from app.services.student_stats_service import StudentStatsService
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+VERIFICATION_FACTORS = ('gps_verified', 'wifi_verified', 'bluetooth_verified', 'location_provided')
+
+# Session fields copied onto the rollup so analytics can filter rollups alone
+SESSION_FIELDS = ('subject_id', 'section_id', 'faculty_id', 'classroom_id', 'created_at')
+
+
+def _epoch(value) -> Optional[float]:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def build_rollup(session_id: str, session_data: Dict, records: Iterable[Dict], expected: int) -> Dict:
+    """
+    Compute a finalized rollup from a session's attendance records
+
+    Args:
+        session_id: Session ID
+        session_data: sessions/{id} document
+        records: The session's student_attendance documents
+        expected: Students in the section
+
+    Returns:
+        Rollup document
+    """
+    rollup = {
+        'session_id': session_id,
+        **{field: session_data.get(field) for field in SESSION_FIELDS},
+        'present': 0,
+        'suspicious': 0,
+        'expected': expected,
+        'verification': {factor: 0 for factor in VERIFICATION_FACTORS},
+        'first_scan_at': None,
+        'last_scan_at': None,
+        'finalized': True,
+    }
+    for record in records:
+        status = record.get('status')
+        if status in ('present', 'suspicious'):
+            rollup[status] += 1
+        verification = record.get('verification_data') or {}
+        for factor in VERIFICATION_FACTORS:
+            if verification.get(factor):
+                rollup['verification'][factor] += 1
+        scanned_at = _epoch(record.get('timestamp'))
+        if scanned_at is not None:
+            if rollup['first_scan_at'] is None or scanned_at < rollup['first_scan_at']:
+                rollup['first_scan_at'] = scanned_at
+            if rollup['last_scan_at'] is None or scanned_at > rollup['last_scan_at']:
+                rollup['last_scan_at'] = scanned_at
+    return rollup
+
+
+def pass_rates(rollup: Dict) -> Dict[str, float]:
+    """Percentage of scans that passed each verification factor"""
+    scans = rollup.get('present', 0) + rollup.get('suspicious', 0)
+    verification = rollup.get('verification') or {}
+    return {
+        factor: round(verification.get(factor, 0) / scans * 100, 2) if scans else 0
+        for factor in VERIFICATION_FACTORS
+    }
+
+
+class SessionRollupService:
+    """Maintain and read per-session attendance rollups"""
+
+    COLLECTION_NAME = 'session_rollups'
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    @staticmethod
+    def add_scan(batch, db, session_id: str, session_data: Dict, attendance_status: str, verification: Dict):
+        """
+        Add one scan to the session's rollup as part of a write batch
+
+        Args:
+            batch: Batch that also writes the attendance record
+            db: Firestore client
+            session_id: Session ID
+            session_data: sessions/{id} document
+            attendance_status: 'present' or 'suspicious'
+            verification: verification_data of the attendance record
+        """
+        now = time.time()
+        update = {
+            'session_id': session_id,
+            **{field: session_data.get(field) for field in SESSION_FIELDS},
+            attendance_status: firestore.Increment(1),
+            'verification': {
+                factor: firestore.Increment(1)
+                for factor in VERIFICATION_FACTORS if verification.get(factor)
+            },
+            'first_scan_at': firestore.Minimum(now),
+            'last_scan_at': firestore.Maximum(now),
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }
+        if not update['verification']:
+            del update['verification']
+        ref = db.collection(SessionRollupService.COLLECTION_NAME).document(session_id)
+        batch.set(ref, update, merge=True)
+
+    @staticmethod
+    def _write_final(db, session_id: str, session_data: Dict, sections: Dict[str, int]) -> Dict:
+        """Recount one session's records, overwrite its rollup and file it in its day"""
+        section_id = session_data.get('section_id')
+        if section_id and section_id not in sections:
+            section_doc = db.collection('sections').document(section_id).get()
+            sections[section_id] = section_doc.to_dict().get('total_students', 0) if section_doc.exists else 0
+        expected = sections.get(section_id, 0) if section_id else 0
+
+        records = [doc.to_dict() for doc in db.collection('student_attendance')
+                   .where('session_id', '==', session_id)
+                   .select(['student_id', 'status', 'verification_data', 'timestamp'])
+                   .stream()]
+        rollup = build_rollup(session_id, session_data, records, expected)
+        batch = db.batch()
+        batch.set(
+            db.collection(SessionRollupService.COLLECTION_NAME).document(session_id),
+            {**rollup, 'updated_at': firestore.SERVER_TIMESTAMP}
+        )
+        DailyRollupService.add_session(batch, db, rollup)
+        batch.commit()
+        StudentStatsService.reconcile_session(db, session_id, session_data, records)
+        return rollup
+
+    @staticmethod
+    def _finalize_blocking(session_id: str) -> Optional[Dict]:
+        db = SessionRollupService._get_db()
+        session_doc = db.collection('sessions').document(session_id).get()
+        if not session_doc.exists:
+            return None
+        return SessionRollupService._write_final(db, session_id, session_doc.to_dict(), {})
+
+    @staticmethod
+    async def finalize(session_id: str) -> Optional[Dict]:
+        """
+        Recount a session's attendance once and freeze its rollup
+
+        Called by end_session; replaces the incremental counters with exact
+        totals from the raw records and records the expected count.
+
+        Args:
+            session_id: Session ID
+
+        Returns:
+            Rollup written, or None if the session doesn't exist
+        """
+        return await asyncio.to_thread(SessionRollupService._finalize_blocking, session_id)
+
+    @staticmethod
+    def get_many_blocking(db, session_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Rollups for sessions in one batched read
+
+        Returns:
+            Dict of session_id -> rollup, for sessions that have one
+        """
+        if not session_ids:
+            return {}
+        collection = db.collection(SessionRollupService.COLLECTION_NAME)
+        return {
+            doc.id: doc.to_dict()
+            for doc in db.get_all([collection.document(session_id) for session_id in session_ids])
+            if doc.exists
+        }
+
+    @staticmethod
+    def backfill(force: bool = False, page_size: int = 200) -> Dict:
+        """
+        Write finalized rollups for sessions that ended before rollups existed
+
+        Args:
+            force: Recompute rollups that are already finalized
+            page_size: Sessions read per page
+
+        Returns:
+            Counts of sessions scanned, written and skipped
+        """
+        db = SessionRollupService._get_db()
+        stats = {'scanned': 0, 'written': 0, 'skipped': 0}
+        sections: Dict[str, int] = {}
+
+        last = None
+        while True:
+            query = db.collection('sessions').order_by('__name__').limit(page_size)
+            if last is not None:
+                query = query.start_after(last)
+            page = list(query.stream())
+            if not page:
+                break
+            last = page[-1]
+
+            existing = SessionRollupService.get_many_blocking(db, [doc.id for doc in page])
+            for session_doc in page:
+                stats['scanned'] += 1
+                session_data = session_doc.to_dict()
+                if session_data.get('status') == 'active' or \
+                        (existing.get(session_doc.id, {}).get('finalized') and not force):
+                    stats['skipped'] += 1
+                    continue
+                SessionRollupService._write_final(db, session_doc.id, session_data, sections)
+                stats['written'] += 1
+            print(f"📊 Rollup backfill: {stats['scanned']} sessions scanned, {stats['written']} written")
+
+        return stats
@@ -5,6 +5,7 @@ from fastapi import HTTPException, status
 import firebase_admin
 from firebase_admin import firestore
 from app.core import firebase
+from app.core.config import settings
 from datetime import datetime
 import secrets
 
@@ -213,6 +214,7 @@ class SessionService:
     async def end_session(session_id: str):
         """End an active session"""
         from app.services.active_sessions_service import ActiveSessionsService
+        from app.services.session_rollup_service import SessionRollupService
         
         db = SessionService._get_db()
         
@@ -222,6 +224,28 @@ class SessionService:
             'end_time': firestore.SERVER_TIMESTAMP
         })
         
+        # Tell every worker: clients get session_status, and each worker's
+        # session cache, roster stream and token handles drop the session,
+        # which stops its QR broadcaster without waiting for the cache TTL
+        from app.services.websocket_manager import manager
+        from app.services.roster_stream import roster_streams  # noqa: F401 (registers its hook)
+        from app.services.session_cache import session_cache  # noqa: F401 (registers its hook)
+        await manager.send_session_status(session_id, 'ended')
+        
+        # Freeze the session's attendance totals for analytics, then have
+        # every worker refresh the cached analytics that include it
+        try:
+            await SessionRollupService.finalize(session_id)
+        except Exception as e:
+            print(f"⚠️ Failed to finalize session rollup: {e}")
+        from app.services.analytics_cache import analytics_cache
+        await analytics_cache.publish_invalidation(session_id)
+        
+        # Look for proxy attendance across the session's scans
+        if settings.PROXY_DETECTION_ON_END_SESSION:
+            from app.services.proxy_detection_service import ProxyDetectionService
+            ProxyDetectionService.schedule(session_id)
+        
         # Also end ActiveSession for cleanup
         try:
             await ActiveSessionsService.end_active_session(session_id)
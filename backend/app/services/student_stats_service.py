@@ -0,0 +1,240 @@
+"""
+Student Stats Service - Per-student, per-subject attendance counters
+
+One document per student per subject in
+student_subject_stats/{student_id}_{subject_id}:
+
+    {
+        'student_id': ..., 'subject_id': ..., 'section_id': ...,
+        'attended': n, 'suspicious': n, 'held': n,
+        'sessions': {session_id: 'present' | 'suspicious' | 'absent'}
+    }
+
+mark_attendance adds each scan in the same batch as the attendance record
+(the session counts as held for the student who attended it). When the
+session rollup is finalized (end_session or the rollup backfill), every
+student of the section gets the session's outcome, absentees included,
+and the counters are recomputed from the sessions map, so re-finalizing a
+session never double-counts. A student's percentage is then one document
+read, and a section's eligibility list one query.
+"""
+import asyncio
+from typing import Dict, Iterable, List, Optional
+
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+
+COUNTERS = {'present': 'attended', 'suspicious': 'suspicious'}
+
+GET_ALL_CHUNK = 300
+BATCH_LIMIT = 500
+
+
+def doc_id(student_id: str, subject_id: str) -> str:
+    return f"{student_id}_{subject_id}"
+
+
+def counters(sessions: Dict[str, str]) -> Dict[str, int]:
+    """attended / suspicious / held recomputed from a sessions map"""
+    outcomes = list(sessions.values())
+    return {
+        'attended': outcomes.count('present'),
+        'suspicious': outcomes.count('suspicious'),
+        'held': len(outcomes),
+    }
+
+
+def summarize(stats: Dict, threshold: float) -> Dict:
+    """Public view of a stats document with its percentage and eligibility"""
+    held = stats.get('held', 0)
+    percentage = round(stats.get('attended', 0) / held * 100, 2) if held else 0
+    return {
+        'student_id': stats.get('student_id'),
+        'subject_id': stats.get('subject_id'),
+        'section_id': stats.get('section_id'),
+        'attended': stats.get('attended', 0),
+        'suspicious': stats.get('suspicious', 0),
+        'held': held,
+        'percentage': percentage,
+        'eligible': held > 0 and percentage >= threshold,
+    }
+
+
+def _outcomes(records: Iterable[Dict]) -> Dict[str, str]:
+    """student_id -> this session's outcome; present wins over suspicious"""
+    outcomes = {}
+    for record in records:
+        student_id, status = record.get('student_id'), record.get('status')
+        if student_id and status in COUNTERS and outcomes.get(student_id) != 'present':
+            outcomes[student_id] = status
+    return outcomes
+
+
+class StudentStatsService:
+    """Maintain and read per-student, per-subject attendance counters"""
+
+    COLLECTION_NAME = 'student_subject_stats'
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    @staticmethod
+    def add_scan(batch, db, student_id: str, session_id: str, session_data: Dict, attendance_status: str):
+        """
+        Add one scan to the student's counters as part of a write batch
+
+        Args:
+            batch: Batch that also writes the attendance record
+            db: Firestore client
+            student_id: Student ID
+            session_id: Session ID
+            session_data: sessions/{id} document
+            attendance_status: 'present' or 'suspicious'
+        """
+        subject_id = session_data.get('subject_id')
+        if not subject_id or attendance_status not in COUNTERS:
+            return
+        ref = db.collection(StudentStatsService.COLLECTION_NAME).document(doc_id(student_id, subject_id))
+        batch.set(ref, {
+            'student_id': student_id,
+            'subject_id': subject_id,
+            'section_id': session_data.get('section_id'),
+            'sessions': {session_id: attendance_status},
+            COUNTERS[attendance_status]: firestore.Increment(1),
+            'held': firestore.Increment(1),
+            'updated_at': firestore.SERVER_TIMESTAMP,
+        }, merge=True)
+
+    @staticmethod
+    def reconcile_session(db, session_id: str, session_data: Dict, records: List[Dict]) -> int:
+        """
+        Record a finished session for every student of its section
+
+        Args:
+            db: Firestore client
+            session_id: Session ID
+            session_data: sessions/{id} document
+            records: The session's student_attendance documents (student_id, status)
+
+        Returns:
+            Number of student documents written
+        """
+        subject_id, section_id = session_data.get('subject_id'), session_data.get('section_id')
+        if not subject_id:
+            return 0
+        outcomes = _outcomes(records)
+        if section_id:
+            enrolled = db.collection('students').where('section_id', '==', section_id).select([]).stream()
+            for student_doc in enrolled:
+                outcomes.setdefault(student_doc.id, 'absent')
+        if not outcomes:
+            return 0
+
+        collection = db.collection(StudentStatsService.COLLECTION_NAME)
+        refs = {student_id: collection.document(doc_id(student_id, subject_id)) for student_id in outcomes}
+        existing = {}
+        ref_list = list(refs.values())
+        for start in range(0, len(ref_list), GET_ALL_CHUNK):
+            for doc in db.get_all(ref_list[start:start + GET_ALL_CHUNK]):
+                if doc.exists:
+                    existing[doc.id] = doc.to_dict().get('sessions') or {}
+
+        batch, pending = db.batch(), 0
+        for student_id, outcome in outcomes.items():
+            ref = refs[student_id]
+            sessions = {**existing.get(ref.id, {}), session_id: outcome}
+            batch.set(ref, {
+                'student_id': student_id,
+                'subject_id': subject_id,
+                'section_id': section_id,
+                'sessions': sessions,
+                **counters(sessions),
+                'updated_at': firestore.SERVER_TIMESTAMP,
+            })
+            pending += 1
+            if pending == BATCH_LIMIT:
+                batch.commit()
+                batch, pending = db.batch(), 0
+        if pending:
+            batch.commit()
+        return len(outcomes)
+
+    @staticmethod
+    def _student_blocking(student_id: str, subject_id: Optional[str]) -> List[Dict]:
+        db = StudentStatsService._get_db()
+        collection = db.collection(StudentStatsService.COLLECTION_NAME)
+        if subject_id:
+            doc = collection.document(doc_id(student_id, subject_id)).get()
+            return [doc.to_dict()] if doc.exists else []
+        return [doc.to_dict() for doc in collection.where('student_id', '==', student_id).stream()]
+
+    @staticmethod
+    async def get_student_attendance(student_id: str, subject_id: Optional[str] = None,
+                                     threshold: Optional[float] = None) -> Dict:
+        """
+        Get a student's attendance percentage per subject
+
+        Args:
+            student_id: Student ID
+            subject_id: Only this subject (a single document read)
+            threshold: Eligibility percentage (default ATTENDANCE_ELIGIBILITY_PERCENT)
+
+        Returns:
+            Attended, suspicious and held counts, percentage and eligibility per subject
+        """
+        threshold = settings.ATTENDANCE_ELIGIBILITY_PERCENT if threshold is None else threshold
+        docs = await asyncio.to_thread(StudentStatsService._student_blocking, student_id, subject_id)
+        subjects = sorted((summarize(doc, threshold) for doc in docs), key=lambda item: item['subject_id'] or '')
+        for item in subjects:
+            del item['student_id']
+        return {
+            'student_id': student_id,
+            'threshold': threshold,
+            'subjects': subjects,
+        }
+
+    @staticmethod
+    def _section_blocking(section_id: str, subject_id: str) -> List[Dict]:
+        db = StudentStatsService._get_db()
+        query = db.collection(StudentStatsService.COLLECTION_NAME) \
+            .where('section_id', '==', section_id) \
+            .where('subject_id', '==', subject_id) \
+            .select(['student_id', 'subject_id', 'section_id', 'attended', 'suspicious', 'held'])
+        return [doc.to_dict() for doc in query.stream()]
+
+    @staticmethod
+    async def get_section_eligibility(section_id: str, subject_id: str,
+                                      threshold: Optional[float] = None) -> Dict:
+        """
+        Get every student's eligibility in one subject of a section
+
+        Args:
+            section_id: Section ID
+            subject_id: Subject ID
+            threshold: Eligibility percentage (default ATTENDANCE_ELIGIBILITY_PERCENT)
+
+        Returns:
+            Students sorted by percentage (lowest first) with eligible/ineligible totals
+        """
+        threshold = settings.ATTENDANCE_ELIGIBILITY_PERCENT if threshold is None else threshold
+        docs = await asyncio.to_thread(StudentStatsService._section_blocking, section_id, subject_id)
+        students = sorted((summarize(doc, threshold) for doc in docs),
+                          key=lambda item: (item['percentage'], item['student_id'] or ''))
+        for item in students:
+            del item['subject_id'], item['section_id']
+        eligible = sum(1 for item in students if item['eligible'])
+        return {
+            'section_id': section_id,
+            'subject_id': subject_id,
+            'threshold': threshold,
+            'total_students': len(students),
+            'eligible': eligible,
+            'ineligible': len(students) - eligible,
+            'students': students,
+        }
@@ -5,6 +5,7 @@ Background service that rotates QR tokens every 5 seconds for all active session
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from app.services.active_sessions_service import ActiveSessionsService
+from app.services.session_cache import session_cache
 from app.services.websocket_manager import manager
 from datetime import datetime
 import asyncio
@@ -18,7 +19,10 @@ class TokenRotationScheduler:
     1. Fetches all active sessions from Firestore
     2. Generates new token for each session
     3. Updates ActiveSessions collection
-    4. Broadcasts token to WebSocket clients (SmartBoard)
+    4. Publishes token to every worker's session cache (SmartBoard broadcaster sends it)
+    
+    Only the backplane leader rotates, so with several workers the
+    ActiveSessions documents still have a single writer.
     """
     
     def __init__(self):
@@ -32,6 +36,26 @@ class TokenRotationScheduler:
             return
             
         # STABILIZATION: Run a quick cleanup of orphaned sessions on startup
+        # (leader only: a worker starting later must not expire live sessions)
+        if manager.backplane.is_leader():
+            self._expire_orphaned_sessions()
+        
+        # Schedule rotation every 5 seconds
+        self.scheduler.add_job(
+            self._rotate_all_tokens,
+            trigger=IntervalTrigger(seconds=5),
+            id='token_rotation',
+            name='QR Token Rotation',
+            replace_existing=True
+        )
+        
+        self.scheduler.start()
+        self.is_running = True
+        print("✅ Token rotation scheduler started (5-second interval)")
+    
+    @staticmethod
+    def _expire_orphaned_sessions():
+        """Expire ActiveSessions left active by a previous run"""
         try:
             from app.core.firebase import initialize_firebase
             from firebase_admin import firestore
@@ -48,19 +72,6 @@ class TokenRotationScheduler:
                 print("✨ Startup Check: No orphaned sessions found")
         except Exception as e:
             print(f"⚠️ Startup Cleanup Warning: {e}")
-        
-        # Schedule rotation every 5 seconds
-        self.scheduler.add_job(
-            self._rotate_all_tokens,
-            trigger=IntervalTrigger(seconds=5),
-            id='token_rotation',
-            name='QR Token Rotation',
-            replace_existing=True
-        )
-        
-        self.scheduler.start()
-        self.is_running = True
-        print("✅ Token rotation scheduler started (5-second interval)")
     
     def stop(self):
         """Stop the token rotation scheduler"""
@@ -77,6 +88,10 @@ class TokenRotationScheduler:
         Called every 5 seconds by scheduler
         """
         try:
+            # Another worker rotates; this one receives tokens over the backplane
+            if not manager.backplane.is_leader():
+                return
+            
             # Get all active session IDs
             active_session_ids = await ActiveSessionsService.get_all_active_sessions()
             
@@ -90,48 +105,20 @@ class TokenRotationScheduler:
             
             print(f"📡 Scheduler ACTIVE: Rotating {len(active_session_ids)} session(s)...")
             
-            # Rotate token for each session
-            for session_id in active_session_ids:
-                try:
-                    # Rotate token in Firestore
-                    new_token_data = await ActiveSessionsService.rotate_token(session_id)
-                    
-                    if new_token_data:
-                        # Broadcast to WebSocket clients (SmartBoard portal)
-                        await self._broadcast_token_update(session_id, new_token_data)
-                        
-                except Exception as e:
-                    print(f"❌ Critical error rotating token for session {session_id}: {e}")
-                    continue
-            
-        except Exception as e:
-            print(f"❌ Error in token rotation scheduler: {e}")
-    
-    async def _broadcast_token_update(self, session_id: str, token_data: dict):
-        """
-        Broadcast new token to WebSocket clients (SmartBoard)
-        
-        Students will get tokens via Firestore listeners, not WebSocket
-        This is only for SmartBoard QR display
-        
-        Args:
-            session_id: Session identifier
-            token_data: New token data from TokenGenerator
-        """
-        try:
-            message = {
-                "type": "qr_update",
-                "qr_token": token_data['token'],
-                "sequence_number": token_data['sequence'],
-                "timestamp": token_data['timestamp'],
-                "expiry": token_data['expiry']
-            }
+            # Rotate all sessions in one batch (one read, one write)
+            try:
+                rotated = await ActiveSessionsService.rotate_tokens(active_session_ids)
+            except Exception as e:
+                print(f"❌ Critical error rotating tokens: {e}")
+                return
             
-            # Broadcast to all WebSocket connections for this session
-            await manager.broadcast_to_session(session_id, message)
+            # Publish to the in-memory cache; the per-session broadcaster
+            # picks the new token up and sends qr_update to WebSocket clients
+            for session_id, new_token_data in rotated.items():
+                await session_cache.publish_token(session_id, new_token_data)
             
         except Exception as e:
-            print(f"⚠️ Error broadcasting token to WebSocket: {e}")
+            print(f"❌ Error in token rotation scheduler: {e}")
 
 
 # Global scheduler instance
@@ -0,0 +1,375 @@
+"""
+Utilization Service - Daily classroom utilization across the campus hierarchy
+
+Once a day the engine reads the classrooms, that weekday's timetable_slots
+and the day's sessions (with their session rollups for headcounts), joins
+them in memory and materializes:
+
+- room_utilization/{classroom_id}_{date}: one room's scheduled slots,
+  sessions held, minutes in use and occupancy against capacity
+- block_utilization/{block_id}_{date}: the block's totals, per-floor
+  totals, idle rooms and a compact entry per room
+
+Every document keeps summable counts (slots, sessions, minutes, present,
+seats offered) next to the derived percentages, so a floor, block, campus
+or date range is just a sum. Recomputing a day overwrites its documents.
+Reads are a single document (block) or a single query (room over a range,
+campus for a day).
+"""
+import asyncio
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo
+
+import firebase_admin
+from firebase_admin import firestore
+from app.core import firebase
+from app.core.config import settings
+from app.services.daily_rollup_service import local_date, start_date
+from app.services.session_rollup_service import SessionRollupService
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+SUM_FIELDS = ('scheduled_slots', 'held_scheduled', 'unscheduled_sessions', 'sessions_held',
+              'scheduled_minutes', 'held_minutes', 'available_minutes', 'present', 'seats_offered')
+
+CLASSROOM_FIELDS = ['campus_id', 'block_id', 'floor_id', 'room_number', 'capacity']
+SLOT_FIELDS = ['classroom_id', 'start_time', 'end_time', 'is_break']
+SESSION_FIELDS = ['classroom_id', 'slot_id', 'created_at', 'end_time']
+
+GET_ALL_CHUNK = 300
+BATCH_LIMIT = 500
+
+
+def _minutes(hhmm: Optional[str]) -> Optional[int]:
+    """Minutes since midnight of an 'HH:MM' slot time"""
+    try:
+        hours, minutes = map(int, hhmm.split(':'))
+    except (AttributeError, ValueError):
+        return None
+    return hours * 60 + minutes
+
+
+def _slot_minutes(slot: Dict) -> int:
+    start, end = _minutes(slot.get('start_time')), _minutes(slot.get('end_time'))
+    return max(end - start, 0) if start is not None and end is not None else 0
+
+
+def _day_bounds(day: str):
+    """UTC start and end of a local day in ANALYTICS_TIMEZONE"""
+    local = ZoneInfo(settings.ANALYTICS_TIMEZONE)
+    start = datetime.combine(date.fromisoformat(day), time.min, tzinfo=local)
+    return start.astimezone(timezone.utc), (start + timedelta(days=1)).astimezone(timezone.utc)
+
+
+def rates(totals: Dict) -> Dict:
+    """Add slot, time and occupancy percentages to summed counts"""
+    def percent(part, whole):
+        return round(part / whole * 100, 2) if whole else 0
+
+    return {
+        **totals,
+        'slot_utilization': percent(totals['held_scheduled'], totals['scheduled_slots']),
+        'time_utilization': percent(totals['held_minutes'], totals['available_minutes']),
+        'occupancy': percent(totals['present'], totals['seats_offered']),
+    }
+
+
+def sum_counts(items: Iterable[Dict]) -> Dict:
+    """Sum the SUM_FIELDS of room, floor or block entries"""
+    totals = {field: 0 for field in SUM_FIELDS}
+    for item in items:
+        for field in SUM_FIELDS:
+            totals[field] += item.get(field, 0)
+    return totals
+
+
+def build_day(day: str, classrooms: Dict[str, Dict], slots: Dict[str, Dict], sessions: Dict[str, Dict],
+              present: Dict[str, int]) -> Dict[str, Dict]:
+    """
+    Join one day's classrooms, timetable slots and sessions into room entries
+
+    Args:
+        day: ISO date
+        classrooms: classroom_id -> classrooms document
+        slots: slot_id -> timetable_slots document for the day's weekday
+        sessions: session_id -> sessions document created that day
+        present: session_id -> students present (from the session rollup)
+
+    Returns:
+        classroom_id -> room_utilization document
+    """
+    rooms = {}
+    for classroom_id, classroom in classrooms.items():
+        rooms[classroom_id] = {
+            'classroom_id': classroom_id,
+            'room_number': classroom.get('room_number'),
+            'campus_id': classroom.get('campus_id'),
+            'block_id': classroom.get('block_id'),
+            'floor_id': classroom.get('floor_id'),
+            'capacity': classroom.get('capacity') or 0,
+            'date': day,
+            **{field: 0 for field in SUM_FIELDS},
+            'available_minutes': settings.UTILIZATION_TEACHING_MINUTES,
+            'peak_present': 0,
+        }
+
+    for slot in slots.values():
+        room = rooms.get(slot.get('classroom_id'))
+        if room is not None and not slot.get('is_break'):
+            room['scheduled_slots'] += 1
+            room['scheduled_minutes'] += _slot_minutes(slot)
+
+    held_slots = set()
+    for session_id, session in sessions.items():
+        slot = slots.get(session.get('slot_id'))
+        room = rooms.get(session.get('classroom_id') or (slot or {}).get('classroom_id'))
+        if room is None:
+            continue
+        started, ended = session.get('created_at'), session.get('end_time')
+        if isinstance(started, datetime) and isinstance(ended, datetime):
+            minutes = max((ended - started).total_seconds() / 60, 0)
+        else:
+            minutes = _slot_minutes(slot) if slot else 0
+        count = present.get(session_id, 0)
+        room['sessions_held'] += 1
+        room['held_minutes'] += round(minutes)
+        room['present'] += count
+        room['seats_offered'] += room['capacity']
+        room['peak_present'] = max(room['peak_present'], count)
+        if slot is not None and slot.get('classroom_id') == room['classroom_id']:
+            key = (room['classroom_id'], session['slot_id'])
+            if key not in held_slots:
+                held_slots.add(key)
+                room['held_scheduled'] += 1
+        else:
+            room['unscheduled_sessions'] += 1
+
+    for room in rooms.values():
+        room.update(rates({field: room[field] for field in SUM_FIELDS}))
+        room['idle'] = room['sessions_held'] == 0
+    return rooms
+
+
+def build_blocks(day: str, rooms: Dict[str, Dict]) -> Dict[str, Dict]:
+    """
+    Roll room entries up into block documents with per-floor totals
+
+    Returns:
+        block_id -> block_utilization document
+    """
+    grouped: Dict[str, List[Dict]] = {}
+    for room in rooms.values():
+        grouped.setdefault(room.get('block_id') or 'unassigned', []).append(room)
+
+    blocks = {}
+    for block_id, block_rooms in grouped.items():
+        floors: Dict[str, List[Dict]] = {}
+        for room in block_rooms:
+            floors.setdefault(room.get('floor_id') or 'unassigned', []).append(room)
+        idle = sorted(room['classroom_id'] for room in block_rooms if room['idle'])
+        blocks[block_id] = {
+            'block_id': block_id,
+            'campus_id': block_rooms[0].get('campus_id'),
+            'date': day,
+            **rates(sum_counts(block_rooms)),
+            'rooms_total': len(block_rooms),
+            'idle_rooms': idle,
+            'floors': {
+                floor_id: {
+                    **rates(sum_counts(floor_rooms)),
+                    'rooms_total': len(floor_rooms),
+                    'idle_rooms': sum(1 for room in floor_rooms if room['idle']),
+                }
+                for floor_id, floor_rooms in floors.items()
+            },
+            'rooms': {
+                room['classroom_id']: {
+                    field: room[field] for field in ('room_number', 'floor_id', 'capacity', 'scheduled_slots',
+                                                     'sessions_held', 'peak_present', 'slot_utilization',
+                                                     'time_utilization', 'occupancy', 'idle')
+                }
+                for room in block_rooms
+            },
+        }
+    return blocks
+
+
+class UtilizationService:
+    """Materialize and query daily classroom utilization"""
+
+    ROOM_COLLECTION = 'room_utilization'
+    BLOCK_COLLECTION = 'block_utilization'
+
+    @staticmethod
+    def _get_db():
+        """Get Firestore client"""
+        if not firebase_admin._apps:
+            firebase.initialize_firebase()
+        return firestore.client()
+
+    @staticmethod
+    def compute_day(day: Optional[str] = None, db=None) -> Dict:
+        """
+        Join one day's classrooms, slots and sessions and write its utilization
+
+        Args:
+            day: ISO date in ANALYTICS_TIMEZONE (default yesterday)
+            db: Firestore client (default the app's)
+
+        Returns:
+            Rooms, blocks and sessions counted
+        """
+        db = db or UtilizationService._get_db()
+        day = day or start_date(1)
+        weekday = DAYS[date.fromisoformat(day).weekday()]
+        start, end = _day_bounds(day)
+
+        classrooms = {doc.id: doc.to_dict() for doc in
+                      db.collection('classrooms').select(CLASSROOM_FIELDS).stream()}
+        slots = {doc.id: doc.to_dict() for doc in
+                 db.collection('timetable_slots').where('day', '==', weekday).select(SLOT_FIELDS).stream()}
+        sessions = {doc.id: doc.to_dict() for doc in
+                    db.collection('sessions')
+                    .where('created_at', '>=', start)
+                    .where('created_at', '<', end)
+                    .select(SESSION_FIELDS).stream()}
+
+        present = {}
+        rollups = db.collection(SessionRollupService.COLLECTION_NAME)
+        refs = [rollups.document(session_id) for session_id in sessions]
+        for offset in range(0, len(refs), GET_ALL_CHUNK):
+            for doc in db.get_all(refs[offset:offset + GET_ALL_CHUNK], field_paths=['present']):
+                if doc.exists:
+                    present[doc.id] = (doc.to_dict() or {}).get('present', 0)
+
+        rooms = build_day(day, classrooms, slots, sessions, present)
+        blocks = build_blocks(day, rooms)
+
+        writes = [(db.collection(UtilizationService.ROOM_COLLECTION).document(f"{room_id}_{day}"), room)
+                  for room_id, room in rooms.items()]
+        writes += [(db.collection(UtilizationService.BLOCK_COLLECTION).document(f"{block_id}_{day}"), block)
+                   for block_id, block in blocks.items()]
+        for offset in range(0, len(writes), BATCH_LIMIT):
+            batch = db.batch()
+            for ref, data in writes[offset:offset + BATCH_LIMIT]:
+                batch.set(ref, {**data, 'computed_at': firestore.SERVER_TIMESTAMP})
+            batch.commit()
+
+        print(f"🏫 Utilization {day}: {len(rooms)} rooms, {len(blocks)} blocks, {len(sessions)} sessions")
+        return {'date': day, 'rooms': len(rooms), 'blocks': len(blocks), 'sessions': len(sessions)}
+
+    @staticmethod
+    def _room_blocking(classroom_id: str, since: str) -> List[Dict]:
+        db = UtilizationService._get_db()
+        query = db.collection(UtilizationService.ROOM_COLLECTION) \
+            .where('classroom_id', '==', classroom_id) \
+            .where('date', '>=', since)
+        return [doc.to_dict() for doc in query.stream()]
+
+    @staticmethod
+    async def get_room_utilization(classroom_id: str, days: int = 30) -> Dict:
+        """
+        Get a classroom's daily utilization over a period
+
+        Args:
+            classroom_id: Classroom ID
+            days: Number of days to look back
+
+        Returns:
+            Period totals and one entry per computed day
+        """
+        docs = await asyncio.to_thread(UtilizationService._room_blocking, classroom_id, start_date(days))
+        if not docs:
+            return {'error': 'No utilization computed for this classroom'}
+        docs.sort(key=lambda doc: doc['date'])
+        for doc in docs:
+            doc.pop('computed_at', None)
+        latest = docs[-1]
+        return {
+            'classroom_id': classroom_id,
+            'room_number': latest.get('room_number'),
+            'block_id': latest.get('block_id'),
+            'floor_id': latest.get('floor_id'),
+            'capacity': latest.get('capacity'),
+            'period_days': days,
+            'totals': {**rates(sum_counts(docs)), 'idle_days': sum(1 for doc in docs if doc.get('idle'))},
+            'daily': docs,
+        }
+
+    @staticmethod
+    def _block_blocking(block_id: str, day: str) -> Optional[Dict]:
+        db = UtilizationService._get_db()
+        doc = db.collection(UtilizationService.BLOCK_COLLECTION).document(f"{block_id}_{day}").get()
+        return doc.to_dict() if doc.exists else None
+
+    @staticmethod
+    async def get_block_utilization(block_id: str, day: Optional[str] = None) -> Dict:
+        """
+        Get a block's utilization for one day
+
+        Args:
+            block_id: Block ID
+            day: ISO date (default yesterday)
+
+        Returns:
+            Block totals, per-floor totals, idle rooms and per-room summaries
+        """
+        day = day or start_date(1)
+        doc = await asyncio.to_thread(UtilizationService._block_blocking, block_id, day)
+        if doc is None:
+            return {'error': 'No utilization computed for this block and date'}
+        doc.pop('computed_at', None)
+        return doc
+
+    @staticmethod
+    def _campus_blocking(campus_id: str, day: str) -> List[Dict]:
+        db = UtilizationService._get_db()
+        query = db.collection(UtilizationService.BLOCK_COLLECTION) \
+            .where('campus_id', '==', campus_id) \
+            .where('date', '==', day) \
+            .select(list(SUM_FIELDS) + ['block_id', 'rooms_total', 'idle_rooms'])
+        return [doc.to_dict() for doc in query.stream()]
+
+    @staticmethod
+    async def get_campus_utilization(campus_id: str, day: Optional[str] = None) -> Dict:
+        """
+        Get a campus's utilization for one day, block by block
+
+        Args:
+            campus_id: Campus ID
+            day: ISO date (default yesterday)
+
+        Returns:
+            Campus totals and per-block totals with idle room counts
+        """
+        day = day or start_date(1)
+        docs = await asyncio.to_thread(UtilizationService._campus_blocking, campus_id, day)
+        if not docs:
+            return {'error': 'No utilization computed for this campus and date'}
+        blocks = sorted(
+            ({**rates(sum_counts([doc])), 'block_id': doc['block_id'], 'rooms_total': doc.get('rooms_total', 0),
+              'idle_rooms': len(doc.get('idle_rooms') or [])} for doc in docs),
+            key=lambda block: block['time_utilization']
+        )
+        return {
+            'campus_id': campus_id,
+            'date': day,
+            **rates(sum_counts(docs)),
+            'rooms_total': sum(block['rooms_total'] for block in blocks),
+            'idle_rooms': sum(block['idle_rooms'] for block in blocks),
+            'blocks': blocks,
+        }
+
+    @staticmethod
+    def compute_recent(days: int = 1) -> List[Dict]:
+        """
+        Compute the last N local days, ending yesterday
+
+        Returns:
+            compute_day result per day, oldest first
+        """
+        db = UtilizationService._get_db()
+        today = date.fromisoformat(local_date(datetime.now(timezone.utc)))
+        return [UtilizationService.compute_day((today - timedelta(days=n)).isoformat(), db)
+                for n in range(days, 0, -1)]
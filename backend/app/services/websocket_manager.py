@@ -2,9 +2,37 @@
 WebSocket Manager - Handle real-time connections
 """
 from fastapi import WebSocket
-from typing import Dict, Set
-import json
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from app.core.config import settings
+from app.services import ws_codec, ws_topics
+from app.services.ws_outbound import OutboundQueue, COALESCED, DROPPED, OVERFLOW
+from app.services.backplane import Backplane, InProcessBackplane, create_backplane
 import asyncio
+import time
+
+DeliveryHook = Callable[[str, dict], Awaitable[None]]
+
+
+class ConnectionRecord:
+    """
+    State for one WebSocket connection
+    
+    connected_at and last_seen are time.monotonic() values; last_seen moves
+    on every frame received from the client. bytes_sent counts payload
+    bytes (characters for text frames) actually written to the socket.
+    """
+    
+    __slots__ = ("session_id", "role", "topics", "encoding", "queue", "connected_at", "last_seen", "bytes_sent")
+    
+    def __init__(self, session_id: str, role: str, topics: FrozenSet[str], encoding: str, queue: OutboundQueue):
+        self.session_id = session_id
+        self.role = role
+        self.topics = topics
+        self.encoding = encoding
+        self.queue = queue
+        self.connected_at = self.last_seen = time.monotonic()
+        self.bytes_sent = 0
+
 
 class ConnectionManager:
     """Manage WebSocket connections for real-time updates"""
@@ -12,65 +40,436 @@ class ConnectionManager:
     def __init__(self):
         # session_id -> set of WebSocket connections
         self.active_connections: Dict[str, Set[WebSocket]] = {}
-        # websocket -> session_id mapping
-        self.connection_sessions: Dict[WebSocket, str] = {}
+        # session_id -> topic -> subscribed connections (see ws_topics)
+        self.topic_connections: Dict[str, Dict[str, Set[WebSocket]]] = {}
+        # websocket -> session, role, topics, encoding, outbound queue and liveness
+        self.connections: Dict[WebSocket, ConnectionRecord] = {}
+        # session_id -> fan-out latency and eviction counters
+        self.fanout_stats: Dict[str, Dict] = {}
+        # Cross-worker delivery; in-process until start_backplane() runs
+        self.backplane: Backplane = InProcessBackplane()
+        self._backplane_started = False
+        # message type -> [(handler, consume)] run when a message is delivered
+        self.delivery_hooks: Dict[str, List[Tuple[DeliveryHook, bool]]] = {}
+        # Heartbeat sweeper (see start_heartbeats) and its lifetime counters
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.heartbeats_sent = 0
+        self.reaped = 0
+    
+    def add_delivery_hook(self, message_type: str, handler: DeliveryHook, consume: bool = True):
+        """
+        Run handler for every delivered message of one type, on every worker
+        
+        With consume=True the message is internal and is not sent to the
+        session's sockets (e.g. roster events, which the roster stream fans
+        out to its own subscribers). With consume=False the handler only
+        observes it (e.g. caches reacting to session_status).
+        """
+        self.delivery_hooks.setdefault(message_type, []).append((handler, consume))
+    
+    def remove_delivery_hook(self, message_type: str, handler: DeliveryHook):
+        hooks = [hook for hook in self.delivery_hooks.get(message_type, []) if hook[0] != handler]
+        if hooks:
+            self.delivery_hooks[message_type] = hooks
+        else:
+            self.delivery_hooks.pop(message_type, None)
+    
+    async def start_backplane(self, backplane: Backplane = None):
+        """
+        Start cross-worker delivery (called from the app lifespan)
+        
+        Defaults to the backplane named by settings.WS_BACKPLANE.
+        """
+        await self.stop_backplane()
+        self.backplane = backplane or create_backplane(settings.WS_BACKPLANE, settings.WS_BACKPLANE_SOCKET)
+        await self.backplane.start(self.broadcast_local)
+        self._backplane_started = True
+    
+    async def stop_backplane(self):
+        if self._backplane_started:
+            await self.backplane.stop()
+            self._backplane_started = False
+    
+    def start_heartbeats(self):
+        """
+        Start the heartbeat sweeper (called from the app lifespan)
+        
+        Every WS_HEARTBEAT_INTERVAL_SECONDS, connections that have been
+        quiet for an interval get a {"type": "ping"} (clients answer with
+        {"type": "pong"}; any frame counts), and connections quiet for
+        longer than WS_HEARTBEAT_TIMEOUT_SECONDS are reaped. Half-open
+        sockets from phones that left the room would otherwise stay in
+        active_connections, and in every broadcast, until a send failed.
+        """
+        if self._heartbeat_task is None and settings.WS_HEARTBEAT_INTERVAL_SECONDS > 0:
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+    
+    async def stop_heartbeats(self):
+        task, self._heartbeat_task = self._heartbeat_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
     
-    async def connect(self, websocket: WebSocket, session_id: str):
-        """Accept new WebSocket connection"""
-        await websocket.accept()
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"⚠️ Heartbeat sweep failed: {e}")
+    
+    def sweep(self, now: float = None):
+        """
+        Ping quiet connections and reap dead ones
+        
+        Returns:
+            (pinged, reaped) connection counts
+        """
+        now = time.monotonic() if now is None else now
+        interval = settings.WS_HEARTBEAT_INTERVAL_SECONDS
+        timeout = settings.WS_HEARTBEAT_TIMEOUT_SECONDS
+        
+        frames = {}
+        pinged = 0
+        dead = []
+        for websocket, record in self.connections.items():
+            quiet = now - record.last_seen
+            if quiet > timeout:
+                dead.append(websocket)
+            elif quiet >= interval:
+                frame = frames.get(record.encoding)
+                if frame is None:
+                    frame = frames[record.encoding] = ws_codec.encode({"type": "ping"}, record.encoding)
+                if record.queue.put("ping", frame) == OVERFLOW:
+                    dead.append(websocket)
+                else:
+                    pinged += 1
+        
+        for websocket in dead:
+            print(f"💀 Reaping silent WebSocket for session: {self.connections[websocket].session_id}")
+            self._drop(websocket, code=1001)
+        
+        self.heartbeats_sent += pinged
+        self.reaped += len(dead)
+        return pinged, len(dead)
+    
+    def touch(self, websocket: WebSocket):
+        """Record that a frame arrived from the client"""
+        record = self.connections.get(websocket)
+        if record is not None:
+            record.last_seen = time.monotonic()
+    
+    async def connect(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        encoding: str = ws_codec.ENCODING_JSON,
+        role: str = None,
+        topics: Iterable[str] = None,
+        subprotocol: str = None
+    ) -> ConnectionRecord:
+        """
+        Accept new WebSocket connection and start its writer
+        
+        Args:
+            role: smartboard, faculty or student; anything else is "unknown"
+            topics: Topics to receive; defaults to the role's (see ws_topics)
+            subprotocol: Negotiated subprotocol to accept with (see ws_codec)
+        """
+        if subprotocol:
+            await websocket.accept(subprotocol=subprotocol)
+        else:
+            await websocket.accept()
         
         if session_id not in self.active_connections:
             self.active_connections[session_id] = set()
         
         self.active_connections[session_id].add(websocket)
-        self.connection_sessions[websocket] = session_id
+        
+        role = ws_topics.resolve_role(role)
+        topics = frozenset(topics) & ws_topics.TOPICS if topics is not None else ws_topics.ROLE_TOPICS[role]
+        index = self.topic_connections.setdefault(session_id, {})
+        for topic in topics:
+            index.setdefault(topic, set()).add(websocket)
+        
+        queue = OutboundQueue(settings.WS_OUTBOUND_QUEUE_SIZE)
+        record = ConnectionRecord(session_id, role, topics, encoding, queue)
+        self.connections[websocket] = record
+        queue.start(
+            send=lambda frame: self._send_frame(websocket, record, frame),
+            on_error=lambda error: self._on_send_error(websocket, error),
+            on_timeout=lambda: self._on_send_timeout(websocket),
+            timeout=settings.WS_SEND_TIMEOUT_SECONDS
+        )
         
         print(f"✅ WebSocket connected for session: {session_id}")
+        return record
     
     def disconnect(self, websocket: WebSocket):
-        """Remove WebSocket connection"""
-        session_id = self.connection_sessions.get(websocket)
+        """Remove WebSocket connection and stop its writer"""
+        record = self.connections.pop(websocket, None)
+        session_id = record.session_id if record else None
         
         if session_id and session_id in self.active_connections:
             self.active_connections[session_id].discard(websocket)
             
+            index = self.topic_connections.get(session_id, {})
+            for topic in record.topics:
+                subscribers = index.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(websocket)
+                    if not subscribers:
+                        del index[topic]
+            
             # Clean up empty session
             if not self.active_connections[session_id]:
                 del self.active_connections[session_id]
+                self.topic_connections.pop(session_id, None)
+                self.fanout_stats.pop(session_id, None)
         
-        if websocket in self.connection_sessions:
-            del self.connection_sessions[websocket]
+        if record:
+            record.queue.close()
         
         print(f"❌ WebSocket disconnected for session: {session_id}")
     
     async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """Send message to specific connection"""
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"Error sending message: {e}")
-            self.disconnect(websocket)
+        """Queue a message for one connection"""
+        record = self.connections.get(websocket)
+        if record is None:
+            return
+        if record.queue.put(message.get("type"), ws_codec.encode(message, record.encoding)) == OVERFLOW:
+            self._evict(websocket)
     
     async def broadcast_to_session(self, session_id: str, message: dict):
-        """Broadcast message to all connections for a session"""
-        if session_id not in self.active_connections:
+        """
+        Broadcast message to every connection for a session, on every worker
+        
+        Published through the backplane, which delivers it to this worker's
+        sockets and relays it to the other workers.
+        """
+        if not self._backplane_started:
+            await self.backplane.start(self.broadcast_local)
+            self._backplane_started = True
+        await self.backplane.publish(session_id, message)
+    
+    async def broadcast_local(self, session_id: str, message: dict):
+        """
+        Broadcast message to this worker's connections for a session
+        
+        Routed message types (ws_topics.MESSAGE_ROUTES) go only to the
+        connections subscribed to their topics, through the per-session
+        topic index; anything else goes to every connection of the session.
+        
+        The message is encoded once per encoding in use and put on each
+        connection's outbound queue; the per-connection writers do the
+        sending, so this never waits on a client. Slow clients have stale
+        qr_update/attendance_update messages coalesced (see ws_outbound)
+        and are evicted once a send has been stuck for
+        WS_SLOW_CONSUMER_MAX_STRIKES send timeouts or when their queue fills
+        with undroppable messages.
+        """
+        hooks = self.delivery_hooks.get(message.get("type"))
+        if hooks:
+            consumed = False
+            for handler, consume in hooks:
+                try:
+                    await handler(session_id, message)
+                except Exception as e:
+                    print(f"⚠️ Delivery hook failed for {message.get('type')}: {e}")
+                consumed = consumed or consume
+            if consumed:
+                return
+        
+        routes = ws_topics.MESSAGE_ROUTES.get(message.get("type"))
+        if routes is None:
+            connections = self.active_connections.get(session_id)
+            if connections:
+                self.send_to_connections(session_id, connections, message)
+            return
+        
+        index = self.topic_connections.get(session_id)
+        if not index:
             return
         
-        disconnected = set()
+        groups = []
+        reached = None
+        for topic, dropped_fields in routes:
+            subscribers = index.get(topic)
+            if not subscribers:
+                continue
+            if reached:
+                subscribers = subscribers - reached
+            if dropped_fields:
+                variant = {key: value for key, value in message.items() if key not in dropped_fields}
+            else:
+                variant = message
+            groups.append((subscribers, variant))
+            reached = subscribers if reached is None else reached | subscribers
+        
+        if groups:
+            self._deliver(session_id, groups)
+    
+    def send_to_connections(self, session_id: str, connections, message: dict):
+        """
+        Queue one message for a group of a session's connections
+        
+        Encodes once per encoding in use; see broadcast_local.
+        """
+        self._deliver(session_id, ((connections, message),))
+    
+    def _deliver(self, session_id: str, groups):
+        """
+        Queue messages for groups of a session's connections, as one broadcast
+        
+        Args:
+            groups: (connections, message) pairs; each message is encoded
+                once per encoding in use, not once per recipient
+        """
+        started = time.perf_counter()
+        coalesced = dropped = 0
+        overflowed = []
+        for connections, message in groups:
+            message_type = message.get("type")
+            frames = {}
+            for connection in connections:
+                record = self.connections.get(connection)
+                if record is None:
+                    continue
+                frame = frames.get(record.encoding)
+                if frame is None:
+                    frame = frames[record.encoding] = ws_codec.encode(message, record.encoding)
+                
+                outcome = record.queue.put(message_type, frame)
+                if outcome == COALESCED:
+                    coalesced += 1
+                elif outcome == DROPPED:
+                    dropped += 1
+                elif outcome == OVERFLOW:
+                    overflowed.append(connection)
+        
+        for connection in overflowed:
+            self._evict(connection)
+        
+        stats = self._record_fanout(session_id, time.perf_counter() - started)
+        stats["coalesced"] += coalesced
+        stats["dropped"] += dropped
+        stats["evictions"] += len(overflowed)
+    
+    @staticmethod
+    async def _send_frame(websocket: WebSocket, record: ConnectionRecord, frame: ws_codec.Frame):
+        """Send a pre-encoded frame as text or binary"""
+        is_binary, payload = frame
+        if is_binary:
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_text(payload)
+        record.bytes_sent += len(payload)
+    
+    def _on_send_error(self, websocket: WebSocket, error: Exception):
+        print(f"Error sending to WebSocket: {error}")
+        self.disconnect(websocket)
+    
+    def _on_send_timeout(self, websocket: WebSocket) -> bool:
+        """Count a stuck-send timeout period; returns False once the client is evicted"""
+        record = self.connections.get(websocket)
+        stats = self.fanout_stats.get(record.session_id) if record else None
+        if stats is not None:
+            stats["timeouts"] += 1
+        
+        if record is not None and record.queue.strikes < settings.WS_SLOW_CONSUMER_MAX_STRIKES:
+            return True
+        
+        if stats is not None:
+            stats["evictions"] += 1
+        self._evict(websocket)
+        return False
+    
+    def _evict(self, websocket: WebSocket):
+        """Drop a slow consumer and close its socket in the background"""
+        record = self.connections.get(websocket)
+        print(f"🐢 Evicting slow WebSocket consumer for session: {record.session_id if record else None}")
+        self._drop(websocket, code=1013)
+    
+    def _drop(self, websocket: WebSocket, code: int):
+        """Disconnect and close the socket in the background"""
+        self.disconnect(websocket)
         
-        for connection in self.active_connections[session_id]:
+        async def close():
             try:
-                await connection.send_json(message)
-            except Exception as e:
-                print(f"Error broadcasting: {e}")
-                disconnected.add(connection)
+                await asyncio.wait_for(websocket.close(code=code), settings.WS_SEND_TIMEOUT_SECONDS)
+            except Exception:
+                pass
+        
+        asyncio.get_running_loop().create_task(close())
+    
+    def _record_fanout(self, session_id: str, elapsed: float) -> Dict:
+        stats = self.fanout_stats.get(session_id)
+        if stats is None:
+            stats = self.fanout_stats[session_id] = {
+                "broadcasts": 0,
+                "last_ms": 0.0,
+                "max_ms": 0.0,
+                "total_ms": 0.0,
+                "timeouts": 0,
+                "evictions": 0,
+                "coalesced": 0,
+                "dropped": 0
+            }
         
-        # Clean up disconnected connections
-        for connection in disconnected:
-            self.disconnect(connection)
+        elapsed_ms = elapsed * 1000
+        stats["broadcasts"] += 1
+        stats["last_ms"] = elapsed_ms
+        stats["max_ms"] = max(stats["max_ms"], elapsed_ms)
+        stats["total_ms"] += elapsed_ms
+        return stats
     
-    async def send_attendance_update(self, session_id: str, student_count: int, student_name: str = None):
-        """Send attendance count update to all connected clients"""
+    def get_fanout_stats(self, session_id: str) -> Dict:
+        """
+        Get fan-out (enqueue) latency in ms plus slow-consumer counters
+        
+        coalesced counts stale messages replaced by newer ones, dropped counts
+        default-class messages discarded from full queues, and queued is the
+        current backlog across the session's connections.
+        """
+        stats = self.fanout_stats.get(session_id)
+        if not stats:
+            return {"session_id": session_id, "broadcasts": 0}
+        
+        return {
+            "session_id": session_id,
+            "broadcasts": stats["broadcasts"],
+            "last_ms": round(stats["last_ms"], 3),
+            "max_ms": round(stats["max_ms"], 3),
+            "avg_ms": round(stats["total_ms"] / stats["broadcasts"], 3),
+            "timeouts": stats["timeouts"],
+            "evictions": stats["evictions"],
+            "coalesced": stats["coalesced"],
+            "dropped": stats["dropped"],
+            "queued": sum(
+                len(self.connections[connection].queue)
+                for connection in self.active_connections.get(session_id, ())
+                if connection in self.connections
+            ),
+            "connections": self.get_connection_count(session_id)
+        }
+    
+    async def send_attendance_update(
+        self,
+        session_id: str,
+        student_count: int,
+        student_name: str = None,
+        students_added: List[Dict] = None
+    ):
+        """
+        Send attendance count update to all connected clients
+        
+        Args:
+            students_added: Students ({student_id, name}) marked since the
+                previous update, when several are merged into one message
+        """
         message = {
             "type": "attendance_update",
             "session_id": session_id,
@@ -80,6 +479,8 @@ class ConnectionManager:
         
         if student_name:
             message["latest_student"] = student_name
+        if students_added:
+            message["students_added"] = students_added
         
         await self.broadcast_to_session(session_id, message)
     
@@ -98,6 +499,61 @@ class ConnectionManager:
     def get_connection_count(self, session_id: str) -> int:
         """Get number of active connections for a session"""
         return len(self.active_connections.get(session_id, set()))
+    
+    def get_connection_stats(self, session_id: str = None) -> Dict:
+        """
+        Connection totals on this worker, by role, plus heartbeat counters
+        
+        Args:
+            session_id: Also list that session's connections (ages in seconds)
+        """
+        now = time.monotonic()
+        by_role: Dict[str, int] = {}
+        by_topic: Dict[str, int] = {}
+        by_encoding: Dict[str, int] = {}
+        bytes_sent = 0
+        oldest_quiet = 0.0
+        for record in self.connections.values():
+            by_role[record.role] = by_role.get(record.role, 0) + 1
+            for topic in record.topics:
+                by_topic[topic] = by_topic.get(topic, 0) + 1
+            by_encoding[record.encoding] = by_encoding.get(record.encoding, 0) + 1
+            bytes_sent += record.bytes_sent
+            oldest_quiet = max(oldest_quiet, now - record.last_seen)
+        
+        stats = {
+            "connections": len(self.connections),
+            "sessions": len(self.active_connections),
+            "by_role": by_role,
+            "by_topic": by_topic,
+            "by_encoding": by_encoding,
+            "bytes_sent": bytes_sent,
+            "max_quiet_s": round(oldest_quiet, 1),
+            "heartbeats_sent": self.heartbeats_sent,
+            "reaped": self.reaped,
+            "heartbeat_interval_s": settings.WS_HEARTBEAT_INTERVAL_SECONDS,
+            "heartbeat_timeout_s": settings.WS_HEARTBEAT_TIMEOUT_SECONDS
+        }
+        
+        if session_id is not None:
+            stats["session"] = [
+                {
+                    "role": record.role,
+                    "topics": sorted(record.topics),
+                    "encoding": record.encoding,
+                    "connected_s": round(now - record.connected_at, 1),
+                    "quiet_s": round(now - record.last_seen, 1),
+                    "bytes_sent": record.bytes_sent,
+                    "queued": len(record.queue)
+                }
+                for record in (
+                    self.connections[connection]
+                    for connection in self.active_connections.get(session_id, ())
+                    if connection in self.connections
+                )
+            ]
+        
+        return stats
 
 
 # Global connection manager instance
@@ -0,0 +1,137 @@
+"""
+WebSocket message codec
+Encodes outgoing messages once per encoding so a broadcast serializes each
+message a single time, no matter how many sockets receive it.
+
+Encodings:
+- json: text frames, the default for old clients
+- msgpack: MessagePack binary frames with the same keys as JSON
+- msgpack-short: MessagePack with the short keys in SHORT_KEYS (the
+  smallest frames; clients expand keys with the pairs from "connected")
+
+Clients pick one during the handshake by offering WebSocket subprotocols
+(SUBPROTOCOLS, most preferred first); ?encoding=... still works for
+clients that can't set subprotocols. Compression (permessage-deflate) is
+negotiated by uvicorn on top of any of these, see WS_PER_MESSAGE_DEFLATE.
+"""
+import json
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json fallback
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional: binary encoding unavailable
+    msgpack = None
+
+
+ENCODING_JSON = "json"
+ENCODING_MSGPACK = "msgpack"
+ENCODING_MSGPACK_SHORT = "msgpack-short"
+
+# Sec-WebSocket-Protocol value -> encoding
+SUBPROTOCOLS = {
+    "intelliattend.json": ENCODING_JSON,
+    "intelliattend.msgpack": ENCODING_MSGPACK,
+    "intelliattend.msgpack-short": ENCODING_MSGPACK_SHORT,
+}
+
+# Key abbreviations for msgpack-short, applied at every nesting level
+SHORT_KEYS = {
+    "type": "t",
+    "session_id": "s",
+    "total_present": "p",
+    "timestamp": "ts",
+    "qr_token": "q",
+    "sequence_number": "n",
+    "expiry": "x",
+    "status": "st",
+    "data": "d",
+    "latest_student": "l",
+    "students_added": "a",
+    "student_id": "i",
+    "name": "nm",
+    "message": "m",
+    "role": "r",
+    "topics": "tp",
+    "epoch": "e",
+    "seq": "sq",
+    "op": "o",
+    "student": "sd",
+    "students": "ss",
+    "marked_at": "ma",
+}
+
+Frame = Tuple[bool, Union[str, bytes]]
+
+
+def available_encodings() -> set:
+    """Encodings this worker can produce"""
+    encodings = {ENCODING_JSON}
+    if msgpack is not None:
+        encodings.update((ENCODING_MSGPACK, ENCODING_MSGPACK_SHORT))
+    return encodings
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """
+    Pick the encoding for a new connection
+
+    Clients ask for one with ?encoding=...; anything unknown or unavailable
+    falls back to JSON so old clients keep working.
+    """
+    if requested and requested in available_encodings():
+        return requested
+    return ENCODING_JSON
+
+
+def negotiate_handshake(offered: Sequence[str], requested: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Pick the encoding from the client's offered subprotocols
+
+    Args:
+        offered: Sec-WebSocket-Protocol values, most preferred first
+        requested: ?encoding= value, used when no subprotocol matches
+
+    Returns:
+        (encoding, subprotocol to accept with, or None)
+    """
+    encodings = available_encodings()
+    for subprotocol in offered:
+        encoding = SUBPROTOCOLS.get(subprotocol)
+        if encoding in encodings:
+            return encoding, subprotocol
+    return negotiate(requested), None
+
+
+def short_key_pairs() -> List[List[str]]:
+    """[long, short] pairs for msgpack-short clients to expand keys"""
+    return [[key, short] for key, short in SHORT_KEYS.items()]
+
+
+def _shorten(value):
+    if isinstance(value, dict):
+        return {SHORT_KEYS.get(key, key): _shorten(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten(item) for item in value]
+    return value
+
+
+def encode(message: Dict, encoding: str = ENCODING_JSON) -> Frame:
+    """
+    Encode a message for the wire
+
+    Returns:
+        (is_binary, payload) - payload is str for text frames, bytes for binary
+    """
+    if encoding == ENCODING_MSGPACK:
+        return True, msgpack.packb(message, use_bin_type=True)
+    if encoding == ENCODING_MSGPACK_SHORT:
+        return True, msgpack.packb(_shorten(message), use_bin_type=True)
+
+    if orjson is not None:
+        return False, orjson.dumps(message).decode('utf-8')
+    return False, json.dumps(message, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,177 @@
+"""
+WebSocket outbound queues
+Each connection gets a bounded queue drained by its own writer task, so a
+slow client only ever costs a fixed amount of memory and never stalls the
+broadcaster.
+
+Messages are tagged by coalescing class:
+- latest-wins (qr_update, attendance_update): an undelivered message is
+  replaced by the newer one; a stale token or count is worthless
+- reliable (session_status, roster_*): never dropped or coalesced
+- everything else (pong, error replies): FIFO, oldest dropped when full
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from app.services.ws_codec import Frame
+
+CLASS_LATEST = "latest"
+CLASS_RELIABLE = "reliable"
+CLASS_DEFAULT = "default"
+
+MESSAGE_CLASSES = {
+    "qr_update": CLASS_LATEST,
+    "attendance_update": CLASS_LATEST,
+    "session_status": CLASS_RELIABLE,
+    "roster_snapshot": CLASS_RELIABLE,
+    "roster_delta": CLASS_RELIABLE,
+}
+
+# Outcomes of OutboundQueue.put
+QUEUED = "queued"
+COALESCED = "coalesced"
+DROPPED = "dropped"
+OVERFLOW = "overflow"
+
+
+def message_class(message_type: Optional[str]) -> str:
+    """Coalescing class for a message type"""
+    return MESSAGE_CLASSES.get(message_type, CLASS_DEFAULT)
+
+
+class OutboundQueue:
+    """
+    Bounded, coalescing send queue for one connection
+
+    Latest-wins messages hold one slot per type: a newer one overwrites the
+    pending frame in place and keeps the older one's position. When the
+    queue is full the oldest default-class message is dropped; if only
+    reliable and latest-wins messages are queued the client is hopelessly
+    behind and put() reports OVERFLOW so the caller can evict it.
+    """
+
+    __slots__ = (
+        "max_size", "_items", "_latest", "_ready",
+        "coalesced", "dropped", "sent", "strikes", "writer"
+    )
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        # (message_class, type or None, frame or None); latest-wins entries
+        # keep their frame in _latest so it can be replaced in O(1)
+        self._items: Deque[Tuple[str, Optional[str], Optional[Frame]]] = deque()
+        self._latest: Dict[str, Frame] = {}
+        self._ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+        self.sent = 0
+        # send-timeout periods the current send has been stuck for
+        self.strikes = 0
+        self.writer: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, message_type: Optional[str], frame: Frame) -> str:
+        """
+        Queue a frame for sending
+
+        Returns:
+            QUEUED, COALESCED, DROPPED (an older default-class message was
+            discarded to make room) or OVERFLOW (nothing could be discarded)
+        """
+        kind = message_class(message_type)
+
+        if kind == CLASS_LATEST:
+            if message_type in self._latest:
+                self._latest[message_type] = frame
+                self.coalesced += 1
+                return COALESCED
+            entry = (kind, message_type, None)
+        else:
+            entry = (kind, None, frame)
+
+        outcome = QUEUED
+        if len(self._items) >= self.max_size:
+            if not self._drop_oldest_default():
+                return OVERFLOW
+            outcome = DROPPED
+
+        if kind == CLASS_LATEST:
+            self._latest[message_type] = frame
+        self._items.append(entry)
+        self._ready.set()
+        return outcome
+
+    def _drop_oldest_default(self) -> bool:
+        for index, (kind, _, _) in enumerate(self._items):
+            if kind == CLASS_DEFAULT:
+                del self._items[index]
+                self.dropped += 1
+                return True
+        return False
+
+    async def get(self) -> Frame:
+        """Wait for and remove the next frame"""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+
+        kind, message_type, frame = self._items.popleft()
+        if kind == CLASS_LATEST:
+            frame = self._latest.pop(message_type)
+        return frame
+
+    def start(self, send: Callable[[Frame], Awaitable[None]], on_error, on_timeout, timeout: float):
+        """
+        Start the writer task
+
+        Args:
+            send: Coroutine function that writes one frame to the socket
+            on_error: Called with the exception when a send fails; the writer stops
+            on_timeout: Called each time a send has been stuck for another
+                timeout period; return False to give up on the connection
+            timeout: Per-send timeout in seconds
+        """
+        self.writer = asyncio.create_task(self._write(send, on_error, on_timeout, timeout))
+
+    async def _write(self, send, on_error, on_timeout, timeout: float):
+        """
+        Send queued frames one at a time
+
+        A slow send is never cancelled while the connection is kept: that
+        would lose the frame (breaking the reliable class) and could leave a
+        partial WebSocket frame on the socket. Instead each timeout period
+        counts a strike while the same send keeps going; when on_timeout
+        gives up, the send is cancelled and the connection is being closed.
+        """
+        while True:
+            frame = await self.get()
+            sending = asyncio.ensure_future(send(frame))
+            try:
+                while True:
+                    done, _ = await asyncio.wait((sending,), timeout=timeout)
+                    if done:
+                        break
+                    self.strikes += 1
+                    if not on_timeout():
+                        sending.cancel()
+                        return
+            except asyncio.CancelledError:
+                sending.cancel()
+                raise
+
+            error = sending.exception()
+            if error is not None:
+                on_error(error)
+                return
+            self.strikes = 0
+            self.sent += 1
+
+    def close(self):
+        """Stop the writer task unless it is the caller"""
+        writer = self.writer
+        self.writer = None
+        if writer is not None and writer is not asyncio.current_task():
+            writer.cancel()
@@ -0,0 +1,67 @@
+"""
+WebSocket topics
+Session sockets subscribe to topics instead of receiving every message
+type. A role picks the default topics and ?topics= narrows them, so a
+faculty phone skips the 5-second QR stream and a wall display gets counts
+without per-student names.
+
+Topics:
+- qr: qr_update
+- count: attendance_update without student names
+- students: attendance_update with student names (latest_student, students_added)
+- status: session_status
+
+Message types without a route (connected, pong, errors) are per-connection
+replies or legacy broadcasts and still reach every socket of the session.
+Roster streams (?roster=1) keep their own subscriber sets.
+"""
+from typing import Dict, FrozenSet, Optional, Tuple
+
+TOPIC_QR = "qr"
+TOPIC_COUNT = "count"
+TOPIC_STUDENTS = "students"
+TOPIC_STATUS = "status"
+TOPICS = frozenset({TOPIC_QR, TOPIC_COUNT, TOPIC_STUDENTS, TOPIC_STATUS})
+
+ROLE_UNKNOWN = "unknown"
+ROLE_TOPICS: Dict[str, FrozenSet[str]] = {
+    "smartboard": frozenset({TOPIC_QR, TOPIC_COUNT, TOPIC_STATUS}),
+    "faculty": frozenset({TOPIC_STUDENTS, TOPIC_STATUS}),
+    "student": frozenset({TOPIC_STATUS}),
+    # Clients that don't declare a role get everything, as before topics
+    ROLE_UNKNOWN: TOPICS,
+}
+ROLES = frozenset(ROLE_TOPICS) - {ROLE_UNKNOWN}
+
+STUDENT_FIELDS = frozenset({"latest_student", "students_added"})
+
+# message type -> ((topic, fields dropped for that topic), ...). A socket on
+# several routed topics receives the first matching variant only.
+MESSAGE_ROUTES: Dict[str, Tuple[Tuple[str, FrozenSet[str]], ...]] = {
+    "qr_update": ((TOPIC_QR, frozenset()),),
+    "attendance_update": ((TOPIC_STUDENTS, frozenset()), (TOPIC_COUNT, STUDENT_FIELDS)),
+    "session_status": ((TOPIC_STATUS, frozenset()),),
+}
+
+
+def resolve_role(role: Optional[str]) -> str:
+    """Known role, or ROLE_UNKNOWN"""
+    return role if role in ROLES else ROLE_UNKNOWN
+
+
+def resolve_topics(role: str, requested: Optional[str] = None) -> FrozenSet[str]:
+    """
+    Topics for a new connection
+
+    Args:
+        role: Resolved role (see resolve_role)
+        requested: Comma-separated ?topics= value; unknown names are ignored
+
+    Returns:
+        The requested topics if any are valid, else the role's defaults
+    """
+    if requested:
+        topics = frozenset(name.strip() for name in requested.split(',')) & TOPICS
+        if topics:
+            return topics
+    return ROLE_TOPICS[role]
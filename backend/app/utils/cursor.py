@@ -0,0 +1,52 @@
+"""
+Page cursors - opaque tokens for (timestamp, document ID) pagination
+
+A cursor is the base64url-encoded JSON [timestamp, doc_id] of the last
+document on a page. Listings order by (timestamp, __name__) and pass the
+decoded pair to start_after, so ties on timestamp never skip or repeat a
+document and every page costs one query no matter how deep it is.
+"""
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import List, Optional
+
+
+def encode_cursor(timestamp: Optional[datetime], doc_id: str) -> str:
+    """Cursor pointing just after this document"""
+    value = timestamp.isoformat() if isinstance(timestamp, datetime) else None
+    raw = json.dumps([value, doc_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> List:
+    """
+    start_after values for a cursor
+
+    Raises:
+        ValueError: If the cursor was not produced by encode_cursor
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        value, doc_id = json.loads(raw)
+        if not isinstance(doc_id, str) or not doc_id:
+            raise ValueError
+        timestamp = datetime.fromisoformat(value) if value is not None else None
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    return [timestamp, doc_id]
+
+
+def page(docs: List, limit: int):
+    """
+    Split a limit + 1 result into the page and the next cursor
+
+    Returns:
+        (documents on this page, cursor for the next page or None)
+    """
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    last = docs[-1]
+    return docs, encode_cursor((last.to_dict() or {}).get('timestamp'), last.id)
@@ -0,0 +1,414 @@
+"""
+Token Engine - single source of QR token minting and validation
+Every producer (rotation scheduler, SmartBoard broadcaster, legacy QR service)
+and every validator goes through this module, so all of them agree on one
+format and one key.
+"""
+import hmac
+import hashlib
+import base64
+import json
+import struct
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+from app.core.constants import QR_TOKEN_PREFIX as LEGACY_TOKEN_PREFIX
+
+
+ValidationResult = Tuple[bool, Optional[Dict], Optional[str]]
+
+
+class TokenEngine:
+    """
+    Mints and validates QR tokens with cached key material
+
+    Formats:
+    - v1: QR_{base64_json_payload}_{signature}
+    - v2: Q2{HEX(version | handle | sequence | timestamp | mac)}
+      Fixed 25-byte binary body. Room and subject are not embedded; they are
+      resolved server-side from the session the handle points to. Uppercase
+      hex stays inside the QR alphanumeric charset, so the token fits QR
+      version 3 instead of version 9 for a typical v1 token.
+    - legacy: IATT_{base64_json_payload}_{signature}, signed with JWT_SECRET.
+      Validate-only, kept so tokens already on screen keep working.
+
+    New tokens are always minted in the configured version.
+    """
+
+    V1_PREFIX = "QR"
+    V2_PREFIX = "Q2"
+    LEGACY_PREFIX = LEGACY_TOKEN_PREFIX
+    TOKEN_VALIDITY_SECONDS = 5
+    GRACE_PERIOD_SECONDS = 2  # Additional buffer for clock sync issues
+
+    SIGNATURE_LENGTH = 16  # v1/legacy base64 signature characters
+
+    # v2 layout: version (B), session handle (I), sequence (I), timestamp (I)
+    V2_STRUCT = struct.Struct(">BIII")
+    V2_VERSION = 2
+    V2_MAC_BYTES = 12  # 96-bit truncated HMAC, same strength as v1's 16 base64 chars
+    V2_TOKEN_LENGTH = len(V2_PREFIX) + 50  # 25 bytes -> 50 hex chars
+
+    # Handles kept for resolving v2 tokens; least recently minted go first
+    MAX_SESSION_HANDLES = 4096
+
+    def __init__(
+        self,
+        secret_key: str,
+        legacy_secret_key: str,
+        version: int = 1,
+        session_handles: Optional["OrderedDict[int, str]"] = None
+    ):
+        """
+        Args:
+            secret_key: HMAC key for v1/v2 tokens (QR_SECRET_KEY)
+            legacy_secret_key: HMAC key for legacy IATT tokens (JWT_SECRET)
+            version: Format used for newly minted tokens (1 or 2)
+            session_handles: Handle map to share with a previous engine
+        """
+        if version not in (1, 2):
+            raise ValueError(f"Unsupported QR token version: {version}")
+
+        self.version = version
+
+        # Keyed HMAC objects are built once and copied per token, which skips
+        # re-deriving the inner/outer key pads on every call.
+        self._mac = hmac.new(secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+        self._legacy_mac = hmac.new(legacy_secret_key.encode('utf-8'), digestmod=hashlib.sha256)
+
+        # handle -> session_id, filled as tokens are minted on this worker
+        # (LRU, capped at MAX_SESSION_HANDLES; dropped at end_session)
+        self._session_handles: "OrderedDict[int, str]" = (
+            session_handles if session_handles is not None else OrderedDict()
+        )
+
+    # ------------------------------------------------------------------
+    # Session handles (v2)
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def session_handle(session_id: str) -> int:
+        """
+        Derive the 32-bit v2 session handle for a session ID
+
+        Deterministic, so every worker derives the same handle without
+        coordination. Collisions only matter within the small set of
+        concurrently active sessions, and the signature still binds the
+        token to the handle.
+        """
+        digest = hashlib.blake2b(session_id.encode('utf-8'), digest_size=4).digest()
+        return int.from_bytes(digest, 'big')
+
+    def register_session(self, session_id: str) -> int:
+        """Record the handle for a session so v2 tokens can be resolved back to it"""
+        handle = self.session_handle(session_id)
+        handles = self._session_handles
+        if handle in handles:
+            handles.move_to_end(handle)
+        handles[handle] = session_id
+        if len(handles) > self.MAX_SESSION_HANDLES:
+            handles.popitem(last=False)
+        return handle
+
+    def forget_session(self, session_id: str):
+        """Drop a session's handle once it has ended"""
+        handle = self.session_handle(session_id)
+        if self._session_handles.get(handle) == session_id:
+            del self._session_handles[handle]
+
+    def resolve_handle(self, handle: int) -> Optional[str]:
+        """Resolve a v2 session handle to a session ID known to this worker"""
+        return self._session_handles.get(handle)
+
+    # ------------------------------------------------------------------
+    # Generation
+    # ------------------------------------------------------------------
+
+    def generate(
+        self,
+        session_id: str,
+        class_id: str = "UNKNOWN",
+        room_id: str = "UNKNOWN",
+        subject_id: str = "UNKNOWN",
+        sequence: int = 0,
+        timestamp: Optional[int] = None,
+        version: Optional[int] = None
+    ) -> Dict[str, any]:
+        """
+        Generate a new QR token in the configured format
+
+        version overrides the configured format for this token only
+        (benchmarks and tests); production callers leave it unset.
+
+        Returns:
+            Dict containing:
+                - token: Full signed QR token string
+                - timestamp: Unix timestamp of generation
+                - expiry: Unix timestamp when token expires
+                - sequence: Sequence number
+                - payload: Decoded payload (room/subject included for server use)
+        """
+        if timestamp is None:
+            timestamp = self._now()
+
+        if (version or self.version) == 2:
+            token, payload = self._encode_v2(session_id, sequence, timestamp)
+            payload.update({"cid": class_id, "rid": room_id, "sub": subject_id})
+        else:
+            payload = {
+                "sid": session_id,
+                "cid": class_id,
+                "rid": room_id,
+                "sub": subject_id,
+                "seq": sequence,
+                "ts": timestamp  # CRITICAL: Timestamp for validation
+            }
+            token = self._encode_v1(payload)
+
+        return {
+            "token": token,
+            "timestamp": timestamp,
+            "expiry": timestamp + self.TOKEN_VALIDITY_SECONDS,
+            "sequence": sequence,
+            "payload": payload
+        }
+
+    def generate_many(self, requests: Iterable[Dict]) -> List[Dict[str, any]]:
+        """
+        Generate tokens for many sessions in one call
+
+        All tokens in the batch share one timestamp, so a rotation tick stamps
+        every session identically.
+
+        Args:
+            requests: Dicts with generate() keyword arguments
+                      (session_id required; class_id, room_id, subject_id, sequence optional)
+        """
+        timestamp = self._now()
+        return [self.generate(timestamp=timestamp, **request) for request in requests]
+
+    def _encode_v1(self, payload: Dict) -> str:
+        json_str = json.dumps(payload, separators=(',', ':'))
+        payload_b64 = base64.urlsafe_b64encode(json_str.encode('utf-8')).decode('utf-8').rstrip('=')
+        return f"{self.V1_PREFIX}_{payload_b64}_{self._sign_v1(payload_b64)}"
+
+    def _encode_v2(self, session_id: str, sequence: int, timestamp: int) -> Tuple[str, Dict]:
+        handle = self.register_session(session_id)
+        body = self.V2_STRUCT.pack(self.V2_VERSION, handle, sequence & 0xFFFFFFFF, timestamp)
+        mac = self._mac.copy()
+        mac.update(body)
+        token = self.V2_PREFIX + (body + mac.digest()[:self.V2_MAC_BYTES]).hex().upper()
+        return token, {
+            "v": self.V2_VERSION,
+            "sid": session_id,
+            "h": handle,
+            "seq": sequence,
+            "ts": timestamp
+        }
+
+    def _sign_v1(self, payload_b64: str) -> str:
+        """HMAC-SHA256 over the base64 payload, base64 encoded and truncated for QR size"""
+        mac = self._mac.copy()
+        mac.update(payload_b64.encode('utf-8'))
+        return base64.urlsafe_b64encode(mac.digest()).decode('utf-8')[:self.SIGNATURE_LENGTH]
+
+    def _sign_legacy(self, payload_b64: str) -> str:
+        mac = self._legacy_mac.copy()
+        mac.update(payload_b64.encode('utf-8'))
+        return base64.urlsafe_b64encode(mac.digest()).decode('utf-8')[:self.SIGNATURE_LENGTH]
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    def validate(self, token: str) -> ValidationResult:
+        """
+        Validate QR token signature and timestamp, whatever its format
+
+        Returns:
+            Tuple of (is_valid, payload_dict, error_message)
+            - is_valid: True if token is valid and not expired
+            - payload_dict: Decoded payload data if valid, None otherwise
+            - error_message: Error description if invalid, None if valid
+        """
+        if token.startswith(self.V2_PREFIX):
+            return self._validate_v2(token)
+        if token.startswith(self.LEGACY_PREFIX + "_"):
+            return self.validate_legacy(token)
+        return self._validate_v1(token)
+
+    def validate_many(self, tokens: Iterable[str]) -> List[ValidationResult]:
+        """Validate a batch of tokens against one clock reading"""
+        now = self._now()
+        return [self._validate_at(token, now) for token in tokens]
+
+    def validate_legacy(self, token: str) -> ValidationResult:
+        """Compatibility validator for IATT_ tokens signed with JWT_SECRET"""
+        return self._validate_json_token(token, self.LEGACY_PREFIX, self._sign_legacy, self._now())
+
+    def _validate_at(self, token: str, now: int) -> ValidationResult:
+        if token.startswith(self.V2_PREFIX):
+            return self._validate_v2(token, now)
+        if token.startswith(self.LEGACY_PREFIX + "_"):
+            return self._validate_json_token(token, self.LEGACY_PREFIX, self._sign_legacy, now)
+        return self._validate_v1(token, now)
+
+    def _validate_v1(self, token: str, now: Optional[int] = None) -> ValidationResult:
+        return self._validate_json_token(
+            token, self.V1_PREFIX, self._sign_v1, self._now() if now is None else now
+        )
+
+    def _validate_json_token(self, token: str, expected_prefix: str, sign, now: int) -> ValidationResult:
+        try:
+            parts = self.split_json_token(token)
+            if parts is None:
+                return False, None, "Invalid token format"
+
+            prefix, payload_b64, signature = parts
+
+            if prefix != expected_prefix:
+                return False, None, "Invalid token prefix"
+
+            # Verify signature
+            if not hmac.compare_digest(signature, sign(payload_b64)):
+                return False, None, "Invalid signature - token may be tampered"
+
+            payload_data = self._decode_json_payload(payload_b64)
+
+            # Validate timestamp
+            token_timestamp = payload_data.get('ts')
+            if not token_timestamp:
+                return False, None, "Missing timestamp in token"
+
+            error = self._check_age(token_timestamp, now)
+            if error:
+                return False, None, error
+
+            # Token is valid!
+            return True, payload_data, None
+
+        except Exception as e:
+            return False, None, f"Token validation error: {str(e)}"
+
+    def _validate_v2(self, token: str, now: Optional[int] = None) -> ValidationResult:
+        """
+        Validate a compact binary (v2) QR token
+
+        The returned payload carries the session handle as 'h'; 'sid' is
+        filled in when this worker knows the session, otherwise None and the
+        caller matches the handle against the expected session.
+        """
+        if len(token) != self.V2_TOKEN_LENGTH:
+            return False, None, "Invalid token format"
+
+        try:
+            raw = bytes.fromhex(token[len(self.V2_PREFIX):])
+        except ValueError:
+            return False, None, "Invalid token encoding"
+
+        body = raw[:self.V2_STRUCT.size]
+        mac = self._mac.copy()
+        mac.update(body)
+        if not hmac.compare_digest(raw[self.V2_STRUCT.size:], mac.digest()[:self.V2_MAC_BYTES]):
+            return False, None, "Invalid signature - token may be tampered"
+
+        version, handle, sequence, token_timestamp = self.V2_STRUCT.unpack(body)
+        if version != self.V2_VERSION:
+            return False, None, f"Unsupported token version: {version}"
+
+        error = self._check_age(token_timestamp, self._now() if now is None else now)
+        if error:
+            return False, None, error
+
+        return True, {
+            "v": version,
+            "sid": self.resolve_handle(handle),
+            "h": handle,
+            "seq": sequence,
+            "ts": token_timestamp
+        }, None
+
+    def _check_age(self, token_timestamp: int, now: int) -> Optional[str]:
+        """Return an error message if the token is outside its validity window"""
+        age_seconds = now - token_timestamp
+
+        # Check if token is within validity window + grace period
+        max_age = self.TOKEN_VALIDITY_SECONDS + self.GRACE_PERIOD_SECONDS
+
+        if age_seconds < 0:
+            return f"Token from future (clock skew detected: {abs(age_seconds)}s)"
+
+        if age_seconds > max_age:
+            return f"Token expired ({age_seconds}s old, max {max_age}s)"
+
+        return None
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def matches_session(self, payload: Dict, session_id: str) -> bool:
+        """Check a validated payload belongs to session_id (v2 payloads may only carry a handle)"""
+        if payload.get('sid') is not None:
+            return payload['sid'] == session_id
+        return payload.get('h') == self.session_handle(session_id)
+
+    def extract_session_id(self, token: str) -> Optional[str]:
+        """
+        Extract session ID from token without full validation
+        Useful for quick lookups before full validation
+        """
+        try:
+            if token.startswith(self.V2_PREFIX):
+                raw = bytes.fromhex(token[len(self.V2_PREFIX):])
+                _, handle, _, _ = self.V2_STRUCT.unpack(raw[:self.V2_STRUCT.size])
+                return self.resolve_handle(handle)
+
+            parts = self.split_json_token(token)
+            if parts is None:
+                return None
+            return self._decode_json_payload(parts[1]).get('sid')
+
+        except Exception:
+            return None
+
+    @classmethod
+    def split_json_token(cls, token: str) -> Optional[Tuple[str, str, str]]:
+        """
+        Split a v1/legacy token into (prefix, payload, signature)
+
+        URL-safe base64 may itself contain '_', so the fixed-length signature
+        is taken from the end instead of splitting on every underscore.
+        """
+        sig_len = cls.SIGNATURE_LENGTH
+        prefix, sep, rest = token.partition('_')
+        if not sep or len(rest) < sig_len + 2 or rest[-sig_len - 1] != '_':
+            return None
+        return prefix, rest[:-sig_len - 1], rest[-sig_len:]
+
+    @staticmethod
+    def _decode_json_payload(payload_b64: str) -> Dict:
+        padding = '=' * (-len(payload_b64) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload_b64 + padding).decode('utf-8'))
+
+    @staticmethod
+    def _now() -> int:
+        return int(datetime.now(timezone.utc).timestamp())
+
+
+# Global engine, rebuilt only when the relevant settings change
+_engine: Optional[TokenEngine] = None
+_engine_config: Optional[Tuple[str, str, int]] = None
+
+
+def get_token_engine() -> TokenEngine:
+    """Get the process-wide token engine for the current settings"""
+    global _engine, _engine_config
+    config = (settings.QR_SECRET_KEY, settings.JWT_SECRET, settings.QR_TOKEN_VERSION)
+    if _engine is None or config != _engine_config:
+        # Handles are key-independent: share the map so known sessions keep resolving
+        handles = _engine._session_handles if _engine is not None else None
+        _engine = TokenEngine(*config, session_handles=handles)
+        _engine_config = config
+    return _engine
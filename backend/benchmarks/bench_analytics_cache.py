@@ -0,0 +1,87 @@
+"""
+Benchmark: polled analytics endpoints with and without the response cache
+
+Simulates dashboards polling section trends and the faculty summary
+POLLS times while scans land (one attendance_update every SCAN_EVERY
+polls) on the six-month dataset from bench_daily_rollups, with RTT_MS per
+Firestore round trip. Reports p50/p95 latency per endpoint and the
+cache's hit ratios.
+
+Usage (from backend/):
+    python benchmarks/bench_analytics_cache.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.analytics_cache import AnalyticsCache
+from app.services.analytics_service import AnalyticsService
+from app.services.session_cache import session_cache
+from app.services.session_rollup_service import SessionRollupService
+from benchmarks.bench_daily_rollups import build
+
+POLLS = 200
+SCAN_EVERY = 10
+RTT_MS = 5
+
+ENDPOINTS = {
+    'section_trends': ({'section_id': 'SEC', 'days': 30}, [('section', 'SEC')],
+                       lambda: AnalyticsService.get_section_trends('SEC', 30)),
+    'faculty_summary': ({'faculty_id': 'F1', 'days': 30}, [('faculty', 'F1')],
+                        lambda: AnalyticsService.get_faculty_summary('F1', 30)),
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+
+async def poll(cache):
+    samples = {name: [] for name in ENDPOINTS}
+    for n in range(POLLS):
+        if cache and n and n % SCAN_EVERY == 0:
+            await cache.on_session_change('S000_0', {'type': 'attendance_update'})
+        for name, (params, tags, compute) in ENDPOINTS.items():
+            started = time.perf_counter()
+            if cache:
+                await cache.get(name, params, tags, compute)
+            else:
+                await compute()
+            samples[name].append(time.perf_counter() - started)
+        await asyncio.sleep(0.001)  # let background refreshes run between polls
+    return samples
+
+
+def main():
+    db = build()
+    with patch.object(SessionRollupService, '_get_db', return_value=db), \
+            contextlib.redirect_stdout(io.StringIO()):
+        SessionRollupService.backfill(page_size=500)
+    db.latency_seconds = RTT_MS / 1000
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=600)
+
+    print("=" * 72)
+    print(f"{POLLS} dashboard polls, attendance_update every {SCAN_EVERY} polls, {RTT_MS} ms RTT")
+    print("=" * 72)
+    print(f"{'endpoint':<18}{'uncached p50':>14}{'p95':>9}{'cached p50':>14}{'p95':>9}{'hit ratio':>11}")
+    with patch.object(AnalyticsService, '_get_db', return_value=db), \
+            patch.object(session_cache, 'peek_session', return_value={'section_id': 'SEC', 'faculty_id': 'F1'}):
+        uncached = asyncio.run(poll(None))
+        cached = asyncio.run(poll(cache))
+    stats = cache.get_stats()['endpoints']
+    for name in ENDPOINTS:
+        print(f"{name:<18}{percentile(uncached[name], 0.5):>12.2f}ms{percentile(uncached[name], 0.95):>7.2f}ms"
+              f"{percentile(cached[name], 0.5):>12.3f}ms{percentile(cached[name], 0.95):>7.3f}ms"
+              f"{stats[name]['hit_ratio']:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
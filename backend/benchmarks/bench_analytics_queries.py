@@ -0,0 +1,99 @@
+"""
+Benchmark: AnalyticsService Firestore round trips and document reads
+
+Runs each analytics method against an in-memory Firestore that counts
+round trips and billed reads, for a 30-day window of a section with
+SESSIONS sessions and STUDENTS students, and compares it with the
+previous per-session loop (one attendance stream + one section read per
+session). "rollups" is after the rollup backfill: session rollups for the
+faculty summary, daily rollups for subject and section trends.
+
+Usage (from backend/):
+    python benchmarks/bench_analytics_queries.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.analytics_service import AnalyticsService
+from app.services.session_rollup_service import SessionRollupService
+from tests.unit.fake_firestore import FakeFirestore
+
+SESSIONS = 120  # 30 days, 4 lectures a day
+STUDENTS = 60
+
+
+def build():
+    db = FakeFirestore()
+    now = datetime.now(timezone.utc)
+    db.seed('sections', 'SEC', {'total_students': STUDENTS})
+    for s in range(SESSIONS):
+        session_id = f"S{s:04d}"
+        db.seed('sessions', session_id, {
+            'faculty_id': 'F1', 'subject_id': f"SUB{s % 4}", 'section_id': 'SEC',
+            'created_at': now - timedelta(hours=6 * s), 'status': 'ended'
+        })
+        for i in range(STUDENTS):
+            if (i * 7 + s) % 10:
+                db.seed('student_attendance', f"{session_id}_{i}", {
+                    'session_id': session_id, 'student_id': f"ST{i}", 'status': 'present'
+                })
+    for d in range(30):
+        db.seed('faculty_attendance', f"FA{d}", {'faculty_id': 'F1', 'timestamp': now - timedelta(days=d)})
+    return db
+
+
+def legacy(db, method):
+    """Round trips and reads of the previous per-session implementation"""
+    db.reset_counters()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=30)
+    field, value = {'faculty': ('faculty_id', 'F1'), 'subject': ('subject_id', 'SUB0'),
+                    'section': ('section_id', 'SEC')}[method]
+    if method == 'section':
+        db.collection('sections').document('SEC').get()
+    for session_doc in db.collection('sessions').where(field, '==', value).where('created_at', '>=', cutoff).stream():
+        list(db.collection('student_attendance').where('session_id', '==', session_doc.id)
+             .where('status', '==', 'present').stream())
+        if method == 'subject':
+            db.collection('sections').document('SEC').get()
+    if method == 'faculty':
+        list(db.collection('faculty_attendance').where('faculty_id', '==', 'F1')
+             .where('timestamp', '>=', cutoff).stream())
+    return db.round_trips, db.reads
+
+
+async def current(db):
+    with patch.object(AnalyticsService, '_get_db', return_value=db):
+        return {
+            'faculty': (await AnalyticsService.get_faculty_summary('F1'))['query_stats'],
+            'subject': (await AnalyticsService.get_subject_attendance('SUB0'))['query_stats'],
+            'section': (await AnalyticsService.get_section_trends('SEC'))['query_stats'],
+        }
+
+
+def main():
+    db = build()
+    with patch.object(SessionRollupService, '_get_db', return_value=db), \
+            contextlib.redirect_stdout(io.StringIO()):
+        SessionRollupService.backfill()
+    rollups = asyncio.run(current(db))
+    print("=" * 60)
+    print(f"Analytics queries ({SESSIONS} sessions x {STUDENTS} students, 30 days)")
+    print("=" * 60)
+    print(f"{'':>10}{'round trips':^20}{'documents read':^20}")
+    print(f"{'method':>10}" + f"{'before':>10}{'rollups':>10}" * 2)
+    for method in rollups:
+        trips, reads = legacy(db, method)
+        print(f"{method:>10}{trips:>10}{rollups[method]['round_trips']:>10}"
+              f"{reads:>10}{rollups[method]['documents_read']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: cross-worker broadcast latency over the Unix-socket backplane
+
+Starts one publishing worker (which hosts the broker) and several receiving
+worker processes, publishes MESSAGES broadcasts at a steady rate, and
+reports publish-to-delivery latency on the receiving workers. Latency uses
+time.monotonic(), which is system-wide on Linux so it compares across
+processes.
+
+Usage (from backend/):
+    python benchmarks/bench_backplane_latency.py
+"""
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.backplane import UnixSocketBackplane
+
+RECEIVERS = 3
+MESSAGES = 2000
+INTERVAL_SECONDS = 0.001
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def receiver(path, ready, results):
+    async def main():
+        latencies = []
+        done = asyncio.Event()
+
+        async def deliver(session_id, message):
+            latencies.append(time.monotonic() - message["sent_at"])
+            if message["seq"] == MESSAGES - 1:
+                done.set()
+
+        backplane = UnixSocketBackplane(path, host_broker=False)
+        await backplane.start(deliver)
+        await backplane.wait_connected()
+        ready.set()
+        try:
+            await asyncio.wait_for(done.wait(), 60)
+        finally:
+            await backplane.stop()
+        results.put(latencies)
+
+    asyncio.run(main())
+
+
+async def publisher(path, ready_events):
+    async def deliver(session_id, message):
+        pass
+
+    backplane = UnixSocketBackplane(path)
+    await backplane.start(deliver)
+    await backplane.wait_connected()
+    while not all(event.is_set() for event in ready_events):
+        await asyncio.sleep(0.01)
+    # Give the broker a moment to register every receiver's connection
+    await asyncio.sleep(0.2)
+
+    started = time.perf_counter()
+    for seq in range(MESSAGES):
+        await backplane.publish("S1", {
+            "type": "attendance_update",
+            "total_present": seq,
+            "seq": seq,
+            "sent_at": time.monotonic()
+        })
+        await asyncio.sleep(INTERVAL_SECONDS)
+    elapsed = time.perf_counter() - started
+    await asyncio.sleep(0.5)
+    await backplane.stop()
+    return elapsed
+
+
+def main():
+    path = os.path.join(tempfile.mkdtemp(), "backplane.sock")
+    results = multiprocessing.Queue()
+    ready_events = [multiprocessing.Event() for _ in range(RECEIVERS)]
+
+    # The publisher must host the broker before receivers connect
+    async def run():
+        publish = asyncio.create_task(publisher(path, ready_events))
+        await asyncio.sleep(0.2)
+        procs = [
+            multiprocessing.Process(target=receiver, args=(path, ready, results))
+            for ready in ready_events
+        ]
+        for proc in procs:
+            proc.start()
+        elapsed = await publish
+        return procs, elapsed
+
+    procs, elapsed = asyncio.run(run())
+    latencies = []
+    for _ in procs:
+        latencies.extend(results.get(timeout=60))
+    for proc in procs:
+        proc.join()
+
+    ms = [latency * 1000 for latency in latencies]
+    print(f"Backplane: {RECEIVERS} receiving workers, {MESSAGES} broadcasts "
+          f"({MESSAGES / elapsed:.0f}/s published)")
+    print(f"  delivered: {len(ms)} / {RECEIVERS * MESSAGES}")
+    print(f"  p50: {statistics.median(ms):.3f} ms   p99: {_percentile(ms, 99):.3f} ms   "
+          f"max: {max(ms):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
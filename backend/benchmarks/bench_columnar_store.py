@@ -0,0 +1,175 @@
+"""
+Benchmark: columnar analytics store on a synthetic semester
+
+1. Query latency on ~5M attendance records: SECTIONS sections of STUDENTS
+   students, SESSIONS_PER_DAY sessions a day for DAYS days, about 85%
+   attendance. The data is generated straight into the store (numpy ->
+   Arrow -> Parquet) rather than through Firestore.
+2. Sync throughput: documents per second from an in-memory Firestore into
+   the store, first run and incremental run.
+
+Needs pyarrow and numpy.
+
+Usage (from backend/):
+    python benchmarks/bench_columnar_store.py [--records-scale 1.0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.services.columnar_store import ColumnarStore
+from tests.unit.fake_firestore import FakeFirestore
+
+SECTIONS = 92  # x 60 students x 6 sessions x 180 days x ~85% present = ~5.07M records
+STUDENTS = 60
+SESSIONS_PER_DAY = 6
+DAYS = 180
+SUBJECTS_PER_SECTION = 6
+RUNS = 5
+
+
+def generate(store: ColumnarStore, sections: int, days: int):
+    """Write DAYS days of sessions and attendance, one day per write, then compact"""
+    rng = np.random.default_rng(7)
+    today = datetime.now(timezone.utc).replace(hour=3, minute=30, second=0, microsecond=0)
+    section_ids = np.array([f"SEC{s:03d}" for s in range(sections)])
+    records = 0
+    for day in range(days):
+        start = today - timedelta(days=day)
+        month = start.strftime('%Y-%m')
+        # sessions: sections x slots
+        sec = np.repeat(np.arange(sections), SESSIONS_PER_DAY)
+        slot = np.tile(np.arange(SESSIONS_PER_DAY), sections)
+        session_ids = pc.binary_join_element_wise(
+            pa.array(section_ids[sec]), pa.array([f"D{day:03d}S{n}" for n in slot]), "_")
+        created = pa.array([start + timedelta(hours=int(n)) for n in range(SESSIONS_PER_DAY)] * sections, pa.timestamp('us', tz='UTC'))
+        subjects = pa.array([f"SUB{(s * 3 + n) % (sections * SUBJECTS_PER_SECTION) // 1}" for s, n in
+                             zip(sec % sections, slot % SUBJECTS_PER_SECTION)])
+        store.write_table('sessions', pa.table({
+            'id': session_ids,
+            'faculty_id': pa.array([f"F{(s * 7 + n) % 120}" for s, n in zip(sec, slot)]),
+            'subject_id': subjects,
+            'classroom_id': pa.array([f"R{s % 40}" for s in sec]),
+            'created_at': created,
+            'month': pa.array([month] * len(sec)),
+            'section_id': pa.array(section_ids[sec]),
+        }), f"d{day}")
+
+        # attendance: every session x student who showed up
+        session_index = np.repeat(np.arange(len(sec)), STUDENTS)
+        student = np.tile(np.arange(STUDENTS), len(sec))
+        attended = rng.random(len(session_index)) < 0.85
+        session_index, student = session_index[attended], student[attended]
+        statuses = np.where(rng.random(len(student)) < 0.05, 'suspicious', 'present')
+        ids = pc.take(session_ids, pa.array(session_index))
+        rows = len(student)
+        records += rows
+        store.write_table('student_attendance', pa.table({
+            'id': pc.binary_join_element_wise(ids, pa.array(student.astype(str)), "_"),
+            'session_id': ids,
+            'student_id': pa.array(np.char.add(section_ids[sec[session_index]], student.astype(str))),
+            'subject_id': pc.take(subjects, pa.array(session_index)),
+            'status': pa.array(statuses),
+            'gps_verified': pa.array(rng.random(rows) < 0.9),
+            'wifi_verified': pa.array(rng.random(rows) < 0.7),
+            'bluetooth_verified': pa.array(rng.random(rows) < 0.6),
+            'timestamp': pc.take(created, pa.array(session_index)),
+            'month': pa.array([month] * rows),
+            'section_id': pa.array(section_ids[sec[session_index]]),
+        }), f"d{day}")
+    pq.write_table(pa.table({'section_id': pa.array(section_ids),
+                             'total_students': pa.array([STUDENTS] * sections, pa.int64())}),
+                   os.path.join(store.root, ColumnarStore.SECTIONS_FILE))
+    store.compact()
+    return records
+
+
+def latency(fn):
+    fn()  # warm the file cache
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000
+
+
+def sync_throughput():
+    db = FakeFirestore()
+    now = datetime.now(timezone.utc)
+    for n in range(50000):
+        db.seed('student_attendance', f"A{n:06d}", {
+            'session_id': f"S{n // 60}", 'student_id': f"ST{n % 60}", 'section_id': f"SEC{n % 8}",
+            'subject_id': 'SUB', 'status': 'present', 'timestamp': now - timedelta(seconds=n),
+            'verification_data': {'gps_verified': True}
+        })
+    root = tempfile.mkdtemp(prefix="bench_columnar_sync_")
+    try:
+        store = ColumnarStore(root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            store.sync(db)
+            first = time.perf_counter() - started
+            for n in range(1000):
+                db.seed('student_attendance', f"B{n:06d}", {
+                    'session_id': 'SNEW', 'student_id': f"ST{n}", 'section_id': 'SEC0', 'subject_id': 'SUB',
+                    'status': 'present', 'timestamp': now + timedelta(seconds=n + 1)
+                })
+            db.reset_counters()
+            started = time.perf_counter()
+            store.sync(db)
+            incremental = time.perf_counter() - started
+        return first, incremental, db.reads
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records-scale", type=float, default=1.0, help="fraction of the 5M-record dataset")
+    args = parser.parse_args()
+    sections = max(2, int(SECTIONS * args.records_scale))
+
+    root = tempfile.mkdtemp(prefix="bench_columnar_")
+    try:
+        store = ColumnarStore(root)
+        started = time.perf_counter()
+        records = generate(store, sections, DAYS)
+        print("=" * 64)
+        print(f"Columnar store: {records:,} attendance records, {sections * SESSIONS_PER_DAY * DAYS:,} sessions")
+        print(f"(generated and written in {time.perf_counter() - started:.1f} s, "
+              f"median of {RUNS} runs below)")
+        print("=" * 64)
+        queries = [
+            ("section trends, 30 days", lambda: store.section_trends("SEC001", 30)),
+            ("section trends, 180 days", lambda: store.section_trends("SEC001", 180)),
+            ("subject attendance, 180 days", lambda: store.subject_attendance("SUB3", None, 180)),
+            ("faculty summary, 180 days", lambda: store.faculty_summary("F7", 180)),
+        ]
+        for name, query in queries:
+            print(f"  {name:<32}{latency(query):>9.1f} ms")
+    finally:
+        shutil.rmtree(root)
+
+    first, incremental, reads = sync_throughput()
+    print(f"\nSync from Firestore: 50,000 docs in {first:.2f} s ({50000 / first:,.0f} docs/s); "
+          f"+1,000 new docs in {incremental * 1000:.0f} ms ({reads} reads)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark: section trends from daily rollups vs per-session recounts
+
+Generates six months of one section (SUBJECTS subjects, SESSIONS_PER_DAY
+sessions a day, STUDENTS students), builds the session and daily rollups
+with the backfill, then times get_section_trends for 30/90/180-day windows
+against the original implementation (sessions query, then one
+student_attendance stream per session).
+
+Both run on an in-memory Firestore that sleeps RTT_MS per round trip, so
+the wall time reflects network round trips as well as Python work.
+
+Usage (from backend/):
+    python benchmarks/bench_daily_rollups.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.analytics_service import AnalyticsService
+from app.services.session_rollup_service import SessionRollupService
+from tests.unit.fake_firestore import FakeFirestore
+
+DAYS = 182
+SUBJECTS = 4
+SESSIONS_PER_DAY = 4
+STUDENTS = 60
+RTT_MS = 5
+WINDOWS = (30, 90, 180)
+
+
+def build():
+    db = FakeFirestore()
+    now = datetime.now(timezone.utc)
+    db.seed('sections', 'SEC', {'total_students': STUDENTS})
+    for day in range(DAYS):
+        for slot in range(SESSIONS_PER_DAY):
+            session_id = f"S{day:03d}_{slot}"
+            db.seed('sessions', session_id, {
+                'faculty_id': 'F1', 'subject_id': f"SUB{slot % SUBJECTS}", 'section_id': 'SEC',
+                'created_at': now - timedelta(days=day, hours=slot), 'status': 'ended'
+            })
+            for i in range(STUDENTS):
+                if (i * 7 + day + slot) % 10:
+                    db.seed('student_attendance', f"{session_id}_{i}", {
+                        'session_id': session_id, 'student_id': f"ST{i}",
+                        'status': 'present', 'timestamp': now
+                    })
+    return db
+
+
+def original_section_trends(db, section_id, days):
+    """get_section_trends before rollups: one attendance stream per session"""
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+    section = db.collection('sections').document(section_id).get().to_dict()
+    total_students = section.get('total_students', 0)
+    subject_wise = defaultdict(lambda: {'sessions': 0, 'total_present': 0})
+    daily = []
+    sessions = db.collection('sessions') \
+        .where('section_id', '==', section_id) \
+        .where('created_at', '>=', cutoff_date) \
+        .stream()
+    for session_doc in sessions:
+        data = session_doc.to_dict()
+        present = sum(1 for _ in db.collection('student_attendance')
+                      .where('session_id', '==', session_doc.id)
+                      .where('status', '==', 'present')
+                      .stream())
+        subject_wise[data.get('subject_id')]['sessions'] += 1
+        subject_wise[data.get('subject_id')]['total_present'] += present
+        daily.append({'date': data.get('created_at'), 'present': present,
+                      'percentage': round(present / total_students * 100, 2)})
+    return subject_wise, daily
+
+
+def timed(db, fn):
+    db.reset_counters()
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, db.round_trips, db.reads, result
+
+
+def main():
+    started = time.perf_counter()
+    db = build()
+    with patch.object(SessionRollupService, '_get_db', return_value=db), \
+            contextlib.redirect_stdout(io.StringIO()):
+        SessionRollupService.backfill(page_size=500)
+    records = len(db.data['student_attendance'])
+    print("=" * 72)
+    print(f"Section trends, 6 months: {DAYS * SESSIONS_PER_DAY} sessions, {records} attendance records, "
+          f"{RTT_MS} ms RTT")
+    print(f"(dataset + backfill built in {time.perf_counter() - started:.1f} s)")
+    print("=" * 72)
+    print(f"{'days':>6}{'original':>12}{'trips':>8}{'reads':>9}{'daily':>12}{'trips':>8}{'reads':>9}{'speedup':>9}")
+
+    db.latency_seconds = RTT_MS / 1000
+    with patch.object(AnalyticsService, '_get_db', return_value=db):
+        for days in WINDOWS:
+            old_time, old_trips, old_reads, (_, old_daily) = timed(
+                db, lambda days=days: original_section_trends(db, 'SEC', days))
+            new_time, new_trips, new_reads, result = timed(
+                db, lambda days=days: asyncio.run(AnalyticsService.get_section_trends('SEC', days)))
+            assert len(result['daily_trends']) == len(old_daily)
+            print(f"{days:>6}{old_time * 1000:>10.0f}ms{old_trips:>8}{old_reads:>9}"
+                  f"{new_time * 1000:>10.1f}ms{new_trips:>8}{new_reads:>9}{old_time / new_time:>8.0f}x")
+
+        for period in ('week', 'month'):
+            elapsed, trips, reads, result = timed(
+                db, lambda period=period: asyncio.run(AnalyticsService.get_section_rollup('SEC', 180, period)))
+            print(f"\n180 days by {period}: {len(result['buckets'])} buckets in {elapsed * 1000:.1f} ms "
+                  f"({trips} round trips, {reads} reads)", end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
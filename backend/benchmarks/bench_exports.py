@@ -0,0 +1,87 @@
+"""
+Benchmark: streaming exports vs building the whole response
+
+For growing section exports, compares building every row into one JSON
+body (how the report routes work) against ExportService.stream in CSV.
+Reports peak Python memory (tracemalloc), time to the first rows and
+total time on an in-memory Firestore that sleeps RTT_MS per round trip.
+The fake's own result set is built before measuring so the peak reflects
+the export code, not the stand-in database.
+
+Usage (from backend/):
+    python benchmarks/bench_exports.py
+"""
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.export_service import ExportService, to_row
+from tests.unit.fake_firestore import FakeFirestore
+
+SIZES = (10_000, 50_000, 100_000)
+RTT_MS = 5
+
+
+def build(records):
+    db = FakeFirestore()
+    start = datetime.now(timezone.utc) - timedelta(days=120)
+    for n in range(records):
+        db.seed('student_attendance', f"A{n:06d}", {
+            'session_id': f"S{n // 60}", 'student_id': f"ST{n % 60}", 'subject_id': f"SUB{n % 6}",
+            'section_id': 'SEC', 'classroom_id': 'R1', 'status': 'present', 'verified_by': 'qr_scan',
+            'timestamp': start + timedelta(seconds=n * 90),
+            'verification_data': {'gps_verified': True, 'wifi_verified': False, 'bluetooth_verified': False,
+                                  'distance_meters': 8.2, 'location_provided': {'gps': {'latitude': 12.9}}}
+        })
+    return db
+
+
+def whole_body(db):
+    docs = db.collection('student_attendance').where('section_id', '==', 'SEC').stream()
+    records = [to_row(doc.id, doc.to_dict()) for doc in docs]
+    yield json.dumps({'section_id': 'SEC', 'total_records': len(records), 'records': records}, default=str)
+
+
+def measure(db, chunks, header_chunks=0):
+    db.reset_counters()
+    tracemalloc.start()
+    started = time.perf_counter()
+    first = None
+    size = 0
+    for n, chunk in enumerate(chunks):
+        if first is None and n >= header_chunks:  # first rows, not just the CSV header
+            first = time.perf_counter() - started
+        size += len(chunk)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first * 1000, total * 1000, peak / 2**20, size / 2**20
+
+
+def main():
+    print("=" * 78)
+    print(f"Section export, {RTT_MS} ms RTT: whole JSON body vs streamed CSV")
+    print("=" * 78)
+    print(f"{'records':>9}{'':3}{'first byte':>12}{'total':>10}{'peak MB':>9}"
+          f"{'':3}{'first byte':>12}{'total':>10}{'peak MB':>9}{'out MB':>8}")
+    for records in SIZES:
+        db = build(records)
+        with patch.object(ExportService, '_get_db', return_value=db):
+            for _ in ExportService.stream('section', 'SEC', 'csv', page_size=records):
+                pass  # build the fake's sorted result set outside the measurement
+            db.latency_seconds = RTT_MS / 1000
+            old = measure(db, whole_body(db))
+            new = measure(db, ExportService.stream('section', 'SEC', 'csv'), header_chunks=1)
+        print(f"{records:>9,}{'':3}{old[0]:>10.0f}ms{old[1]:>8.0f}ms{old[2]:>9.1f}"
+              f"{'':3}{new[0]:>10.0f}ms{new[1]:>8.0f}ms{new[2]:>9.1f}{new[3]:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
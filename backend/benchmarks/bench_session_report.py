@@ -0,0 +1,95 @@
+"""
+Benchmark: session report first page vs the whole report
+
+A lecture-hall session of STUDENTS scans, each record carrying the raw
+location payload the app sends. Times the original report (every record,
+full documents) against the first cursor page (REPORT_PAGE_SIZE students,
+projected fields), both including JSON serialization, on an in-memory
+Firestore that sleeps RTT_MS per round trip.
+
+Usage (from backend/):
+    python benchmarks/bench_session_report.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.analytics_service import REPORT_PAGE_SIZE, AnalyticsService
+from app.services.session_rollup_service import SessionRollupService, build_rollup
+from tests.unit.fake_firestore import FakeFirestore
+
+STUDENTS = (250, 1000, 3000)
+RTT_MS = 5
+RUNS = 5
+
+
+def build(students):
+    db = FakeFirestore()
+    now = datetime.now(timezone.utc)
+    db.seed('sections', 'SEC', {'total_students': students})
+    db.seed('sessions', 'S1', {'faculty_id': 'F1', 'subject_id': 'SUB', 'section_id': 'SEC',
+                               'created_at': now, 'status': 'ended'})
+    for i in range(students):
+        db.seed('student_attendance', f"A{i:05d}", {
+            'session_id': 'S1', 'student_id': f"ST{i}", 'subject_id': 'SUB', 'section_id': 'SEC',
+            'status': 'present', 'verified_by': 'qr_scan', 'timestamp': now + timedelta(seconds=i),
+            'verification_data': {
+                'gps_verified': True, 'wifi_verified': True, 'bluetooth_verified': False, 'distance_meters': 9.4,
+                'location_provided': {'gps': {'latitude': 12.97, 'longitude': 77.59, 'accuracy': 8.0},
+                                      'wifi_ssid': 'CAMPUS', 'wifi_bssid': 'aa:bb:cc:dd:ee:ff',
+                                      'bluetooth_beacon': {'uuid': 'f7826da6-4fa2-4e98-8024-bc5b71e0893e',
+                                                           'major': 1, 'minor': 7}}
+            }
+        })
+    with patch.object(SessionRollupService, '_get_db', return_value=db), \
+            contextlib.redirect_stdout(io.StringIO()):
+        SessionRollupService.backfill()
+    return db
+
+
+def original_report(db):
+    """get_session_report before pagination: every record, full documents"""
+    session = db.collection('sessions').document('S1').get().to_dict()
+    records = [doc.to_dict() for doc in db.collection('student_attendance').where('session_id', '==', 'S1').stream()]
+    students = [{'student_id': r.get('student_id'), 'status': r.get('status'), 'timestamp': r.get('timestamp'),
+                 'verification': r.get('verification_data', {})} for r in records]
+    rollup = build_rollup('S1', session, records, db.collection('sections').document('SEC').get().to_dict()
+                          .get('total_students', 0))
+    return {'statistics': rollup, 'students': students}
+
+
+def timed(fn):
+    samples = []
+    for _ in range(RUNS):
+        started = time.perf_counter()
+        size = len(json.dumps(fn(), default=str))
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2] * 1000, size / 1024
+
+
+def main():
+    print("=" * 72)
+    print(f"Session report, {RTT_MS} ms RTT: whole report vs first page of {REPORT_PAGE_SIZE} (median of {RUNS})")
+    print("=" * 72)
+    print(f"{'students':>9}{'whole':>12}{'KB':>9}{'first page':>14}{'KB':>8}")
+    for students in STUDENTS:
+        db = build(students)
+        db.latency_seconds = RTT_MS / 1000
+        with patch.object(AnalyticsService, '_get_db', return_value=db):
+            old_ms, old_kb = timed(lambda db=db: original_report(db))
+            new_ms, new_kb = timed(lambda: asyncio.run(AnalyticsService.get_session_report('S1')))
+        print(f"{students:>9}{old_ms:>10.1f}ms{old_kb:>9.0f}{new_ms:>12.1f}ms{new_kb:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
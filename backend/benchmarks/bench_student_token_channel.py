@@ -0,0 +1,171 @@
+"""
+Benchmark: student token channel vs Firestore listeners
+
+1. Firestore reads per student per hour for a class of CLASS_SIZE
+   - listener:  every student's listener on ActiveSessions/{id} is charged
+                one document read per rotation (plus the initial snapshot)
+   - websocket: students follow /websocket/session/{id}/token; the worker
+                reads Firestore for the session, not per student. Measured
+                by running the real endpoint and broadcaster on a clock
+                sped up SPEEDUP times and counting the cache's Firestore
+                fetches. Each app still reads ActiveSessions once to learn
+                the channel (tokenChannel).
+   The scheduler's own rotation read/write happens either way and is left out.
+
+2. Fan-out: time for one rotation to reach STUDENTS sockets on one worker.
+
+Usage (from backend/):
+    python benchmarks/bench_student_token_channel.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from fastapi import WebSocketDisconnect
+
+from app.api.v1 import websocket as ws_routes
+from app.core.config import settings
+from app.services.session_cache import session_cache
+from app.services.websocket_manager import manager
+
+CLASS_SIZE = 120
+STUDENTS = 5000
+SPEEDUP = 100
+SIMULATED_HOURS = 0.1
+
+
+class FakeWebSocket:
+    """Student device that follows the channel until hangup"""
+
+    # sockets that have received sequence 2 (the fan-out measurement)
+    reached = 0
+
+    def __init__(self, hangup: asyncio.Event):
+        self.query_params = {}
+        self.scope = {}
+        self.hangup = hangup
+        self.frames = 0
+        self.last_sequence = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+    async def send_text(self, text):
+        self.frames += 1
+        self.last_sequence = json.loads(text).get("sequence_number")
+        if self.last_sequence == 2:
+            FakeWebSocket.reached += 1
+
+    async def receive_text(self):
+        await self.hangup.wait()
+        raise WebSocketDisconnect()
+
+
+class FirestoreCounter:
+    def __init__(self):
+        self.reads = 0
+
+    def session(self, session_id):
+        self.reads += 1
+        return {"status": "active"}
+
+    def token(self, session_id):
+        self.reads += 1
+        return {"token": "QR_initial", "sequence": 0, "timestamp": 0, "expiry": 7}
+
+
+def _token(sequence):
+    return {"token": f"QR_token_{sequence}", "sequence": sequence, "timestamp": sequence, "expiry": sequence + 7}
+
+
+async def measure_reads():
+    """Server-side Firestore reads for one session over SIMULATED_HOURS"""
+    interval = settings.QR_REFRESH_INTERVAL_SECONDS
+    settings.QR_REFRESH_INTERVAL_SECONDS = interval / SPEEDUP
+    session_cache.ttl_seconds = settings.SESSION_CACHE_TTL_SECONDS / SPEEDUP
+    counter = FirestoreCounter()
+    session_cache._fetch_session = counter.session
+    session_cache._fetch_token = counter.token
+
+    hangup = asyncio.Event()
+    sockets = [FakeWebSocket(hangup) for _ in range(CLASS_SIZE)]
+    rotations = int(SIMULATED_HOURS * 3600 / interval)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            tasks = [
+                asyncio.create_task(ws_routes.websocket_student_token_endpoint(ws, "CLASS"))
+                for ws in sockets
+            ]
+            for sequence in range(1, rotations + 1):
+                await asyncio.sleep(settings.QR_REFRESH_INTERVAL_SECONDS)
+                session_cache.set_token("CLASS", _token(sequence))  # the rotation scheduler
+            await asyncio.sleep(settings.QR_REFRESH_INTERVAL_SECONDS)
+            hangup.set()
+            await asyncio.gather(*tasks)
+    finally:
+        settings.QR_REFRESH_INTERVAL_SECONDS = interval
+
+    behind = sum(1 for ws in sockets if ws.last_sequence != rotations)
+    return counter.reads / SIMULATED_HOURS, rotations / SIMULATED_HOURS, behind
+
+
+async def measure_fanout():
+    """Enqueue and delivery time for one rotation to STUDENTS sockets"""
+    hangup = asyncio.Event()
+    sockets = [FakeWebSocket(hangup) for _ in range(STUDENTS)]
+    session_cache._fetch_session = lambda session_id: {"status": "active"}
+    session_cache.set_token("BIG", _token(1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tasks = [
+            asyncio.create_task(ws_routes.websocket_student_token_endpoint(ws, "BIG"))
+            for ws in sockets
+        ]
+        while any(ws.frames == 0 for ws in sockets):
+            await asyncio.sleep(0.001)
+
+        started = time.perf_counter()
+        await manager.broadcast_local("BIG", {
+            "type": "qr_update", "qr_token": "QR_token_2", "sequence_number": 2, "timestamp": 2, "expiry": 9
+        })
+        enqueued = time.perf_counter() - started
+        while FakeWebSocket.reached < STUDENTS:
+            await asyncio.sleep(0)
+        delivered = time.perf_counter() - started
+
+        hangup.set()
+        await asyncio.gather(*tasks)
+    return enqueued, delivered
+
+
+def main():
+    print("=" * 60)
+    print(f"Student Token Channel ({CLASS_SIZE}-student class, "
+          f"{settings.QR_REFRESH_INTERVAL_SECONDS} s rotation)")
+    print("=" * 60)
+
+    server_reads, rotations, behind = asyncio.run(measure_reads())
+    listener = rotations + 1
+    websocket = 1 + server_reads / CLASS_SIZE
+    print("Firestore reads per student per hour:")
+    print(f"  listener    {listener:9.1f}   ({rotations:.0f} rotations + initial snapshot)")
+    print(f"  websocket   {websocket:9.1f}   (1 channel lookup + {server_reads:.0f} worker reads "
+          f"shared by {CLASS_SIZE})")
+    print(f"  saved       {1 - websocket / listener:9.1%}   students behind at the end: {behind}")
+
+    enqueued, delivered = asyncio.run(measure_fanout())
+    print(f"\nOne rotation to {STUDENTS} students on one worker:")
+    print(f"  enqueue {enqueued * 1000:7.2f} ms   delivered to all {delivered * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: GET /api/v1/sessions/{id}/token throughput
+
+Drives the real route through the FastAPI application (routing, header
+parsing, dependency resolution, response) with raw ASGI calls from one
+event loop, so the number is what a single worker can serve before
+uvicorn's HTTP parsing and the network are added. The handler itself is a
+dictionary lookup against SessionCache; no Firestore access happens.
+
+- fresh: no If-None-Match, full 200 body
+- 304:   If-None-Match carries the current sequence
+
+Usage (from backend/):
+    python benchmarks/bench_token_endpoint.py
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from fastapi import FastAPI
+
+from app.api.v1 import session as session_api
+from app.services.session_cache import session_cache
+
+REQUESTS = 20000
+SESSION = "BENCH_SESSION"
+TARGET_RPS = 10000
+
+
+def make_scope(headers):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": f"/api/v1/sessions/{SESSION}/token",
+        "raw_path": f"/api/v1/sessions/{SESSION}/token".encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+
+async def run(app, headers, expected_status):
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    scope = make_scope(headers)
+    for _ in range(200):  # warm-up
+        await app(dict(scope), receive, send)
+    statuses.clear()
+
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        await app(dict(scope), receive, send)
+    elapsed = time.perf_counter() - started
+
+    assert all(status == expected_status for status in statuses), set(statuses)
+    return REQUESTS / elapsed, elapsed / REQUESTS
+
+
+def main():
+    app = FastAPI()
+    app.include_router(session_api.router, prefix="/api/v1/sessions")
+    session_cache.set_token(SESSION, {
+        "token": "QR_benchmark_token", "timestamp": 1000, "expiry": 1007, "sequence": 42
+    })
+
+    print("=" * 60)
+    print(f"Token Endpoint Throughput ({REQUESTS} requests, one event loop)")
+    print("=" * 60)
+    for name, headers, status in [
+        ("fresh", [], 200),
+        ("304", [(b"if-none-match", b'"42"')], 304),
+    ]:
+        rps, per_request = asyncio.run(run(app, headers, status))
+        verdict = "ok" if rps >= TARGET_RPS else f"below {TARGET_RPS}/s target"
+        print(f"  {name:6}  {rps:10,.0f} req/s   {per_request * 1e6:7.1f} us/request   {verdict}")
+
+
+if __name__ == "__main__":
+    main()
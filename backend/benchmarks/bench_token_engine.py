@@ -0,0 +1,71 @@
+"""
+Benchmark: shared token engine throughput
+
+Measures single and batch generate/validate for each format the engine
+understands, including the legacy IATT_ compatibility validator.
+
+Usage (from backend/):
+    python benchmarks/bench_token_engine.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.utils.token_engine import TokenEngine
+
+BATCH_SIZE = 200  # concurrent sessions on one worker
+ROUNDS = 100
+
+
+def bench_format(version: int):
+    engine = TokenEngine("qr-secret", "jwt-secret", version=version)
+    requests = [
+        {
+            "session_id": f"session-{i:05d}",
+            "class_id": "CSE-3A",
+            "room_id": "BLK-A-201",
+            "subject_id": "CS301",
+            "sequence": i,
+        }
+        for i in range(BATCH_SIZE)
+    ]
+    tokens = [t["token"] for t in engine.generate_many(requests)]
+
+    single_gen = timeit.timeit(lambda: [engine.generate(**r) for r in requests], number=ROUNDS)
+    batch_gen = timeit.timeit(lambda: engine.generate_many(requests), number=ROUNDS)
+    single_val = timeit.timeit(lambda: [engine.validate(t) for t in tokens], number=ROUNDS)
+    batch_val = timeit.timeit(lambda: engine.validate_many(tokens), number=ROUNDS)
+
+    ops = BATCH_SIZE * ROUNDS
+    return ops / single_gen, ops / batch_gen, ops / single_val, ops / batch_val
+
+
+def bench_legacy():
+    # Mint legacy-shaped tokens by signing v1 payloads with the legacy key
+    engine = TokenEngine("qr-secret", "jwt-secret")
+    tokens = []
+    for i in range(BATCH_SIZE):
+        v1 = engine.generate(f"session-{i:05d}", sequence=i)["token"]
+        _, payload_b64, _ = TokenEngine.split_json_token(v1)
+        tokens.append(f"{TokenEngine.LEGACY_PREFIX}_{payload_b64}_{engine._sign_legacy(payload_b64)}")
+
+    seconds = timeit.timeit(lambda: engine.validate_many(tokens), number=ROUNDS)
+    return BATCH_SIZE * ROUNDS / seconds
+
+
+def main():
+    print("=" * 60)
+    print(f"Token Engine Benchmark ({BATCH_SIZE} sessions x {ROUNDS} rounds)")
+    print("=" * 60)
+    print(f"{'Format':10}{'gen':>12}{'gen_many':>12}{'val':>12}{'val_many':>12}  (ops/sec)")
+    for version in (1, 2):
+        results = bench_format(version)
+        print(f"{'v' + str(version):10}" + "".join(f"{r:>12,.0f}" for r in results))
+    print(f"{'legacy':10}{'-':>12}{'-':>12}{'-':>12}{bench_legacy():>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
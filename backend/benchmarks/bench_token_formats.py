@@ -0,0 +1,83 @@
+"""
+Benchmark: QR token format v1 (JSON/base64) vs v2 (compact binary)
+
+Measures generate/validate throughput and the QR version each token needs.
+
+Usage (from backend/):
+    python benchmarks/bench_token_formats.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.utils.token_generator import TokenGenerator
+
+ITERATIONS = 20000
+SESSION_ID = "Xk3v9QpL2mN8rT4wZa1B"  # Firestore auto-ID length
+
+
+def qr_version(data: str):
+    """Smallest QR version (error correction M) that fits the data"""
+    try:
+        import qrcode
+    except ImportError:
+        return None
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M)
+    qr.add_data(data)
+    qr.make(fit=True)
+    return qr.version
+
+
+def bench(version: int):
+    def generate():
+        return TokenGenerator.generate_token(
+            session_id=SESSION_ID,
+            class_id="CSE-3A",
+            room_id="BLK-A-201",
+            subject_id="CS301-DATA-STRUCTURES",
+            sequence=42,
+            version=version
+        )
+
+    token = generate()["token"]
+    assert TokenGenerator.validate_token(token)[0], f"v{version} token failed validation"
+
+    gen_seconds = timeit.timeit(generate, number=ITERATIONS)
+    val_seconds = timeit.timeit(lambda: TokenGenerator.validate_token(token), number=ITERATIONS)
+
+    return {
+        "token_length": len(token),
+        "qr_version": qr_version(token),
+        "generate_per_sec": ITERATIONS / gen_seconds,
+        "validate_per_sec": ITERATIONS / val_seconds,
+    }
+
+
+def main():
+    print("=" * 60)
+    print("QR Token Format Benchmark")
+    print("=" * 60)
+
+    results = {1: bench(1), 2: bench(2)}
+
+    print(f"{'':22}{'v1':>16}{'v2':>16}")
+    for key, label in [
+        ("token_length", "Token length (chars)"),
+        ("qr_version", "QR version (EC M)"),
+        ("generate_per_sec", "Generate ops/sec"),
+        ("validate_per_sec", "Validate ops/sec"),
+    ]:
+        v1, v2 = results[1][key], results[2][key]
+        fmt = (lambda v: f"{v:>16,.0f}") if isinstance(v1, float) else (lambda v: f"{str(v):>16}")
+        print(f"{label:22}{fmt(v1)}{fmt(v2)}")
+
+    print("-" * 60)
+    print(f"Generate speedup: {results[2]['generate_per_sec'] / results[1]['generate_per_sec']:.2f}x")
+    print(f"Validate speedup: {results[2]['validate_per_sec'] / results[1]['validate_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
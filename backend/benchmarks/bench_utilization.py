@@ -0,0 +1,119 @@
+"""
+Benchmark: classroom utilization, on demand vs materialized
+
+A campus of BLOCKS x FLOORS x ROOMS classrooms with SLOTS timetable slots
+per room, most of them held. Times the daily job (compute_day), a block
+and a campus report computed on demand from classrooms, slots, sessions
+and rollups, and the same reports read from the materialized documents,
+cold and through the analytics response cache, on an in-memory Firestore
+that sleeps RTT_MS per round trip.
+
+Usage (from backend/):
+    python benchmarks/bench_utilization.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.analytics_cache import AnalyticsCache
+from app.services.utilization_service import GET_ALL_CHUNK, UtilizationService, build_blocks, build_day
+from tests.unit.fake_firestore import FakeFirestore
+
+BLOCKS, FLOORS, ROOMS, SLOTS = 6, 5, 20, 8
+HELD = 0.85
+RTT_MS = 5
+RUNS = 5
+DAY = '2026-03-02'
+
+
+def build():
+    rng = random.Random(3)
+    db = FakeFirestore()
+    ist = ZoneInfo('Asia/Kolkata')
+    for b in range(BLOCKS):
+        for f in range(FLOORS):
+            for r in range(ROOMS):
+                room_id = f"R{b}{f}{r:02d}"
+                db.seed('classrooms', room_id, {'campus_id': 'C1', 'block_id': f"B{b}", 'floor_id': f"B{b}F{f}",
+                                                'room_number': room_id[1:], 'capacity': rng.choice((40, 60, 120))})
+                for s in range(SLOTS):
+                    slot_id = f"{room_id}_S{s}"
+                    db.seed('timetable_slots', slot_id, {'classroom_id': room_id, 'day': 'Monday',
+                                                         'start_time': f"{9 + s:02d}:00", 'end_time': f"{9 + s:02d}:50",
+                                                         'is_break': False})
+                    if rng.random() < HELD:
+                        started = datetime(2026, 3, 2, 9 + s, rng.randint(0, 5), tzinfo=ist)
+                        db.seed('sessions', slot_id, {'classroom_id': room_id, 'slot_id': slot_id,
+                                                      'created_at': started, 'end_time': started + timedelta(minutes=45)})
+                        db.seed('session_rollups', slot_id, {'present': rng.randint(10, 60)})
+    return db
+
+
+def on_demand(db):
+    """Join everything for one request, as a report would without the daily job"""
+    classrooms = {doc.id: doc.to_dict() for doc in db.collection('classrooms').stream()}
+    slots = {doc.id: doc.to_dict() for doc in db.collection('timetable_slots').where('day', '==', 'Monday').stream()}
+    sessions = {doc.id: doc.to_dict() for doc in db.collection('sessions').stream()}
+    refs = [db.collection('session_rollups').document(session_id) for session_id in sessions]
+    present = {}
+    for offset in range(0, len(refs), GET_ALL_CHUNK):
+        for doc in db.get_all(refs[offset:offset + GET_ALL_CHUNK]):
+            present[doc.id] = doc.to_dict().get('present', 0)
+    return build_blocks(DAY, build_day(DAY, classrooms, slots, sessions, present))['B0']
+
+
+def timed(fn, runs=RUNS):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+
+def main():
+    db = build()
+    rooms = BLOCKS * FLOORS * ROOMS
+    print("=" * 72)
+    print(f"Classroom utilization: {rooms} rooms, {rooms * SLOTS} slots, "
+          f"{len(db.data['sessions'])} sessions, {RTT_MS} ms RTT (median of {RUNS})")
+    print("=" * 72)
+    db.latency_seconds = RTT_MS / 1000
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=600, max_entries=100)
+
+    async def cached_block():
+        return await cache.get('block_utilization', {'block_id': 'B0', 'date': DAY}, [('block', 'B0')],
+                               lambda: UtilizationService.get_block_utilization('B0', DAY))
+
+    with patch.object(UtilizationService, '_get_db', return_value=db), \
+            contextlib.redirect_stdout(io.StringIO()):
+        job_ms = timed(lambda: UtilizationService.compute_day(DAY, db), runs=1)
+        demand_ms = timed(lambda: on_demand(db), runs=3)
+        block_ms = timed(lambda: asyncio.run(UtilizationService.get_block_utilization('B0', DAY)))
+        campus_ms = timed(lambda: asyncio.run(UtilizationService.get_campus_utilization('C1', DAY)))
+        room_ms = timed(lambda: asyncio.run(UtilizationService.get_room_utilization('R0000', 30)))
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(cached_block())
+        cached_ms = timed(lambda: loop.run_until_complete(cached_block()))
+        loop.close()
+
+    print(f"{'daily job (compute_day, all rooms)':<44}{job_ms:>10.1f} ms")
+    print(f"{'block report, joined on demand':<44}{demand_ms:>10.1f} ms")
+    print(f"{'block report, materialized':<44}{block_ms:>10.1f} ms")
+    print(f"{'campus report, materialized':<44}{campus_ms:>10.1f} ms")
+    print(f"{'room report (30 days), materialized':<44}{room_ms:>10.1f} ms")
+    print(f"{'block report, response cache hit':<44}{cached_ms:>10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
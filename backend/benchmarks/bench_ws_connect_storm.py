@@ -0,0 +1,144 @@
+"""
+Benchmark: WebSocket reconnect storm
+
+Reconnects SOCKETS clients spread over SESSIONS sessions at once (a
+SmartBoard reboot or a campus WiFi blip) and measures how long until every
+client has its "connected" message.
+
+- before: the old admission path - a blocking sessions/{id} get and a
+  streamed present-count query on the event loop for every connect
+- after: the real endpoint, admitting from SessionCache (one off-loop
+  read per session, shared by concurrent connects) and an in-memory count
+
+Firestore is simulated with a fixed blocking round trip (FIRESTORE_LATENCY).
+
+Usage (from backend/):
+    python benchmarks/bench_ws_connect_storm.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from fastapi import WebSocketDisconnect
+
+from app.api.v1 import websocket as ws_routes
+from app.services.session_cache import session_cache
+from app.services.websocket_manager import manager
+
+SOCKETS = 2000
+SESSIONS = 200
+FIRESTORE_LATENCY = 0.005
+
+
+class FakeWebSocket:
+    """Client that connects, waits for 'connected', then holds until hangup"""
+
+    def __init__(self, hangup: asyncio.Event):
+        self.query_params = {}
+        self.scope = {}
+        self.hangup = hangup
+        self.connected_at = None
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: str = None):
+        pass
+
+    async def send_text(self, text):
+        if self.connected_at is None and json.loads(text).get("type") == "connected":
+            self.connected_at = time.perf_counter()
+
+    async def receive_text(self):
+        await self.hangup.wait()
+        raise WebSocketDisconnect()
+
+
+class NoBroadcaster:
+    def subscribe(self, session_id):
+        pass
+
+    def unsubscribe(self, session_id):
+        pass
+
+
+def fake_session_read(session_id):
+    time.sleep(FIRESTORE_LATENCY)
+    return {"status": "active"}
+
+
+def fake_count(session_id):
+    time.sleep(FIRESTORE_LATENCY)
+    return 42
+
+
+async def legacy_endpoint(websocket, session_id):
+    """The admission path before the session cache"""
+    session_data = fake_session_read(session_id)  # blocking get on the loop
+    if session_data.get("status") != "active":
+        return
+    await manager.connect(websocket, session_id)
+    count = fake_count(session_id)  # blocking stream count on the loop
+    await manager.send_personal_message({"type": "connected", "total_present": count}, websocket)
+    try:
+        await websocket.receive_text()
+    except WebSocketDisconnect:
+        manager.disconnect(websocket)
+
+
+async def storm(endpoint):
+    session_cache._sessions.clear()
+    session_cache._attendance_counts.clear()
+    hangup = asyncio.Event()
+    sockets = [FakeWebSocket(hangup) for _ in range(SOCKETS)]
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # silence per-connect logging
+        tasks = [
+            asyncio.create_task(endpoint(ws, f"SESSION_{i % SESSIONS}"))
+            for i, ws in enumerate(sockets)
+        ]
+        while any(ws.connected_at is None for ws in sockets):
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+        hangup.set()
+        await asyncio.gather(*tasks)
+
+    latencies = sorted(ws.connected_at - started for ws in sockets)
+    return elapsed, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    try:
+        import uvloop  # what uvicorn[standard] runs in production
+        uvloop.install()
+        loop_name = "uvloop"
+    except ImportError:
+        loop_name = "asyncio"
+
+    session_cache._fetch_session = fake_session_read
+    session_cache._count_present = fake_count
+    ws_routes.broadcaster = NoBroadcaster()
+
+    print("=" * 60)
+    print(f"WebSocket Reconnect Storm ({SOCKETS} sockets, {SESSIONS} sessions, "
+          f"{FIRESTORE_LATENCY * 1000:.0f} ms Firestore, {loop_name})")
+    print("=" * 60)
+    for name, endpoint in [
+        ("before", legacy_endpoint),
+        ("after", ws_routes.websocket_session_endpoint),
+    ]:
+        elapsed, p50, p99 = asyncio.run(storm(endpoint))
+        print(f"  {name:6}  all connected: {elapsed * 1000:9.1f} ms   "
+              f"p50: {p50 * 1000:8.1f} ms   p99: {p99 * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
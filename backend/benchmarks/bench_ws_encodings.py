@@ -0,0 +1,118 @@
+"""
+Benchmark: session WebSocket encodings and permessage-deflate
+
+Replays one class-minute of session traffic (12 qr_update, 20
+attendance_update with student names, 1 session_status) per connection,
+for each encoding with and without permessage-deflate, and reports:
+
+- bytes/msg: average size on the wire, including the WebSocket frame
+  header. Deflate uses websockets' own PerMessageDeflate with uvicorn's
+  settings and context takeover, one compressor per connection, exactly
+  as a server connection keeps it.
+- cpu/broadcast: server CPU to deliver one message to RECIPIENTS sockets:
+  one encode (shared) plus, with deflate, one compression per socket.
+
+Usage (from backend/):
+    python benchmarks/bench_ws_encodings.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from websockets.frames import Frame, Opcode
+
+from app.services import ws_codec
+
+RECIPIENTS = 100
+ROUNDS = 20
+
+
+def traffic():
+    """One minute of broadcasts for a session, in order"""
+    messages = []
+    for tick in range(60):
+        if tick % 5 == 0:
+            messages.append({
+                "type": "qr_update", "qr_token": "QR_eyJzIjoiWGszdjlRcEwybU44clQ0d1phMUIiLCJuIjo" + str(tick),
+                "sequence_number": tick // 5 + 1, "timestamp": 1760000000 + tick, "expiry": 1760000007 + tick
+            })
+        if tick % 3 == 0:
+            n = tick // 3
+            messages.append({
+                "type": "attendance_update", "session_id": "Xk3v9QpL2mN8rT4wZa1B", "total_present": n + 1,
+                "timestamp": 18234.552301 + tick, "latest_student": f"Ananya Ramakrishnan {n}",
+                "students_added": [{"student_id": f"22BCE{1000 + n}", "name": f"Ananya Ramakrishnan {n}"}]
+            })
+    messages.append({
+        "type": "session_status", "session_id": "Xk3v9QpL2mN8rT4wZa1B", "status": "ended",
+        "data": {}, "timestamp": 18300.1
+    })
+    return messages
+
+
+def deflater():
+    """A server connection's compressor, as uvicorn configures it"""
+    return PerMessageDeflate(False, False, 15, 15, {"memLevel": 5})
+
+
+def frame_size(payload_size: int) -> int:
+    """Server frames are unmasked: 2-byte header, 4 or 10 with extended length"""
+    if payload_size < 126:
+        return payload_size + 2
+    if payload_size < 65536:
+        return payload_size + 4
+    return payload_size + 10
+
+
+def wire_frame(frame, extension):
+    is_binary, payload = frame
+    data = payload if is_binary else payload.encode("utf-8")
+    ws_frame = Frame(Opcode.BINARY if is_binary else Opcode.TEXT, data)
+    if extension is not None:
+        ws_frame = extension.encode(ws_frame)
+    return ws_frame.data
+
+
+def bytes_per_message(encoding: str, deflate: bool) -> float:
+    extension = deflater() if deflate else None
+    messages = traffic()
+    total = sum(frame_size(len(wire_frame(ws_codec.encode(m, encoding), extension))) for m in messages)
+    return total / len(messages)
+
+
+def cpu_us_per_broadcast(encoding: str, deflate: bool) -> float:
+    messages = traffic()
+    extensions = [deflater() for _ in range(RECIPIENTS)] if deflate else None
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        for message in messages:
+            frame = ws_codec.encode(message, encoding)
+            if extensions is None:
+                wire_frame(frame, None)
+            else:
+                for extension in extensions:
+                    wire_frame(frame, extension)
+    return (time.process_time() - started) / (ROUNDS * len(messages)) * 1e6
+
+
+def main():
+    encodings = [e for e in (ws_codec.ENCODING_JSON, ws_codec.ENCODING_MSGPACK, ws_codec.ENCODING_MSGPACK_SHORT)
+                 if e in ws_codec.available_encodings()]
+    print("=" * 60)
+    print(f"WebSocket Encodings (one class-minute per connection, {RECIPIENTS} recipients)")
+    print("=" * 60)
+    print(f"{'encoding':>14}{'deflate':>9}{'bytes/msg':>12}{'vs json':>9}{'cpu/broadcast':>16}")
+    baseline = bytes_per_message(ws_codec.ENCODING_JSON, False)
+    for encoding in encodings:
+        for deflate in (False, True):
+            size = bytes_per_message(encoding, deflate)
+            cpu = cpu_us_per_broadcast(encoding, deflate)
+            print(f"{encoding:>14}{'on' if deflate else 'off':>9}{size:>12.1f}"
+                  f"{size / baseline:>9.0%}{cpu:>13.0f} us")
+
+
+if __name__ == "__main__":
+    main()
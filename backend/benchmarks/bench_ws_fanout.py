@@ -0,0 +1,115 @@
+"""
+Benchmark: WebSocket broadcast fan-out
+
+Compares the old sequential broadcast with ConnectionManager's queued
+fan-out (per-connection outbound queues + writer tasks), for a healthy
+session and for one with a single stalled client. "Delivered" is when the
+last healthy client has received the message. Also reports the stalled
+client's queue depth after a burst of updates, which coalescing keeps flat.
+
+Usage (from backend/):
+    python benchmarks/bench_ws_fanout.py
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+os.environ.setdefault("WS_SEND_TIMEOUT_SECONDS", "0.5")
+
+from app.services.websocket_manager import ConnectionManager
+
+SUBSCRIBERS = 1000
+ROUNDS = 20
+MESSAGE = {"type": "qr_update", "qr_token": "Q2" + "0" * 50, "sequence_number": 1, "timestamp": 0}
+
+
+class FakeWebSocket:
+    """Stands in for starlette's WebSocket; records when it last received"""
+
+    def __init__(self, stall: float = 0.0):
+        self.stall = stall
+        self.received_at = 0.0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text):
+        if self.stall:
+            await asyncio.sleep(self.stall)
+        self.received_at = time.perf_counter()
+
+
+async def sequential_broadcast(connections, message):
+    """The previous broadcast_to_session loop"""
+    text = json.dumps(message)
+    for connection in connections:
+        try:
+            await connection.send_text(text)
+        except Exception:
+            pass
+
+
+async def run(stalled: int):
+    manager = ConnectionManager()
+    sockets = [FakeWebSocket() for _ in range(SUBSCRIBERS - stalled)]
+    sockets += [FakeWebSocket(stall=2.0) for _ in range(stalled)]
+    with contextlib.redirect_stdout(io.StringIO()):  # silence per-connect logging
+        for ws in sockets:
+            await manager.connect(ws, "bench")
+    healthy = [ws for ws in sockets if not ws.stall]
+
+    results = {}
+    for name, broadcast in [
+        ("sequential", lambda: sequential_broadcast(list(manager.active_connections["bench"]), MESSAGE)),
+        ("queued", lambda: manager.broadcast_to_session("bench", MESSAGE)),
+    ]:
+        if stalled and name == "sequential":
+            rounds = 1  # each round blocks for the full stall
+        else:
+            rounds = ROUNDS
+        delivered, returned = [], []
+        for _ in range(rounds):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                await broadcast()
+            returned.append(time.perf_counter() - started)
+            while min(ws.received_at for ws in healthy) < started:
+                await asyncio.sleep(0)
+            delivered.append(max(ws.received_at for ws in healthy) - started)
+        results[name] = (sorted(delivered)[len(delivered) // 2] * 1000, sorted(returned)[len(returned) // 2] * 1000)
+
+    backlog = max(len(manager.connections[ws].queue) for ws in sockets if ws in manager.connections)
+    return results, manager.get_fanout_stats("bench"), backlog
+
+
+def main():
+    try:
+        import uvloop  # what uvicorn[standard] runs in production
+        uvloop.install()
+        loop_name = "uvloop"
+    except ImportError:
+        loop_name = "asyncio"
+
+    print("=" * 60)
+    print(f"WebSocket Fan-out Benchmark ({SUBSCRIBERS} subscribers, {loop_name})")
+    print("=" * 60)
+    for stalled in (0, 1):
+        results, stats, backlog = asyncio.run(run(stalled))
+        print(f"\n{'1 stalled client' if stalled else 'All clients healthy'}:")
+        for name, (delivered, returned) in results.items():
+            print(f"  {name:11} delivered to healthy: {delivered:9.2f} ms   call returned: {returned:9.2f} ms")
+        print(f"  deepest outbound queue after {ROUNDS} rounds: {backlog}")
+        print(f"  manager stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
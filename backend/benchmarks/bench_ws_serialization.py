@@ -0,0 +1,68 @@
+"""
+Benchmark: broadcast serialization CPU
+
+"Before" mirrors the previous broadcast: starlette's send_json runs
+json.dumps for every recipient. "After" is ConnectionManager's
+encode-once path (orjson when installed, msgpack for binary clients).
+Reported as CPU microseconds per broadcast message.
+
+Usage (from backend/):
+    python benchmarks/bench_ws_serialization.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services import ws_codec
+
+ROUNDS = 200
+MESSAGE = {
+    "type": "attendance_update",
+    "session_id": "Xk3v9QpL2mN8rT4wZa1B",
+    "total_present": 57,
+    "latest_student": "Ananya Ramakrishnan",
+    "timestamp": 18234.552301,
+}
+
+
+def before(recipients: int):
+    # starlette WebSocket.send_json
+    for _ in range(recipients):
+        json.dumps(MESSAGE, separators=(",", ":"), ensure_ascii=False)
+
+
+def after(recipients: int, encoding: str):
+    frames = {}
+    for _ in range(recipients):
+        frame = frames.get(encoding)
+        if frame is None:
+            frames[encoding] = ws_codec.encode(MESSAGE, encoding)
+
+
+def cpu_us_per_message(fn, *args):
+    started = time.process_time()
+    for _ in range(ROUNDS):
+        fn(*args)
+    return (time.process_time() - started) / ROUNDS * 1e6
+
+
+def main():
+    encodings = sorted(ws_codec.available_encodings())
+    print("=" * 60)
+    print("Broadcast Serialization Benchmark (CPU us per message)")
+    print(f"orjson: {'yes' if ws_codec.orjson else 'no'}   encodings: {', '.join(encodings)}")
+    print("=" * 60)
+    header = f"{'recipients':>10}{'before':>12}" + "".join(f"{'after/' + e:>16}" for e in encodings)
+    print(header)
+    for recipients in (10, 100, 1000):
+        row = f"{recipients:>10}{cpu_us_per_message(before, recipients):>12.1f}"
+        for encoding in encodings:
+            row += f"{cpu_us_per_message(after, recipients, encoding):>16.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Benchmark: role-scoped WebSocket topics
+
+One class-minute of traffic on a worker holding SESSIONS sessions, each
+followed by one SmartBoard and FACULTY_PER_SESSION faculty phones:
+12 qr_update (5 s rotation), ATTENDANCE_UPDATES attendance_update with
+student names, and one session_status.
+
+- all topics: every socket connects without a role (the old behaviour)
+- by role:    sockets declare smartboard/faculty and get only their topics
+
+Reports frames and bytes written to sockets, and server CPU time
+(process time for broadcast + writer tasks).
+
+Usage (from backend/):
+    python benchmarks/bench_ws_topics.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "benchmark-secret")
+
+from app.services.websocket_manager import ConnectionManager
+
+SESSIONS = 200
+FACULTY_PER_SESSION = 2
+QR_UPDATES = 12
+ATTENDANCE_UPDATES = 20
+
+
+class FakeWebSocket:
+    """Counts what the server writes"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000):
+        pass
+
+    async def send_text(self, text):
+        self.frames += 1
+        self.bytes += len(text)
+
+
+def traffic(session_id):
+    """One minute of broadcasts for a session, in order"""
+    messages = []
+    for tick in range(60):
+        if tick % 5 == 0:
+            messages.append({
+                "type": "qr_update", "session_id": session_id, "qr_token": "QR_" + "x" * 120,
+                "sequence_number": tick // 5, "timestamp": 1700000000 + tick, "expires_at": 1700000007 + tick
+            })
+        if tick % 3 == 0:
+            n = tick // 3
+            messages.append({
+                "type": "attendance_update", "session_id": session_id, "total_present": n + 1,
+                "timestamp": 1700000000.0 + tick, "latest_student": f"Student Name {n}",
+                "students_added": [{"student_id": f"STU{n:05d}", "name": f"Student Name {n}"}]
+            })
+    messages.append({"type": "session_status", "session_id": session_id, "status": "ended", "data": {}})
+    return messages
+
+
+async def run(with_roles: bool):
+    manager = ConnectionManager()
+    sockets = []
+    with contextlib.redirect_stdout(io.StringIO()):  # silence per-connect logging
+        for s in range(SESSIONS):
+            for role in ["smartboard"] + ["faculty"] * FACULTY_PER_SESSION:
+                ws = FakeWebSocket()
+                sockets.append(ws)
+                await manager.connect(ws, f"S{s}", role=role if with_roles else None)
+
+    schedule = [traffic(f"S{s}") for s in range(SESSIONS)]
+    cpu_started = time.process_time()
+    for step in range(len(schedule[0])):
+        for s in range(SESSIONS):
+            await manager.broadcast_local(f"S{s}", schedule[s][step])
+        # Let writers drain between messages, as the seconds between them would
+        for _ in range(3):
+            await asyncio.sleep(0)
+    cpu = time.process_time() - cpu_started
+    assert not any(len(record.queue) for record in manager.connections.values())
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ws in sockets:
+            manager.disconnect(ws)
+    return sum(ws.frames for ws in sockets), sum(ws.bytes for ws in sockets), cpu
+
+
+def main():
+    print("=" * 60)
+    print(f"WebSocket Topics ({SESSIONS} sessions x (1 SmartBoard + "
+          f"{FACULTY_PER_SESSION} faculty), one class-minute)")
+    print("=" * 60)
+    results = {}
+    for name, with_roles in [("all topics", False), ("by role", True)]:
+        frames, sent, cpu = asyncio.run(run(with_roles))
+        results[name] = (frames, sent, cpu)
+        print(f"  {name:10}  frames: {frames:7,}   bytes: {sent / 1024:9.1f} KiB   cpu: {cpu * 1000:7.1f} ms")
+
+    base, scoped = results["all topics"], results["by role"]
+    print(f"\n  saved: {1 - scoped[0] / base[0]:.0%} frames, {1 - scoped[1] / base[1]:.0%} bytes, "
+          f"{1 - scoped[2] / base[2]:.0%} cpu")
+
+
+if __name__ == "__main__":
+    main()
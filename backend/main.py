@@ -21,6 +21,12 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting IntelliAttend API Server...")
     print(f"🔥 Database: Cloud Firestore ({settings.FIREBASE_PROJECT_ID})")
     
+    # Connect WebSocket broadcasts to the cross-worker backplane (this also
+    # decides which worker leads, which the scheduler needs)
+    from app.services.websocket_manager import manager
+    await manager.start_backplane()
+    manager.start_heartbeats()
+    
     # Start token rotation scheduler
     from app.services.token_rotation_scheduler import start_token_rotation
     start_token_rotation()
@@ -33,6 +39,11 @@ async def lifespan(app: FastAPI):
     # Stop token rotation scheduler
     from app.services.token_rotation_scheduler import stop_token_rotation
     stop_token_rotation()
+    
+    from app.services.attendance_debouncer import attendance_debouncer
+    await attendance_debouncer.flush_all()
+    await manager.stop_heartbeats()
+    await manager.stop_backplane()
 
 
 # Initialize FastAPI app
@@ -96,5 +107,6 @@ if __name__ == "__main__":
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        ws_per_message_deflate=settings.WS_PER_MESSAGE_DEFLATE
     )
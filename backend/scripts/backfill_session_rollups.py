@@ -0,0 +1,38 @@
+"""
+Backfill session rollups
+Writes a finalized session_rollups document for every ended session,
+counting its student_attendance records once, and files it in the daily
+rollups and every section student's subject stats. Active sessions are
+left to end_session. Use --force once to fill the student stats for
+sessions finalized before they existed (writes are idempotent).
+
+Usage (from backend/):
+    python scripts/backfill_session_rollups.py [--force]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.session_rollup_service import SessionRollupService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill per-session attendance rollups")
+    parser.add_argument("--force", action="store_true", help="recompute rollups that are already finalized")
+    parser.add_argument("--page-size", type=int, default=200, help="sessions read per page")
+    args = parser.parse_args()
+
+    print("📊 Backfilling session rollups...")
+    try:
+        stats = SessionRollupService.backfill(force=args.force, page_size=args.page_size)
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        sys.exit(1)
+    print(f"✅ Done: {stats['written']} written, {stats['skipped']} skipped of {stats['scanned']} sessions")
+
+
+if __name__ == "__main__":
+    main()
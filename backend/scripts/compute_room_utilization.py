@@ -0,0 +1,41 @@
+"""
+Daily classroom utilization
+Joins classrooms, that weekday's timetable slots and the day's sessions
+and writes room_utilization and block_utilization documents. Recomputing
+a day overwrites it, so reruns and backfills are safe. Run it nightly
+after the last session of the day.
+
+Usage (from backend/):
+    python scripts/compute_room_utilization.py [--days 1]
+    python scripts/compute_room_utilization.py --date 2026-03-02
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.utilization_service import UtilizationService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute daily classroom utilization")
+    parser.add_argument("--days", type=int, default=1, help="recompute the last N days, ending yesterday")
+    parser.add_argument("--date", help="compute one day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    print("🏫 Computing classroom utilization...")
+    try:
+        if args.date:
+            results = [UtilizationService.compute_day(args.date)]
+        else:
+            results = UtilizationService.compute_recent(args.days)
+    except Exception as e:
+        print(f"❌ Utilization failed: {e}")
+        sys.exit(1)
+    print(f"✅ Done: {len(results)} days, {sum(result['sessions'] for result in results)} sessions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Nightly proxy-attendance detection
+Runs the batch detectors (shared devices, WiFi bursts, identical GPS
+fixes, impossible timings) over every session that ended in the last
+--hours and stores new findings in proxy_findings for review. Findings
+already stored are left as they are, so overlapping runs are safe.
+
+Usage (from backend/):
+    python scripts/detect_proxy_attendance.py [--hours 24]
+    python scripts/detect_proxy_attendance.py --session SESSION_ID
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.proxy_detection_service import ProxyDetectionService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect proxy attendance patterns")
+    parser.add_argument("--hours", type=int, default=24, help="sessions created in the last N hours")
+    parser.add_argument("--session", help="analyze one session only")
+    args = parser.parse_args()
+
+    print("🕵️ Running proxy-attendance detection...")
+    try:
+        if args.session:
+            stats = {'sessions': 1, 'findings': len(ProxyDetectionService.analyze_blocking(args.session))}
+        else:
+            stats = ProxyDetectionService.run_recent(args.hours)
+    except Exception as e:
+        print(f"❌ Detection failed: {e}")
+        sys.exit(1)
+    print(f"✅ Done: {stats['sessions']} sessions analyzed, {stats['findings']} findings")
+
+
+if __name__ == "__main__":
+    main()
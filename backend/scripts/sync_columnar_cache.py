@@ -0,0 +1,58 @@
+"""
+Sync the columnar analytics cache
+Copies attendance, sessions and faculty attendance added since the last
+run into the local Parquet store (ANALYTICS_CACHE_DIR), then optionally
+answers a report from it.
+
+Usage (from backend/):
+    python scripts/sync_columnar_cache.py
+    python scripts/sync_columnar_cache.py --section SEC_A --days 180
+    python scripts/sync_columnar_cache.py --subject CS301 --days 120 --no-sync
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.columnar_store import ColumnarStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync and query the columnar analytics cache")
+    parser.add_argument("--root", help="store directory (default: ANALYTICS_CACHE_DIR)")
+    parser.add_argument("--no-sync", action="store_true", help="query the store as it is")
+    parser.add_argument("--section", help="section trends for this section")
+    parser.add_argument("--subject", help="subject attendance for this subject (with --section to filter)")
+    parser.add_argument("--faculty", help="teaching summary for this faculty member")
+    parser.add_argument("--days", type=int, default=30)
+    args = parser.parse_args()
+
+    store = ColumnarStore(args.root)
+    if not args.no_sync:
+        print("📦 Syncing columnar analytics cache...")
+        try:
+            added = store.sync()
+        except Exception as e:
+            print(f"❌ Sync failed: {e}")
+            sys.exit(1)
+        print(f"✅ Synced: {sum(added.values())} new rows, {store.compact()} partitions compacted")
+
+    started = time.perf_counter()
+    if args.subject:
+        report = store.subject_attendance(args.subject, args.section, args.days)
+    elif args.section:
+        report = store.section_trends(args.section, args.days)
+    elif args.faculty:
+        report = store.faculty_summary(args.faculty, args.days)
+    else:
+        return
+    print(json.dumps(report, indent=2, default=str))
+    print(f"⏱️  {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+import os
+
+# Settings requires JWT_SECRET; provide a test value when no .env is present
+os.environ.setdefault("JWT_SECRET", "test-secret")
@@ -0,0 +1,401 @@
+"""
+In-memory stand-in for the firebase_admin Firestore client
+
+Covers what the services use: collection/document refs, where (positional
+==, !=, <, <=, >, >=, in, array_contains), select, order_by, limit,
+start_after, stream/get, count aggregations, get_all, batches and the
+SERVER_TIMESTAMP / Increment / Maximum / Minimum / ArrayUnion transforms.
+
+Every call that would be a network round trip is counted in
+``round_trips``, and billed document reads in ``reads`` (one per document
+returned, at least one per query; one per 1000 entries for a count).
+Set ``latency_seconds`` to make each round trip sleep like a network call.
+"""
+import bisect
+import copy
+import itertools
+import math
+import time
+from datetime import datetime, timezone
+
+from google.cloud.firestore_v1 import transforms
+
+_ids = itertools.count(1)
+
+
+def _get_path(data, path):
+    for part in path.split('.'):
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def _resolve(current, value):
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, transforms.Increment):
+        return (current or 0) + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if current is None else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if current is None else min(current, value.value)
+    if isinstance(value, transforms.ArrayUnion):
+        merged = list(current or [])
+        merged.extend(item for item in value.values if item not in merged)
+        return merged
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        return {key: _resolve(base.get(key), item) for key, item in value.items()}
+    return copy.deepcopy(value)
+
+
+def _set_path(data, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = _resolve(data.get(parts[-1]), value)
+
+
+def _merge(target, updates):
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        else:
+            target[key] = _resolve(target.get(key), value)
+
+
+def _field(doc_id, data, path):
+    return doc_id if path == '__name__' else _get_path(data, path)
+
+
+def _hashable(value):
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return repr(value)
+
+
+def _order_key(value):
+    return (value is not None, value)
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return _get_path(self._data or {}, field)
+
+
+class FakeDocumentRef:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f"{self._collection}/{self.id}"
+
+    def _store(self):
+        self._db._touch(self._collection)
+        return self._db.data.setdefault(self._collection, {})
+
+    def _snapshot(self):
+        return FakeSnapshot(self, self._db.data.get(self._collection, {}).get(self.id))
+
+    def get(self, *args, **kwargs):
+        self._db._round_trip(reads=1)
+        return self._snapshot()
+
+    def _apply_set(self, data, merge=False):
+        store = self._store()
+        if merge and self.id in store:
+            _merge(store[self.id], data)
+        else:
+            store[self.id] = _resolve({}, data)
+
+    def _apply_update(self, data):
+        store = self._store()
+        if self.id not in store:
+            raise KeyError(f"No document to update: {self.path}")
+        for path, value in data.items():
+            _set_path(store[self.id], path, value)
+
+    def set(self, data, merge=False):
+        self._db._round_trip(writes=1)
+        self._apply_set(data, merge)
+
+    def update(self, data):
+        self._db._round_trip(writes=1)
+        self._apply_update(data)
+
+    def delete(self):
+        self._db._round_trip(writes=1)
+        self._store().pop(self.id, None)
+
+
+class FakeAggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class FakeAggregation:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, *args, **kwargs):
+        count = len(self._query._matching())
+        self._query._db._round_trip(reads=max(1, math.ceil(count / 1000)))
+        return [[FakeAggregationResult(self._alias, count)]]
+
+
+class FakeQuery:
+    DESCENDING = "DESCENDING"
+    ASCENDING = "ASCENDING"
+
+    def __init__(self, db, collection, filters=(), orders=(), limit=None, start_after=None, fields=None):
+        self._db = db
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._start_after = start_after
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, orders=self._orders, limit=self._limit,
+                     start_after=self._start_after, fields=self._fields)
+        state.update(changes)
+        return FakeQuery(self._db, self._collection, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(start_after=document_fields_or_snapshot)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def count(self, alias=None):
+        return FakeAggregation(self, alias)
+
+    @staticmethod
+    def _matches(data, field, op, value):
+        actual = _get_path(data, field)
+        if op == '==':
+            return actual == value
+        if op == '!=':
+            return actual is not None and actual != value
+        if op == 'in':
+            return actual in value
+        if op == 'not-in':
+            return actual is not None and actual not in value
+        if op == 'array_contains':
+            return isinstance(actual, list) and value in actual
+        if op == 'array_contains_any':
+            return isinstance(actual, list) and any(item in actual for item in value)
+        if actual is None:
+            return False
+        return {'<': actual < value, '<=': actual <= value, '>': actual > value, '>=': actual >= value}[op]
+
+    def _matching(self):
+        for field, op, value in self._filters:
+            if op in ('in', 'not-in', 'array_contains_any') and len(value) > 30:
+                raise ValueError(f"'{op}' supports up to 30 values, got {len(value)}")
+        cache_key = (self._collection, repr(self._filters), self._orders)
+        cached = self._db._results.get(cache_key)
+        if cached is None or cached[0] != self._db._versions.get(self._collection, 0):
+            cached = self._db._results[cache_key] = (self._db._versions.get(self._collection, 0),
+                                                     self._sorted())
+        docs, keys = cached[1]
+        if self._start_after is not None:
+            docs = self._after_cursor(docs, keys)
+        if self._limit is not None:
+            docs = docs[:self._limit]
+        return docs
+
+    def _sorted(self):
+        """Filtered and ordered matches, plus bisect keys when every order is ascending"""
+        store = self._db.data.get(self._collection, {})
+        candidates = store.items()
+        for field, op, value in self._filters:
+            if op == '==' and field != '__name__':
+                ids = self._db._index(self._collection, field).get(_hashable(value), ())
+                candidates = [(doc_id, store[doc_id]) for doc_id in ids]
+                break
+        docs = [
+            (doc_id, data) for doc_id, data in candidates
+            if all(self._matches(data, *f) for f in self._filters)
+        ]
+        orders = self._orders or ()
+        for field, direction in reversed(orders):
+            docs.sort(key=lambda item: _order_key(_field(item[0], item[1], field)), reverse=direction == self.DESCENDING)
+        if not orders:
+            docs.sort(key=lambda item: item[0])
+        keys = None
+        if all(direction != self.DESCENDING for _, direction in orders):
+            keys = [tuple(_order_key(_field(doc_id, data, field)) for field, _ in orders) + (doc_id,)
+                    for doc_id, data in docs]
+        return docs, keys
+
+    def _after_cursor(self, docs, keys=None):
+        cursor = self._start_after
+        if isinstance(cursor, FakeSnapshot):
+            values = [_field(cursor.id, cursor._data, field) for field, _ in self._orders]
+            cursor_id = cursor.id
+        elif isinstance(cursor, dict):
+            values = [cursor.get(field) for field, _ in self._orders]
+            cursor_id = cursor.get('__name__')
+        else:
+            values = list(cursor)
+            cursor_id = values[len(self._orders)] if len(values) > len(self._orders) else None
+            values = values[:len(self._orders)]
+
+        names = [value for (field, _), value in zip(self._orders, values) if field == '__name__']
+        if cursor_id is None and names:
+            cursor_id = names[0]
+        if keys is not None and cursor_id is not None:
+            cursor_key = tuple(_order_key(value) for value in values) + (cursor_id,)
+            return docs[bisect.bisect_right(keys, cursor_key):]
+
+        def after(item):
+            doc_id, data = item
+            for (field, direction), cursor_value in zip(self._orders, values):
+                key, other = _order_key(_field(doc_id, data, field)), _order_key(cursor_value)
+                if key != other:
+                    return key > other if direction != self.DESCENDING else key < other
+            return cursor_id is not None and doc_id > cursor_id
+
+        return [item for item in docs if after(item)]
+
+    def stream(self, *args, **kwargs):
+        docs = self._matching()
+        self._db._round_trip(reads=max(1, len(docs)))
+        snapshots = []
+        for doc_id, data in docs:
+            if self._fields is not None:
+                projected = {}
+                for field in self._fields:
+                    if _get_path(data, field) is not None:
+                        _set_path(projected, field, _get_path(data, field))
+                data = projected
+            snapshots.append(FakeSnapshot(FakeDocumentRef(self._db, self._collection, doc_id), copy.deepcopy(data)))
+        return iter(snapshots)
+
+    def get(self, *args, **kwargs):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, name):
+        super().__init__(db, name)
+        self.id = name
+
+    def document(self, doc_id=None):
+        return FakeDocumentRef(self._db, self._collection, doc_id or f"auto{next(_ids):08d}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self):
+        return [FakeDocumentRef(self._db, self._collection, doc_id) for doc_id in self._db.data.get(self._collection, {})]
+
+
+class FakeBatch:
+    def __init__(self, db):
+        self._db = db
+        self._ops = []
+
+    def set(self, ref, data, merge=False):
+        self._ops.append(lambda: ref._apply_set(data, merge))
+
+    def update(self, ref, data):
+        self._ops.append(lambda: ref._apply_update(data))
+
+    def delete(self, ref):
+        self._ops.append(lambda: ref._store().pop(ref.id, None))
+
+    def commit(self):
+        self._db._round_trip(writes=len(self._ops))
+        for op in self._ops:
+            op()
+        self._ops = []
+
+
+class FakeFirestore:
+    def __init__(self):
+        # collection -> doc_id -> data
+        self.data = {}
+        self.round_trips = 0
+        self.reads = 0
+        self.writes = 0
+        self.latency_seconds = 0.0
+        # (collection, field) -> value -> doc IDs, rebuilt after writes
+        self._indexes = {}
+        self._versions = {}
+        # (collection, filters, orders) -> (version, (docs, keys)), rebuilt after writes
+        self._results = {}
+
+    def _touch(self, collection):
+        self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def _index(self, collection, field):
+        version = self._versions.get(collection, 0)
+        cached = self._indexes.get((collection, field))
+        if cached is None or cached[0] != version:
+            index = {}
+            for doc_id, data in self.data.get(collection, {}).items():
+                index.setdefault(_hashable(_get_path(data, field)), []).append(doc_id)
+            cached = self._indexes[(collection, field)] = (version, index)
+        return cached[1]
+
+    def _round_trip(self, reads=0, writes=0):
+        self.round_trips += 1
+        self.reads += reads
+        self.writes += writes
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def get_all(self, references, *args, **kwargs):
+        references = list(references)
+        self._round_trip(reads=len(references))
+        return [ref._snapshot() for ref in references]
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def seed(self, collection, doc_id, data):
+        """Insert a document without counting it"""
+        self._touch(collection)
+        self.data.setdefault(collection, {})[doc_id] = copy.deepcopy(data)
+
+    def reset_counters(self):
+        self.round_trips = self.reads = self.writes = 0
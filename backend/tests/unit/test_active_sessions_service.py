@@ -0,0 +1,59 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.services.active_sessions_service import BATCH_LIMIT, ActiveSessionsService
+from tests.unit.fake_firestore import FakeBatch, FakeFirestore
+
+SESSIONS = 1200
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    for n in range(SESSIONS):
+        fake.seed(ActiveSessionsService.COLLECTION_NAME, f"S{n:04d}", {
+            'status': 'active', 'sequence': 0, 'classId': 'SEC', 'roomId': 'R1', 'subjectId': 'SUB'
+        })
+    with patch.object(ActiveSessionsService, '_get_db', return_value=fake):
+        yield fake
+
+
+def _session_ids():
+    return [f"S{n:04d}" for n in range(SESSIONS)]
+
+
+@pytest.mark.asyncio
+async def test_rotation_commits_in_batches_of_500(db):
+    sizes = []
+    commit = FakeBatch.commit
+
+    def record(batch):
+        sizes.append(len(batch._ops))
+        commit(batch)
+
+    with patch.object(FakeBatch, 'commit', record):
+        rotated = await ActiveSessionsService.rotate_tokens(_session_ids())
+
+    assert sizes == [BATCH_LIMIT, BATCH_LIMIT, SESSIONS - 2 * BATCH_LIMIT]
+    assert len(rotated) == SESSIONS
+    assert {doc['sequence'] for doc in db.data[ActiveSessionsService.COLLECTION_NAME].values()} == {1}
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_does_not_stop_the_others(db):
+    commit, calls = FakeBatch.commit, []
+
+    def flaky(batch):
+        calls.append(batch)
+        if len(calls) == 2:
+            raise RuntimeError("deadline exceeded")
+        commit(batch)
+
+    with patch.object(FakeBatch, 'commit', flaky):
+        rotated = await ActiveSessionsService.rotate_tokens(_session_ids())
+
+    assert len(rotated) == SESSIONS - BATCH_LIMIT
+    stored = db.data[ActiveSessionsService.COLLECTION_NAME]
+    assert sum(1 for doc in stored.values() if doc['sequence'] == 1) == SESSIONS - BATCH_LIMIT
+    assert all(stored[session_id]['sequence'] == 0 for session_id in _session_ids() if session_id not in rotated)
@@ -0,0 +1,105 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from app.services.analytics_cache import AnalyticsCache, session_tags
+from app.services.session_cache import session_cache
+
+SESSION = {'faculty_id': 'F1', 'section_id': 'SEC', 'subject_id': 'SUB'}
+
+
+class Computation:
+    def __init__(self):
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        return {'version': self.calls}
+
+
+@pytest.mark.asyncio
+async def test_repeat_requests_hit_until_ttl():
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=60)
+    compute = Computation()
+
+    for _ in range(3):
+        assert await cache.get('section_trends', {'section_id': 'SEC', 'days': 30}, [('section', 'SEC')],
+                               compute) == {'version': 1}
+    await cache.get('section_trends', {'section_id': 'SEC', 'days': 90}, [('section', 'SEC')], compute)
+
+    assert compute.calls == 2
+    stats = cache.get_stats()['endpoints']['section_trends']
+    assert (stats['hits'], stats['misses'], stats['hit_ratio']) == (2, 2, 0.5)
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_served_stale_while_revalidating():
+    cache = AnalyticsCache(ttl_seconds=0, stale_seconds=60)
+    compute = Computation()
+    await cache.get('faculty_summary', {'faculty_id': 'F1'}, [('faculty', 'F1')], compute)
+
+    compute.release = asyncio.Event()
+    assert await cache.get('faculty_summary', {'faculty_id': 'F1'}, [('faculty', 'F1')], compute) == {'version': 1}
+    assert await cache.get('faculty_summary', {'faculty_id': 'F1'}, [('faculty', 'F1')], compute) == {'version': 1}
+    compute.release.set()
+    await asyncio.sleep(0)
+
+    assert compute.calls == 2  # one background refresh for both stale hits
+    assert cache._entries[('faculty_summary', (('faculty_id', 'F1'),))].value == {'version': 2}
+    assert cache.get_stats()['endpoints']['faculty_summary']['stale_hits'] == 2
+
+
+@pytest.mark.asyncio
+async def test_session_change_invalidates_only_affected_entries():
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=60)
+    trends, other = Computation(), Computation()
+    await cache.get('section_trends', {'section_id': 'SEC'}, [('section', 'SEC')], trends)
+    await cache.get('section_trends', {'section_id': 'OTHER'}, [('section', 'OTHER')], other)
+
+    with patch.object(session_cache, 'peek_session', return_value=SESSION):
+        await cache.on_session_change('S1', {'type': 'attendance_update', 'total_present': 3})
+
+    # Still instant, and refreshed behind the response
+    assert await cache.get('section_trends', {'section_id': 'SEC'}, [('section', 'SEC')], trends) == {'version': 1}
+    await asyncio.sleep(0)
+    assert await cache.get('section_trends', {'section_id': 'SEC'}, [('section', 'SEC')], trends) == {'version': 2}
+    await cache.get('section_trends', {'section_id': 'OTHER'}, [('section', 'OTHER')], other)
+    assert other.calls == 1
+    assert cache.get_stats()['endpoints']['section_trends']['invalidations'] == 1
+
+
+@pytest.mark.asyncio
+async def test_invalidation_during_computation_keeps_result_stale():
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=60)
+    compute = Computation()
+    compute.release = asyncio.Event()
+
+    first = asyncio.ensure_future(cache.get('session_report', {'session_id': 'S1'}, [('session', 'S1')], compute))
+    second = asyncio.ensure_future(cache.get('session_report', {'session_id': 'S1'}, [('session', 'S1')], compute))
+    await asyncio.sleep(0)
+    cache.invalidate(session_tags('S1', SESSION))
+    compute.release.set()
+    assert await first == await second == {'version': 1}
+    assert compute.calls == 1  # concurrent misses share one computation
+
+    assert cache._entries[('session_report', (('session_id', 'S1'),))].stale
+
+
+@pytest.mark.asyncio
+async def test_errors_are_not_cached_and_lru_is_bounded():
+    cache = AnalyticsCache(ttl_seconds=60, stale_seconds=60, max_entries=2)
+
+    async def missing():
+        return {'error': 'Section not found'}
+
+    await cache.get('section_trends', {'section_id': 'NOPE'}, [('section', 'NOPE')], missing)
+    assert cache.get_stats()['entries'] == 0 and ('section', 'NOPE') not in cache._tags
+
+    for section in ('A', 'B', 'C'):
+        await cache.get('section_trends', {'section_id': section}, [('section', section)], Computation())
+    assert [key[1][0][1] for key in cache._entries] == ['B', 'C']
+    assert ('section', 'A') not in cache._tags
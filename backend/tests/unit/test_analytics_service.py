@@ -0,0 +1,207 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import analytics as analytics_routes
+from app.services.analytics_service import AnalyticsService
+from app.services.session_rollup_service import SessionRollupService
+from tests.unit.fake_firestore import FakeFirestore
+
+SECTION = "SEC_A"
+
+
+def _seed(db, sessions=40, students=25):
+    """
+    Sessions alternate between two subjects, one every 5 hours, newest
+    first; S000 and S001 are still active. Student i attends session s when
+    (i + s) % 5 != 0, and student 1 is always suspicious.
+    """
+    now = datetime.now(timezone.utc)
+    db.seed('sections', SECTION, {'total_students': students})
+    db.seed('sections', 'SEC_B', {'total_students': 10})
+    for s in range(sessions):
+        session_id = f"S{s:03d}"
+        db.seed('sessions', session_id, {
+            'faculty_id': 'F1', 'subject_id': f"SUB{s % 2}", 'section_id': SECTION,
+            'created_at': now - timedelta(hours=5 * s), 'status': 'active' if s < 2 else 'ended'
+        })
+        for i in range(students):
+            if (i + s) % 5 == 0:
+                continue
+            db.seed('student_attendance', f"{session_id}_{i}", {
+                'session_id': session_id, 'student_id': f"ST{i}", 'section_id': SECTION,
+                'status': 'suspicious' if i == 1 else 'present', 'timestamp': now
+            })
+    for s in range(30):
+        db.seed('faculty_attendance', f"FA{s}", {'faculty_id': 'F1', 'timestamp': now - timedelta(days=s)})
+    db.seed('sessions', 'OLD', {'faculty_id': 'F1', 'subject_id': 'SUB0', 'section_id': SECTION,
+                                'created_at': now - timedelta(days=90), 'status': 'ended'})
+    return db
+
+
+def _expected_present(s, students=25):
+    return sum(1 for i in range(students) if (i + s) % 5 != 0 and i != 1)
+
+
+@pytest.fixture
+def db():
+    """Sessions without rollups: analytics falls back to count aggregations"""
+    fake = _seed(FakeFirestore())
+    with patch.object(AnalyticsService, '_get_db', return_value=fake), \
+         patch.object(SessionRollupService, '_get_db', return_value=fake):
+        yield fake
+
+
+@pytest.fixture
+def rolled_up(db):
+    """Same data with every ended session backfilled into session and daily rollups"""
+    stats = SessionRollupService.backfill(page_size=16)
+    assert stats == {'scanned': 41, 'written': 39, 'skipped': 2}
+    db.reset_counters()
+    return db
+
+
+@pytest.mark.asyncio
+async def test_faculty_summary_counts_with_chunked_aggregations(db):
+    result = await AnalyticsService.get_faculty_summary('F1', days=30)
+
+    total = sum(_expected_present(s) for s in range(40))
+    assert result['total_sessions'] == 40
+    assert result['total_students_taught'] == total
+    assert result['unique_subjects'] == 2
+    assert result['faculty_attendance_rate'] == 75.0
+    # sessions + rollups + faculty attendance count + 2 'in' chunks of <= 30 sessions
+    assert result['query_stats'] == {'round_trips': 5, 'documents_read': 83}
+    assert result['query_stats']['round_trips'] == db.round_trips
+    assert result['query_stats']['documents_read'] == db.reads
+
+
+@pytest.mark.asyncio
+async def test_faculty_summary_from_rollups(rolled_up):
+    result = await AnalyticsService.get_faculty_summary('F1', days=30)
+
+    assert result['total_students_taught'] == sum(_expected_present(s) for s in range(40))
+    # sessions + rollups + faculty count + one 'in' count for the 2 active sessions
+    assert result['query_stats'] == {'round_trips': 4, 'documents_read': 82}
+
+
+@pytest.mark.asyncio
+async def test_subject_attendance_reads_daily_rollups(rolled_up):
+    result = await AnalyticsService.get_subject_attendance('SUB0', days=30)
+
+    assert result['total_sessions'] == 20
+    by_id = {row['session_id']: row for row in result['sessions']}
+    assert by_id['S004']['present'] == _expected_present(4)
+    assert by_id['S004']['expected'] == 25
+    assert by_id['S000']['present'] == _expected_present(0)  # active: counted live
+    assert result['sessions'][0]['session_id'] == 'S000'
+    present = sum(_expected_present(s) for s in range(0, 40, 2))
+    assert result['overall_attendance'] == round(present / (20 * 25) * 100, 2)
+    # daily rollups + active sessions + window count + its rollup + its count + its section
+    assert result['query_stats']['round_trips'] == 6
+    assert result['query_stats']['documents_read'] < 20
+
+
+@pytest.mark.asyncio
+async def test_section_trends_from_daily_rollups(rolled_up):
+    result = await AnalyticsService.get_section_trends(SECTION, days=30)
+
+    assert result['total_students'] == 25
+    assert len(result['daily_trends']) == 40
+    subjects = {row['subject_id']: row for row in result['subject_wise']}
+    present = sum(_expected_present(s) for s in range(0, 40, 2))
+    assert subjects['SUB0']['average_attendance'] == round(present / (20 * 25) * 100, 2)
+    # 40 sessions over ~9 days: one document per day, whatever the session count
+    assert result['query_stats']['documents_read'] <= 2 + 10 + 2 + 2 + 1
+
+
+@pytest.mark.asyncio
+async def test_section_trends_missing_section(db):
+    assert await AnalyticsService.get_section_trends('NOPE') == {'error': 'Section not found'}
+
+
+@pytest.mark.asyncio
+async def test_section_rollup_merges_days_into_weeks_and_months(rolled_up):
+    days = await AnalyticsService.get_section_rollup(SECTION, days=120, period='day')
+    weeks = await AnalyticsService.get_section_rollup(SECTION, days=120, period='week')
+    months = await AnalyticsService.get_section_rollup(SECTION, days=120, period='month', subject_id='SUB1')
+
+    ended = range(2, 40)
+    assert sum(b['sessions'] for b in days['buckets']) == len(ended) + 1  # + OLD
+    assert sum(b['present'] for b in weeks['buckets']) == sum(_expected_present(s) for s in ended)
+    assert sum(b['sessions'] for b in months['buckets']) == len([s for s in ended if s % 2])
+    assert all(b['period_start'].endswith('-01') for b in months['buckets'])
+    assert weeks['sessions_without_daily_rollup'] == 0
+    # daily rollups + window and active session counts
+    assert weeks['query_stats']['round_trips'] == 3
+
+
+@pytest.mark.asyncio
+async def test_ended_sessions_without_daily_rollup_are_not_dropped(rolled_up):
+    # Ended before daily rollups were backfilled / expired without end_session
+    now = datetime.now(timezone.utc)
+    for s, present in ((1, 7), (2, 9)):
+        rolled_up.seed('sessions', f"GAP{s}", {'faculty_id': 'F1', 'subject_id': 'SUB0', 'section_id': SECTION,
+                                               'created_at': now - timedelta(hours=5 * s + 1), 'status': 'ended'})
+        for i in range(present):
+            rolled_up.seed('student_attendance', f"GAP{s}_{i}", {'session_id': f"GAP{s}", 'student_id': f"ST{i}",
+                                                               'section_id': SECTION, 'status': 'present'})
+
+    trends = await AnalyticsService.get_section_trends(SECTION, days=30)
+    assert len(trends['daily_trends']) == 42
+    subject = await AnalyticsService.get_subject_attendance('SUB0', days=30)
+    by_id = {row['session_id']: row['present'] for row in subject['sessions']}
+    assert (by_id['GAP1'], by_id['GAP2']) == (7, 9)
+
+    weeks = await AnalyticsService.get_section_rollup(SECTION, days=120, period='week')
+    assert weeks['sessions_without_daily_rollup'] == 2
+
+
+@pytest.mark.asyncio
+async def test_session_report(db):
+    result = await AnalyticsService.get_session_report('S002')
+
+    assert result['statistics']['present'] == _expected_present(2)
+    assert result['statistics']['suspicious'] == 1
+    assert result['statistics']['expected_students'] == 25
+    assert len(result['students']) == 20
+    assert result['statistics']['finalized'] is False
+    assert result['next_cursor'] is None
+    # session + rollups + page + records (no rollup yet) + section
+    assert result['query_stats']['round_trips'] == 5
+    assert await AnalyticsService.get_session_report('NOPE') == {'error': 'Session not found'}
+
+    with pytest.raises(HTTPException) as bad_cursor:
+        await analytics_routes.get_session_report('S002', limit=20, cursor='not-a-cursor')
+    assert bad_cursor.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_session_report_pages_with_cursor(rolled_up):
+    students, cursor, pages = [], None, 0
+    while True:
+        result = await AnalyticsService.get_session_report('S002', limit=7, cursor=cursor)
+        pages += 1
+        students += [student['student_id'] for student in result['students']]
+        assert result['statistics']['present'] == _expected_present(2)
+        assert result['query_stats']['round_trips'] == 3
+        cursor = result['next_cursor']
+        if cursor is None:
+            break
+
+    # Every record shares one timestamp, so the document ID breaks the ties
+    assert pages == 3
+    assert len(students) == len(set(students)) == 20
+
+
+@pytest.mark.asyncio
+async def test_session_report_uses_finalized_rollup(rolled_up):
+    rolled_up.data['session_rollups']['S002']['expected'] = 30  # frozen at end, section later grew/shrank
+    result = await AnalyticsService.get_session_report('S002')
+
+    assert result['statistics']['expected_students'] == 30
+    assert result['statistics']['present'] == _expected_present(2)
+    assert result['statistics']['finalized'] is True
+    assert result['query_stats']['round_trips'] == 3
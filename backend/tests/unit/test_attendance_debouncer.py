@@ -0,0 +1,60 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.attendance_debouncer import AttendanceDebouncer
+from app.services.websocket_manager import manager
+
+
+@pytest.fixture
+def debouncer():
+    debouncer = AttendanceDebouncer(window_ms=50)
+    with patch.object(manager, "send_attendance_update", AsyncMock()) as send:
+        debouncer.send = send
+        yield debouncer
+    manager.remove_delivery_hook("session_status", debouncer._on_session_status)
+
+
+@pytest.mark.asyncio
+async def test_burst_sends_first_immediately_then_one_merged_update(debouncer):
+    for n in range(1, 61):
+        await debouncer.update("D1", n, f"Student {n}", f"s{n}")
+
+    assert debouncer.send.await_count == 1
+    assert debouncer.send.await_args.args[:2] == ("D1", 1)
+
+    await asyncio.sleep(0.1)
+
+    assert debouncer.send.await_count == 2
+    args, kwargs = debouncer.send.await_args
+    assert args == ("D1", 60, "Student 60")
+    assert [s["student_id"] for s in kwargs["students_added"]] == [f"s{n}" for n in range(2, 61)]
+
+    stats = debouncer.get_stats("D1")
+    assert stats["session"] == {"updates": 60, "messages": 2, "messages_saved": 58, "pending": False}
+
+
+@pytest.mark.asyncio
+async def test_update_after_quiet_window_goes_out_immediately(debouncer):
+    await debouncer.update("D2", 1, "A", "a")
+    await asyncio.sleep(0.07)
+    await debouncer.update("D2", 2, "B", "b")
+
+    assert debouncer.send.await_count == 2
+    assert debouncer.send.await_args.args[:2] == ("D2", 2)
+
+
+@pytest.mark.asyncio
+async def test_session_end_flushes_pending_update(debouncer):
+    await debouncer.update("D3", 1, "A", "a")
+    await debouncer.update("D3", 2, "B", "b")
+    assert debouncer.send.await_count == 1
+
+    await debouncer._on_session_status("D3", {"status": "ended"})
+
+    assert debouncer.send.await_count == 2
+    assert debouncer.send.await_args.args[:2] == ("D3", 2)
+    assert debouncer.get_stats("D3").get("session") is None
+    await asyncio.sleep(0.07)
+    assert debouncer.send.await_count == 2
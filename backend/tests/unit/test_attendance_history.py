@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import attendance as attendance_routes
+from app.services.attendance_service import AttendanceService
+from app.utils.cursor import decode_cursor, encode_cursor
+from tests.unit.fake_firestore import FakeFirestore
+
+NOW = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    for n in range(45):
+        fake.seed('student_attendance', f"A{n:02d}", {
+            'session_id': f"S{n}", 'student_id': 'ST1', 'subject_id': 'SUB', 'status': 'present',
+            # Pairs share a timestamp
+            'timestamp': NOW + timedelta(minutes=n // 2),
+            'verification_data': {'gps_verified': True, 'location_provided': {'gps': {'latitude': 1.0}}}
+        })
+    fake.seed('student_attendance', 'OTHER', {'student_id': 'ST2', 'timestamp': NOW})
+    with patch.object(AttendanceService, '_get_db', return_value=fake):
+        yield fake
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(NOW, 'A01')) == [NOW, 'A01']
+    with pytest.raises(ValueError):
+        decode_cursor('bm90LWpzb24')
+
+
+@pytest.mark.asyncio
+async def test_history_pages_newest_first(db):
+    ids, cursor = [], None
+    db.reset_counters()
+    while True:
+        result = await AttendanceService.get_student_history('ST1', limit=20, cursor=cursor)
+        ids += [record['attendance_id'] for record in result['records']]
+        cursor = result['next_cursor']
+        if cursor is None:
+            break
+
+    assert ids == [f"A{n:02d}" for n in reversed(range(45))]
+    assert db.round_trips == 3
+    assert result['records'][0]['verification'] == {'gps_verified': True}  # raw location not fetched
+
+
+@pytest.mark.asyncio
+async def test_history_rejects_bad_input(db):
+    with pytest.raises(HTTPException) as bad_cursor:
+        await attendance_routes.get_student_attendance_history('ST1', cursor='%%%')
+    with pytest.raises(HTTPException) as bad_limit:
+        await AttendanceService.get_student_history('ST1', limit=0)
+    assert bad_cursor.value.status_code == bad_limit.value.status_code == 400
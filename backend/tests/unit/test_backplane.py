@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+from app.services import backplane
+from app.services.backplane import Backplane, InProcessBackplane, UnixSocketBackplane, create_backplane
+
+
+class Recorder:
+    def __init__(self):
+        self.messages = []
+        self.arrived = asyncio.Event()
+
+    async def deliver(self, session_id, message):
+        self.messages.append((session_id, message))
+        self.arrived.set()
+
+
+@pytest.mark.asyncio
+async def test_in_process_backplane_delivers_locally():
+    recorder = Recorder()
+    backplane = InProcessBackplane()
+    await backplane.start(recorder.deliver)
+
+    await backplane.publish("S1", {"type": "attendance_update"})
+
+    assert recorder.messages == [("S1", {"type": "attendance_update"})]
+
+
+@pytest.mark.asyncio
+async def test_unix_backplane_relays_to_other_workers_once(tmp_path):
+    path = str(tmp_path / "bp.sock")
+    worker_a, worker_b = Recorder(), Recorder()
+    backplane_a = UnixSocketBackplane(path)
+    backplane_b = UnixSocketBackplane(path)
+
+    await backplane_a.start(worker_a.deliver)
+    await backplane_b.start(worker_b.deliver)
+    try:
+        # Only one of them may own the broker
+        assert (backplane_a._broker is None) != (backplane_b._broker is None)
+        await backplane_a.wait_connected()
+        await backplane_b.wait_connected()
+
+        await backplane_a.publish("S1", {"type": "session_status", "status": "ended"})
+        await asyncio.wait_for(worker_b.arrived.wait(), 2)
+        await asyncio.sleep(0.05)
+
+        assert worker_a.messages == [("S1", {"type": "session_status", "status": "ended"})]
+        assert worker_b.messages == [("S1", {"type": "session_status", "status": "ended"})]
+    finally:
+        await backplane_b.stop()
+        await backplane_a.stop()
+
+
+def test_create_backplane_rejects_unknown_kind():
+    assert isinstance(create_backplane("inprocess"), InProcessBackplane)
+    with pytest.raises(ValueError):
+        create_backplane("carrier-pigeon")
+
+
+@pytest.mark.asyncio
+async def test_one_unix_worker_leads_and_another_takes_over(tmp_path):
+    path = str(tmp_path / "bp.sock")
+    first, second = UnixSocketBackplane(path), UnixSocketBackplane(path)
+
+    assert first.is_leader()
+    assert not second.is_leader()
+
+    await first.stop()
+    assert second.is_leader()
+    await second.stop()
+
+
+@pytest.mark.asyncio
+async def test_broker_cuts_off_worker_that_stops_reading(tmp_path, monkeypatch):
+    monkeypatch.setattr(backplane, "MAX_PEER_BUFFER_BYTES", 1 << 16)
+    path = str(tmp_path / "bp.sock")
+    publisher = UnixSocketBackplane(path)
+    await publisher.start(Recorder().deliver)
+    await publisher.wait_connected()
+    broker = publisher._broker
+
+    # A peer that connects and never reads
+    _, stuck = await asyncio.open_unix_connection(path)
+    await asyncio.sleep(0.05)
+    assert len(broker._writers) == 2
+
+    try:
+        padding = "x" * 4096
+        for _ in range(2000):
+            await publisher.publish("S1", {"type": "attendance_update", "pad": padding})
+            await asyncio.sleep(0)
+            if len(broker._writers) == 1:
+                break
+        assert len(broker._writers) == 1
+    finally:
+        stuck.close()
+        await publisher.stop()
+
+
+def test_backplane_without_publish_fails_at_construction():
+    class Incomplete(Backplane):
+        async def start(self, deliver):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.services.analytics_service import AnalyticsService
+from app.services.columnar_store import ColumnarStore
+from app.services.session_rollup_service import SessionRollupService
+from tests.unit.fake_firestore import FakeFirestore
+from tests.unit.test_analytics_service import SECTION, _expected_present, _seed
+
+
+@pytest.fixture
+def db():
+    fake = _seed(FakeFirestore())
+    with patch.object(AnalyticsService, '_get_db', return_value=fake), \
+         patch.object(SessionRollupService, '_get_db', return_value=fake):
+        SessionRollupService.backfill()
+        yield fake
+
+
+@pytest.fixture
+def store(db, tmp_path):
+    store = ColumnarStore(str(tmp_path))
+    added = store.sync(db, page_size=300)
+    assert added == {'student_attendance': 800, 'sessions': 41, 'faculty_attendance': 30}
+    return store
+
+
+def _strip(result):
+    result.pop('query_stats', None)
+    return result
+
+
+@pytest.mark.asyncio
+async def test_section_trends_match_firestore_analytics(store):
+    expected = _strip(await AnalyticsService.get_section_trends(SECTION, days=30))
+    result = store.section_trends(SECTION, days=30)
+
+    assert [(r['subject_id'], r['present']) for r in result['daily_trends']] == \
+           [(r['subject_id'], r['present']) for r in expected['daily_trends']]
+    assert sorted(result['subject_wise'], key=lambda r: r['subject_id']) == \
+           sorted(expected['subject_wise'], key=lambda r: r['subject_id'])
+    assert store.section_trends('NOPE') == {'error': 'Section not found'}
+
+
+@pytest.mark.asyncio
+async def test_subject_attendance_and_faculty_summary_match(store):
+    subject = store.subject_attendance('SUB1', SECTION, days=30)
+    expected = _strip(await AnalyticsService.get_subject_attendance('SUB1', SECTION, days=30))
+    assert subject['overall_attendance'] == expected['overall_attendance']
+    assert [(r['session_id'], r['present'], r['expected']) for r in subject['sessions']] == \
+           [(r['session_id'], r['present'], r['expected']) for r in expected['sessions']]
+
+    summary = store.faculty_summary('F1', days=30)
+    expected = _strip(await AnalyticsService.get_faculty_summary('F1', days=30))
+    assert summary == expected
+
+
+def test_sync_is_incremental(db, store):
+    assert store.sync(db) == {'student_attendance': 0, 'sessions': 0, 'faculty_attendance': 0}
+
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    db.seed('student_attendance', 'NEW_1', {'session_id': 'S000', 'student_id': 'ST0', 'section_id': SECTION,
+                                            'subject_id': 'SUB0', 'status': 'present', 'timestamp': later})
+    db.reset_counters()
+    assert store.sync(db)['student_attendance'] == 1
+    assert db.reads < 50  # only the new page, not the history
+    assert store.section_trends(SECTION)['daily_trends'][0]['present'] == _expected_present(0) + 1
+    assert ColumnarStore(store.root).watermarks()['student_attendance'][1] == 'NEW_1'
@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import analytics as analytics_api
+from app.services.export_service import COLUMNS, ExportService
+from tests.unit.fake_firestore import FakeFirestore
+
+START = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    fake.seed('sessions', 'S1', {'section_id': 'SEC', 'subject_id': 'SUB'})
+    for n in range(250):
+        fake.seed('student_attendance', f"A{n:03d}", {
+            'session_id': 'S1' if n < 60 else f"S{n // 60 + 1}", 'student_id': f"ST{n % 60}",
+            'subject_id': 'SUB', 'section_id': 'SEC', 'classroom_id': 'R1',
+            'status': 'present' if n % 7 else 'suspicious',
+            # Pairs of records share a timestamp so the cursor needs the document ID
+            'timestamp': START + timedelta(minutes=n // 2),
+            'verification_data': {'gps_verified': n % 2 == 0, 'distance_meters': 12.5,
+                                  'location_provided': {'gps': {'latitude': 1.0}}}
+        })
+    with patch.object(ExportService, '_get_db', return_value=fake):
+        yield fake
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(analytics_api.router, prefix="/api/v1/analytics")
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_pages_cover_every_row_once_in_order(db):
+    db.reset_counters()
+    chunks = list(ExportService.stream('section', 'SEC', 'ndjson', page_size=200))
+    rows = [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+    assert [row['attendance_id'] for row in rows] == [f"A{n:03d}" for n in range(250)]
+    assert [chunk.count('\n') for chunk in chunks] == [100, 150]  # small first page, then page_size
+    assert db.round_trips == 2
+    assert 'location_provided' not in json.dumps(rows)
+    assert rows[0]['gps_verified'] is True and rows[0]['distance_meters'] == 12.5
+
+
+def test_time_range_is_half_open(db):
+    start, end = START + timedelta(minutes=10), START + timedelta(minutes=20)
+    rows = [json.loads(line) for chunk in ExportService.stream('student', 'ST30', 'ndjson', start, end)
+            for line in chunk.splitlines()]
+    assert [row['attendance_id'] for row in rows] == ['A030']
+
+
+@pytest.mark.asyncio
+async def test_session_export_streams_csv(client):
+    async with client:
+        response = await client.get("/api/v1/analytics/export/session/S1")
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'attendance_session_S1.csv' in response.headers['content-disposition']
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert list(rows[0]) == COLUMNS
+    assert len(rows) == 60
+    assert rows[0]['timestamp'] == START.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_export_errors(client):
+    async with client:
+        missing = await client.get("/api/v1/analytics/export/session/NOPE")
+        backwards = await client.get("/api/v1/analytics/export/section/SEC",
+                                     params={'start': '2026-03-02T10:00:00', 'end': '2026-03-01T00:00:00'})
+        no_start = await client.get("/api/v1/analytics/export/section/SEC")
+
+    assert missing.status_code == 404
+    assert backwards.status_code == 400
+    assert no_start.status_code == 422
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.services.proxy_detection_service import ProxyDetectionService, SessionScans, detect
+from tests.unit.fake_firestore import FakeFirestore
+
+START = datetime(2026, 3, 2, 9, tzinfo=timezone.utc)
+SESSION = {'section_id': 'SEC', 'subject_id': 'SUB', 'faculty_id': 'F1', 'created_at': START,
+           'end_time': START + timedelta(hours=1), 'status': 'ended'}
+
+
+def _seed(db, students=60):
+    """
+    Honest scans: own device, fixes on a 1 m grid, one scan every 2 s.
+    Injected: ST10-12 share PHONE_X (minutes apart), ST20-21 share PHONE_Y
+    2 s apart, ST30-31 report the same fix (ST32 too, but with a coarse
+    accuracy), ST40-42 arrive 0.1 s apart, ST50 scans before the session.
+    """
+    db.seed('sessions', 'S1', SESSION)
+    offsets = {10: 20, 11: 45, 12: 71, 40: 80, 41: 80.1, 42: 80.2, 50: -30}
+    for k in range(students):
+        device = {10: 'PHONE_X', 11: 'PHONE_X', 12: 'PHONE_X', 20: 'PHONE_Y', 21: 'PHONE_Y'}.get(k, f"D{k}")
+        lat, lng, accuracy = 12.9 + (k % 8) * 9e-6, 77.5 + (k // 8) * 9e-6, 8.0
+        if k in (31, 32):
+            lat, lng = 12.9 + (30 % 8) * 9e-6, 77.5 + (30 // 8) * 9e-6
+        if k == 32:
+            accuracy = 40.0
+        db.seed('student_attendance', f"A{k:03d}", {
+            'session_id': 'S1', 'student_id': f"ST{k}", 'device_id': device, 'status': 'present',
+            'timestamp': START + timedelta(seconds=offsets.get(k, 2 * k + 300)),
+            'verification_data': {'gps_verified': True, 'location_provided': {
+                'gps': {'latitude': lat, 'longitude': lng, 'accuracy': accuracy},
+                'wifi_bssid': 'AA:BB:CC:00:11:22',
+            }}
+        })
+    return db
+
+
+@pytest.fixture
+def db():
+    fake = _seed(FakeFirestore())
+    with patch.object(ProxyDetectionService, '_get_db', return_value=fake):
+        yield fake
+
+
+def _groups(findings):
+    return sorted((f['detector'], tuple(f['student_ids'])) for f in findings)
+
+
+def test_detectors_find_only_injected_patterns(db):
+    docs = list(db.collection('student_attendance').stream())
+    findings = detect(SessionScans(docs), SESSION)
+
+    assert _groups(findings) == [
+        ('identical_gps', ('ST30', 'ST31')),
+        ('impossible_timing', ('ST20', 'ST21')),
+        ('impossible_timing', ('ST50',)),
+        ('shared_device', ('ST10', 'ST11', 'ST12')),
+        ('shared_device', ('ST20', 'ST21')),
+        ('wifi_burst', ('ST40', 'ST41', 'ST42')),
+    ]
+    rescan = next(f for f in findings if f['evidence'].get('reason') == 'device_rescan')
+    assert rescan['evidence'] == {'reason': 'device_rescan', 'device_id': 'PHONE_Y', 'gap_seconds': 2.0}
+
+
+@pytest.mark.asyncio
+async def test_findings_stored_once_and_review_status_kept(db):
+    ProxyDetectionService.analyze_blocking('S1')
+    stored = db.data['proxy_findings']
+    assert len(stored) == 6
+    assert {doc['review_status'] for doc in stored.values()} == {'pending'}
+
+    first = next(iter(stored))
+    stored[first]['review_status'] = 'confirmed'
+    ProxyDetectionService.analyze_blocking('S1')
+    assert len(db.data['proxy_findings']) == 6
+    assert db.data['proxy_findings'][first]['review_status'] == 'confirmed'
+
+    result = await ProxyDetectionService.get_findings('S1')
+    assert result['total_findings'] == 6
+    assert [f['severity'] for f in result['findings']][:4] == ['high'] * 4
+
+
+def test_nightly_run_skips_active_sessions(db):
+    db.seed('sessions', 'S2', {**SESSION, 'status': 'active', 'created_at': datetime.now(timezone.utc)})
+    db.seed('sessions', 'S1', {**SESSION, 'created_at': datetime.now(timezone.utc) - timedelta(hours=2)})
+    assert ProxyDetectionService.run_recent(hours=24) == {'sessions': 1, 'findings': 6}
+
+
+@pytest.mark.asyncio
+async def test_schedule_runs_detection_in_background(db):
+    from app.services import proxy_detection_service
+
+    ProxyDetectionService.schedule('S1')
+    assert 'proxy_findings' not in db.data  # end_session does not wait for it
+    await asyncio.gather(*proxy_detection_service._background_jobs)
+    assert len(db.data['proxy_findings']) == 6
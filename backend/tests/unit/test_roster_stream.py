@@ -0,0 +1,176 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.services.roster_stream import ROSTER_EVENT, RosterStreams
+from app.services.websocket_manager import manager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        pass
+
+    async def send_text(self, text):
+        self.received.append(json.loads(text))
+
+
+def _student(student_id):
+    return {"student_id": student_id, "name": student_id.title(), "status": "present", "marked_at": None}
+
+
+@pytest.fixture
+def streams():
+    db = MagicMock()
+    record = MagicMock()
+    record.to_dict.return_value = {"student_id": "s0", "status": "present", "timestamp": None}
+    db.collection.return_value.where.return_value.stream.return_value = [record]
+    db.get_all.return_value = []
+
+    with patch.object(RosterStreams, "_get_db", staticmethod(lambda: db)):
+        streams = RosterStreams(buffer_size=3)
+        yield streams
+    manager.remove_delivery_hook(ROSTER_EVENT, streams._on_event)
+    manager.remove_delivery_hook("session_status", streams._on_session_status)
+
+
+async def _received(ws, count, timeout=1.0):
+    """Wait for the connection's writer task to deliver count frames"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(ws.received) < count:
+        assert loop.time() < deadline, f"got {len(ws.received)} of {count} frames"
+        await asyncio.sleep(0.001)
+    return ws.received
+
+
+@pytest.mark.asyncio
+async def test_snapshot_then_ordered_deltas(streams):
+    ws = FakeWebSocket()
+    await manager.connect(ws, "R1")
+    try:
+        await streams.subscribe(ws, "R1")
+        await streams.publish("R1", _student("s1"))
+        await streams.publish("R1", _student("s2"))
+
+        snapshot, first, second = await _received(ws, 3)
+        assert snapshot["type"] == "roster_snapshot"
+        assert [s["student_id"] for s in snapshot["students"]] == ["s0"]
+        assert (first["seq"], second["seq"]) == (snapshot["seq"] + 1, snapshot["seq"] + 2)
+        assert second["student"]["student_id"] == "s2"
+        assert streams.get("R1").students.keys() == {"s0", "s1", "s2"}
+    finally:
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_resume_replays_only_missed_deltas(streams):
+    ws = FakeWebSocket()
+    await manager.connect(ws, "R2")
+    await streams.subscribe(ws, "R2")
+    await streams.publish("R2", _student("s1"))
+    last = (await _received(ws, 2))[-1]
+    epoch, last_seq = last["epoch"], last["seq"]
+    streams.unsubscribe(ws, "R2")
+    manager.disconnect(ws)
+
+    # Two changes while the client is away
+    await streams.publish("R2", _student("s2"))
+    await streams.publish("R2", _student("s3"))
+
+    back = FakeWebSocket()
+    await manager.connect(back, "R2")
+    try:
+        await streams.subscribe(back, "R2", epoch=epoch, since=last_seq)
+        replayed = await _received(back, 2)
+        await asyncio.sleep(0.01)
+        assert [m["type"] for m in replayed] == ["roster_delta", "roster_delta"]
+        assert [m["student"]["student_id"] for m in replayed] == ["s2", "s3"]
+    finally:
+        manager.disconnect(back)
+
+
+@pytest.mark.asyncio
+async def test_resume_falls_back_to_snapshot(streams):
+    ws = FakeWebSocket()
+    await manager.connect(ws, "R3")
+    try:
+        await streams.subscribe(ws, "R3")
+        epoch = (await _received(ws, 1))[0]["epoch"]
+        for index in range(5):  # buffer holds 3
+            await streams.publish("R3", _student(f"s{index + 1}"))
+
+        roster = streams.get("R3")
+        assert roster.missed_since(epoch, 1) is None  # fell out of the buffer
+        assert roster.missed_since("other-worker", roster.seq) is None
+        assert roster.missed_since(epoch, roster.seq) == []
+        assert [d["seq"] for d in roster.missed_since(epoch, 3)] == [4, 5]
+    finally:
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_idle_roster_expires_after_last_subscriber_leaves(streams):
+    streams.idle_ttl_seconds = 0.02
+    ws = FakeWebSocket()
+    await manager.connect(ws, "R4")
+    try:
+        await streams.subscribe(ws, "R4")
+        streams.unsubscribe(ws, "R4")
+        assert streams.get("R4") is not None
+        await asyncio.sleep(0.05)
+        assert streams.get("R4") is None
+    finally:
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_session_end_from_any_worker_drops_roster(streams):
+    ws = FakeWebSocket()
+    await manager.connect(ws, "R5")
+    try:
+        await streams.subscribe(ws, "R5")
+        await manager.send_session_status("R5", "ended")
+        assert streams.get("R5") is None
+        # Clients still get the status itself
+        assert (await _received(ws, 2))[-1]["status"] == "ended"
+    finally:
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_first_subscribers_share_one_load_off_the_event_loop(streams):
+    calls, loop_thread = [], threading.get_ident()
+
+    def read_students(session_id):
+        calls.append(threading.get_ident())
+        time.sleep(0.05)
+        return {"s0": _student("s0")}
+
+    sockets = [FakeWebSocket() for _ in range(20)]
+    for ws in sockets:
+        await manager.connect(ws, "R6")
+    try:
+        with patch.object(streams, "_read_students", read_students):
+            subscribing = asyncio.gather(*(streams.subscribe(ws, "R6") for ws in sockets))
+            await asyncio.sleep(0.01)
+            # A change delivered mid-load is not lost
+            await streams.publish("R6", _student("s1"))
+            await subscribing
+
+        assert len(calls) == 1 and calls[0] != loop_thread
+        assert streams.get("R6").students.keys() == {"s0", "s1"}
+        snapshot = (await _received(sockets[0], 1))[0]
+        assert {s["student_id"] for s in snapshot["students"]} == {"s0", "s1"}
+    finally:
+        for ws in sockets:
+            manager.disconnect(ws)
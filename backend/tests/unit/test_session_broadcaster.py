@@ -0,0 +1,143 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.services.active_sessions_service import ActiveSessionsService
+from app.services.session_broadcaster import SessionBroadcaster
+from app.services.session_cache import SessionCache
+
+
+def _token(sequence):
+    return {"token": f"QR_tok{sequence}", "sequence": sequence, "timestamp": 0, "expiry": 5}
+
+
+@pytest.mark.asyncio
+async def test_single_stream_per_session():
+    cache = SessionCache(ttl_seconds=60)
+    cache._sessions["S1"] = (float("inf"), {"status": "active"})
+    cache.set_token("S1", _token(1))
+    broadcast = AsyncMock()
+
+    with patch("app.services.session_broadcaster.session_cache", cache), \
+         patch("app.services.session_broadcaster.manager.broadcast_local", broadcast):
+        broadcaster = SessionBroadcaster()
+
+        # SmartBoard plus three faculty phones
+        for _ in range(4):
+            broadcaster.subscribe("S1")
+        await asyncio.sleep(0)
+        assert len(broadcaster._tasks) == 1
+
+        cache.set_token("S1", _token(2))
+        await asyncio.sleep(0.01)
+        cache.set_token("S1", _token(3))
+        await asyncio.sleep(0.01)
+
+        sequences = [call.args[1]["sequence_number"] for call in broadcast.await_args_list]
+        assert sequences == [1, 2, 3]
+
+        for _ in range(3):
+            broadcaster.unsubscribe("S1")
+        assert broadcaster.is_running("S1")
+
+        broadcaster.unsubscribe("S1")
+        await asyncio.sleep(0)
+        assert not broadcaster.is_running("S1")
+
+
+@pytest.mark.asyncio
+async def test_first_token_is_the_stored_one():
+    cache = SessionCache(ttl_seconds=60)
+    cache._sessions["S2"] = (float("inf"), {"status": "active", "subject_id": "CS301"})
+    broadcast = AsyncMock()
+    rotate = AsyncMock(return_value={})
+
+    with patch("app.services.session_broadcaster.session_cache", cache), \
+         patch("app.services.session_broadcaster.manager.broadcast_local", broadcast), \
+         patch.object(ActiveSessionsService, "get_current_token", AsyncMock(return_value=_token(7))), \
+         patch.object(ActiveSessionsService, "rotate_tokens", rotate):
+        broadcaster = SessionBroadcaster()
+        broadcaster.subscribe("S2")
+        await asyncio.sleep(0.01)
+
+        assert broadcast.await_args.args[1]["qr_token"] == "QR_tok7"
+        rotate.assert_not_awaited()
+        broadcaster.unsubscribe("S2")
+
+
+@pytest.mark.asyncio
+async def test_fallback_rotation_is_persisted_and_published():
+    from app.services.session_cache import session_cache as global_cache
+
+    cache = SessionCache(ttl_seconds=60)
+    cache._sessions["S4"] = (float("inf"), {"status": "active"})
+    cache.set_token("S4", _token(1))
+    broadcast = AsyncMock()
+    rotate = AsyncMock(return_value={"S4": _token(2)})
+
+    with patch("app.services.session_broadcaster.session_cache", cache), \
+         patch("app.services.session_broadcaster.manager.broadcast_local", broadcast), \
+         patch("app.services.session_broadcaster.settings") as mock_settings, \
+         patch.object(ActiveSessionsService, "rotate_tokens", rotate):
+        mock_settings.QR_REFRESH_INTERVAL_SECONDS = 0.02
+        broadcaster = SessionBroadcaster()
+        broadcaster.FALLBACK_GRACE_SECONDS = 0
+        broadcaster.subscribe("S4")
+        await asyncio.sleep(0.03)
+        broadcaster.unsubscribe("S4")
+
+    rotate.assert_awaited_with(["S4"])
+    # Published to every worker's cache, not just recorded locally
+    assert global_cache.get_token("S4")["token"] == "QR_tok2"
+    global_cache.invalidate("S4")
+    assert [call.args[1]["qr_token"] for call in broadcast.await_args_list][:2] == ["QR_tok1", "QR_tok2"]
+
+
+@pytest.mark.asyncio
+async def test_new_token_with_same_sequence_is_still_broadcast():
+    cache = SessionCache(ttl_seconds=60)
+    cache._sessions["S5"] = (float("inf"), {"status": "active"})
+    cache.set_token("S5", _token(3))
+    broadcast = AsyncMock()
+
+    with patch("app.services.session_broadcaster.session_cache", cache), \
+         patch("app.services.session_broadcaster.manager.broadcast_local", broadcast):
+        broadcaster = SessionBroadcaster()
+        broadcaster.subscribe("S5")
+        await asyncio.sleep(0.01)
+        cache.set_token("S5", {**_token(3), "token": "QR_tok3_persisted"})
+        await asyncio.sleep(0.01)
+        broadcaster.unsubscribe("S5")
+
+    assert [call.args[1]["qr_token"] for call in broadcast.await_args_list] == ["QR_tok3", "QR_tok3_persisted"]
+
+
+@pytest.mark.asyncio
+async def test_stops_when_session_ends():
+    cache = SessionCache(ttl_seconds=60)
+    cache._sessions["S3"] = (float("inf"), {"status": "active"})
+    cache.set_token("S3", _token(1))
+
+    with patch("app.services.session_broadcaster.session_cache", cache), \
+         patch("app.services.session_broadcaster.manager.broadcast_local", AsyncMock()):
+        broadcaster = SessionBroadcaster()
+        broadcaster.subscribe("S3")
+        await asyncio.sleep(0.01)
+
+        # As delivered through the backplane from whichever worker ended it
+        await cache.on_session_status("S3", {"type": "session_status", "status": "ended"})
+        await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+
+        assert not broadcaster.is_running("S3")
+
+
+@pytest.mark.asyncio
+async def test_published_tokens_reach_the_cache_through_the_backplane():
+    from app.services.session_cache import session_cache
+
+    await session_cache.publish_token("S6", {**_token(4), "payload": {"sid": "S6"}})
+
+    assert session_cache.get_token("S6") == _token(4)
+    session_cache.invalidate("S6")
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.session_cache import SessionCache
+
+
+class CountingFetch:
+    def __init__(self, result, delay=0.02):
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, session_id):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_connect_storm_reads_session_once():
+    cache = SessionCache(ttl_seconds=60)
+    fetch = CountingFetch({"status": "active"})
+
+    with patch.object(cache, "_fetch_session", fetch):
+        results = await asyncio.gather(*(cache.get_session("S1") for _ in range(200)))
+        assert all(r == {"status": "active"} for r in results)
+        assert fetch.calls == 1
+
+        # Served from memory afterwards
+        await cache.get_session("S1")
+        assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_session_is_cached_too():
+    cache = SessionCache(ttl_seconds=60)
+    fetch = CountingFetch(None, delay=0)
+
+    with patch.object(cache, "_fetch_session", fetch):
+        assert await cache.get_session("GONE") is None
+        assert await cache.get_session("GONE") is None
+    assert fetch.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_attendance_count_counted_once_then_kept_in_memory():
+    cache = SessionCache(ttl_seconds=60)
+    count = CountingFetch(10)
+
+    with patch.object(cache, "_count_present", count):
+        counts = await asyncio.gather(*(cache.get_attendance_count("S2") for _ in range(50)))
+        assert set(counts) == {10}
+
+        count.result = 11  # the scan committed before record_present runs
+        assert await cache.record_present("S2") == 11
+        # Another worker announced a later total over the backplane
+        await cache.on_attendance_update("S2", {"type": "attendance_update", "total_present": 14})
+        assert await cache.get_attendance_count("S2") == 14
+        # An out-of-order older total doesn't roll it back
+        await cache.on_attendance_update("S2", {"type": "attendance_update", "total_present": 12})
+        assert await cache.get_attendance_count("S2") == 14
+
+    assert count.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_record_present_on_cold_worker_counts_scan_once():
+    cache = SessionCache(ttl_seconds=60)
+
+    # The committed scan is the session's first
+    with patch.object(cache, "_count_present", CountingFetch(1, delay=0)):
+        assert await cache.record_present("S4") == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_scans_on_two_workers_both_counted():
+    committed = {"present": 5}
+    workers = [SessionCache(ttl_seconds=60), SessionCache(ttl_seconds=60)]
+    for worker in workers:
+        worker._attendance_counts["S5"] = 5
+
+    def count_present(session_id):
+        time.sleep(0.01)
+        return committed["present"]
+
+    # One scan commits on each worker before either announces its total
+    committed["present"] += 2
+    with patch.object(workers[0], "_count_present", count_present), \
+            patch.object(workers[1], "_count_present", count_present):
+        totals = await asyncio.gather(*(worker.record_present("S5") for worker in workers))
+    assert totals == [7, 7]
+
+    for worker in workers:
+        for total in totals:
+            await worker.on_attendance_update("S5", {"type": "attendance_update", "total_present": total})
+        assert await worker.get_attendance_count("S5") == 7
+
+
+@pytest.mark.asyncio
+async def test_session_end_drops_count():
+    cache = SessionCache(ttl_seconds=60)
+    cache._attendance_counts["S3"] = 5
+
+    await cache.on_session_status("S3", {"type": "session_status", "status": "ended"})
+
+    assert "S3" not in cache._attendance_counts
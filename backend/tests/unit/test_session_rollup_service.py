@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.services.daily_rollup_service import merge_range, session_entries
+from app.services.session_rollup_service import SessionRollupService, pass_rates
+from tests.unit.fake_firestore import FakeFirestore
+
+SESSION = {'subject_id': 'SUB', 'section_id': 'SEC', 'faculty_id': 'F1', 'classroom_id': 'R1',
+           'created_at': datetime(2026, 3, 2, 9, tzinfo=timezone.utc), 'status': 'active'}
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    fake.seed('sessions', 'S1', SESSION)
+    fake.seed('sections', 'SEC', {'total_students': 4})
+    with patch.object(SessionRollupService, '_get_db', return_value=fake):
+        yield fake
+
+
+def _scan(db, student_id, status, verification):
+    batch = db.batch()
+    batch.set(db.collection('student_attendance').document(), {
+        'session_id': 'S1', 'student_id': student_id, 'status': status,
+        'verification_data': verification, 'timestamp': datetime.now(timezone.utc)
+    })
+    SessionRollupService.add_scan(batch, db, 'S1', SESSION, status, verification)
+    batch.commit()
+
+
+def test_scans_update_rollup_incrementally(db):
+    _scan(db, 'A', 'present', {'gps_verified': True, 'wifi_verified': True, 'location_provided': {'gps': 1}})
+    _scan(db, 'B', 'suspicious', {'gps_verified': False, 'location_provided': {}})
+    _scan(db, 'C', 'present', {'gps_verified': True})
+
+    rollup = db.data['session_rollups']['S1']
+    assert (rollup['present'], rollup['suspicious']) == (2, 1)
+    assert rollup['verification'] == {'gps_verified': 2, 'wifi_verified': 1, 'location_provided': 1}
+    assert rollup['first_scan_at'] <= rollup['last_scan_at']
+    assert rollup['section_id'] == 'SEC'
+    assert 'finalized' not in rollup
+    assert pass_rates(rollup)['gps_verified'] == 66.67
+    # one round trip per scan: record and rollup share a batch
+    assert db.round_trips == 3
+
+
+@pytest.mark.asyncio
+async def test_finalize_recounts_and_freezes_expected(db):
+    _scan(db, 'A', 'present', {'gps_verified': True})
+    db.data['session_rollups']['S1']['present'] = 7  # drifted counter
+    _scan(db, 'B', 'present', {'bluetooth_verified': True})
+
+    rollup = await SessionRollupService.finalize('S1')
+
+    assert rollup['present'] == 2
+    assert rollup['expected'] == 4
+    assert rollup['finalized'] is True
+    assert db.data['session_rollups']['S1']['verification']['bluetooth_verified'] == 1
+    assert await SessionRollupService.finalize('MISSING') is None
+
+
+def test_backfill_skips_active_and_finalized(db):
+    db.seed('sessions', 'S2', {**SESSION, 'status': 'ended'})
+    db.seed('sessions', 'S3', {**SESSION, 'status': 'ended'})
+    db.seed('session_rollups', 'S3', {'finalized': True, 'present': 9})
+
+    assert SessionRollupService.backfill(page_size=2) == {'scanned': 3, 'written': 1, 'skipped': 2}
+    assert db.data['session_rollups']['S2']['finalized'] is True
+    assert db.data['session_rollups']['S3']['present'] == 9
+    assert SessionRollupService.backfill(force=True)['written'] == 2
+
+
+@pytest.mark.asyncio
+async def test_finalize_files_session_in_daily_rollup_once(db):
+    _scan(db, 'A', 'present', {'gps_verified': True})
+    await SessionRollupService.finalize('S1')
+    await SessionRollupService.finalize('S1')
+
+    [daily] = db.data['daily_rollups'].values()
+    assert daily['date'] == '2026-03-02'
+    assert daily['subject_ids'] == ['SUB']
+    [entry] = session_entries(daily)
+    assert (entry['session_id'], entry['present'], entry['expected']) == ('S1', 1, 4)
+    assert merge_range([daily], 'week')[0]['period_start'] == '2026-03-02'
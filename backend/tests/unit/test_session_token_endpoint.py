@@ -0,0 +1,109 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api.v1 import session as session_api
+from app.services.session_cache import session_cache
+
+SESSION = "TOKEN_ENDPOINT_S1"
+
+
+def _token(sequence):
+    return {
+        "token": f"QR_token_{sequence}",
+        "timestamp": 1000 + sequence,
+        "expiry": 1007 + sequence,
+        "sequence": sequence,
+    }
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(session_api.router, prefix="/api/v1/sessions")
+    session_cache.set_token(SESSION, _token(1))
+    yield httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    session_cache._tokens.pop(SESSION, None)
+    session_cache._token_events.pop(SESSION, None)
+    session_api._token_responses.pop(SESSION, None)
+
+
+@pytest.mark.asyncio
+async def test_token_served_with_sequence_etag(client):
+    async with client:
+        response = await client.get(f"/api/v1/sessions/{SESSION}/token")
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"1"'
+    assert response.json()["token"] == "QR_token_1"
+    assert response.json()["sequence"] == 1
+
+
+@pytest.mark.asyncio
+async def test_matching_etag_gets_304(client):
+    async with client:
+        response = await client.get(
+            f"/api/v1/sessions/{SESSION}/token", headers={"If-None-Match": '"1"'}
+        )
+        stale = await client.get(
+            f"/api/v1/sessions/{SESSION}/token", headers={"If-None-Match": '"0"'}
+        )
+
+    assert response.status_code == 304
+    assert response.headers["etag"] == '"1"'
+    assert stale.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_long_poll_returns_next_rotation(client):
+    async with client:
+        poll = asyncio.create_task(client.get(
+            f"/api/v1/sessions/{SESSION}/token?wait=5", headers={"If-None-Match": '"1"'}
+        ))
+        await asyncio.sleep(0.05)
+        assert not poll.done()
+
+        session_cache.set_token(SESSION, _token(2))
+        response = await asyncio.wait_for(poll, 2)
+
+    assert response.status_code == 200
+    assert response.headers["etag"] == '"2"'
+    assert response.json()["token"] == "QR_token_2"
+
+
+@pytest.mark.asyncio
+async def test_long_poll_times_out_with_304(client):
+    async with client:
+        response = await client.get(
+            f"/api/v1/sessions/{SESSION}/token?wait=0.05", headers={"If-None-Match": '"1"'}
+        )
+
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_cold_worker_reads_stored_token_once(client):
+    session_cache._tokens.pop(SESSION, None)
+    fetch_token = MagicMock(return_value=_token(7))
+
+    with patch.object(session_cache, "get_session", AsyncMock(return_value={"status": "active"})), \
+         patch.object(session_cache, "_fetch_token", fetch_token):
+        async with client:
+            first = await client.get(f"/api/v1/sessions/{SESSION}/token")
+            second = await client.get(f"/api/v1/sessions/{SESSION}/token")
+
+    assert first.json()["sequence"] == 7
+    assert second.headers["etag"] == '"7"'
+    assert fetch_token.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_unknown_session_is_404(client):
+    with patch.object(session_cache, "get_session", AsyncMock(return_value=None)):
+        async with client:
+            response = await client.get("/api/v1/sessions/NO_SUCH_SESSION/token")
+
+    assert response.status_code == 404
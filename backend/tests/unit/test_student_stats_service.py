@@ -0,0 +1,80 @@
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from app.services.session_rollup_service import SessionRollupService
+from app.services.student_stats_service import StudentStatsService
+from tests.unit.fake_firestore import FakeFirestore
+
+STUDENTS = ['A', 'B', 'C', 'D']
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    fake.seed('sections', 'SEC', {'total_students': len(STUDENTS)})
+    for student_id in STUDENTS:
+        fake.seed('students', student_id, {'section_id': 'SEC'})
+    with patch.object(SessionRollupService, '_get_db', return_value=fake), \
+            patch.object(StudentStatsService, '_get_db', return_value=fake):
+        yield fake
+
+
+def _session(db, session_id, scans):
+    """Run one session: scan (student, status) pairs, then end it"""
+    session = {'subject_id': 'SUB', 'section_id': 'SEC', 'faculty_id': 'F1',
+               'created_at': datetime(2026, 3, 2, 9, tzinfo=timezone.utc), 'status': 'active'}
+    db.seed('sessions', session_id, session)
+    for student_id, status in scans:
+        batch = db.batch()
+        batch.set(db.collection('student_attendance').document(), {
+            'session_id': session_id, 'student_id': student_id, 'status': status,
+            'timestamp': datetime.now(timezone.utc)
+        })
+        StudentStatsService.add_scan(batch, db, student_id, session_id, session, status)
+        batch.commit()
+    db.seed('sessions', session_id, {**session, 'status': 'ended'})
+
+
+def _stats(db, student_id):
+    doc = db.data['student_subject_stats'][f"{student_id}_SUB"]
+    return doc.get('attended', 0), doc.get('suspicious', 0), doc['held']
+
+
+@pytest.mark.asyncio
+async def test_scans_count_incrementally_and_end_session_adds_absentees(db):
+    _session(db, 'S1', [('A', 'present'), ('B', 'suspicious')])
+    assert _stats(db, 'A') == (1, 0, 1)
+    assert _stats(db, 'B') == (0, 1, 1)
+    assert 'C_SUB' not in db.data['student_subject_stats']
+
+    await SessionRollupService.finalize('S1')
+    await SessionRollupService.finalize('S1')  # idempotent
+
+    assert [_stats(db, student) for student in STUDENTS] == [(1, 0, 1), (0, 1, 1), (0, 0, 1), (0, 0, 1)]
+    assert db.data['student_subject_stats']['C_SUB']['sessions'] == {'S1': 'absent'}
+
+
+@pytest.mark.asyncio
+async def test_percentage_and_eligibility_are_single_reads(db):
+    for n in range(4):
+        scans = [('A', 'present'), ('B', 'present' if n < 3 else 'suspicious'), ('C', 'present' if n < 2 else None)]
+        _session(db, f"S{n}", [(student, status) for student, status in scans if status])
+        await SessionRollupService.finalize(f"S{n}")
+
+    db.reset_counters()
+    result = await StudentStatsService.get_student_attendance('B', 'SUB')
+    assert db.round_trips == 1
+    assert result['subjects'] == [{'subject_id': 'SUB', 'section_id': 'SEC', 'attended': 3, 'suspicious': 1,
+                                   'held': 4, 'percentage': 75.0, 'eligible': True}]
+
+    db.reset_counters()
+    section = await StudentStatsService.get_section_eligibility('SEC', 'SUB')
+    assert db.round_trips == 1
+    assert [(s['student_id'], s['percentage'], s['eligible']) for s in section['students']] == \
+           [('D', 0, False), ('C', 50.0, False), ('B', 75.0, True), ('A', 100.0, True)]
+    assert (section['eligible'], section['ineligible']) == (2, 2)
+
+    strict = await StudentStatsService.get_section_eligibility('SEC', 'SUB', threshold=80)
+    assert strict['eligible'] == 1
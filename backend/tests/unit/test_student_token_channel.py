@@ -0,0 +1,106 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from app.api.v1 import websocket as ws_routes
+from app.services.session_cache import session_cache
+from app.services.websocket_manager import manager
+
+SESSION = "STUDENT_CHANNEL_S1"
+
+
+class FakeWebSocket:
+    def __init__(self, query_params=None):
+        self.query_params = query_params or {}
+        self.scope = {}
+        self.received = []
+        self.incoming = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+    async def send_text(self, text):
+        self.received.append(json.loads(text))
+
+    async def receive_text(self):
+        data = await self.incoming.get()
+        if data is None:
+            raise WebSocketDisconnect()
+        return data
+
+
+async def _received(ws, count, timeout=1.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while len(ws.received) < count:
+        assert loop.time() < deadline, f"got {len(ws.received)} of {count} frames"
+        await asyncio.sleep(0.001)
+    return ws.received
+
+
+@pytest.fixture
+def channel():
+    session_cache.set_token(SESSION, {"token": "QR_t1", "sequence": 1, "timestamp": 0, "expiry": 7})
+    with patch.object(session_cache, "get_session", AsyncMock(return_value={"status": "active"})), \
+         patch.object(session_cache, "get_attendance_count", AsyncMock(return_value=0)), \
+         patch.object(ws_routes, "broadcaster", MagicMock()) as broadcaster:
+        yield broadcaster
+    session_cache._tokens.pop(SESSION, None)
+    session_cache._token_events.pop(SESSION, None)
+
+
+@pytest.mark.asyncio
+async def test_student_gets_current_token_then_rotations_only(channel):
+    student, board = FakeWebSocket(), FakeWebSocket({"role": "smartboard"})
+    tasks = [
+        asyncio.create_task(ws_routes.websocket_student_token_endpoint(student, SESSION)),
+        asyncio.create_task(ws_routes.websocket_session_endpoint(board, SESSION)),
+    ]
+    try:
+        first = await _received(student, 1)
+        assert first[0]["type"] == "qr_update"
+        assert first[0]["qr_token"] == "QR_t1"
+        channel.subscribe.assert_called_with(SESSION)
+
+        await _received(board, 1)  # connected
+        await manager.broadcast_local(SESSION, {"type": "qr_update", "qr_token": "QR_t2", "sequence_number": 2})
+        await manager.broadcast_local(SESSION, {"type": "attendance_update", "total_present": 4})
+        await manager.broadcast_local(SESSION, {"type": "session_status", "status": "ended"})
+        received = await _received(student, 3)
+        await asyncio.sleep(0.01)
+
+        assert [m["type"] for m in received] == ["qr_update", "qr_update", "session_status"]
+        assert received[1]["qr_token"] == "QR_t2"
+
+        # Read-only: only ping gets an answer
+        await student.incoming.put(json.dumps({"type": "refresh"}))
+        await student.incoming.put(json.dumps({"type": "ping"}))
+        assert (await _received(student, 4))[-1] == {"type": "pong"}
+    finally:
+        for ws in (student, board):
+            await ws.incoming.put(None)
+        await asyncio.gather(*tasks)
+
+    assert manager.get_connection_count(SESSION) == 0
+    assert channel.unsubscribe.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failure_during_handshake_releases_connection(channel):
+    student, board = FakeWebSocket(), FakeWebSocket({"role": "smartboard"})
+    failing = AsyncMock(side_effect=RuntimeError("client went away"))
+
+    with patch.object(session_cache, "load_token", failing), \
+         patch.object(session_cache, "get_attendance_count", failing):
+        await ws_routes.websocket_student_token_endpoint(student, SESSION)
+        await ws_routes.websocket_session_endpoint(board, SESSION)
+
+    assert student not in manager.connections and board not in manager.connections
+    channel.subscribe.assert_not_called()
+    channel.unsubscribe.assert_not_called()
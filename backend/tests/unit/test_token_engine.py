@@ -0,0 +1,79 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+
+from app.utils.token_engine import TokenEngine, get_token_engine
+from app.utils.token_generator import TokenGenerator
+
+
+def _legacy_token(session_id, secret, timestamp=None):
+    """Build an IATT_ token the way the old QRService did"""
+    payload = {"sid": session_id, "seq": 1, "ts": timestamp or int(time.time())}
+    payload_b64 = base64.urlsafe_b64encode(
+        json.dumps(payload, separators=(',', ':')).encode()
+    ).decode().rstrip('=')
+    signature = base64.urlsafe_b64encode(
+        hmac.new(secret.encode(), payload_b64.encode(), hashlib.sha256).digest()
+    ).decode()[:16]
+    return f"IATT_{payload_b64}_{signature}"
+
+
+def test_legacy_prefix_is_accepted_with_legacy_key():
+    engine = TokenEngine("qr-secret", "jwt-secret")
+
+    is_valid, payload, error = engine.validate(_legacy_token("S1", "jwt-secret"))
+    assert is_valid, error
+    assert payload["sid"] == "S1"
+
+    is_valid, _, _ = engine.validate(_legacy_token("S1", "qr-secret"))
+    assert not is_valid
+
+
+def test_generate_many_shares_timestamp_and_validates():
+    engine = TokenEngine("qr-secret", "jwt-secret", version=2)
+
+    tokens = engine.generate_many([
+        {"session_id": f"S{i}", "sequence": i} for i in range(50)
+    ])
+
+    assert len({t["timestamp"] for t in tokens}) == 1
+    results = engine.validate_many([t["token"] for t in tokens])
+    assert all(is_valid for is_valid, _, _ in results)
+    assert [payload["sid"] for _, payload, _ in results] == [f"S{i}" for i in range(50)]
+
+
+def test_v2_handle_matches_session_on_other_worker():
+    minted = TokenEngine("qr-secret", "jwt-secret", version=2).generate("SESSION_X")
+    other_worker = TokenEngine("qr-secret", "jwt-secret", version=2)
+
+    is_valid, payload, _ = other_worker.validate(minted["token"])
+
+    assert is_valid
+    assert payload["sid"] is None
+    assert other_worker.matches_session(payload, "SESSION_X")
+    assert not other_worker.matches_session(payload, "SESSION_Y")
+
+
+def test_facade_and_engine_agree():
+    token = get_token_engine().generate("SESSION_Z", sequence=3)["token"]
+
+    is_valid, payload, error = TokenGenerator.validate_token(token)
+
+    assert is_valid, error
+    assert payload["seq"] == 3
+
+
+def test_session_handles_are_bounded_and_forgotten():
+    engine = TokenEngine("qr-secret", "jwt-secret", version=2)
+    engine.MAX_SESSION_HANDLES = 3
+    for i in range(5):
+        engine.generate(f"S{i}")
+
+    assert engine.resolve_handle(engine.session_handle("S0")) is None
+    assert engine.resolve_handle(engine.session_handle("S4")) == "S4"
+
+    engine.forget_session("S4")
+    assert engine.resolve_handle(engine.session_handle("S4")) is None
+    assert len(engine._session_handles) == 2
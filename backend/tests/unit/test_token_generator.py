@@ -0,0 +1,88 @@
+from unittest.mock import patch
+
+from app.utils.token_generator import TokenGenerator
+
+
+def _generate(version, session_id="SESSION_ABC", sequence=7):
+    return TokenGenerator.generate_token(
+        session_id=session_id,
+        class_id="CSE-3A",
+        room_id="A201",
+        subject_id="CS301",
+        sequence=sequence,
+        version=version
+    )
+
+
+def test_v1_round_trip():
+    token_data = _generate(1)
+
+    assert token_data["token"].startswith("QR_")
+    is_valid, payload, error = TokenGenerator.validate_token(token_data["token"])
+
+    assert is_valid, error
+    assert payload["sid"] == "SESSION_ABC"
+    assert payload["rid"] == "A201"
+    assert payload["seq"] == 7
+
+
+def test_v2_round_trip_and_size():
+    v1_token = _generate(1)["token"]
+    token_data = _generate(2)
+    token = token_data["token"]
+
+    assert token.startswith("Q2")
+    assert len(token) == 52
+    assert len(token) < len(v1_token) / 2
+
+    is_valid, payload, error = TokenGenerator.validate_token(token)
+    assert is_valid, error
+    assert payload["sid"] == "SESSION_ABC"
+    assert payload["h"] == TokenGenerator.session_handle("SESSION_ABC")
+    assert payload["seq"] == 7
+    assert payload["ts"] == token_data["timestamp"]
+    assert TokenGenerator.extract_session_id(token) == "SESSION_ABC"
+
+
+def test_v1_payload_containing_underscore():
+    # URL-safe base64 can emit '_', which must not break token parsing
+    for sequence in range(200):
+        token = _generate(1, session_id="s?>?>", sequence=sequence)["token"]
+        is_valid, _, error = TokenGenerator.validate_token(token)
+        assert is_valid, (token, error)
+
+
+def test_v2_rejects_tampered_token():
+    token = _generate(2)["token"]
+    # Flip one character of the signed body
+    tampered = token[:5] + ("A" if token[5] != "A" else "B") + token[6:]
+
+    is_valid, payload, error = TokenGenerator.validate_token(tampered)
+
+    assert not is_valid
+    assert payload is None
+    assert "signature" in error
+
+
+def test_v2_rejects_expired_token():
+    token_data = _generate(2)
+    max_age = TokenGenerator.TOKEN_VALIDITY_SECONDS + TokenGenerator.GRACE_PERIOD_SECONDS
+
+    with patch("app.utils.token_engine.datetime") as mock_datetime:
+        mock_datetime.now.return_value.timestamp.return_value = token_data["timestamp"] + max_age + 1
+        is_valid, _, error = TokenGenerator.validate_token(token_data["token"])
+
+    assert not is_valid
+    assert "expired" in error
+
+
+def test_v2_signature_depends_on_secret():
+    token = _generate(2)["token"]
+
+    with patch("app.utils.token_engine.settings") as mock_settings:
+        mock_settings.QR_SECRET_KEY = "a-different-secret"
+        mock_settings.JWT_SECRET = "test-secret"
+        mock_settings.QR_TOKEN_VERSION = 1
+        is_valid, _, _ = TokenGenerator.validate_token(token)
+
+    assert not is_valid
@@ -0,0 +1,84 @@
+from datetime import datetime
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from app.services.utilization_service import UtilizationService
+from tests.unit.fake_firestore import FakeFirestore
+
+IST = ZoneInfo('Asia/Kolkata')
+DAY = '2026-03-02'  # a Monday
+
+
+def _at(hour, minute=0, day=2):
+    return datetime(2026, 3, day, hour, minute, tzinfo=IST)
+
+
+@pytest.fixture
+def db():
+    fake = FakeFirestore()
+    for room_id, block_id, floor_id, capacity in [('R1', 'B1', 'F1', 60), ('R2', 'B1', 'F1', 40),
+                                                  ('R3', 'B1', 'F2', 30), ('R4', 'B2', 'F3', 20)]:
+        fake.seed('classrooms', room_id, {'campus_id': 'C1', 'block_id': block_id, 'floor_id': floor_id,
+                                          'room_number': room_id[1:], 'capacity': capacity})
+    for slot_id, room_id, day, start, end, is_break in [
+            ('SA', 'R1', 'Monday', '09:00', '10:00', False), ('SB', 'R1', 'Monday', '10:00', '11:00', False),
+            ('SK', 'R1', 'Monday', '11:00', '11:15', True), ('SC', 'R2', 'Monday', '09:00', '10:00', False),
+            ('SD', 'R3', 'Tuesday', '09:00', '10:00', False)]:
+        fake.seed('timetable_slots', slot_id, {'classroom_id': room_id, 'day': day, 'start_time': start,
+                                               'end_time': end, 'is_break': is_break})
+    sessions = [('X1', 'R1', 'SA', _at(9, 2), _at(9, 52), 45),
+                ('X2', 'R2', 'SC', _at(9), None, 30),        # still active: counts the slot length
+                ('X3', 'R4', None, _at(14), _at(15), 10),    # unscheduled
+                ('X4', 'R3', None, _at(14, day=1), _at(15, day=1), 25)]  # previous day
+    for session_id, room_id, slot_id, created_at, end_time, present in sessions:
+        fake.seed('sessions', session_id, {'classroom_id': room_id, 'slot_id': slot_id,
+                                           'created_at': created_at, 'end_time': end_time})
+        fake.seed('session_rollups', session_id, {'present': present})
+    with patch.object(UtilizationService, '_get_db', return_value=fake):
+        yield fake
+
+
+def test_compute_day_joins_slots_sessions_and_rooms(db):
+    assert UtilizationService.compute_day(DAY) == {'date': DAY, 'rooms': 4, 'blocks': 2, 'sessions': 3}
+    UtilizationService.compute_day(DAY)  # recomputing overwrites
+    assert len(db.data['room_utilization']) == 4
+
+    r1 = db.data['room_utilization'][f"R1_{DAY}"]
+    assert (r1['scheduled_slots'], r1['scheduled_minutes'], r1['held_scheduled'], r1['held_minutes']) == (2, 120, 1, 50)
+    assert (r1['slot_utilization'], r1['time_utilization'], r1['occupancy']) == (50.0, 11.9, 75.0)
+    r2 = db.data['room_utilization'][f"R2_{DAY}"]
+    assert (r2['held_minutes'], r2['occupancy'], r2['idle']) == (60, 75.0, False)
+    r4 = db.data['room_utilization'][f"R4_{DAY}"]
+    assert (r4['scheduled_slots'], r4['unscheduled_sessions'], r4['occupancy']) == (0, 1, 50.0)
+
+    b1 = db.data['block_utilization'][f"B1_{DAY}"]
+    assert (b1['rooms_total'], b1['idle_rooms'], b1['scheduled_slots'], b1['held_scheduled']) == (3, ['R3'], 3, 2)
+    assert b1['floors']['F1']['slot_utilization'] == 66.67
+    assert b1['floors']['F2']['idle_rooms'] == 1
+    assert b1['rooms']['R3']['idle'] is True
+
+
+@pytest.mark.asyncio
+async def test_reads_are_one_round_trip(db):
+    UtilizationService.compute_day(DAY)
+
+    db.reset_counters()
+    block = await UtilizationService.get_block_utilization('B1', DAY)
+    assert db.round_trips == 1
+    assert block['occupancy'] == 75.0
+
+    db.reset_counters()
+    campus = await UtilizationService.get_campus_utilization('C1', DAY)
+    assert db.round_trips == 1
+    assert (campus['rooms_total'], campus['idle_rooms'], campus['sessions_held']) == (4, 1, 3)
+    assert [block['block_id'] for block in campus['blocks']] == ['B1', 'B2']  # least used first
+
+    db.reset_counters()
+    with patch('app.services.utilization_service.start_date', return_value='2026-02-01'):
+        room = await UtilizationService.get_room_utilization('R3', 30)
+    assert db.round_trips == 1
+    assert room['totals']['idle_days'] == 1
+
+    assert 'error' in await UtilizationService.get_block_utilization('B1', '2026-03-03')
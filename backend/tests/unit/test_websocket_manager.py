@@ -0,0 +1,249 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+
+from app.services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self, stall=0.0, fail=False):
+        self.stall = stall
+        self.fail = fail
+        self.received = []
+        self.closed = False
+
+    async def accept(self):
+        pass
+
+    async def close(self, code=1000):
+        self.closed = True
+
+    async def send_text(self, text):
+        if self.fail:
+            raise RuntimeError("connection reset")
+        if self.stall:
+            await asyncio.sleep(self.stall)
+        self.received.append(json.loads(text))
+
+
+async def drain():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_block_and_is_evicted():
+    manager = ConnectionManager()
+    healthy = [FakeWebSocket() for _ in range(5)]
+    stalled = FakeWebSocket(stall=10)
+
+    with patch("app.services.websocket_manager.settings") as mock_settings:
+        mock_settings.WS_SEND_TIMEOUT_SECONDS = 0.01
+        mock_settings.WS_SLOW_CONSUMER_MAX_STRIKES = 2
+        mock_settings.WS_OUTBOUND_QUEUE_SIZE = 8
+        for ws in healthy + [stalled]:
+            await manager.connect(ws, "S1")
+
+        await manager.broadcast_local("S1", {"type": "session_status", "status": "a"})
+        await drain()
+        assert all(len(ws.received) == 1 for ws in healthy)
+
+        await manager.broadcast_local("S1", {"type": "session_status", "status": "b"})
+        await asyncio.sleep(0.05)
+
+    assert manager.get_connection_count("S1") == 5
+    assert stalled not in manager.connections
+    assert stalled.closed
+    stats = manager.get_fanout_stats("S1")
+    assert stats["broadcasts"] == 2
+    assert stats["timeouts"] == 2
+    assert stats["evictions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_send_disconnects_only_that_client():
+    manager = ConnectionManager()
+    good, bad = FakeWebSocket(), FakeWebSocket(fail=True)
+    await manager.connect(good, "S2")
+    await manager.connect(bad, "S2")
+
+    await manager.broadcast_to_session("S2", {"type": "attendance_update"})
+    await drain()
+
+    assert good.received == [{"type": "attendance_update"}]
+    assert manager.active_connections["S2"] == {good}
+
+
+@pytest.mark.asyncio
+async def test_backlogged_client_gets_only_latest_updates_and_every_status():
+    manager = ConnectionManager()
+    slow = FakeWebSocket(stall=0.05)
+    await manager.connect(slow, "S4")
+    await drain()  # writer now waiting for the first frame
+
+    await manager.broadcast_local("S4", {"type": "qr_update", "sequence_number": 0})
+    await asyncio.sleep(0)  # first frame is in flight
+    for sequence in range(1, 50):
+        await manager.broadcast_local("S4", {"type": "qr_update", "sequence_number": sequence})
+        await manager.broadcast_local("S4", {"type": "attendance_update", "total_present": sequence})
+        if sequence % 10 == 0:
+            await manager.broadcast_local("S4", {"type": "session_status", "status": f"s{sequence}"})
+
+    assert len(manager.connections[slow].queue) == 2 + 4
+    await asyncio.sleep(0.6)
+
+    types = [message["type"] for message in slow.received]
+    assert types.count("session_status") == 4
+    assert types.count("qr_update") == 2
+    qr = [message for message in slow.received if message["type"] == "qr_update"]
+    assert qr[-1]["sequence_number"] == 49
+    attendance = [message for message in slow.received if message["type"] == "attendance_update"]
+    assert attendance == [{"type": "attendance_update", "total_present": 49}]
+
+    stats = manager.get_fanout_stats("S4")
+    assert stats["coalesced"] == 48 + 48
+    assert stats["dropped"] == 0
+    manager.disconnect(slow)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_reply_and_evicts_on_overflow():
+    manager = ConnectionManager()
+    stuck = FakeWebSocket(stall=10)
+    with patch("app.services.websocket_manager.settings") as mock_settings:
+        mock_settings.WS_SEND_TIMEOUT_SECONDS = 5
+        mock_settings.WS_SLOW_CONSUMER_MAX_STRIKES = 3
+        mock_settings.WS_OUTBOUND_QUEUE_SIZE = 2
+        await manager.connect(stuck, "S5")
+
+        await manager.send_personal_message({"type": "pong"}, stuck)
+        await asyncio.sleep(0)  # writer takes it and stalls
+        await manager.send_personal_message({"type": "pong"}, stuck)
+        await manager.broadcast_local("S5", {"type": "session_status", "status": "a"})
+        await manager.broadcast_local("S5", {"type": "session_status", "status": "b"})
+        assert manager.get_fanout_stats("S5")["dropped"] == 1
+
+        await manager.broadcast_local("S5", {"type": "session_status", "status": "c"})
+
+    assert stuck not in manager.connections
+    assert manager.get_connection_count("S5") == 0
+
+
+@pytest.mark.asyncio
+async def test_message_encoded_once_per_encoding():
+    manager = ConnectionManager()
+    for _ in range(10):
+        await manager.connect(FakeWebSocket(), "S3")
+
+    with patch("app.services.websocket_manager.ws_codec.encode", wraps=__import__(
+        "app.services.ws_codec", fromlist=["encode"]
+    ).encode) as encode:
+        await manager.broadcast_to_session("S3", {"type": "qr_update", "sequence_number": 1})
+
+    assert encode.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_slow_send_is_not_cancelled_or_lost():
+    manager = ConnectionManager()
+    laggy = FakeWebSocket(stall=0.03)
+    with patch("app.services.websocket_manager.settings") as mock_settings:
+        mock_settings.WS_SEND_TIMEOUT_SECONDS = 0.01
+        mock_settings.WS_SLOW_CONSUMER_MAX_STRIKES = 10
+        mock_settings.WS_OUTBOUND_QUEUE_SIZE = 8
+        await manager.connect(laggy, "S6")
+
+        await manager.broadcast_local("S6", {"type": "session_status", "status": "a"})
+        await manager.broadcast_local("S6", {"type": "session_status", "status": "b"})
+        await asyncio.sleep(0.15)
+
+    assert [m["status"] for m in laggy.received] == ["a", "b"]
+    assert manager.get_connection_count("S6") == 1
+    assert manager.get_fanout_stats("S6")["timeouts"] >= 2
+    manager.disconnect(laggy)
+
+
+@pytest.mark.asyncio
+async def test_sweep_pings_quiet_connections_and_reaps_silent_ones():
+    manager = ConnectionManager()
+    chatty, quiet, dead = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    with patch("app.services.websocket_manager.settings") as mock_settings:
+        mock_settings.WS_SEND_TIMEOUT_SECONDS = 1
+        mock_settings.WS_SLOW_CONSUMER_MAX_STRIKES = 3
+        mock_settings.WS_OUTBOUND_QUEUE_SIZE = 8
+        mock_settings.WS_HEARTBEAT_INTERVAL_SECONDS = 15
+        mock_settings.WS_HEARTBEAT_TIMEOUT_SECONDS = 45
+        for ws in (chatty, quiet, dead):
+            await manager.connect(ws, "S7")
+
+        now = manager.connections[chatty].last_seen
+        manager.connections[quiet].last_seen = now - 20
+        manager.connections[dead].last_seen = now - 50
+
+        assert manager.sweep(now=now) == (1, 1)
+        await drain()
+
+    assert quiet.received == [{"type": "ping"}]
+    assert chatty.received == []
+    assert dead.closed
+    assert manager.active_connections["S7"] == {chatty, quiet}
+    assert manager.get_connection_stats()["reaped"] == 1
+
+    manager.touch(quiet)
+    assert manager.connections[quiet].last_seen >= now
+    for ws in (chatty, quiet):
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_connection_stats_by_role_and_bytes_sent():
+    manager = ConnectionManager()
+    board, phone = FakeWebSocket(), FakeWebSocket()
+    await manager.connect(board, "S8", role="smartboard")
+    await manager.connect(phone, "S8", role="not-a-role")
+
+    await manager.broadcast_local("S8", {"type": "session_status", "status": "a"})
+    await drain()
+
+    stats = manager.get_connection_stats("S8")
+    assert stats["connections"] == 2
+    assert stats["by_role"] == {"smartboard": 1, "unknown": 1}
+    frame_size = len(json.dumps({"type": "session_status", "status": "a"}, separators=(",", ":")))
+    assert stats["bytes_sent"] == 2 * frame_size
+    assert sorted(c["role"] for c in stats["session"]) == ["smartboard", "unknown"]
+    for ws in (board, phone):
+        manager.disconnect(ws)
+
+
+@pytest.mark.asyncio
+async def test_broadcasts_reach_only_subscribed_topics():
+    manager = ConnectionManager()
+    board, faculty, legacy = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    await manager.connect(board, "S9", role="smartboard")
+    await manager.connect(faculty, "S9", role="faculty")
+    await manager.connect(legacy, "S9")
+
+    await manager.broadcast_local("S9", {"type": "qr_update", "sequence_number": 1})
+    await manager.broadcast_local("S9", {
+        "type": "attendance_update", "total_present": 3, "latest_student": "Asha",
+        "students_added": [{"student_id": "s3", "name": "Asha"}]
+    })
+    await manager.broadcast_local("S9", {"type": "session_status", "status": "ended"})
+    await asyncio.sleep(0.02)
+
+    assert [m["type"] for m in board.received] == ["qr_update", "attendance_update", "session_status"]
+    assert board.received[1] == {"type": "attendance_update", "total_present": 3}
+    assert [m["type"] for m in faculty.received] == ["attendance_update", "session_status"]
+    assert faculty.received[0]["latest_student"] == "Asha"
+    assert [m["type"] for m in legacy.received] == ["qr_update", "attendance_update", "session_status"]
+    assert legacy.received[1]["latest_student"] == "Asha"
+    assert manager.get_fanout_stats("S9")["broadcasts"] == 3
+
+    manager.disconnect(board)
+    assert "qr" in manager.topic_connections["S9"]  # legacy client still on it
+    manager.disconnect(legacy)
+    assert "qr" not in manager.topic_connections["S9"]
+    manager.disconnect(faculty)
+    assert "S9" not in manager.topic_connections
@@ -0,0 +1,44 @@
+import json
+
+import msgpack
+
+from app.services import ws_codec
+
+MESSAGE = {
+    "type": "attendance_update",
+    "session_id": "S1",
+    "total_present": 3,
+    "students_added": [{"student_id": "s3", "name": "Asha"}],
+}
+
+
+def test_handshake_picks_first_offered_subprotocol():
+    offered = ["other.v1", "intelliattend.msgpack-short", "intelliattend.json"]
+    assert ws_codec.negotiate_handshake(offered) == ("msgpack-short", "intelliattend.msgpack-short")
+
+
+def test_handshake_without_known_subprotocol_falls_back_to_query_then_json():
+    assert ws_codec.negotiate_handshake(["other.v1"], "msgpack") == ("msgpack", None)
+    assert ws_codec.negotiate_handshake([], "bogus") == ("json", None)
+
+
+def test_short_keys_round_trip():
+    is_binary, payload = ws_codec.encode(MESSAGE, ws_codec.ENCODING_MSGPACK_SHORT)
+    assert is_binary
+
+    longer = {short: key for key, short in ws_codec.short_key_pairs()}
+
+    def expand(value):
+        if isinstance(value, dict):
+            return {longer.get(key, key): expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [expand(item) for item in value]
+        return value
+
+    assert expand(msgpack.unpackb(payload)) == MESSAGE
+    assert len(payload) < len(ws_codec.encode(MESSAGE, ws_codec.ENCODING_MSGPACK)[1])
+    assert len(payload) < len(json.dumps(MESSAGE))
+
+
+def test_short_keys_are_unique():
+    assert len(set(ws_codec.SHORT_KEYS.values())) == len(ws_codec.SHORT_KEYS)
@@ -103,7 +103,10 @@ function connectWebSocket(sid) {
 
     websocket.onmessage = (event) => {
         const data = JSON.parse(event.data);
-        if (data.type === 'qr_update') {
+        if (data.type === 'ping') {
+            // Server heartbeat: answer or the connection is reaped
+            websocket.send(JSON.stringify({ type: 'pong' }));
+        } else if (data.type === 'qr_update') {
             handleUpdate(data);
         } else if (data.type === 'attendance_update') {
             addLog('SUCCESS', `Attendance sync: ${data.total_present} verified.`);
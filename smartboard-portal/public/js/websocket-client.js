@@ -23,7 +23,7 @@ function initializeWebSocket(sessionId) {
 
     // Construct WebSocket URL
     // Construct WebSocket URL
-    const wsUrl = `${CONFIG.WS_URL}/api/v1/websocket/session/${sessionId}`;
+    const wsUrl = `${CONFIG.WS_URL}/api/v1/websocket/session/${sessionId}?role=smartboard`;
 
     try {
         websocket = new WebSocket(wsUrl);
@@ -63,6 +63,11 @@ function handleWebSocketMessage(event) {
 
         // Handle different message types
         switch (data.type) {
+            case 'ping':
+                // Server heartbeat: answer or the connection is reaped
+                websocket.send(JSON.stringify({ type: 'pong' }));
+                break;
+
             case 'connected':
                 console.log('[WebSocket] Connection established:', data.message);
                 break;